@@ -0,0 +1,11 @@
+"""
+Benchmarks
+
+Timed scenarios over the repository and geo hot paths, run against a
+deterministic synthetic dataset (see benchmarks/synthetic.py).
+
+Usage (from the repository root):
+    python -m benchmarks.run --rows 100000 --output results.json
+    python -m benchmarks.run --rows 100000 --baseline results.json --threshold 0.2
+    python -m benchmarks.results old.json new.json --threshold 0.2
+"""
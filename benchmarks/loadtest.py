@@ -0,0 +1,507 @@
+"""
+HTTP Load Generator
+
+Replays a realistic mix of API requests against the server at a target
+rate and reports latency percentiles, throughput and error rate per
+operation.
+
+By default the application from main.py is started in a child process on
+a free local port, serving a copy of a synthetic dataset (see
+benchmarks/synthetic.py) so the real database is never touched. With
+``--url`` an already running server is targeted instead (for example
+``python main.py --backend-only --workers 4``); the requests authenticate
+with ``--token``, or with a token obtained by logging in as ``--email``.
+
+Requests arrive as a Poisson process (open loop): a slow server does not
+slow the arrivals down, and latency is measured from the moment a request
+was due, so queueing delay is included (no coordinated omission).
+
+Usage (from the repository root):
+    python -m benchmarks.loadtest --rows 100000 --rate 200 --duration 30
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --email me@example.com --rate 50
+    python -m benchmarks.loadtest --mix viewport=80 search=20 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import getpass
+import multiprocessing
+import random
+import secrets
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import httpx
+
+from benchmarks.synthetic import CITIES, PLACES, QUALIFIERS, load_dataset
+
+DEFAULT_RATE = 50.0
+DEFAULT_DURATION = 20.0
+DEFAULT_CONNECTIONS = 64
+DEFAULT_ROWS = 10_000
+
+# Markers per page of the map viewport reads
+VIEWPORT_PAGE = 500
+
+SEARCH_TERMS = ["Trattoria", "abbandonata", "tramonto", "Porto", "Milano", "Faro", "zzz"]
+
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class Target:
+    """What the requests can refer to on the server under test"""
+
+    marker_ids: list[int]
+    label_ids: list[int]
+    label_names: list[str]
+
+
+@dataclass
+class Operation:
+    """A kind of request of the mix"""
+
+    name: str
+    route: str
+    # Called with the random generator and the target, returns httpx.request arguments
+    build: Callable[[random.Random, Target], dict]
+
+
+def _viewport(rng: random.Random, target: Target) -> dict:
+    # Panning and zooming the map: pages of pins, sometimes filtered by labels
+    params = {
+        "fields": "id,title,latitude,longitude,is_favorite,labels",
+        "limit": VIEWPORT_PAGE,
+        "offset": VIEWPORT_PAGE * rng.randrange(4),
+    }
+    if target.label_ids and rng.random() < 0.3:
+        chosen = rng.sample(target.label_ids, min(len(target.label_ids), rng.randint(1, 2)))
+        params["label_ids"] = ",".join(map(str, chosen))
+    return {"method": "GET", "url": "/api/v1/markers", "params": params}
+
+
+def _detail(rng: random.Random, target: Target) -> dict:
+    marker_id = rng.choice(target.marker_ids) if target.marker_ids else 1
+    return {"method": "GET", "url": f"/api/v1/markers/{marker_id}"}
+
+
+def _search(rng: random.Random, target: Target) -> dict:
+    params = {"search": rng.choice(SEARCH_TERMS), "limit": 50}
+    return {"method": "GET", "url": "/api/v1/markers", "params": params}
+
+
+def _labels(rng: random.Random, target: Target) -> dict:
+    return {"method": "GET", "url": "/api/v1/labels"}
+
+
+def _create(rng: random.Random, target: Target) -> dict:
+    # Markers are created through the import endpoint, the real write path
+    _, latitude, longitude, _, spread = rng.choice(CITIES)
+    labels = rng.sample(target.label_names, min(len(target.label_names), rng.randint(0, 2)))
+    feature = {
+        "type": "Feature",
+        "geometry": {
+            "type": "Point",
+            "coordinates": [
+                round(rng.gauss(longitude, spread), 6), round(rng.gauss(latitude, spread), 6)
+            ],
+        },
+        "properties": {
+            "name": f"{rng.choice(PLACES)} {rng.choice(QUALIFIERS)} load",
+            "labels": labels,
+        },
+    }
+    document = json.dumps({"type": "FeatureCollection", "features": [feature]})
+    return {
+        "method": "POST",
+        "url": "/api/v1/import/geojson",
+        "files": {"file": ("marker.geojson", document.encode(), "application/geo+json")},
+    }
+
+
+def _label_edit(rng: random.Random, target: Target) -> dict:
+    params = {
+        "name": f"load-{rng.randrange(1_000_000)}",
+        "color": f"#{rng.randrange(0x1000000):06x}",
+        "icon": "tag",
+    }
+    return {"method": "POST", "url": "/api/v1/labels", "params": params}
+
+
+OPERATIONS = {
+    operation.name: operation for operation in (
+        Operation("viewport", "GET /api/v1/markers", _viewport),
+        Operation("detail", "GET /api/v1/markers/{marker_id}", _detail),
+        Operation("search", "GET /api/v1/markers?search", _search),
+        Operation("labels", "GET /api/v1/labels", _labels),
+        Operation("create", "POST /api/v1/import/{import_format}", _create),
+        Operation("label_edit", "POST /api/v1/labels", _label_edit),
+    )
+}
+
+# Relative frequency of each operation: mostly map reads
+DEFAULT_MIX = {
+    "viewport": 45, "detail": 15, "search": 15, "labels": 10, "create": 10, "label_edit": 5,
+}
+
+
+def parse_mix(items: list[str] | None) -> dict[str, float]:
+    """
+    Parse ``name=weight`` items
+
+    Raises:
+        ValueError: If an operation is unknown or a weight is not a number
+    """
+    if not items:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition("=")
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r} (known: {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-percent * len(sorted_values) // 100)))
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class RouteStats:
+    """Outcome of the requests of one operation"""
+
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: dict[int, int] = field(default_factory=dict)
+
+    def record(self, latency: float, status: int | None) -> None:
+        self.latencies.append(latency)
+        key = status if status is not None else 0
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if status is None or status >= 400:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> dict:
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        summary = {
+            "requests": count,
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(self.errors / count, 4) if count else 0.0,
+            "statuses": {str(status): n for status, n in sorted(self.statuses.items())},
+        }
+        for percent in PERCENTILES:
+            summary[f"p{percent}_ms"] = round(percentile(latencies, percent) * 1000, 3)
+        return summary
+
+
+async def _send(
+    client: httpx.AsyncClient,
+    request: dict,
+    due: float,
+    stats: RouteStats
+) -> None:
+    loop = asyncio.get_running_loop()
+    try:
+        response = await client.request(**request)
+        await response.aclose()
+        status = response.status_code
+    except httpx.HTTPError:
+        status = None
+    stats.record(loop.time() - due, status)
+
+
+def login(base_url: str, email: str, password: str) -> str:
+    """Access token of a user of the server under test"""
+    response = httpx.post(
+        f"{base_url}/api/v1/auth/token", data={"username": email, "password": password}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def discover_target(client: httpx.AsyncClient) -> Target:
+    """Marker and label IDs the generated requests can refer to"""
+    labels = (await client.get("/api/v1/labels")).json()["labels"]
+    markers = (await client.get(
+        "/api/v1/markers", params={"fields": "id", "limit": 1000}
+    )).json()["markers"]
+    return Target(
+        marker_ids=[marker["id"] for marker in markers],
+        label_ids=[label["id"] for label in labels],
+        label_names=[label["name"] for label in labels],
+    )
+
+
+async def run_load(
+    base_url: str,
+    token: str,
+    mix: dict[str, float],
+    rate: float,
+    duration: float,
+    connections: int = DEFAULT_CONNECTIONS,
+    seed: int = 42
+) -> dict:
+    """
+    Send requests drawn from ``mix`` at ``rate`` per second for ``duration`` seconds
+
+    Every request carries ``token`` as its bearer access token.
+
+    Returns:
+        Report with the per-operation summaries and the overall totals
+    """
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    stats = {name: RouteStats() for name in names}
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(
+        base_url=base_url, headers=headers, limits=limits, timeout=60
+    ) as client:
+        target = await discover_target(client)
+        loop = asyncio.get_running_loop()
+        tasks = set()
+        started = loop.time()
+        due = started
+        while True:
+            due += rng.expovariate(rate)
+            if due - started >= duration:
+                break
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            name = rng.choices(names, weights)[0]
+            request = OPERATIONS[name].build(rng, target)
+            task = asyncio.create_task(_send(client, request, due, stats[name]))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - started
+
+    total = RouteStats()
+    for route_stats in stats.values():
+        total.latencies.extend(route_stats.latencies)
+        total.errors += route_stats.errors
+        for status, count in route_stats.statuses.items():
+            total.statuses[status] = total.statuses.get(status, 0) + count
+    return {
+        "meta": {
+            "rate": rate,
+            "duration": duration,
+            "connections": connections,
+            "seed": seed,
+            "mix": mix,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "routes": {
+            name: {"route": OPERATIONS[name].route, **stats[name].summary(elapsed)}
+            for name in names
+        },
+        "total": total.summary(elapsed),
+    }
+
+
+def format_report(report: dict) -> str:
+    header = (
+        f"{'operation':<12} {'route':<38} {'requests':>8} {'rps':>8} "
+        f"{'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}"
+    )
+    lines = [header]
+    rows = [(name, summary) for name, summary in report["routes"].items()]
+    rows.append(("total", {"route": "", **report["total"]}))
+    for name, summary in rows:
+        lines.append(
+            f"{name:<12} {summary['route']:<38} {summary['requests']:>8} "
+            f"{summary['throughput_rps']:>8.1f} {summary['p50_ms']:>7.1f}ms "
+            f"{summary['p95_ms']:>7.1f}ms {summary['p99_ms']:>7.1f}ms "
+            f"{summary['error_rate']:>7.1%}"
+        )
+    return "\n".join(lines)
+
+
+# ==================== Local server ====================
+
+def _serve(database: str, user_id: int, ready, log_level: str) -> None:
+    """
+    Child process: serve the application on a free port with a benchmark database
+
+    Puts the port and an access token of the benchmark user on ``ready``.
+    """
+    import uvicorn
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+
+    from pymypersonalmap.config import settings
+    from pymypersonalmap.database import session
+    from pymypersonalmap.main import app
+    from pymypersonalmap.models.user import User
+    from pymypersonalmap.services import auth_service
+
+    # Tokens of this server only
+    settings.SECRET_KEY = secrets.token_urlsafe(32)
+
+    # Same engine setup as the application, on the benchmark database
+    engine = create_engine(
+        f"sqlite:///{database}",
+        poolclass=session.TimedQueuePool,
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    event.listen(engine, "connect", session._configure_connection)
+    session.instrument_engine(engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_benchmark_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[session.get_db] = get_benchmark_db
+    with session_factory() as db:
+        tokens = auth_service.issue_tokens(db.get(User, user_id))
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    ready.put((sock.getsockname()[1], tokens.access_token))
+    # The lifespan would initialize and optimize the real database
+    config = uvicorn.Config(app, lifespan="off", log_level=log_level, access_log=False)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class LocalServer:
+    """
+    The application served by a child process on a copy of a synthetic dataset
+
+    Usage:
+        with LocalServer(rows=10000) as server:
+            asyncio.run(run_load(server.url, server.token, ...))
+    """
+
+    def __init__(
+        self,
+        rows: int,
+        seed: int = 42,
+        db_dir: Path | str | None = None,
+        log_level: str = "warning"
+    ):
+        self.rows = rows
+        self.seed = seed
+        self.db_dir = Path(db_dir or Path(tempfile.gettempdir()) / "mypersonalmap-bench")
+        self.log_level = log_level
+        self.url = ""
+        self.token = ""
+        self._workdir: tempfile.TemporaryDirectory | None = None
+        self._process = None
+
+    def __enter__(self) -> "LocalServer":
+        dataset = load_dataset(self.rows, self.seed, self.db_dir)
+        dataset.engine.dispose()
+
+        # Writes go to a copy, so the cached dataset stays the same between runs
+        self._workdir = tempfile.TemporaryDirectory(prefix="loadtest-")
+        database = Path(self._workdir.name) / "loadtest.db"
+        shutil.copyfile(self.db_dir / f"bench-{self.rows}-{self.seed}.db", database)
+
+        context = multiprocessing.get_context("spawn")
+        ready = context.Queue()
+        self._process = context.Process(
+            target=_serve,
+            args=(str(database), dataset.user_id, ready, self.log_level),
+            daemon=True,
+        )
+        self._process.start()
+        port, self.token = ready.get(timeout=120)
+        self.url = f"http://127.0.0.1:{port}"
+        self._wait_ready()
+        return self
+
+    def _wait_ready(self, timeout: float = 60.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"{self.url}/health", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            if not self._process.is_alive():
+                break
+            time.sleep(0.1)
+        raise RuntimeError("The benchmark server did not start")
+
+    def __exit__(self, *exc_info) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(10)
+            if self._process.is_alive():
+                self._process.kill()
+        if self._workdir is not None:
+            self._workdir.cleanup()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the PyMyPersonalMap API")
+    parser.add_argument("--url", help="Server to load (default: start one on a synthetic dataset)")
+    parser.add_argument("--token", help="Access token of the requests with --url")
+    parser.add_argument("--email",
+                        help="With --url, log in as this user (the password is prompted)")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS,
+                        help=f"Markers in the synthetic dataset (default: {DEFAULT_ROWS})")
+    parser.add_argument("--seed", type=int, default=42, help="Dataset and request mix seed")
+    parser.add_argument("--db-dir", help="Directory where generated datasets are kept")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help=f"Requests per second (default: {DEFAULT_RATE:g})")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION,
+                        help=f"Seconds of load (default: {DEFAULT_DURATION:g})")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS,
+                        help=f"Maximum open connections (default: {DEFAULT_CONNECTIONS})")
+    parser.add_argument("--mix", nargs="+", metavar="OPERATION=WEIGHT",
+                        help=f"Request mix (default: "
+                             f"{' '.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())})")
+    parser.add_argument("--output", help="Write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.url and not (args.token or args.email):
+        parser.error("--url needs --token or --email")
+
+    def load(url: str, token: str) -> dict:
+        return asyncio.run(run_load(
+            url, token, mix, args.rate, args.duration, args.connections, args.seed
+        ))
+
+    if args.url:
+        token = args.token or login(args.url, args.email, getpass.getpass())
+        report = load(args.url, token)
+    else:
+        with LocalServer(args.rows, args.seed, args.db_dir) as server:
+            print(f"Serving {args.rows} synthetic markers at {server.url}")
+            report = load(server.url, server.token)
+
+    print(format_report(report))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
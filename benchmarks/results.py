@@ -0,0 +1,147 @@
+"""
+Benchmark Results
+
+Timing statistics, the JSON results file and the comparison of two runs.
+Runs are compared on the median, which is the statistic least affected by
+a noisy neighbour; a scenario regresses when its median grew by more
+than the threshold (0.2 = 20% slower).
+
+Usage:
+    python -m benchmarks.results baseline.json current.json --threshold 0.2
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import sqlalchemy
+
+DEFAULT_THRESHOLD = 0.2
+
+
+@dataclass
+class Regression:
+    """A scenario slower than its baseline"""
+
+    name: str
+    baseline_ms: float
+    current_ms: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current_ms / self.baseline_ms
+
+
+def summarize(seconds: list[float]) -> dict:
+    """Statistics (in milliseconds) of the timings of one scenario"""
+    timings = sorted(value * 1000 for value in seconds)
+    p95 = timings[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))]
+    return {
+        "repeat": len(timings),
+        "min_ms": round(timings[0], 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "p95_ms": round(p95, 4),
+        "mean_ms": round(statistics.fmean(timings), 4),
+    }
+
+
+def build_results(rows: int, seed: int, results: dict[str, dict]) -> dict:
+    """Results document with the environment they were measured in"""
+    return {
+        "meta": {
+            "rows": rows,
+            "seed": seed,
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+
+
+def save_results(document: dict, path: Path | str) -> None:
+    Path(path).write_text(json.dumps(document, indent=2) + "\n", encoding="utf-8")
+
+
+def load_results(path: Path | str) -> dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def compare(
+    baseline: dict,
+    current: dict,
+    threshold: float = DEFAULT_THRESHOLD
+) -> list[Regression]:
+    """
+    Scenarios whose median grew by more than ``threshold``
+
+    Scenarios missing from either run are ignored.
+
+    Args:
+        baseline: Results document of the reference run
+        current: Results document of the new run
+        threshold: Tolerated slowdown (0.2 = 20%)
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None or reference["median_ms"] <= 0:
+            continue
+        if result["median_ms"] > reference["median_ms"] * (1 + threshold):
+            regressions.append(
+                Regression(name, reference["median_ms"], result["median_ms"])
+            )
+    return regressions
+
+
+def format_comparison(baseline: dict, current: dict) -> str:
+    """Side-by-side medians of two runs"""
+    lines = [f"{'scenario':<24} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            lines.append(f"{name:<24} {'-':>12} {result['median_ms']:>10.3f}ms {'new':>8}")
+            continue
+        change = result["median_ms"] / reference["median_ms"] - 1 if reference["median_ms"] else 0
+        lines.append(
+            f"{name:<24} {reference['median_ms']:>10.3f}ms "
+            f"{result['median_ms']:>10.3f}ms {change:>+8.1%}"
+        )
+    return "\n".join(lines)
+
+
+def check(baseline: dict, current: dict, threshold: float) -> int:
+    """Print the comparison and return the exit code (1 on regression)"""
+    if baseline["meta"]["rows"] != current["meta"]["rows"]:
+        print(
+            f"warning: comparing {baseline['meta']['rows']} rows "
+            f"with {current['meta']['rows']} rows"
+        )
+    print(format_comparison(baseline, current))
+    regressions = compare(baseline, current, threshold)
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression.name}: {regression.baseline_ms:.3f}ms -> "
+            f"{regression.current_ms:.3f}ms ({regression.ratio:.2f}x)"
+        )
+    return 1 if regressions else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline", help="Results of the reference run")
+    parser.add_argument("current", help="Results of the new run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Tolerated median slowdown (default: 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    return check(load_results(args.baseline), load_results(args.current), args.threshold)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Benchmark Runner
+
+Generates (or reuses) the synthetic dataset, times every scenario and
+writes the results as JSON. With ``--baseline`` the run is compared to a
+previous results file and exits with status 1 on regression.
+
+Usage:
+    python -m benchmarks.run --rows 100000 --output results.json
+    python -m benchmarks.run --rows 100000 --baseline results.json --threshold 0.2
+"""
+
+import argparse
+import gc
+import sys
+import time
+
+from benchmarks import results as results_module
+from benchmarks.scenarios import SCENARIOS, Scenario
+from benchmarks.synthetic import Dataset, load_dataset
+
+DEFAULT_ROWS = 10_000
+DEFAULT_REPEAT = 20
+WARMUP = 2
+
+
+def time_scenario(scenario: Scenario, dataset: Dataset, repeat: int) -> dict:
+    """Time ``repeat`` calls of a scenario after a short warmup"""
+    db = dataset.session()
+    try:
+        run = scenario.prepare(dataset, db)
+        for _ in range(WARMUP):
+            run()
+        timings = []
+        gc.collect()
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+            db.rollback()
+        return results_module.summarize(timings)
+    finally:
+        db.close()
+
+
+def run_benchmarks(
+    dataset: Dataset,
+    repeat: int = DEFAULT_REPEAT,
+    names: list[str] | None = None
+) -> dict:
+    """
+    Time the scenarios against a dataset
+
+    Args:
+        dataset: Populated benchmark database
+        repeat: Timed calls per scenario
+        names: Scenarios to run (None = all)
+
+    Returns:
+        Results document (see benchmarks.results.build_results)
+    """
+    timings = {}
+    for scenario in SCENARIOS:
+        if names and scenario.name not in names:
+            continue
+        timings[scenario.name] = time_scenario(scenario, dataset, repeat)
+        summary = timings[scenario.name]
+        print(
+            f"{scenario.name:<24} median {summary['median_ms']:>10.3f}ms  "
+            f"p95 {summary['p95_ms']:>10.3f}ms  ({scenario.description})"
+        )
+    return results_module.build_results(dataset.rows, dataset.seed, timings)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the PyMyPersonalMap benchmarks")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS,
+                        help=f"Markers in the dataset (default: {DEFAULT_ROWS})")
+    parser.add_argument("--seed", type=int, default=42, help="Dataset seed")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help=f"Timed calls per scenario (default: {DEFAULT_REPEAT})")
+    parser.add_argument("--db-dir",
+                        help="Directory where generated datasets are kept "
+                             "(default: in memory, regenerated each run)")
+    parser.add_argument("--scenarios", nargs="+",
+                        choices=[scenario.name for scenario in SCENARIOS],
+                        help="Scenarios to run (default: all)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with this results file")
+    parser.add_argument("--threshold", type=float, default=results_module.DEFAULT_THRESHOLD,
+                        help="Tolerated median slowdown against the baseline "
+                             "(default: 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    dataset = load_dataset(args.rows, args.seed, args.db_dir)
+    print(f"Dataset: {args.rows} markers, seed {args.seed} "
+          f"({time.perf_counter() - started:.1f}s)")
+
+    try:
+        document = run_benchmarks(dataset, args.repeat, args.scenarios)
+    finally:
+        dataset.engine.dispose()
+
+    if args.output:
+        results_module.save_results(document, args.output)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        print()
+        return results_module.check(
+            results_module.load_results(args.baseline), document, args.threshold
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
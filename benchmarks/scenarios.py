@@ -0,0 +1,188 @@
+"""
+Benchmark Scenarios
+
+Each scenario prepares deterministic arguments from the dataset and
+returns a callable timed once per repetition. Queries run through the
+same repository and service functions as the API.
+"""
+
+import json
+import random
+from dataclasses import dataclass
+from typing import Callable
+
+from benchmarks.synthetic import CITIES, Dataset, create_database, generate_markers
+from pymypersonalmap.models.user import User
+from pymypersonalmap.repository import labels_repository, marker_repository
+from pymypersonalmap.services import marker_service, snapshot_service
+from pymypersonalmap.services.marker_index import get_marker_index
+
+# Markers inserted per bulk insert repetition
+BULK_INSERT_ROWS = 1000
+
+# Rows serialized per serialization repetition
+SERIALIZATION_ROWS = 1000
+
+# Radius and viewport of the map queries
+RADIUS_METERS = 5000
+VIEWPORT_DEGREES = 0.2
+
+
+@dataclass
+class Scenario:
+    """A named, timed operation"""
+
+    name: str
+    description: str
+    # Called with the dataset and an open session, returns the timed callable
+    prepare: Callable
+
+
+def _city_points(rng: random.Random, count: int = 64) -> list[tuple[float, float]]:
+    """Query points near the cities (where the markers and the users are)"""
+    points = []
+    for _ in range(count):
+        _, latitude, longitude, _, spread = rng.choice(CITIES)
+        points.append((rng.gauss(latitude, spread), rng.gauss(longitude, spread)))
+    return points
+
+
+def _cycle(values: list):
+    """Callable returning the next value of a list at each call"""
+    state = {"next": 0}
+
+    def next_value():
+        value = values[state["next"] % len(values)]
+        state["next"] += 1
+        return value
+    return next_value
+
+
+def prepare_radius(dataset: Dataset, db) -> Callable:
+    next_point = _cycle(_city_points(random.Random(dataset.seed)))
+
+    def run():
+        latitude, longitude = next_point()
+        db.expunge_all()
+        return marker_repository.get_markers_within_radius(
+            db, latitude, longitude, RADIUS_METERS, user_id=dataset.user_id
+        )
+    return run
+
+
+def prepare_bbox(dataset: Dataset, db) -> Callable:
+    next_point = _cycle(_city_points(random.Random(dataset.seed)))
+    half = VIEWPORT_DEGREES / 2
+
+    def run():
+        latitude, longitude = next_point()
+        db.expunge_all()
+        return marker_repository.get_markers_in_bounding_box(
+            db, latitude - half, longitude - half, latitude + half, longitude + half,
+            user_id=dataset.user_id
+        )
+    return run
+
+
+def _index_scenario(query: str) -> Callable:
+    def prepare(dataset: Dataset, db) -> Callable:
+        index = get_marker_index()
+        index.get(db, dataset.user_id)
+        next_point = _cycle(_city_points(random.Random(dataset.seed)))
+        half = VIEWPORT_DEGREES / 2
+
+        def run():
+            latitude, longitude = next_point()
+            if query == "radius":
+                return index.within_radius(
+                    db, dataset.user_id, latitude, longitude, RADIUS_METERS
+                )
+            return index.in_bbox(
+                db, dataset.user_id,
+                latitude - half, longitude - half, latitude + half, longitude + half
+            )
+        return run
+    return prepare
+
+
+def prepare_search(dataset: Dataset, db) -> Callable:
+    next_term = _cycle(["Trattoria", "abbandonata", "tramonto", "Porto", "Milano", "zzz"])
+
+    def run():
+        db.expunge_all()
+        return marker_repository.search_markers(db, next_term(), user_id=dataset.user_id)
+    return run
+
+
+def prepare_label_counts(dataset: Dataset, db) -> Callable:
+    def run():
+        return {
+            label_id: labels_repository.count_markers_with_label(db, label_id)
+            for label_id in dataset.label_ids
+        }
+    return run
+
+
+def prepare_label_counts_snapshot(dataset: Dataset, db) -> Callable:
+    snapshot = snapshot_service.build_snapshot(db, dataset.user_id)
+    return snapshot.label_counts
+
+
+def prepare_bulk_insert(dataset: Dataset, db) -> Callable:
+    rows = list(generate_markers(BULK_INSERT_ROWS, dataset.seed, dataset.label_ids))
+
+    def run():
+        # Fresh database each time, so every repetition does the same work
+        engine, session_factory = create_database()
+        target = session_factory()
+        try:
+            user = User(username="bulk", email="bulk@example.com", hashed_password="-")
+            target.add(user)
+            target.commit()
+            return marker_repository.bulk_create_markers(target, user.idUser, rows)
+        finally:
+            target.close()
+            engine.dispose()
+    return run
+
+
+def prepare_serialize_rows(dataset: Dataset, db) -> Callable:
+    def run():
+        _, markers = marker_service.list_markers(
+            db, dataset.user_id, limit=SERIALIZATION_ROWS
+        )
+        return json.dumps(markers, default=str)
+    return run
+
+
+def prepare_serialize_orm(dataset: Dataset, db) -> Callable:
+    def run():
+        db.expunge_all()
+        markers = marker_repository.get_all_markers(
+            db, user_id=dataset.user_id, limit=SERIALIZATION_ROWS,
+            with_details=True, with_labels=True
+        )
+        return json.dumps([marker.to_dict() for marker in markers], default=str)
+    return run
+
+
+SCENARIOS = [
+    Scenario("radius", f"Markers within {RADIUS_METERS} m of a city point (SQL)",
+             prepare_radius),
+    Scenario("radius_index", "Same radius query on the in-memory MarkerIndex",
+             _index_scenario("radius")),
+    Scenario("bbox", f"Markers in a {VIEWPORT_DEGREES} degree viewport (SQL)", prepare_bbox),
+    Scenario("bbox_index", "Same viewport on the in-memory MarkerIndex",
+             _index_scenario("bbox")),
+    Scenario("search", "search_markers on title/description", prepare_search),
+    Scenario("label_counts", "count_markers_with_label for every label",
+             prepare_label_counts),
+    Scenario("label_counts_snapshot", "Label counts from the columnar snapshot",
+             prepare_label_counts_snapshot),
+    Scenario("bulk_insert", f"bulk_create_markers of {BULK_INSERT_ROWS} rows",
+             prepare_bulk_insert),
+    Scenario("serialize_rows", f"list_markers + JSON of {SERIALIZATION_ROWS} rows",
+             prepare_serialize_rows),
+    Scenario("serialize_orm", f"ORM load + to_dict + JSON of {SERIALIZATION_ROWS} markers",
+             prepare_serialize_orm),
+]
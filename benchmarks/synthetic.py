@@ -0,0 +1,231 @@
+"""
+Synthetic Dataset Generator
+
+Deterministic, city-like marker distributions for benchmarks: most
+markers are clustered around real cities (Gaussian spread proportional to
+the city size, weighted by population), the rest are scattered over the
+countryside. Titles and descriptions are assembled from word lists so
+that text search has realistic selectivity, and labels follow a skewed
+popularity like real libraries (a few labels on most markers).
+
+The same ``seed`` and ``count`` always produce the same rows.
+"""
+
+import math
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from pymypersonalmap.database.session import Base
+from pymypersonalmap.models.user import User
+from pymypersonalmap.repository import labels_repository, marker_repository
+from pymypersonalmap.services.label_service import SYSTEM_LABELS
+
+# (name, latitude, longitude, weight, spread in degrees)
+CITIES = [
+    ("Milano", 45.4642, 9.1900, 10, 0.08),
+    ("Roma", 41.9028, 12.4964, 12, 0.10),
+    ("Napoli", 40.8518, 14.2681, 7, 0.06),
+    ("Torino", 45.0703, 7.6869, 6, 0.06),
+    ("Firenze", 43.7696, 11.2558, 5, 0.04),
+    ("Bologna", 44.4949, 11.3426, 4, 0.04),
+    ("Venezia", 45.4408, 12.3155, 4, 0.03),
+    ("Palermo", 38.1157, 13.3615, 4, 0.05),
+    ("Bari", 41.1171, 16.8719, 3, 0.04),
+    ("Genova", 44.4056, 8.9463, 3, 0.04),
+    ("Paris", 48.8566, 2.3522, 9, 0.10),
+    ("London", 51.5074, -0.1278, 9, 0.12),
+    ("Berlin", 52.5200, 13.4050, 6, 0.10),
+    ("Barcelona", 41.3874, 2.1686, 5, 0.06),
+    ("Wien", 48.2082, 16.3738, 3, 0.06),
+    ("New York", 40.7128, -74.0060, 6, 0.12),
+    ("Tokyo", 35.6762, 139.6503, 5, 0.15),
+    ("Sydney", -33.8688, 151.2093, 2, 0.10),
+]
+
+# Fraction of markers outside any city
+COUNTRYSIDE_FRACTION = 0.1
+# Countryside markers fall in this box (roughly Europe)
+COUNTRYSIDE_BOX = (36.0, -10.0, 60.0, 30.0)
+
+PLACES = [
+    "Trattoria", "Osteria", "Chiesa", "Villa", "Fabbrica", "Stazione", "Ponte", "Castello",
+    "Parco", "Belvedere", "Museo", "Faro", "Torre", "Mercato", "Piazza", "Cascina",
+]
+QUALIFIERS = [
+    "Vecchia", "Abbandonata", "del Porto", "San Marco", "Nuova", "Alta", "dei Pini",
+    "sul Fiume", "Rossa", "Grande", "del Sole", "di Mezzo",
+]
+NOTES = [
+    "accesso libero", "vista sul tramonto", "parcheggio vicino", "chiuso il lunedì",
+    "ottima cucina", "luce migliore al mattino", "entrata sul retro", "sentiero ripido",
+]
+
+# Label popularity decays like 1 / rank ** LABEL_SKEW
+LABEL_SKEW = 1.2
+MAX_LABELS_PER_MARKER = 3
+FAVORITE_FRACTION = 0.1
+
+# Markers inserted per transaction while populating
+INSERT_BATCH_SIZE = 10_000
+
+
+@dataclass
+class Dataset:
+    """A populated benchmark database"""
+
+    engine: Engine
+    session_factory: sessionmaker
+    user_id: int
+    label_ids: list[int]
+    rows: int
+    seed: int
+
+    def session(self) -> Session:
+        return self.session_factory()
+
+
+def _label_weights(count: int) -> list[float]:
+    return [1 / (rank + 1) ** LABEL_SKEW for rank in range(count)]
+
+
+def generate_markers(
+    count: int,
+    seed: int = 42,
+    label_ids: list[int] | None = None
+) -> Iterator[dict]:
+    """
+    Generate marker rows for ``marker_repository.bulk_create_markers``
+
+    Args:
+        count: Number of markers
+        seed: Random seed (same seed, same rows)
+        label_ids: Labels to assign (none if empty)
+
+    Yields:
+        Dictionaries with title, description, latitude, longitude,
+        is_favorite and label_ids
+    """
+    rng = random.Random(seed)
+    weights = [city[3] for city in CITIES]
+    label_ids = list(label_ids or [])
+    label_weights = _label_weights(len(label_ids))
+    min_lat, min_lon, max_lat, max_lon = COUNTRYSIDE_BOX
+
+    for index in range(count):
+        if rng.random() < COUNTRYSIDE_FRACTION:
+            latitude = rng.uniform(min_lat, max_lat)
+            longitude = rng.uniform(min_lon, max_lon)
+            city = "Campagna"
+        else:
+            city, city_lat, city_lon, _, spread = rng.choices(CITIES, weights)[0]
+            latitude = rng.gauss(city_lat, spread)
+            # Same spread in km east-west as north-south
+            longitude = rng.gauss(city_lon, spread / max(math.cos(math.radians(city_lat)), 0.1))
+        latitude = max(-90.0, min(90.0, latitude))
+        longitude = (longitude + 180.0) % 360.0 - 180.0
+
+        labels = []
+        if label_ids:
+            wanted = rng.randint(0, MAX_LABELS_PER_MARKER)
+            labels = list(dict.fromkeys(rng.choices(label_ids, label_weights, k=wanted)))
+
+        yield {
+            "title": f"{rng.choice(PLACES)} {rng.choice(QUALIFIERS)} {index}",
+            "description": f"{city}: {rng.choice(NOTES)}, {rng.choice(NOTES)}",
+            "latitude": round(latitude, 6),
+            "longitude": round(longitude, 6),
+            "is_favorite": rng.random() < FAVORITE_FRACTION,
+            "label_ids": labels,
+        }
+
+
+def create_database(path: Path | str | None = None) -> tuple[Engine, sessionmaker]:
+    """
+    Create an empty benchmark database with the application schema
+
+    Args:
+        path: SQLite file (None = in memory)
+    """
+    url = f"sqlite:///{path}" if path else "sqlite://"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    from pymypersonalmap.models import (  # Register all models
+        attachment, labels, marker, marker_change, marker_label, user
+    )
+    Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def populate(db: Session, count: int, seed: int = 42) -> tuple[int, list[int]]:
+    """
+    Fill a database with a user, the system labels and ``count`` markers
+
+    Returns:
+        Tuple (user ID, label IDs)
+    """
+    user = User(username="bench", email="bench@example.com", hashed_password="-")
+    db.add(user)
+    db.commit()
+    labels = labels_repository.bulk_create_system_labels(db, SYSTEM_LABELS)
+    db.commit()
+    label_ids = [label.idLabel for label in labels]
+
+    batch = []
+    for row in generate_markers(count, seed, label_ids):
+        batch.append(row)
+        if len(batch) == INSERT_BATCH_SIZE:
+            marker_repository.bulk_create_markers(db, user.idUser, batch)
+            batch = []
+    marker_repository.bulk_create_markers(db, user.idUser, batch)
+    return user.idUser, label_ids
+
+
+def load_dataset(rows: int, seed: int = 42, path: Path | str | None = None) -> Dataset:
+    """
+    Open a benchmark database, generating it if needed
+
+    A database file named after ``rows`` and ``seed`` is reused, since
+    generating a million markers takes a while. It is generated under a
+    temporary name, so an interrupted run never leaves a partial dataset.
+
+    Args:
+        rows: Number of markers
+        seed: Random seed
+        path: Directory of the database files (None = in memory, not reused)
+    """
+    if path is None:
+        engine, session_factory = create_database()
+        db = session_factory()
+        try:
+            user_id, label_ids = populate(db, rows, seed)
+        finally:
+            db.close()
+        return Dataset(engine, session_factory, user_id, label_ids, rows, seed)
+
+    file = Path(path) / f"bench-{rows}-{seed}.db"
+    if not file.exists():
+        file.parent.mkdir(parents=True, exist_ok=True)
+        partial = file.with_suffix(".partial")
+        partial.unlink(missing_ok=True)
+        engine, session_factory = create_database(partial)
+        db = session_factory()
+        try:
+            populate(db, rows, seed)
+        finally:
+            db.close()
+            engine.dispose()
+        partial.replace(file)
+
+    engine, session_factory = create_database(file)
+    db = session_factory()
+    try:
+        user_id = db.query(User.idUser).filter(User.username == "bench").scalar()
+        label_ids = [label.idLabel for label in labels_repository.get_system_labels(db)]
+    finally:
+        db.close()
+    return Dataset(engine, session_factory, user_id, label_ids, rows, seed)
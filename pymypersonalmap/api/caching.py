@@ -0,0 +1,54 @@
+"""
+HTTP Caching Helpers
+
+Strong ETags and conditional GET (If-None-Match) support for list endpoints.
+ETags are derived from the user's latest change sequence number, so they
+change exactly when the underlying data does.
+"""
+
+import hashlib
+from fastapi import Request, Response
+
+from pymypersonalmap.utils.metrics import record_cache
+
+
+def make_etag(*parts) -> str:
+    """
+    Build a strong ETag from the values that determine a response
+
+    Args:
+        *parts: Values identifying the representation (resource name, user,
+            change sequence, query string, ...)
+
+    Returns:
+        Quoted ETag value, e.g. '"3f2a..."'
+    """
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check the request's If-None-Match header against an ETag
+
+    Args:
+        request: Incoming request
+        etag: Current ETag of the resource
+
+    Returns:
+        True if the client already has this representation
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # Weak comparison per RFC 9110 section 13.1.2
+    candidates = {value.strip().removeprefix("W/") for value in header.split(",")}
+    matches = header.strip() == "*" or etag in candidates
+    # Revalidations only: requests without If-None-Match are not counted
+    record_cache("http_etag", matches)
+    return matches
+
+
+def not_modified(etag: str) -> Response:
+    """Build an empty 304 Not Modified response carrying the ETag"""
+    return Response(status_code=304, headers={"ETag": etag})
@@ -0,0 +1,95 @@
+"""
+API Dependencies
+
+Shared FastAPI dependencies for the API layer.
+"""
+
+import hmac
+from typing import List, Optional
+
+from fastapi import Depends, Header, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.orm import Session
+
+from pymypersonalmap.config import settings
+from pymypersonalmap.database.session import get_db
+from pymypersonalmap.services import auth_service
+from pymypersonalmap.services.auth_service import ActiveUser
+
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token", auto_error=False)
+
+
+def get_current_user(
+    token: Optional[str] = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> ActiveUser:
+    """
+    Resolve the user of the request from its bearer access token
+
+    Costs no query while the token and the user are cached (see
+    services/auth_service.py); the session is the request's own.
+
+    Raises:
+        HTTPException: 401 if the token is missing, invalid or expired, or the
+            user is inactive or deleted; 503 if authentication is not configured
+    """
+    unauthorized = {"WWW-Authenticate": "Bearer"}
+    if token is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers=unauthorized)
+    try:
+        return auth_service.authenticate(db, token)
+    except auth_service.InvalidTokenError:
+        raise HTTPException(
+            status_code=401, detail="Invalid or expired token", headers=unauthorized
+        )
+    except auth_service.AuthNotConfiguredError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+def get_current_user_id(user: ActiveUser = Depends(get_current_user)) -> int:
+    """
+    Resolve the ID of the user the request acts on
+
+    Usage in FastAPI:
+        @app.get("/items")
+        def get_items(user_id: int = Depends(get_current_user_id)):
+            ...
+    """
+    return user.id
+
+
+def require_admin_token(
+    x_admin_token: Optional[str] = Header(None, description="Value of ADMIN_TOKEN")
+) -> None:
+    """
+    Allow the request only if it carries the admin token
+
+    Admin endpoints do not exist (404) while ADMIN_TOKEN is unset.
+
+    Raises:
+        HTTPException: 404 if admin endpoints are disabled, 403 if the token is wrong
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(
+        x_admin_token.encode(), settings.ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+def parse_int_list(value: Optional[str], name: str) -> Optional[List[int]]:
+    """
+    Parse a comma-separated list of integers from a query parameter
+
+    Raises:
+        HTTPException: 400 if an item is not an integer
+    """
+    if not value:
+        return None
+    try:
+        return [int(item) for item in value.split(",") if item.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail=f"{name} must be a comma-separated list of integers"
+        )
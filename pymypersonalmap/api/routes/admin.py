@@ -0,0 +1,126 @@
+"""
+Admin Routes
+
+Diagnostics of the running server process and account deletion. Disabled
+unless ADMIN_TOKEN is set; requests must carry it in the ``X-Admin-Token``
+header.
+
+Every call is answered by the worker process that received it: with
+several workers, repeat it until the wanted ``pid`` answers, or run a
+single worker while investigating. See scripts/memory_diagnostics.py for
+a command line client.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import sessionmaker
+
+from pymypersonalmap.api.dependencies import require_admin_token
+from pymypersonalmap.database.session import get_session_factory
+from pymypersonalmap.services.account_deletion_service import (
+    DeletionJobNotFoundError, get_deletion_jobs
+)
+from pymypersonalmap.services.attachment_service import get_blob_store
+from pymypersonalmap.services.blob_store import BlobStore
+from pymypersonalmap.services.snapshot_service import SnapshotStore, get_snapshot_store
+from pymypersonalmap.services.user_service import UserNotFoundError
+from pymypersonalmap.utils import memory
+
+
+router = APIRouter(
+    prefix="/api/v1/admin", tags=["Admin"], dependencies=[Depends(require_admin_token)]
+)
+
+
+@router.get("/memory")
+def get_memory():
+    """
+    Size and number of entries of every in-process cache and index
+
+    Also reports the process ID, its resident memory and the number of
+    objects tracked by the garbage collector.
+    """
+    return memory.cache_report()
+
+
+@router.get("/memory/tracing")
+def get_tracing():
+    """Whether allocations are traced, traced memory and the snapshots available"""
+    return memory.tracing_status()
+
+
+@router.post("/memory/tracing/start")
+def start_tracing(frames: int = 1):
+    """
+    Start tracing allocations with tracemalloc
+
+    - **frames**: Frames stored per allocation (1 is enough to group by line)
+    """
+    if not 1 <= frames <= 100:
+        raise HTTPException(status_code=400, detail="frames must be between 1 and 100")
+    return memory.start_tracing(frames)
+
+
+@router.post("/memory/tracing/stop")
+def stop_tracing():
+    """Stop tracing allocations and drop the snapshots"""
+    return memory.stop_tracing()
+
+
+@router.post("/memory/snapshots", status_code=201)
+def take_snapshot():
+    """Take a snapshot of the traced allocations (tracing must be started)"""
+    try:
+        return memory.take_snapshot()
+    except memory.TracingNotStartedError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/memory/snapshots/{first_id}/diff/{second_id}")
+def diff_snapshots(first_id: int, second_id: int, limit: int = 25):
+    """
+    Allocation growth between two snapshots, grouped by file and line
+
+    - **first_id**: Older snapshot
+    - **second_id**: Newer snapshot
+    - **limit**: Lines reported, largest growth first
+    """
+    try:
+        return memory.compare_snapshots(first_id, second_id, limit=max(limit, 1))
+    except memory.SnapshotNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.delete("/users/{user_id}", status_code=202)
+def delete_user(
+    user_id: int,
+    session_factory: sessionmaker = Depends(get_session_factory),
+    blob_store: BlobStore = Depends(get_blob_store),
+    snapshot_store: SnapshotStore = Depends(get_snapshot_store)
+):
+    """
+    Delete a user and everything they own, in the background
+
+    The user is deactivated at once; markers, attachments, labels and
+    changes are then deleted in batches. Poll the returned job at
+    /users/deletions/{job_id}.
+    """
+    try:
+        job = get_deletion_jobs().start(user_id, session_factory, blob_store, snapshot_store)
+    except UserNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return job.to_dict()
+
+
+@router.get("/users/deletions")
+def list_deletions():
+    """Account deletions started by this process, oldest first"""
+    return {"jobs": [job.to_dict() for job in get_deletion_jobs().jobs()]}
+
+
+@router.get("/users/deletions/{job_id}")
+def get_deletion(job_id: str):
+    """State and progress of an account deletion"""
+    try:
+        return get_deletion_jobs().get(job_id).to_dict()
+    except DeletionJobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
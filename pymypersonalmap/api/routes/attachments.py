@@ -0,0 +1,260 @@
+"""
+Attachment Routes
+
+Upload, listing, download (with HTTP range requests) and deletion of
+files attached to markers.
+"""
+
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.orm import Session
+
+from pymypersonalmap.api.caching import etag_matches, not_modified
+from pymypersonalmap.api.dependencies import get_current_user_id
+from pymypersonalmap.database.session import get_db
+from pymypersonalmap.services import attachment_service
+from pymypersonalmap.services.attachment_service import AttachmentNotFoundError, get_blob_store
+from pymypersonalmap.services.blob_store import BlobStore, BlobTooLargeError
+from pymypersonalmap.services.marker_service import MarkerNotFoundError
+from pymypersonalmap.services.thumbnail_service import (
+    THUMBNAIL_SIZES,
+    ThumbnailError,
+    ThumbnailGenerator,
+    ThumbnailTimeoutError,
+    get_thumbnail_generator,
+)
+
+
+router = APIRouter(prefix="/api/v1", tags=["Attachments"])
+
+# Content is addressed by hash: a given attachment never changes
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+# Uploaded types shown in the browser; anything else (HTML, SVG, ...) is
+# served as a download so it cannot run script on the API origin
+INLINE_CONTENT_TYPES = frozenset({
+    "image/jpeg", "image/png", "image/gif", "image/webp", "image/avif", "image/heic", "image/tiff",
+})
+
+
+def parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range ``Range: bytes=...`` header
+
+    Args:
+        header: Range header value
+        size: Size of the representation in bytes
+
+    Returns:
+        Inclusive (start, end) offsets, or None if the header should be
+        ignored (other unit, multiple ranges, malformed)
+
+    Raises:
+        ValueError: If the range cannot be satisfied
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep or not (first or last) or not (first + last).isdigit():
+        return None
+
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and start > end:
+        return None
+    if start >= size:
+        raise ValueError("Range starts past the end")
+    return start, min(end, size - 1)
+
+
+@router.post("/markers/{marker_id}/attachments", status_code=201)
+def upload_attachment(
+    marker_id: int,
+    file: UploadFile = File(...),
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+    store: BlobStore = Depends(get_blob_store),
+    thumbnails: ThumbnailGenerator = Depends(get_thumbnail_generator)
+):
+    """
+    Attach a file to a marker
+
+    The upload is streamed to the blob store in chunks; identical content
+    is stored only once. Thumbnails of photos are rendered in the background.
+    """
+    try:
+        attachment = attachment_service.add_attachment(
+            db, store, marker_id, user_id, file.file, file.filename, file.content_type
+        )
+    except MarkerNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BlobTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    if attachment.content_type.startswith("image/"):
+        thumbnails.submit(attachment.sha256, store.path(attachment.sha256))
+    return attachment.to_dict()
+
+
+@router.get("/markers/{marker_id}/attachments")
+def list_attachments(
+    marker_id: int,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """Get the attachments of a marker"""
+    try:
+        attachments = attachment_service.list_attachments(db, marker_id, user_id)
+    except MarkerNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return [attachment.to_dict() for attachment in attachments]
+
+
+@router.get("/attachments/{attachment_id}")
+def download_attachment(
+    attachment_id: int,
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+    store: BlobStore = Depends(get_blob_store)
+):
+    """
+    Download an attachment
+
+    Supports `Range: bytes=start-end` (single range, 206 Partial Content),
+    `If-Range` and `If-None-Match`.
+    """
+    try:
+        attachment = attachment_service.get_attachment(db, attachment_id, user_id)
+    except AttachmentNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if not store.exists(attachment.sha256):
+        raise HTTPException(
+            status_code=404, detail=f"Content of attachment {attachment_id} is missing"
+        )
+
+    etag = f'"{attachment.sha256}"'
+    if etag_matches(request, etag):
+        response = not_modified(etag)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    size = store.size(attachment.sha256)
+    disposition = "inline" if attachment.content_type in INLINE_CONTENT_TYPES else "attachment"
+    filename = _quote_filename(attachment.filename)
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Content-Disposition": f"{disposition}; filename*=UTF-8''{filename}",
+        "X-Content-Type-Options": "nosniff",
+    }
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_byte_range(range_header, size)
+        except ValueError:
+            return Response(
+                status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"}
+            )
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(
+            store.iter_range(attachment.sha256), media_type=attachment.content_type, headers=headers
+        )
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        store.iter_range(attachment.sha256, start, end),
+        status_code=206,
+        media_type=attachment.content_type,
+        headers=headers
+    )
+
+
+@router.get("/attachments/{attachment_id}/thumbnail")
+def download_thumbnail(
+    attachment_id: int,
+    request: Request,
+    size: int = 320,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+    store: BlobStore = Depends(get_blob_store),
+    thumbnails: ThumbnailGenerator = Depends(get_thumbnail_generator)
+):
+    """
+    Download a JPEG thumbnail of a photo attachment
+
+    - **size**: Longest side in pixels (128, 320 or 800)
+
+    Rendered on the first request and cached; concurrent first requests
+    share one rendering.
+    """
+    if size not in THUMBNAIL_SIZES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported thumbnail size {size}; use one of {THUMBNAIL_SIZES}",
+        )
+    try:
+        attachment = attachment_service.get_attachment(db, attachment_id, user_id)
+    except AttachmentNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if not store.exists(attachment.sha256):
+        raise HTTPException(
+            status_code=404, detail=f"Content of attachment {attachment_id} is missing"
+        )
+
+    etag = f'"{attachment.sha256}-{size}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if etag_matches(request, etag):
+        response = not_modified(etag)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    try:
+        path = thumbnails.get(attachment.sha256, store.path(attachment.sha256), size)
+    except ThumbnailTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except ThumbnailError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+
+@router.delete("/attachments/{attachment_id}", status_code=204)
+def delete_attachment(
+    attachment_id: int,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+    store: BlobStore = Depends(get_blob_store),
+    thumbnails: ThumbnailGenerator = Depends(get_thumbnail_generator)
+):
+    """Delete an attachment (the content is removed once nothing references it)"""
+    try:
+        released = attachment_service.delete_attachment(db, store, attachment_id, user_id)
+    except AttachmentNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if released:
+        thumbnails.discard(released)
+    return Response(status_code=204)
+
+
+def _quote_filename(filename: str) -> str:
+    """Percent-encode a file name for Content-Disposition (RFC 5987)"""
+    return quote(filename, safe="")
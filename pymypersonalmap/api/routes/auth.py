@@ -0,0 +1,71 @@
+"""
+Auth Routes
+
+Login with email and password, token refresh, and the authenticated user.
+Other endpoints expect the access token as ``Authorization: Bearer <token>``.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from pymypersonalmap.api.dependencies import get_current_user
+from pymypersonalmap.database.session import get_db
+from pymypersonalmap.services import auth_service
+from pymypersonalmap.services.auth_service import ActiveUser, AuthNotConfiguredError
+from pymypersonalmap.services.user_service import InvalidCredentialsError, PasswordHasherBusyError
+
+
+router = APIRouter(prefix="/api/v1/auth", tags=["Authentication"])
+
+
+class RefreshRequest(BaseModel):
+    """Request model for refreshing tokens"""
+    refresh_token: str
+
+
+@router.post("/token")
+async def login(
+    form: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db)
+):
+    """
+    Log in and get an access and a refresh token
+
+    OAuth2 password flow (form fields `username` and `password`); the
+    username is the account's email. The password check is awaited, so a
+    login holds no request thread while bcrypt runs.
+    """
+    try:
+        tokens = await auth_service.login(db, form.username, form.password)
+    except InvalidCredentialsError as e:
+        raise HTTPException(
+            status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"}
+        )
+    except PasswordHasherBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except AuthNotConfiguredError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return tokens.to_dict()
+
+
+@router.post("/refresh")
+def refresh(request: RefreshRequest, db: Session = Depends(get_db)):
+    """Exchange a refresh token for a new access and refresh token"""
+    try:
+        tokens = auth_service.refresh(db, request.refresh_token)
+    except auth_service.InvalidTokenError:
+        raise HTTPException(
+            status_code=401, detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    except AuthNotConfiguredError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return tokens.to_dict()
+
+
+@router.get("/me")
+def get_me(user: ActiveUser = Depends(get_current_user)):
+    """The authenticated user (served from the authentication cache)"""
+    return {"id": user.id, "is_active": user.is_active, "is_admin": user.is_admin}
@@ -0,0 +1,49 @@
+"""
+Change Feed Routes
+
+Delta sync endpoint: clients poll with the last sequence number they have
+seen and receive only what changed since then.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+
+from pymypersonalmap.api.caching import make_etag, etag_matches, not_modified
+from pymypersonalmap.api.dependencies import get_current_user_id
+from pymypersonalmap.database.session import get_db
+from pymypersonalmap.services import sync_service
+
+
+router = APIRouter(prefix="/api/v1", tags=["Sync"])
+
+
+@router.get("/changes")
+def get_changes(
+    request: Request,
+    response: Response,
+    since: int = 0,
+    limit: int = sync_service.MAX_CHANGES_PER_PAGE,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Get markers and labels changed since a sequence number
+
+    - **since**: Last `last_seq` received (0 for a full sync)
+    - **limit**: Maximum number of changes to consume; repeat while `has_more` is true
+
+    Deleted entities are returned as tombstones (IDs in `deleted`).
+    Supports `If-None-Match`: returns 304 when nothing changed.
+    """
+    latest_seq = sync_service.get_latest_seq(db, user_id)
+    etag = make_etag("changes", user_id, latest_seq, since, limit)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    try:
+        result = sync_service.get_changes(db, user_id, since=since, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response.headers["ETag"] = etag
+    return result
@@ -0,0 +1,38 @@
+"""
+Duplicate Routes
+
+On-demand search for duplicate markers (merge candidates).
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from pymypersonalmap.api.dependencies import get_current_user_id
+from pymypersonalmap.database.session import get_db
+from pymypersonalmap.services import dedupe_service
+
+
+router = APIRouter(prefix="/api/v1", tags=["Markers"])
+
+
+@router.get("/markers/duplicates")
+def get_duplicates(
+    distance_m: float = dedupe_service.DEFAULT_DISTANCE_M,
+    min_similarity: float = dedupe_service.DEFAULT_MIN_SIMILARITY,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Find pairs of markers that are probably the same place
+
+    - **distance_m**: Maximum distance between the two markers in meters
+    - **min_similarity**: Minimum similarity of the normalized titles (0..1)
+    """
+    try:
+        pairs = dedupe_service.find_duplicates(
+            db, user_id, distance_m=distance_m, min_similarity=min_similarity
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"total": len(pairs), "duplicates": pairs}
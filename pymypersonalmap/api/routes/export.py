@@ -0,0 +1,52 @@
+"""
+Export Routes
+
+Streaming download of a user's markers as GeoJSON, NDJSON, CSV or GPX.
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from pymypersonalmap.api.dependencies import get_current_user_id, parse_int_list
+from pymypersonalmap.database.session import get_session_factory
+from pymypersonalmap.services import export_service
+from pymypersonalmap.services.export_service import UnsupportedExportFormatError
+
+
+router = APIRouter(prefix="/api/v1", tags=["Export"])
+
+
+@router.get("/export/{export_format}")
+def export_markers(
+    export_format: str,
+    label_ids: Optional[str] = None,
+    user_id: int = Depends(get_current_user_id),
+    session_factory=Depends(get_session_factory)
+):
+    """
+    Export the user's markers
+
+    - **export_format**: geojson, ndjson, csv or gpx
+    - **label_ids**: Only export markers with at least one of these labels (comma-separated)
+
+    The file is streamed in batches, so memory use does not grow with the
+    number of markers.
+    """
+    try:
+        media_type, extension = export_service.get_format(export_format)
+    except UnsupportedExportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    chunks = export_service.stream_export(
+        user_id,
+        export_format,
+        label_ids=parse_int_list(label_ids, "label_ids"),
+        session_factory=session_factory
+    )
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="markers_export.{extension}"'}
+    )
@@ -0,0 +1,158 @@
+"""
+Import Routes
+
+Upload of GPX, KML, GeoJSON and CSV files, imported in chunks.
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from pymypersonalmap.api.dependencies import get_current_user_id
+from pymypersonalmap.config.settings import MAX_UPLOAD_SIZE_MB, PHOTO_IMPORT_ROOT
+from pymypersonalmap.database.session import get_db
+from pymypersonalmap.services import import_service, photo_import_service
+from pymypersonalmap.services.import_service import UnsupportedImportFormatError
+from pymypersonalmap.services.photo_import_service import (
+    PhotoDirectoryError, PhotoDirectoryNotAllowedError
+)
+
+
+router = APIRouter(prefix="/api/v1", tags=["Import"])
+
+
+def _spool_to_disk(file: UploadFile, directory: str, index: int) -> str:
+    """Copy an upload to a file in ``directory`` in chunks and return its path"""
+    path = Path(directory) / str(index)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(file.file, out, 1024 * 1024)
+    return str(path)
+
+
+def _check_size(file: UploadFile) -> None:
+    """Refuse files larger than MAX_UPLOAD_SIZE_MB"""
+    if file.size is not None and file.size > MAX_UPLOAD_SIZE_MB * 1024 * 1024:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{file.filename or 'File'} is larger than {MAX_UPLOAD_SIZE_MB} MB",
+        )
+
+
+@router.post("/import")
+def import_many(
+    files: List[UploadFile] = File(...),
+    on_duplicate: Optional[str] = None,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Import markers from several files at once
+
+    - **files**: Files to import; the format of each one comes from its
+      extension (.gpx, .kml, .geojson/.json, .csv)
+    - **on_duplicate**: `skip` or `report` markers duplicating existing ones (default: import all)
+
+    Files are parsed in parallel worker processes (IMPORT_WORKERS) and
+    inserted in chunks by this request.
+    """
+    try:
+        formats = [import_service.format_from_filename(file.filename or "") for file in files]
+    except UnsupportedImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    for file in files:
+        _check_size(file)
+
+    # Workers get file paths, not contents: nothing is held in memory per file
+    with tempfile.TemporaryDirectory(prefix="import-") as directory:
+        sources = (
+            (file.filename, import_format, _spool_to_disk(file, directory, index))
+            for index, (file, import_format) in enumerate(zip(files, formats))
+        )
+        try:
+            report = import_service.import_files(db, user_id, sources, on_duplicate=on_duplicate)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    return report.to_dict()
+
+
+class PhotoImportRequest(BaseModel):
+    """Request model for importing a photo directory"""
+    directory: str
+    recursive: bool = True
+    cluster_distance_m: float = photo_import_service.DEFAULT_CLUSTER_DISTANCE_M
+
+
+# Before /import/{import_format}, which would otherwise match /import/photos
+@router.post("/import/photos")
+def import_photos(
+    request: PhotoImportRequest,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Create markers from the geotagged photos of a local directory
+
+    - **directory**: Directory inside PHOTO_IMPORT_ROOT on the machine running
+      the backend (absolute, or relative to the root)
+    - **recursive**: Include subdirectories
+    - **cluster_distance_m**: Photos taken closer than this become one marker
+
+    Markers get the "Fotografia" label, or "Drone" for drone cameras. The
+    endpoint is disabled unless PHOTO_IMPORT_ROOT is set.
+    """
+    if not 0 < request.cluster_distance_m <= 1000:
+        raise HTTPException(status_code=400, detail="cluster_distance_m must be between 0 and 1000")
+    try:
+        directory = photo_import_service.resolve_import_directory(
+            request.directory, PHOTO_IMPORT_ROOT
+        )
+    except PhotoDirectoryNotAllowedError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    try:
+        report = photo_import_service.import_photo_directory(
+            db,
+            user_id,
+            directory,
+            recursive=request.recursive,
+            cluster_distance_m=request.cluster_distance_m
+        )
+    except PhotoDirectoryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return report.to_dict()
+
+
+@router.post("/import/{import_format}")
+def import_markers(
+    import_format: str,
+    file: UploadFile = File(...),
+    on_duplicate: Optional[str] = None,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    Import markers from a file
+
+    - **import_format**: gpx, kml, geojson or csv (see ALLOWED_IMPORT_FORMATS)
+    - **file**: File to import (at most MAX_UPLOAD_SIZE_MB)
+    - **on_duplicate**: `skip` or `report` markers duplicating existing ones (default: import all)
+
+    Invalid rows are skipped and listed in the report; valid rows are
+    inserted in chunks, one transaction each.
+    """
+    _check_size(file)
+
+    try:
+        report = import_service.import_markers(
+            db, user_id, import_format, file.file, on_duplicate=on_duplicate
+        )
+    except (UnsupportedImportFormatError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return report.to_dict()
@@ -0,0 +1,56 @@
+"""
+Snapshot Routes
+
+Whole-library download in the columnar binary snapshot format, for
+clients that draw or count every marker at once.
+"""
+
+import os
+from typing import BinaryIO, Iterator
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from pymypersonalmap.api.caching import etag_matches, not_modified
+from pymypersonalmap.api.dependencies import get_current_user_id
+from pymypersonalmap.database.session import get_db
+from pymypersonalmap.services.snapshot_service import SnapshotStore, get_snapshot_store
+
+
+router = APIRouter(prefix="/api/v1", tags=["Markers"])
+
+SNAPSHOT_MEDIA_TYPE = "application/vnd.mypersonalmap.snapshot"
+
+# Bytes sent per chunk
+CHUNK_SIZE = 1024 * 1024
+
+
+def _iter_file(file: BinaryIO) -> Iterator[bytes]:
+    with file:
+        while chunk := file.read(CHUNK_SIZE):
+            yield chunk
+
+
+@router.get("/markers/snapshot")
+def get_marker_snapshot(
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db),
+    snapshots: SnapshotStore = Depends(get_snapshot_store)
+):
+    """
+    Download all markers as a binary columnar snapshot
+
+    See services/snapshot_service.py for the format. The snapshot is
+    updated from the change sequence, so repeated downloads only cost a
+    rewrite of what changed. Supports `If-None-Match`.
+    """
+    snapshot, file = snapshots.open(db, user_id)
+    etag = f'"snapshot-{user_id}-{snapshot.seq}"'
+    if etag_matches(request, etag):
+        file.close()
+        return not_modified(etag)
+
+    headers = {"ETag": etag, "Content-Length": str(os.fstat(file.fileno()).st_size)}
+    return StreamingResponse(_iter_file(file), media_type=SNAPSHOT_MEDIA_TYPE, headers=headers)
@@ -45,6 +45,10 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+# Seconds an authenticated user's status (active, admin) is cached per process
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+# Rows removed per DELETE (and per transaction) when an account is deleted
+USER_DELETION_BATCH_SIZE = int(os.getenv("USER_DELETION_BATCH_SIZE", "1000"))
 
 # ==================== GEOCODING ====================
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "")
@@ -56,6 +60,16 @@ ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 DEBUG = os.getenv("DEBUG", "true").lower() == "true"
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+# Statements slower than this go to logs/slow_queries.log with their plan
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", "200"))
+# Same statement repeated more than this many times in a request = likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+# Statement budgets, e.g. "GET /api/v1/markers=4,GET /api/v1/labels=2"
+QUERY_BUDGETS = os.getenv("QUERY_BUDGETS", "")
+# Requests with "X-Profile: <token>" are profiled into logs/profiles (empty = disabled)
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+# Admin endpoints (/api/v1/admin) require "X-Admin-Token: <token>" (empty = disabled)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
 # ==================== API ====================
 API_V1_PREFIX = os.getenv("API_V1_PREFIX", "/api/v1")
@@ -69,6 +83,20 @@ GEOCODING_RATE_LIMIT_SECONDS = int(os.getenv("GEOCODING_RATE_LIMIT_SECONDS", "1"
 # ==================== FILE UPLOAD ====================
 MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "50"))
 ALLOWED_IMPORT_FORMATS = os.getenv("ALLOWED_IMPORT_FORMATS", "gpx,kml,geojson,csv")
+# Processes parsing multi-file imports (0 = one per CPU core)
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "0"))
+# Attachment blob store (empty = "attachments" in the user data directory)
+ATTACHMENTS_DIR = os.getenv("ATTACHMENTS_DIR", "")
+# Directory the photo import endpoint may read from (empty = endpoint disabled)
+PHOTO_IMPORT_ROOT = os.getenv("PHOTO_IMPORT_ROOT", "")
+# Processes rendering attachment thumbnails
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+# Threads hashing and verifying passwords (bcrypt), i.e. CPU cores logins may use at once
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Password hashes allowed to wait for a thread; more are refused (0 = unbounded)
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+# Map the marker index from snapshot files shared by all server processes
+SHARED_MARKER_INDEX = os.getenv("SHARED_MARKER_INDEX", "false").lower() == "true"
 
 # ==================== FEATURE FLAGS ====================
 ENABLE_WEB_SCRAPING = os.getenv("ENABLE_WEB_SCRAPING", "false").lower() == "true"
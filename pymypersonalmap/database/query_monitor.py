@@ -0,0 +1,284 @@
+"""
+Query Monitor
+
+Per-request accounting of the SQL statements issued through the
+application engine (fed by the cursor listeners in database/session.py):
+
+- statements are counted per request and grouped by shape (the SQL text
+  with IN-lists collapsed), so the same statement repeated more than
+  N_PLUS_ONE_THRESHOLD times in one request is reported as a likely N+1
+- statements slower than SLOW_QUERY_MS are written with their parameters
+  and ``EXPLAIN QUERY PLAN`` output to ``slow_queries.log`` (rotating) in
+  the logs directory
+- each endpoint may have a statement budget (DEFAULT_BUDGETS, extended
+  or overridden by QUERY_BUDGETS); a request
+  over budget is logged, or fails with QueryBudgetExceeded in strict mode,
+  which the test suite enables so regressions fail tests
+
+Outside HTTP requests, wrap code in ``track_queries()`` or
+``query_budget()`` to get the same accounting.
+"""
+
+import logging
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Iterator
+
+from pymypersonalmap.config.settings import (
+    N_PLUS_ONE_THRESHOLD, QUERY_BUDGETS, SLOW_QUERY_MS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode when a request issues more statements than its budget"""
+    pass
+
+
+SLOW_LOG_FILE = "slow_queries.log"
+SLOW_LOG_MAX_BYTES = 5 * 1024 * 1024
+SLOW_LOG_BACKUPS = 5
+
+# Statements worth an EXPLAIN QUERY PLAN
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+# "(?, ?, ?)" -> "(?)": IN-lists of any length have the same shape
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def parse_budgets(value: str) -> dict[str, int]:
+    """
+    Parse a budget setting
+
+    Args:
+        value: Comma-separated "<METHOD> <route template>=<max statements>",
+            e.g. "GET /api/v1/markers=4,GET /api/v1/labels=2"
+
+    Returns:
+        Maximum statements by endpoint
+    """
+    budgets = {}
+    for item in value.split(","):
+        endpoint, separator, limit = item.strip().rpartition("=")
+        if not separator or not endpoint.strip():
+            continue
+        try:
+            budgets[endpoint.strip()] = int(limit)
+        except ValueError:
+            logger.warning(f"Ignoring invalid query budget {item.strip()!r}")
+    return budgets
+
+
+# Statement budgets of the hot read endpoints: constant, whatever the data size
+DEFAULT_BUDGETS = {
+    "GET /api/v1/markers": 4,
+    "GET /api/v1/markers/{marker_id}": 2,
+    "GET /api/v1/markers/{marker_id}/attachments": 2,
+    "GET /api/v1/labels": 2,
+}
+
+# Maximum statements by "<METHOD> <route template>" (QUERY_BUDGETS overrides the defaults)
+budgets: dict[str, int] = {**DEFAULT_BUDGETS, **parse_budgets(QUERY_BUDGETS)}
+
+# Fail requests over budget instead of logging them (tests)
+strict = False
+
+slow_query_seconds = SLOW_QUERY_MS / 1000
+n_plus_one_threshold = N_PLUS_ONE_THRESHOLD
+
+_slow_log: logging.Logger | None = None
+
+
+def statement_shape(statement: str) -> str:
+    """Normalized SQL of a statement, equal for repetitions with other parameters"""
+    return _PLACEHOLDER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class RequestQueries:
+    """Statements issued while serving one request"""
+
+    __slots__ = ("endpoint", "count", "seconds", "shapes")
+
+    def __init__(self, endpoint: str = ""):
+        self.endpoint = endpoint
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: dict[str, int] = {}
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.seconds += elapsed
+        shape = statement_shape(statement)
+        self.shapes[shape] = self.shapes.get(shape, 0) + 1
+
+    def repeated(self, threshold: int | None = None) -> dict[str, int]:
+        """Statement shapes issued more than ``threshold`` times (likely N+1)"""
+        threshold = n_plus_one_threshold if threshold is None else threshold
+        return {shape: count for shape, count in self.shapes.items() if count > threshold}
+
+
+_current: ContextVar[RequestQueries | None] = ContextVar("request_queries", default=None)
+
+
+def current_queries() -> RequestQueries | None:
+    """Statements of the request being served, if tracked"""
+    return _current.get()
+
+
+@contextmanager
+def track_queries(endpoint: str = "") -> Iterator[RequestQueries]:
+    """
+    Count the statements issued in a block
+
+    Example:
+        with track_queries() as queries:
+            marker_service.list_markers(db, user_id)
+        print(queries.count, queries.repeated())
+    """
+    queries = RequestQueries(endpoint)
+    token = _current.set(queries)
+    try:
+        yield queries
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def query_budget(max_statements: int) -> Iterator[RequestQueries]:
+    """
+    Fail if a block issues more than ``max_statements`` statements
+
+    Raises:
+        QueryBudgetExceeded: When the budget is exceeded
+
+    Example:
+        with query_budget(2):
+            label_service.get_available_labels(db, user_id)
+    """
+    with track_queries() as queries:
+        yield queries
+    if queries.count > max_statements:
+        raise QueryBudgetExceeded(
+            f"{queries.count} statements issued, budget is {max_statements}:\n"
+            + "\n".join(f"{count} x {shape}" for shape, count in queries.shapes.items())
+        )
+
+
+def configure_slow_log(log_dir: Path | str | None = None) -> Path:
+    """
+    Set up the rotating slow query log
+
+    Args:
+        log_dir: Directory of the log (default: application logs directory)
+
+    Returns:
+        Path of the log file
+    """
+    global _slow_log
+    if log_dir is None:
+        from pymypersonalmap.gui.config_manager import ConfigManager
+        log_dir = ConfigManager().get_logs_dir()
+    path = Path(log_dir) / SLOW_LOG_FILE
+
+    slow_log = logging.getLogger(f"{__name__}.slow")
+    for handler in list(slow_log.handlers):
+        slow_log.removeHandler(handler)
+        handler.close()
+    handler = RotatingFileHandler(
+        path, maxBytes=SLOW_LOG_MAX_BYTES, backupCount=SLOW_LOG_BACKUPS, encoding="utf-8"
+    )
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    slow_log.addHandler(handler)
+    slow_log.setLevel(logging.INFO)
+    slow_log.propagate = False
+    _slow_log = slow_log
+    return path
+
+
+def _explain(cursor, statement: str, parameters) -> str:
+    """EXPLAIN QUERY PLAN of a statement, run on a fresh cursor of the same connection"""
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return "(not explainable)"
+    if isinstance(parameters, list):
+        # executemany: the plan is the same for every row
+        parameters = parameters[0] if parameters else ()
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+        return "\n".join(f"  {row[-1]}" for row in explain_cursor.fetchall())
+    except Exception as e:
+        return f"(plan unavailable: {e})"
+    finally:
+        explain_cursor.close()
+
+
+def log_slow_statement(cursor, statement: str, parameters, elapsed: float) -> None:
+    """Write a slow statement with its parameters and plan to the slow query log"""
+    if _slow_log is None:
+        configure_slow_log()
+    queries = _current.get()
+    endpoint = queries.endpoint if queries is not None and queries.endpoint else "-"
+    _slow_log.info(
+        f"{elapsed * 1000:.1f} ms [{endpoint}] {_WHITESPACE.sub(' ', statement).strip()}\n"
+        f"  parameters: {parameters!r}\n"
+        f"{_explain(cursor, statement, parameters)}"
+    )
+
+
+def record_statement(cursor, statement: str, parameters, elapsed: float) -> None:
+    """Account for one executed statement (called by the engine listeners)"""
+    queries = _current.get()
+    if queries is not None:
+        queries.record(statement, elapsed)
+    if elapsed >= slow_query_seconds:
+        try:
+            log_slow_statement(cursor, statement, parameters, elapsed)
+        except Exception as e:
+            logger.warning(f"Could not log slow statement: {e}")
+
+
+def check_request(queries: RequestQueries) -> None:
+    """
+    Report N+1 patterns and enforce the endpoint budget of a finished request
+
+    Raises:
+        QueryBudgetExceeded: In strict mode, when the budget is exceeded
+    """
+    for shape, count in queries.repeated().items():
+        logger.warning(f"Possible N+1 in {queries.endpoint}: {count} x {shape}")
+
+    budget = budgets.get(queries.endpoint)
+    if budget is not None and queries.count > budget:
+        message = f"{queries.endpoint} issued {queries.count} statements, budget is {budget}"
+        if strict:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+class QueryMonitorMiddleware:
+    """
+    ASGI middleware tracking the statements of each request
+
+    Usage:
+        app.add_middleware(QueryMonitorMiddleware)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(f"{scope['method']} {scope['path']}") as queries:
+            await self.app(scope, receive, send)
+        # Budgets are keyed by route template, known once the request was routed
+        route = scope.get("route")
+        queries.endpoint = f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+        check_request(queries)
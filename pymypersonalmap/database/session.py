@@ -5,24 +5,102 @@ SQLAlchemy database session configuration and management.
 Uses SQLite embedded database (zero-config, single-file).
 """
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
 from pymypersonalmap.config.settings import database_url, DB_ECHO
+from pymypersonalmap.database import query_monitor
+from pymypersonalmap.utils import memory, metrics
 import logging
+import os
+import threading
+import time
+import weakref
 
 logger = logging.getLogger(__name__)
 
+
+class TimedQueuePool(QueuePool):
+    """QueuePool recording how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+
+def instrument_engine(target: Engine) -> None:
+    """
+    Count and time the SQL statements of an engine
+
+    Statements are attributed to the repository function issuing them
+    (see utils/metrics.py) and to the request being served, with slow ones
+    logged with their plan (see database/query_monitor.py).
+    """
+    @event.listens_for(target, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_start", []).append(time.perf_counter())
+
+    @event.listens_for(target, "after_cursor_execute")
+    def _record_statement(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["statement_start"].pop()
+        function = metrics.repository_function()
+        metrics.DB_STATEMENTS.inc(function)
+        metrics.DB_LATENCY.observe(elapsed, function)
+        query_monitor.record_statement(cursor, statement, parameters, elapsed)
+
+    @event.listens_for(target, "handle_error")
+    def _forget_timer(context):
+        starts = context.connection.info.get("statement_start") if context.connection else None
+        if starts:
+            starts.pop()
+
+
 # Create SQLAlchemy engine for SQLite embedded database
 engine = create_engine(
     database_url,
     echo=DB_ECHO,
+    poolclass=TimedQueuePool,
     connect_args={
         'check_same_thread': False,  # Allow multi-threading
         'timeout': 30,  # Longer timeout for concurrent access
     }
 )
+instrument_engine(engine)
 logger.info(f"Using SQLite database: {database_url}")
 
+
+@event.listens_for(engine, "connect")
+def _configure_connection(dbapi_connection, connection_record):
+    """
+    Per-connection SQLite setup
+
+    WAL lets readers in other server processes run while one writes.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    finally:
+        cursor.close()
+
+
+def _reset_pool_after_fork():
+    """
+    Forget the connections inherited from the parent process
+
+    SQLite connections must not be shared across fork(): the child starts
+    with an empty pool and opens its own, leaving the parent's untouched.
+    """
+    engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -33,6 +111,36 @@ SessionLocal = sessionmaker(
 # Create Base class for models
 Base = declarative_base()
 
+# Sessions that began a transaction and are still referenced, for the memory report
+_live_sessions = weakref.WeakSet()
+_live_sessions_lock = threading.Lock()
+
+
+@event.listens_for(Session, "after_begin")
+def _track_session(session, transaction, connection):
+    with _live_sessions_lock:
+        _live_sessions.add(session)
+
+
+def _identity_map_stats() -> dict:
+    """Objects held by the identity maps of the live sessions"""
+    with _live_sessions_lock:
+        sessions = list(_live_sessions)
+    return {
+        "entries": sum(len(session.identity_map) for session in sessions),
+        "sessions": len(sessions),
+    }
+
+
+memory.register_cache("orm_identity_maps", _identity_map_stats)
+memory.register_cache("sql_compiled_cache", lambda: {
+    "entries": len(engine._compiled_cache),
+    "capacity": engine._compiled_cache.capacity,
+})
+
+# Indexes created by older versions and replaced by composite ones
+SUPERSEDED_INDEXES = ("idx_marker_favorite", "idx_marker_user")
+
 
 def get_db():
     """
@@ -50,14 +158,47 @@ def get_db():
         db.close()
 
 
+def get_session_factory():
+    """
+    Dependency to get the session factory
+
+    For work that outlives the request dependencies, such as streaming
+    responses, which must open (and close) their own session.
+    """
+    return SessionLocal
+
+
 def init_db():
     """
     Initialize database
 
     Creates all tables defined in models.
     """
-    from pymypersonalmap.models import user, marker, labels, marker_label  # Import all models
+    from pymypersonalmap.models import (  # Import all models
+        user, marker, labels, marker_label, marker_change, attachment
+    )
+    had_change_feed = inspect(engine).has_table("marker_changes")
     Base.metadata.create_all(bind=engine)
+    if not had_change_feed:
+        seed_change_feed()
+
+
+def seed_change_feed():
+    """
+    Seed the change feed of a database created before it existed
+
+    Records a create change for every existing marker and custom label,
+    so clients doing a full sync (since=0) receive them.
+    """
+    from pymypersonalmap.repository import change_repository
+    db = SessionLocal()
+    try:
+        seeded = change_repository.seed_changes(db)
+        db.commit()
+        if seeded:
+            logger.info(f"Seeded change feed with {seeded} existing markers and labels")
+    finally:
+        db.close()
 
 
 def drop_db():
@@ -67,3 +208,34 @@ def drop_db():
     WARNING: This will delete all data!
     """
     Base.metadata.drop_all(bind=engine)
+
+
+def ensure_indexes():
+    """
+    Create indexes missing from an existing database
+
+    create_all() does not add new indexes to tables that already exist,
+    so databases created by older versions would keep the old query plans.
+    Indexes superseded by the composite ones are dropped, so they no longer
+    slow down writes or tempt the planner.
+    """
+    from pymypersonalmap.models import (  # Import all models
+        user, marker, labels, marker_label, marker_change, attachment
+    )
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        for name in SUPERSEDED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def optimize_db():
+    """
+    Refresh SQLite planner statistics
+
+    Runs PRAGMA optimize, which re-analyzes tables whose statistics are
+    stale so the planner can pick partial/composite indexes.
+    """
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA optimize"))
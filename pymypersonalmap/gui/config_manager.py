@@ -152,7 +152,7 @@ GEOCODING_USER_AGENT=MyPersonalMap/1.0
             Path to cache directory
         """
         cache_dir = self.user_data_dir / "cache"
-        cache_dir.mkdir(exist_ok=True)
+        cache_dir.mkdir(parents=True, exist_ok=True)
         return cache_dir
 
     def get_exports_dir(self) -> Path:
@@ -166,6 +166,17 @@ GEOCODING_USER_AGENT=MyPersonalMap/1.0
         exports_dir.mkdir(exist_ok=True)
         return exports_dir
 
+    def get_attachments_dir(self) -> Path:
+        """
+        Get directory for marker attachments (content-addressed blob store)
+
+        Returns:
+            Path to attachments directory
+        """
+        attachments_dir = self.user_data_dir / "attachments"
+        attachments_dir.mkdir(parents=True, exist_ok=True)
+        return attachments_dir
+
     def backup_config(self, backup_name: Optional[str] = None) -> Path:
         """
         Backup current .env file
@@ -4,16 +4,28 @@ My Personal Map - Main Application Entry Point
 FastAPI backend per la gestione di segnaposti geografici personalizzati.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
 from typing import List, Optional
 from contextlib import asynccontextmanager
-import uvicorn
 from dotenv import load_dotenv
 import os
 
+from pymypersonalmap.config.settings import PROFILE_TOKEN
+from pymypersonalmap.database.query_monitor import QueryMonitorMiddleware
+from pymypersonalmap.database.session import get_db
+from pymypersonalmap.api.caching import make_etag, etag_matches, not_modified
+from pymypersonalmap.api.dependencies import get_current_user_id, parse_int_list
+from pymypersonalmap.api.routes import (
+    admin, attachments, auth, changes, duplicates, export, imports, snapshots
+)
+from pymypersonalmap.models.marker import MARKER_RESPONSE_FIELDS
+from pymypersonalmap.services import marker_service, label_service, sync_service
+from pymypersonalmap.utils import metrics
+
 # Load environment variables
 load_dotenv()
 
@@ -59,6 +71,11 @@ async def lifespan(app: FastAPI):
         else:
             print(f"\n✓ Database already initialized ({len(existing_tables)} tables found)")
 
+            # Add tables and indexes introduced after the database was created
+            from pymypersonalmap.database.session import ensure_indexes
+            init_db()
+            ensure_indexes()
+
             # Ensure system labels are initialized even if tables exist
             db = SessionLocal()
             try:
@@ -81,6 +98,27 @@ async def lifespan(app: FastAPI):
     # Shutdown
     print("=" * 50)
     print("My Personal Map API Shutting down...")
+    try:
+        from pymypersonalmap.database.session import optimize_db
+        optimize_db()
+    except Exception as e:
+        print(f"⚠ Warning: Failed to optimize database: {e}")
+    try:
+        from pymypersonalmap.database.session import SessionLocal
+        from pymypersonalmap.services import attachment_service
+        db = SessionLocal()
+        try:
+            attachment_service.collect_garbage(db, attachment_service.get_blob_store())
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"⚠ Warning: Failed to collect unreferenced attachments: {e}")
+    from pymypersonalmap.services.thumbnail_service import shutdown_thumbnail_generator
+    shutdown_thumbnail_generator()
+    from pymypersonalmap.services.user_service import shutdown_password_hasher
+    shutdown_password_hasher()
+    from pymypersonalmap.services.account_deletion_service import shutdown_deletion_jobs
+    shutdown_deletion_jobs()
     print("=" * 50)
 
 
@@ -101,8 +139,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Profile-Id"],
 )
 
+# Per-request statement accounting: N+1 detection and statement budgets
+app.add_middleware(QueryMonitorMiddleware)
+# Request metrics (outermost, so the time spent in other middleware is included)
+app.add_middleware(metrics.MetricsMiddleware)
+# On-demand profiling of single requests (not installed at all when disabled)
+if PROFILE_TOKEN:
+    from pymypersonalmap.utils.profiler import ProfilerMiddleware
+    app.add_middleware(ProfilerMiddleware, token=PROFILE_TOKEN)
+
+# Routers
+app.include_router(admin.router)
+app.include_router(auth.router)
+app.include_router(attachments.router)
+app.include_router(changes.router)
+app.include_router(export.router)
+app.include_router(imports.router)
+# Before /api/v1/markers/{marker_id}, which would otherwise match /markers/duplicates
+app.include_router(duplicates.router)
+app.include_router(snapshots.router)
+
 
 # ==================== Models ====================
 
@@ -182,15 +241,32 @@ async def api_health_check():
     )
 
 
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+def get_metrics():
+    """
+    Metrics in the Prometheus text format
+
+    Request counts and latency histograms per route, requests in flight,
+    SQL statement counts and durations per repository function, connection
+    pool waits and cache hit ratios. Values are per server process.
+    """
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
 # ==================== Markers Endpoints (Placeholder) ====================
 
 @app.get("/api/v1/markers", tags=["Markers"])
-async def get_markers(
+def get_markers(
+    request: Request,
+    response: Response,
     label_ids: Optional[str] = None,
     search: Optional[str] = None,
     is_favorite: Optional[bool] = None,
+    fields: Optional[str] = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
 ):
     """
     Get list of markers with optional filters
@@ -198,27 +274,76 @@ async def get_markers(
     - **label_ids**: Comma-separated label IDs to filter
     - **search**: Search text in name/description
     - **is_favorite**: Filter by favorite status
+    - **fields**: Comma-separated sparse fieldset (e.g. `id,title,latitude,longitude`).
+      Only the requested fields are read from the database. Default: all fields.
     - **limit**: Maximum number of results
     - **offset**: Offset for pagination
+
+    Responses carry a strong ETag; send it back in `If-None-Match` to get
+    304 Not Modified when nothing changed.
     """
-    # TODO: Implement database query
+    etag = make_etag(
+        "markers", user_id, sync_service.get_latest_seq(db, user_id), request.url.query
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    selected_fields = MARKER_RESPONSE_FIELDS
+    if fields:
+        selected_fields = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+
+    try:
+        total, markers = marker_service.list_markers(
+            db=db,
+            user_id=user_id,
+            fields=selected_fields,
+            label_ids=parse_int_list(label_ids, "label_ids"),
+            search=search,
+            is_favorite=is_favorite,
+            skip=offset,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    response.headers["ETag"] = etag
     return {
-        "total": 0,
+        "total": total,
         "limit": limit,
         "offset": offset,
-        "markers": []
+        "markers": markers
     }
 
 
 @app.get("/api/v1/markers/{marker_id}", response_model=MarkerResponse, tags=["Markers"])
-async def get_marker(marker_id: int):
+def get_marker(
+    marker_id: int,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
     """
     Get single marker by ID
 
     - **marker_id**: Marker ID to retrieve
     """
-    # TODO: Implement database query
-    raise HTTPException(status_code=404, detail="Marker not found")
+    try:
+        marker = marker_service.get_marker(db, marker_id, with_details=True)
+    except marker_service.MarkerNotFoundError:
+        raise HTTPException(status_code=404, detail="Marker not found")
+
+    if marker.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Marker not found")
+
+    return MarkerResponse(
+        id=marker.idMarker,
+        name=marker.title,
+        coordinates=Coordinates(latitude=marker.latitude, longitude=marker.longitude),
+        description=marker.description,
+        address=marker.address,
+        labels=[label.name for label in marker.labels],
+        is_favorite=marker.is_favorite,
+        created_at=marker.created_at.isoformat()
+    )
 
 
 @app.post("/api/v1/markers", response_model=MarkerResponse, status_code=201, tags=["Markers"])
@@ -284,12 +409,24 @@ async def delete_marker(marker_id: int):
 # ==================== Labels Endpoints (Placeholder) ====================
 
 @app.get("/api/v1/labels", tags=["Labels"])
-async def get_labels():
+def get_labels(
+    request: Request,
+    response: Response,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
     """
     Get all labels (system + custom user labels)
+
+    Supports `If-None-Match` like the markers list.
     """
-    # TODO: Implement database query
-    return {"labels": []}
+    etag = make_etag("labels", user_id, sync_service.get_latest_seq(db, user_id))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    labels = label_service.get_available_labels(db, user_id=user_id)
+    response.headers["ETag"] = etag
+    return {"labels": [label.to_dict() for label in labels]}
 
 
 @app.post("/api/v1/labels", status_code=201, tags=["Labels"])
@@ -324,7 +461,9 @@ async def http_exception_handler(request, exc):
                 "message": exc.detail,
                 "timestamp": "2025-12-13T00:00:00Z"
             }
-        }
+        },
+        # WWW-Authenticate on 401, Retry-After on 503
+        headers=exc.headers
     )
 
 
@@ -350,8 +489,9 @@ if __name__ == "__main__":
     Run the application with GUI (which starts FastAPI backend automatically)
 
     Usage:
-        python main.py                    # Start GUI + Backend
-        python -m uvicorn main:app        # Start backend only
+        python main.py                            # Start GUI + Backend
+        python main.py --backend-only             # Backend only, WORKERS_COUNT workers
+        python main.py --backend-only --reload    # Backend only, auto-reload (development)
 
     The GUI application will:
         1. Start FastAPI backend in a background thread
@@ -369,15 +509,10 @@ if __name__ == "__main__":
 
     # Check if running in GUI mode or backend-only mode
     if len(sys.argv) > 1 and sys.argv[1] == "--backend-only":
-        # Start backend only (for development/testing)
+        # Start backend only: pre-fork workers on SERVER_HOST:SERVER_PORT
         print("Starting backend only...")
-        uvicorn.run(
-            "main:app",
-            host=os.getenv("HOST", "0.0.0.0"),
-            port=int(os.getenv("PORT", "8000")),
-            reload=os.getenv("DEBUG", "true").lower() == "true",
-            log_level=os.getenv("LOG_LEVEL", "info").lower()
-        )
+        from pymypersonalmap.server import main as server_main
+        server_main(sys.argv[2:])
     else:
         # Start GUI application (which includes backend)
         print("Starting GUI application (includes backend)...")
@@ -2,5 +2,7 @@ from .user import User
 from .marker import Marker
 from .labels import Label
 from .marker_label import MarkerLabel
+from .marker_change import MarkerChange
+from .attachment import Attachment
 
-__all__ = ["User", "Marker", "Label", "MarkerLabel"]
\ No newline at end of file
+__all__ = ["User", "Marker", "Label", "MarkerLabel", "MarkerChange", "Attachment"]
\ No newline at end of file
@@ -0,0 +1,83 @@
+from datetime import datetime
+from sqlalchemy import String, DateTime, ForeignKey, Index, BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from pymypersonalmap.database.session import Base
+
+
+class Attachment(Base):
+    """
+    File attached to a marker
+
+    The content lives in the blob store, addressed by its SHA-256; rows
+    with the same ``sha256`` share one stored file.
+    """
+    __tablename__ = "attachments"
+
+    idAttachment: Mapped[int] = mapped_column(
+        primary_key=True,
+        autoincrement=True
+    )
+
+    marker_id: Mapped[int] = mapped_column(
+        ForeignKey("markers.idMarker", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.idUser", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    sha256: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+        doc="Hex SHA-256 of the content (blob store key)"
+    )
+
+    filename: Mapped[str] = mapped_column(
+        String(255),
+        nullable=False
+    )
+
+    content_type: Mapped[str] = mapped_column(
+        String(100),
+        nullable=False
+    )
+
+    size: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        server_default=func.now(),
+        nullable=False
+    )
+
+    __table_args__ = (
+        # Attachments of a marker (list, delete with the marker)
+        Index('idx_attachment_marker', 'marker_id'),
+        # Blob reference counting
+        Index('idx_attachment_sha256', 'sha256'),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<Attachment(id={self.idAttachment}, marker_id={self.marker_id}, "
+            f"filename='{self.filename}')>"
+        )
+
+    def to_dict(self) -> dict:
+        """Convert attachment to dictionary for API responses"""
+        return {
+            'id': self.idAttachment,
+            'marker_id': self.marker_id,
+            'filename': self.filename,
+            'content_type': self.content_type,
+            'size': self.size,
+            'sha256': self.sha256,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
@@ -40,12 +40,14 @@ class Label(Base):
     is_system: Mapped[bool] = mapped_column(
         Boolean,
         default=False,
-        nullable=False
+        nullable=False,
+        index=True
     )
 
     created_by: Mapped[int | None] = mapped_column(
         ForeignKey("users.idUser", ondelete="SET NULL"),
-        nullable=True
+        nullable=True,
+        index=True
     )
 
     created_at: Mapped[datetime] = mapped_column(
@@ -64,4 +66,17 @@ class Label(Base):
     creator: Mapped["User | None"] = relationship(
         "User",
         foreign_keys=[created_by]
-    )
\ No newline at end of file
+    )
+
+    def __repr__(self) -> str:
+        return f"<Label(id={self.idLabel}, name='{self.name}', color='{self.color}')>"
+
+    def to_dict(self) -> dict:
+        """Convert label to dictionary for API responses"""
+        return {
+            'id': self.idLabel,
+            'name': self.name,
+            'color': self.color,
+            'icon': self.icon,
+            'is_system': self.is_system,
+        }
@@ -1,6 +1,6 @@
 from datetime import datetime
-from typing import TYPE_CHECKING
-from sqlalchemy import String, DateTime, ForeignKey, JSON, Column, Text, Float, Index
+from typing import TYPE_CHECKING, Iterable
+from sqlalchemy import String, DateTime, ForeignKey, JSON, Text, Float, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -11,6 +11,29 @@ if TYPE_CHECKING:
     from pymypersonalmap.models.labels import Label
 
 
+# Heavy columns (Text, long String, JSON) are deferred: they are loaded only
+# when accessed or when a query asks for them with undefer_group(DETAILS_GROUP)
+DETAILS_GROUP = "details"
+
+# API field name -> markers table column name (see Marker.to_dict)
+MARKER_FIELDS = {
+    'id': 'idMarker',
+    'title': 'title',
+    'description': 'description',
+    'latitude': 'latitude',
+    'longitude': 'longitude',
+    'address': 'address',
+    'metadata': 'marker_metadata',
+    'is_favorite': 'is_favorite',
+    'user_id': 'user_id',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+# Fields accepted by Marker.to_dict(fields=...); 'labels' comes from the relationship
+MARKER_RESPONSE_FIELDS = tuple(MARKER_FIELDS) + ('labels',)
+
+
 class Marker(Base):
     __tablename__ = "markers"
 
@@ -26,7 +49,9 @@ class Marker(Base):
 
     description: Mapped[str | None] = mapped_column(
         Text,
-        nullable=True
+        nullable=True,
+        deferred=True,
+        deferred_group=DETAILS_GROUP
     )
 
     # Geographic coordinates using WGS84 (EPSG:4326)
@@ -47,14 +72,18 @@ class Marker(Base):
     address: Mapped[str | None] = mapped_column(
         String(500),
         nullable=True,
+        deferred=True,
+        deferred_group=DETAILS_GROUP,
         doc="Human-readable address"
     )
 
     # JSON metadata for flexible additional data (hours, phone, website, etc.)
     # Using 'marker_metadata' instead of 'metadata' (which is reserved in SQLAlchemy)
-    marker_metadata = Column(
+    marker_metadata = mapped_column(
         JSON,
-        nullable=True
+        nullable=True,
+        deferred=True,
+        deferred_group=DETAILS_GROUP
     )
 
     # Favorite flag for quick access
@@ -95,13 +124,21 @@ class Marker(Base):
     )
 
     # Indexes for performance
+    # Every user-facing query filters by user_id first, so composite indexes
+    # lead with it. Query plans are checked in tests/integration/test_query_plans.py
     __table_args__ = (
         # Compound index for geographic queries (bounding box searches)
         Index('idx_marker_coordinates', 'latitude', 'longitude'),
-        # Index for favorite markers
-        Index('idx_marker_favorite', 'is_favorite'),
-        # Index for user queries
-        Index('idx_marker_user', 'user_id'),
+        # Per-user bounding box / radius searches
+        Index('idx_marker_user_coordinates', 'user_id', 'latitude', 'longitude'),
+        # Per-user listing in ID order (pagination)
+        Index('idx_marker_user_id', 'user_id', 'idMarker'),
+        # Partial index: only favorite rows are indexed
+        Index(
+            'idx_marker_user_favorite', 'user_id', 'idMarker',
+            sqlite_where=text('is_favorite = 1'),
+            postgresql_where=text('is_favorite')
+        ),
     )
 
     def __repr__(self) -> str:
@@ -112,8 +149,17 @@ class Marker(Base):
         """Return coordinates as (latitude, longitude) tuple"""
         return (self.latitude, self.longitude)
 
-    def to_dict(self) -> dict:
-        """Convert marker to dictionary for API responses"""
+    def to_dict(self, fields: Iterable[str] | None = None) -> dict:
+        """
+        Convert marker to dictionary for API responses
+
+        Args:
+            fields: Optional subset of keys to include (sparse fieldset).
+                Deferred columns are only loaded if requested.
+        """
+        if fields is not None:
+            return {field: self._field_value(field) for field in fields}
+
         return {
             'id': self.idMarker,
             'title': self.title,
@@ -127,4 +173,16 @@ class Marker(Base):
             'labels': [label.name for label in self.labels] if self.labels else [],
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-        }
\ No newline at end of file
+        }
+
+    def _field_value(self, field: str):
+        """Get the API value of a single to_dict field"""
+        if field == 'labels':
+            return [label.name for label in self.labels] if self.labels else []
+        if field in ('created_at', 'updated_at'):
+            value = getattr(self, field)
+            return value.isoformat() if value else None
+        if field in MARKER_FIELDS:
+            return getattr(self, MARKER_FIELDS[field])
+        raise ValueError(f"Unknown marker field: {field}")
+
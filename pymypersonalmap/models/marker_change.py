@@ -0,0 +1,67 @@
+from datetime import datetime
+from sqlalchemy import String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from pymypersonalmap.database.session import Base
+
+
+# Entities tracked by the change feed
+ENTITY_MARKER = "marker"
+ENTITY_LABEL = "label"
+
+# Operations; "delete" rows are tombstones
+OP_CREATE = "create"
+OP_UPDATE = "update"
+OP_DELETE = "delete"
+
+
+class MarkerChange(Base):
+    """
+    Change sequence for delta sync
+
+    One row per create/update/delete of a marker or label, in commit order.
+    ``seq`` is monotonically increasing and never reused (SQLite AUTOINCREMENT),
+    so clients can ask for everything after the last sequence they have seen.
+    Label association changes are recorded as an update of the marker.
+    """
+    __tablename__ = "marker_changes"
+
+    seq: Mapped[int] = mapped_column(
+        primary_key=True,
+        autoincrement=True
+    )
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.idUser", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    entity: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False
+    )
+
+    entity_id: Mapped[int] = mapped_column(
+        nullable=False
+    )
+
+    operation: Mapped[str] = mapped_column(
+        String(10),
+        nullable=False
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        server_default=func.now(),
+        nullable=False
+    )
+
+    __table_args__ = (
+        # Feed reads: WHERE user_id = ? AND seq > ? ORDER BY seq
+        Index('idx_marker_change_user_seq', 'user_id', 'seq'),
+        {'sqlite_autoincrement': True},
+    )
+
+    def __repr__(self) -> str:
+        return f"<MarkerChange(seq={self.seq}, {self.operation} {self.entity} {self.entity_id})>"
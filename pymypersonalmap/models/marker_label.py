@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import ForeignKey, DateTime, UniqueConstraint, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 
@@ -34,6 +34,9 @@ class MarkerLabel(Base):
     )
 
     # Ensure a marker can't have the same label multiple times
+    # (the unique index also serves lookups by marker_id)
     __table_args__ = (
         UniqueConstraint('marker_id', 'label_id', name='uq_marker_label'),
+        # Lookups by label (label counts, label filters, label deletion)
+        Index('idx_marker_label_label', 'label_id', 'marker_id'),
     )
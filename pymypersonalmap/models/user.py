@@ -65,5 +65,9 @@ class User(Base):
     markers: Mapped[list["Marker"]] = relationship(
         "Marker",
         back_populates="user",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        # Deleting a user never loads its markers: foreign keys are not
+        # enforced on SQLite, so user_repository.delete_user removes them
+        # with set-based DELETEs
+        passive_deletes=True
     )
@@ -0,0 +1,132 @@
+"""
+Attachment Repository
+
+Data access layer for marker attachments (file metadata; the content is
+kept in the blob store).
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import Select, select, delete, func
+from pymypersonalmap.models.attachment import Attachment
+from pymypersonalmap.models.marker_change import ENTITY_MARKER, OP_UPDATE
+from pymypersonalmap.repository import change_repository
+from typing import List, Optional, Set, Union
+
+
+def create_attachment(
+    db: Session,
+    marker_id: int,
+    user_id: int,
+    sha256: str,
+    filename: str,
+    content_type: str,
+    size: int
+) -> Attachment:
+    """
+    Create an attachment record
+
+    Recorded in the change feed as an update of the marker.
+
+    Args:
+        db: Database session
+        marker_id: Marker the file is attached to
+        user_id: Owner of the marker
+        sha256: Blob store key of the content
+        filename: Original file name
+        content_type: MIME type
+        size: Size in bytes
+
+    Returns:
+        Created Attachment instance
+    """
+    attachment = Attachment(
+        marker_id=marker_id,
+        user_id=user_id,
+        sha256=sha256,
+        filename=filename,
+        content_type=content_type,
+        size=size
+    )
+    db.add(attachment)
+    db.flush()
+    change_repository.record_change(db, user_id, ENTITY_MARKER, marker_id, OP_UPDATE)
+    db.commit()
+    db.refresh(attachment)
+    return attachment
+
+
+def get_attachment_by_id(db: Session, attachment_id: int) -> Optional[Attachment]:
+    """Get attachment by ID"""
+    return db.get(Attachment, attachment_id)
+
+
+def get_marker_attachments(db: Session, marker_id: int) -> List[Attachment]:
+    """Get the attachments of a marker in upload order"""
+    return list(db.scalars(
+        select(Attachment)
+        .where(Attachment.marker_id == marker_id)
+        .order_by(Attachment.idAttachment)
+    ))
+
+
+def delete_owned_attachment(db: Session, attachment_id: int, user_id: int) -> Optional[str]:
+    """
+    Delete an attachment owned by a user without loading it
+
+    Args:
+        db: Database session
+        attachment_id: Attachment ID
+        user_id: ID of the user that must own the attachment
+
+    Returns:
+        SHA-256 of the deleted attachment, or None if nothing was deleted
+    """
+    table = Attachment.__table__
+    row = db.execute(
+        delete(table)
+        .where(table.c.idAttachment == attachment_id, table.c.user_id == user_id)
+        .returning(table.c.sha256, table.c.marker_id)
+    ).first()
+
+    if row is not None:
+        change_repository.record_change(db, user_id, ENTITY_MARKER, row.marker_id, OP_UPDATE)
+    db.commit()
+    return row.sha256 if row is not None else None
+
+
+def delete_marker_attachments(db: Session, marker_id: int) -> List[str]:
+    """
+    Delete the attachment records of a marker (no commit)
+
+    Returns:
+        SHA-256 keys of the deleted attachments
+    """
+    table = Attachment.__table__
+    return list(db.scalars(
+        delete(table).where(table.c.marker_id == marker_id).returning(table.c.sha256)
+    ))
+
+
+def delete_attachments_of_markers(db: Session, marker_ids: Union[List[int], Select]) -> int:
+    """
+    Delete the attachment records of many markers (no commit)
+
+    ``marker_ids`` is a list of IDs or a SELECT of marker IDs.
+
+    Returns:
+        Number of deleted attachment records
+    """
+    table = Attachment.__table__
+    return db.execute(delete(table).where(table.c.marker_id.in_(marker_ids))).rowcount
+
+
+def count_blob_references(db: Session, sha256: str) -> int:
+    """Count attachments referencing a blob"""
+    return db.execute(
+        select(func.count()).select_from(Attachment).where(Attachment.sha256 == sha256)
+    ).scalar_one()
+
+
+def get_referenced_blobs(db: Session) -> Set[str]:
+    """Get the keys of all blobs referenced by at least one attachment"""
+    return set(db.scalars(select(Attachment.sha256).distinct()))
@@ -0,0 +1,216 @@
+"""
+Change Repository
+
+Data access layer for the marker/label change sequence (delta sync).
+Changes are written in the caller's transaction, so they commit or roll
+back together with the data change they describe. In-process read models
+(see services/marker_index.py) can register a change listener, called
+once the transaction that recorded the changes has committed.
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import event, select, insert, delete, func, literal
+from pymypersonalmap.models.labels import Label
+from pymypersonalmap.models.marker import Marker
+from pymypersonalmap.models.marker_change import (
+    MarkerChange,
+    ENTITY_MARKER,
+    ENTITY_LABEL,
+    OP_CREATE,
+)
+from typing import Callable, Iterable, List
+
+
+# Called with (user_id, entity, entity_ids) after each commit that recorded changes
+ChangeListener = Callable[[int, str, List[int]], None]
+
+_listeners: List[ChangeListener] = []
+
+# Session.info key of the changes recorded in the current transaction
+_PENDING_KEY = "pending_changes"
+
+
+def add_change_listener(listener: ChangeListener) -> None:
+    """Register a function notified of committed changes"""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_change_listener(listener: ChangeListener) -> None:
+    """Unregister a change listener"""
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def _remember(db: Session, user_id: int, entity: str, entity_ids: List[int]) -> None:
+    # Nothing to keep unless someone listens
+    if _listeners:
+        db.info.setdefault(_PENDING_KEY, []).append((user_id, entity, entity_ids))
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_listeners(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    for listener in list(_listeners):
+        for user_id, entity, entity_ids in pending:
+            listener(user_id, entity, entity_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_pending(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def record_change(
+    db: Session,
+    user_id: int,
+    entity: str,
+    entity_id: int,
+    operation: str
+) -> None:
+    """
+    Append a change to the sequence (no commit)
+
+    Args:
+        db: Database session
+        user_id: Owner of the changed entity
+        entity: Entity type (ENTITY_MARKER or ENTITY_LABEL)
+        entity_id: ID of the changed entity
+        operation: OP_CREATE, OP_UPDATE or OP_DELETE
+    """
+    db.execute(insert(MarkerChange.__table__).values(
+        user_id=user_id,
+        entity=entity,
+        entity_id=entity_id,
+        operation=operation
+    ))
+    _remember(db, user_id, entity, [entity_id])
+
+
+def record_changes(
+    db: Session,
+    user_id: int,
+    entity: str,
+    entity_ids: Iterable[int],
+    operation: str
+) -> None:
+    """
+    Append the same change for many entities with one executemany (no commit)
+
+    Args:
+        db: Database session
+        user_id: Owner of the changed entities
+        entity: Entity type (ENTITY_MARKER or ENTITY_LABEL)
+        entity_ids: IDs of the changed entities
+        operation: OP_CREATE, OP_UPDATE or OP_DELETE
+    """
+    rows = [
+        {'user_id': user_id, 'entity': entity, 'entity_id': entity_id, 'operation': operation}
+        for entity_id in entity_ids
+    ]
+    if rows:
+        db.execute(insert(MarkerChange.__table__), rows)
+        _remember(db, user_id, entity, [row['entity_id'] for row in rows])
+
+
+def get_changes_since(
+    db: Session,
+    user_id: int,
+    since: int = 0,
+    limit: int = 1000
+) -> List[tuple]:
+    """
+    Get a user's changes with a sequence number greater than ``since``
+
+    Args:
+        db: Database session
+        user_id: User ID
+        since: Last sequence number the client has seen
+        limit: Maximum number of changes to return
+
+    Returns:
+        List of (seq, entity, entity_id, operation) tuples ordered by seq
+    """
+    table = MarkerChange.__table__
+    stmt = (
+        select(table.c.seq, table.c.entity, table.c.entity_id, table.c.operation)
+        .where(table.c.user_id == user_id, table.c.seq > since)
+        .order_by(table.c.seq)
+        .limit(limit)
+    )
+    return db.execute(stmt).all()
+
+
+def get_latest_seq(db: Session, user_id: int) -> int:
+    """
+    Get the sequence number of a user's most recent change
+
+    Args:
+        db: Database session
+        user_id: User ID
+
+    Returns:
+        Latest sequence number, or 0 if the user has no changes
+    """
+    table = MarkerChange.__table__
+    stmt = select(func.max(table.c.seq)).where(table.c.user_id == user_id)
+    return db.execute(stmt).scalar() or 0
+
+
+def delete_user_changes_batch(db: Session, user_id: int, limit: int) -> int:
+    """
+    Delete up to ``limit`` of a user's changes, oldest first (no commit)
+
+    Args:
+        db: Database session
+        user_id: User ID
+        limit: Maximum number of deleted changes
+
+    Returns:
+        Number of deleted changes
+    """
+    table = MarkerChange.__table__
+    oldest = (
+        select(table.c.seq)
+        .where(table.c.user_id == user_id)
+        .order_by(table.c.seq)
+        .limit(limit)
+    )
+    return db.execute(delete(table).where(table.c.seq.in_(oldest))).rowcount
+
+
+def delete_user_changes(db: Session, user_id: int) -> int:
+    """Delete all of a user's changes (no commit); returns how many"""
+    table = MarkerChange.__table__
+    return db.execute(delete(table).where(table.c.user_id == user_id)).rowcount
+
+
+def seed_changes(db: Session) -> int:
+    """
+    Record a create change for every existing marker and custom label (no commit)
+
+    Used once, when the change table is added to a database that already
+    has data, so that a full sync (``since=0``) returns everything.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Number of recorded changes
+    """
+    table = MarkerChange.__table__
+    columns = [table.c.user_id, table.c.entity, table.c.entity_id, table.c.operation]
+    markers = Marker.__table__
+    labels = Label.__table__
+    inserted = 0
+    for source in (
+        select(labels.c.created_by, literal(ENTITY_LABEL), labels.c.idLabel, literal(OP_CREATE))
+        .where(labels.c.created_by.is_not(None))
+        .order_by(labels.c.idLabel),
+        select(markers.c.user_id, literal(ENTITY_MARKER), markers.c.idMarker, literal(OP_CREATE))
+        .order_by(markers.c.idMarker),
+    ):
+        inserted += db.execute(insert(table).from_select(columns, source)).rowcount
+    return inserted
@@ -1,5 +1,13 @@
+from sqlalchemy import select, delete, func
 from sqlalchemy.orm import Session
 from pymypersonalmap.models.labels import Label
+from pymypersonalmap.models.marker import Marker
+from pymypersonalmap.models.marker_label import MarkerLabel
+from pymypersonalmap.models.marker_change import (
+    ENTITY_LABEL, ENTITY_MARKER, OP_CREATE, OP_UPDATE, OP_DELETE
+)
+from pymypersonalmap.repository import change_repository
+from collections import defaultdict
 
 
 def create_label(
@@ -20,6 +28,8 @@ def create_label(
     )
     db.add(label)
     db.flush()
+    if created_by is not None:
+        change_repository.record_change(db, created_by, ENTITY_LABEL, label.idLabel, OP_CREATE)
     return label
 
 
@@ -28,11 +38,26 @@ def get_label_by_id(db: Session, label_id: int) -> Label | None:
     return db.get(Label, label_id)
 
 
+def get_labels_by_ids(db: Session, label_ids: list[int]) -> list[Label]:
+    """Get labels by a list of IDs"""
+    if not label_ids:
+        return []
+    return db.query(Label).filter(Label.idLabel.in_(label_ids)).all()
+
+
 def get_label_by_name(db: Session, name: str) -> Label | None:
     """Get label by name"""
     return db.query(Label).filter(Label.name == name).first()
 
 
+def get_label_ids_by_name(db: Session, user_id: int) -> dict[str, int]:
+    """Map the names of the labels visible to a user (system + own) to their IDs"""
+    stmt = select(Label.name, Label.idLabel).where(
+        (Label.is_system == True) | (Label.created_by == user_id)
+    )
+    return {name: label_id for name, label_id in db.execute(stmt)}
+
+
 def get_all_labels(
     db: Session,
     skip: int = 0,
@@ -83,6 +108,8 @@ def update_label(
     if icon is not None:
         label.icon = icon
 
+    if label.created_by is not None:
+        change_repository.record_change(db, label.created_by, ENTITY_LABEL, label_id, OP_UPDATE)
     db.flush()
     return label
 
@@ -93,11 +120,45 @@ def delete_label(db: Session, label_id: int) -> bool:
     if not label or label.is_system:
         return False
 
+    if label.created_by is not None:
+        change_repository.record_change(db, label.created_by, ENTITY_LABEL, label_id, OP_DELETE)
+    # Markers carrying the label change too: read as (id, owner) rows, not loaded
+    rows = db.execute(
+        select(MarkerLabel.marker_id, Marker.user_id)
+        .join(Marker, Marker.idMarker == MarkerLabel.marker_id)
+        .where(MarkerLabel.label_id == label_id)
+    )
+    marker_ids_by_user: dict[int, list[int]] = defaultdict(list)
+    for marker_id, user_id in rows:
+        marker_ids_by_user[user_id].append(marker_id)
+    for user_id, marker_ids in marker_ids_by_user.items():
+        change_repository.record_changes(db, user_id, ENTITY_MARKER, marker_ids, OP_UPDATE)
+
+    marker_labels = MarkerLabel.__table__
+    db.execute(delete(marker_labels).where(marker_labels.c.label_id == label_id))
+    # The associations are gone, so the ORM finds nothing left to unlink
+    db.expire(label, ["markers"])
     db.delete(label)
     db.flush()
     return True
 
 
+def delete_user_labels(db: Session, user_id: int) -> int:
+    """
+    Delete the custom labels of a user and their marker associations (no commit)
+
+    Returns:
+        Number of deleted labels
+    """
+    table = Label.__table__
+    label_ids = select(table.c.idLabel).where(
+        table.c.created_by == user_id, table.c.is_system == False
+    )
+    marker_labels = MarkerLabel.__table__
+    db.execute(delete(marker_labels).where(marker_labels.c.label_id.in_(label_ids)))
+    return db.execute(delete(table).where(table.c.idLabel.in_(label_ids))).rowcount
+
+
 def label_exists_by_name(db: Session, name: str) -> bool:
     """Check if label exists by name"""
     return db.query(Label).filter(Label.name == name).count() > 0
@@ -105,10 +166,8 @@ def label_exists_by_name(db: Session, name: str) -> bool:
 
 def count_markers_with_label(db: Session, label_id: int) -> int:
     """Count how many markers use this label"""
-    label = db.get(Label, label_id)
-    if not label:
-        return 0
-    return len(label.markers)
+    stmt = select(func.count()).select_from(MarkerLabel).where(MarkerLabel.label_id == label_id)
+    return db.execute(stmt).scalar_one()
 
 
 def bulk_create_system_labels(db: Session, labels_data: list[dict]) -> list[Label]:
@@ -5,12 +5,74 @@ Data access layer for Marker model operations.
 Uses lat/lon columns for coordinate storage.
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from pymypersonalmap.models.marker import Marker
+from sqlalchemy.orm import Session, selectinload, undefer_group
+from sqlalchemy import and_, select, func, insert, update, delete, union
+from pymypersonalmap.models.marker import Marker, DETAILS_GROUP, MARKER_FIELDS
 from pymypersonalmap.models.labels import Label
+from pymypersonalmap.models.marker_label import MarkerLabel
+from pymypersonalmap.models.marker_change import ENTITY_MARKER, OP_CREATE, OP_UPDATE, OP_DELETE
+from pymypersonalmap.repository import change_repository, attachment_repository
 from pymypersonalmap.services.geo_utils import haversine_distance, get_bounding_box
-from typing import List, Optional
+from typing import Iterator, List, Optional, Sequence
+
+
+# Columns needed to draw a pin on the map or a row in the marker list
+PIN_COLUMNS = ("idMarker", "title", "latitude", "longitude", "is_favorite")
+
+# Maximum number of bound parameters per IN (...) clause (SQLite limit is 999)
+IN_CLAUSE_CHUNK_SIZE = 500
+
+
+class MarkerPin:
+    """
+    Lightweight read-only marker record for map pins and list views
+
+    Built from SQLAlchemy Core rows, so it carries no identity map,
+    relationship proxies or JSON metadata.
+    """
+
+    __slots__ = (
+        "id", "title", "latitude", "longitude", "is_favorite", "label_colors", "distance"
+    )
+
+    def __init__(
+        self,
+        id: int,
+        title: str,
+        latitude: float,
+        longitude: float,
+        is_favorite: bool,
+        label_colors: tuple[str, ...] = (),
+        distance: Optional[float] = None
+    ):
+        self.id = id
+        self.title = title
+        self.latitude = latitude
+        self.longitude = longitude
+        self.is_favorite = is_favorite
+        self.label_colors = label_colors
+        # Meters from the query point, for radius and nearest-neighbour results
+        self.distance = distance
+
+    def __repr__(self) -> str:
+        return (
+            f"<MarkerPin(id={self.id}, title='{self.title}', "
+            f"lat={self.latitude}, lon={self.longitude})>"
+        )
+
+    def to_dict(self) -> dict:
+        """Convert pin to dictionary for API responses"""
+        result = {
+            'id': self.id,
+            'title': self.title,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'is_favorite': self.is_favorite,
+            'label_colors': list(self.label_colors),
+        }
+        if self.distance is not None:
+            result['distance'] = self.distance
+        return result
 
 
 def create_marker(
@@ -53,31 +115,101 @@ def create_marker(
     )
 
     db.add(marker)
+    db.flush()
+    change_repository.record_change(db, user_id, ENTITY_MARKER, marker.idMarker, OP_CREATE)
     db.commit()
     db.refresh(marker)
 
     return marker
 
 
-def get_marker_by_id(db: Session, marker_id: int) -> Optional[Marker]:
+def bulk_create_markers(
+    db: Session,
+    user_id: int,
+    rows: Sequence[dict]
+) -> List[int]:
+    """
+    Insert many markers in one transaction
+
+    Markers, their label associations and the change records are written
+    with one multi-row INSERT each, then committed together.
+
+    Args:
+        db: Database session
+        user_id: ID of the user owning the markers
+        rows: Dictionaries with title, latitude, longitude and optionally
+            description, address, metadata, is_favorite and label_ids
+
+    Returns:
+        IDs of the created markers, in the order of ``rows``
+    """
+    if not rows:
+        return []
+
+    table = Marker.__table__
+    values = [
+        {
+            'title': row['title'],
+            'description': row.get('description'),
+            'latitude': row['latitude'],
+            'longitude': row['longitude'],
+            'address': row.get('address'),
+            'marker_metadata': row.get('metadata'),
+            'is_favorite': row.get('is_favorite', False),
+            'user_id': user_id,
+        }
+        for row in rows
+    ]
+    result = db.execute(
+        insert(table).returning(table.c.idMarker, sort_by_parameter_order=True),
+        values
+    )
+    marker_ids = list(result.scalars())
+
+    label_rows = [
+        {'marker_id': marker_id, 'label_id': label_id}
+        for marker_id, row in zip(marker_ids, rows)
+        for label_id in dict.fromkeys(row.get('label_ids') or ())
+    ]
+    if label_rows:
+        db.execute(insert(MarkerLabel.__table__), label_rows)
+
+    change_repository.record_changes(db, user_id, ENTITY_MARKER, marker_ids, OP_CREATE)
+    db.commit()
+
+    return marker_ids
+
+
+def get_marker_by_id(
+    db: Session,
+    marker_id: int,
+    with_details: bool = False
+) -> Optional[Marker]:
     """
     Get marker by ID
 
     Args:
         db: Database session
         marker_id: Marker ID
+        with_details: Load the deferred columns (description, address,
+            metadata) in the same query
 
     Returns:
         Marker instance or None if not found
     """
-    return db.query(Marker).filter(Marker.idMarker == marker_id).first()
+    query = db.query(Marker)
+    if with_details:
+        query = query.options(undefer_group(DETAILS_GROUP))
+    return query.filter(Marker.idMarker == marker_id).first()
 
 
 def get_all_markers(
     db: Session,
     user_id: Optional[int] = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    with_details: bool = False,
+    with_labels: bool = False
 ) -> List[Marker]:
     """
     Get all markers, optionally filtered by user
@@ -87,11 +219,19 @@ def get_all_markers(
         user_id: Optional user ID to filter by
         skip: Number of records to skip (pagination)
         limit: Maximum number of records to return
+        with_details: Load the deferred columns (description, address,
+            metadata) in the same query
+        with_labels: Load the labels of all markers with one extra query
+            instead of one per marker
 
     Returns:
         List of Marker instances
     """
     query = db.query(Marker)
+    if with_details:
+        query = query.options(undefer_group(DETAILS_GROUP))
+    if with_labels:
+        query = query.options(selectinload(Marker.labels))
 
     if user_id is not None:
         query = query.filter(Marker.user_id == user_id)
@@ -146,6 +286,7 @@ def update_marker(
     if is_favorite is not None:
         marker.is_favorite = is_favorite
 
+    change_repository.record_change(db, marker.user_id, ENTITY_MARKER, marker_id, OP_UPDATE)
     db.commit()
     db.refresh(marker)
 
@@ -167,12 +308,192 @@ def delete_marker(db: Session, marker_id: int) -> bool:
     if not marker:
         return False
 
+    change_repository.record_change(db, marker.user_id, ENTITY_MARKER, marker_id, OP_DELETE)
+    attachment_repository.delete_marker_attachments(db, marker_id)
     db.delete(marker)
     db.commit()
 
     return True
 
 
+# Columns returned by the single-statement mutations, keyed like Marker.to_dict()
+RETURNING_FIELDS = (
+    'id', 'title', 'description', 'latitude', 'longitude', 'address',
+    'metadata', 'is_favorite', 'user_id', 'created_at', 'updated_at'
+)
+
+
+def _returning_columns() -> list:
+    table = Marker.__table__
+    return [table.c[MARKER_FIELDS[field]] for field in RETURNING_FIELDS]
+
+
+def _returned_row_to_dict(row) -> dict:
+    values = dict(zip(RETURNING_FIELDS, row))
+    for key in ('created_at', 'updated_at'):
+        if values[key] is not None:
+            values[key] = values[key].isoformat()
+    return values
+
+
+def marker_exists(db: Session, marker_id: int) -> bool:
+    """
+    Check if a marker exists (primary key lookup, no ORM hydration)
+
+    Args:
+        db: Database session
+        marker_id: Marker ID
+
+    Returns:
+        True if the marker exists
+    """
+    table = Marker.__table__
+    stmt = select(table.c.idMarker).where(table.c.idMarker == marker_id)
+    return db.execute(stmt).first() is not None
+
+
+def update_owned_marker(
+    db: Session,
+    marker_id: int,
+    user_id: int,
+    title: Optional[str] = None,
+    description: Optional[str] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    address: Optional[str] = None,
+    metadata: Optional[dict] = None,
+    is_favorite: Optional[bool] = None
+) -> Optional[dict]:
+    """
+    Update a marker owned by a user in a single statement
+
+    Runs ``UPDATE markers ... WHERE idMarker = ? AND user_id = ? RETURNING ...``,
+    so the ownership check, the update and reading back the new values take
+    one round trip. ORM instances already in the session are not refreshed.
+
+    Args:
+        db: Database session
+        marker_id: Marker ID to update
+        user_id: ID of the user that must own the marker
+        title: New title (optional)
+        description: New description (optional)
+        latitude: New latitude (optional)
+        longitude: New longitude (optional)
+        address: New address (optional)
+        metadata: New metadata (optional)
+        is_favorite: New favorite status (optional)
+
+    Returns:
+        Updated marker as a dictionary (Marker.to_dict keys without labels),
+        or None if no marker with this ID is owned by the user
+    """
+    values = {
+        'title': title,
+        'description': description,
+        'latitude': latitude,
+        'longitude': longitude,
+        'address': address,
+        'marker_metadata': metadata,
+        'is_favorite': is_favorite,
+    }
+    values = {key: value for key, value in values.items() if value is not None}
+
+    table = Marker.__table__
+    ownership = (table.c.idMarker == marker_id, table.c.user_id == user_id)
+
+    if values:
+        stmt = update(table).where(*ownership).values(**values).returning(*_returning_columns())
+    else:
+        stmt = select(*_returning_columns()).where(*ownership)
+
+    row = db.execute(stmt).first()
+    if row is not None and values:
+        change_repository.record_change(db, user_id, ENTITY_MARKER, marker_id, OP_UPDATE)
+    db.commit()
+
+    return _returned_row_to_dict(row) if row is not None else None
+
+
+def delete_owned_marker(db: Session, marker_id: int, user_id: int) -> bool:
+    """
+    Delete a marker owned by a user without loading it
+
+    Runs ``DELETE FROM markers WHERE idMarker = ? AND user_id = ? RETURNING idMarker``
+    and removes the label associations and attachment records of the
+    deleted marker (their blobs are reclaimed by attachment garbage collection).
+
+    Args:
+        db: Database session
+        marker_id: Marker ID to delete
+        user_id: ID of the user that must own the marker
+
+    Returns:
+        True if deleted, False if no marker with this ID is owned by the user
+    """
+    table = Marker.__table__
+    stmt = (
+        delete(table)
+        .where(table.c.idMarker == marker_id, table.c.user_id == user_id)
+        .returning(table.c.idMarker)
+    )
+    deleted = db.execute(stmt).first() is not None
+
+    if deleted:
+        marker_labels = MarkerLabel.__table__
+        db.execute(delete(marker_labels).where(marker_labels.c.marker_id == marker_id))
+        attachment_repository.delete_marker_attachments(db, marker_id)
+        change_repository.record_change(db, user_id, ENTITY_MARKER, marker_id, OP_DELETE)
+
+    db.commit()
+    return deleted
+
+
+def delete_user_markers_batch(db: Session, user_id: int, limit: int) -> int:
+    """
+    Delete up to ``limit`` markers of a user without loading them (no commit)
+
+    Their label associations and attachment records go in the same
+    set-based statements; no change is recorded, as the caller removes
+    the user's change feed too.
+
+    Args:
+        db: Database session
+        user_id: Owner of the markers
+        limit: Maximum number of markers deleted
+
+    Returns:
+        Number of deleted markers (less than ``limit`` once none are left)
+    """
+    table = Marker.__table__
+    marker_ids = list(db.scalars(
+        select(table.c.idMarker).where(table.c.user_id == user_id).limit(limit)
+    ))
+    if marker_ids:
+        marker_labels = MarkerLabel.__table__
+        db.execute(delete(marker_labels).where(marker_labels.c.marker_id.in_(marker_ids)))
+        attachment_repository.delete_attachments_of_markers(db, marker_ids)
+        db.execute(delete(table).where(table.c.idMarker.in_(marker_ids)))
+    return len(marker_ids)
+
+
+def delete_user_markers(db: Session, user_id: int) -> int:
+    """
+    Delete all markers of a user in one set-based pass (no commit)
+
+    Like ``delete_user_markers_batch`` without a limit: label associations
+    and attachment records go first, selected by subquery.
+
+    Returns:
+        Number of deleted markers
+    """
+    table = Marker.__table__
+    marker_ids = select(table.c.idMarker).where(table.c.user_id == user_id)
+    marker_labels = MarkerLabel.__table__
+    db.execute(delete(marker_labels).where(marker_labels.c.marker_id.in_(marker_ids)))
+    attachment_repository.delete_attachments_of_markers(db, marker_ids)
+    return db.execute(delete(table).where(table.c.user_id == user_id)).rowcount
+
+
 def get_markers_within_radius(
     db: Session,
     latitude: float,
@@ -326,6 +647,7 @@ def add_label_to_marker(
     # Check if label already associated
     if label not in marker.labels:
         marker.labels.append(label)
+        change_repository.record_change(db, marker.user_id, ENTITY_MARKER, marker_id, OP_UPDATE)
         db.commit()
         db.refresh(marker)
 
@@ -357,6 +679,7 @@ def remove_label_from_marker(
     # Remove label if associated
     if label in marker.labels:
         marker.labels.remove(label)
+        change_repository.record_change(db, marker.user_id, ENTITY_MARKER, marker_id, OP_UPDATE)
         db.commit()
         db.refresh(marker)
 
@@ -392,3 +715,451 @@ def search_markers(
         query = query.filter(Marker.user_id == user_id)
 
     return query.offset(skip).limit(limit).all()
+
+
+def _marker_filters(
+    user_id: Optional[int] = None,
+    marker_ids: Optional[Sequence[int]] = None,
+    bbox: Optional[tuple[float, float, float, float]] = None,
+    is_favorite: Optional[bool] = None,
+    label_ids: Optional[Sequence[int]] = None,
+    search: Optional[str] = None
+) -> list:
+    """Build Core WHERE clauses on the markers table for the list filters"""
+    table = Marker.__table__
+    clauses = []
+
+    if user_id is not None:
+        clauses.append(table.c.user_id == user_id)
+    if marker_ids is not None:
+        clauses.append(table.c.idMarker.in_(marker_ids))
+    if bbox is not None:
+        min_lat, min_lon, max_lat, max_lon = bbox
+        clauses += [
+            table.c.latitude >= min_lat,
+            table.c.latitude <= max_lat,
+            table.c.longitude >= min_lon,
+            table.c.longitude <= max_lon
+        ]
+    if is_favorite is not None:
+        clauses.append(table.c.is_favorite == is_favorite)
+    if label_ids:
+        marker_labels = MarkerLabel.__table__
+        clauses.append(table.c.idMarker.in_(
+            select(marker_labels.c.marker_id).where(marker_labels.c.label_id.in_(label_ids))
+        ))
+    if search:
+        pattern = f"%{search}%"
+        clauses.append(table.c.title.ilike(pattern) | table.c.description.ilike(pattern))
+
+    return clauses
+
+
+def get_marker_rows(
+    db: Session,
+    columns: Sequence[str] = PIN_COLUMNS,
+    user_id: Optional[int] = None,
+    bbox: Optional[tuple[float, float, float, float]] = None,
+    favorites_only: bool = False,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    marker_ids: Optional[Sequence[int]] = None
+) -> list[tuple]:
+    """
+    Fast read path returning plain row tuples instead of ORM instances
+
+    Runs a SQLAlchemy Core select on the markers table, so no identity map
+    bookkeeping or attribute instrumentation is involved. Rows are tuples in
+    the order of ``columns``.
+
+    Args:
+        db: Database session
+        columns: Marker column names to select (default: PIN_COLUMNS)
+        user_id: Optional user ID to filter by
+        bbox: Optional (min_lat, min_lon, max_lat, max_lon) bounding box
+        favorites_only: Only return favorite markers
+        skip: Number of records to skip (pagination)
+        limit: Maximum number of records to return (None for no limit)
+        marker_ids: Only markers with these IDs
+
+    Returns:
+        List of row tuples
+
+    Raises:
+        ValueError: If a column name is unknown
+    """
+    table = Marker.__table__
+    try:
+        selected = [table.c[name] for name in columns]
+    except KeyError as e:
+        raise ValueError(f"Unknown marker column: {e.args[0]}")
+
+    stmt = select(*selected).where(*_marker_filters(
+        user_id=user_id,
+        marker_ids=marker_ids,
+        bbox=bbox,
+        is_favorite=True if favorites_only else None
+    ))
+
+    stmt = stmt.order_by(table.c.idMarker)
+    if skip:
+        stmt = stmt.offset(skip)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    return db.execute(stmt).all()
+
+
+# Bounding boxes per UNION statement (SQLite allows 500 compound terms)
+BOX_QUERY_CHUNK_SIZE = 100
+
+
+def get_marker_rows_in_boxes(
+    db: Session,
+    boxes: Sequence[tuple[float, float, float, float]],
+    columns: Sequence[str] = PIN_COLUMNS,
+    user_id: Optional[int] = None
+) -> list[tuple]:
+    """
+    Row tuples of the markers inside any of several bounding boxes
+
+    Each box is an indexed range select; they are combined with UNION, so
+    a marker inside overlapping boxes is returned once.
+
+    Args:
+        db: Database session
+        boxes: (min_lat, min_lon, max_lat, max_lon) bounding boxes
+        columns: Marker column names to select (default: PIN_COLUMNS)
+        user_id: Optional user ID to filter by
+
+    Returns:
+        List of row tuples, in no particular order
+
+    Raises:
+        ValueError: If a column name is unknown
+    """
+    table = Marker.__table__
+    try:
+        selected = [table.c[name] for name in columns]
+    except KeyError as e:
+        raise ValueError(f"Unknown marker column: {e.args[0]}")
+
+    # Keyed by row: boxes of different statements may overlap too
+    rows: dict[tuple, None] = {}
+    for start in range(0, len(boxes), BOX_QUERY_CHUNK_SIZE):
+        selects = [
+            select(*selected).where(*_marker_filters(user_id=user_id, bbox=box))
+            for box in boxes[start:start + BOX_QUERY_CHUNK_SIZE]
+        ]
+        stmt = selects[0] if len(selects) == 1 else union(*selects)
+        rows.update(dict.fromkeys(tuple(row) for row in db.execute(stmt)))
+    return list(rows)
+
+
+def get_label_colors_for_markers(
+    db: Session,
+    marker_ids: Sequence[int]
+) -> dict[int, tuple[str, ...]]:
+    """
+    Get label colors for a set of markers with Core selects
+
+    Args:
+        db: Database session
+        marker_ids: Marker IDs to look up
+
+    Returns:
+        Dictionary mapping marker ID to a tuple of label colors
+    """
+    marker_labels = MarkerLabel.__table__
+    labels = Label.__table__
+
+    colors: dict[int, list[str]] = {}
+    for start in range(0, len(marker_ids), IN_CLAUSE_CHUNK_SIZE):
+        chunk = marker_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+        stmt = (
+            select(marker_labels.c.marker_id, labels.c.color)
+            .join(labels, labels.c.idLabel == marker_labels.c.label_id)
+            .where(marker_labels.c.marker_id.in_(chunk))
+            .order_by(marker_labels.c.marker_id, labels.c.idLabel)
+        )
+        for marker_id, color in db.execute(stmt):
+            colors.setdefault(marker_id, []).append(color)
+
+    return {marker_id: tuple(values) for marker_id, values in colors.items()}
+
+
+def get_marker_pins(
+    db: Session,
+    user_id: Optional[int] = None,
+    bbox: Optional[tuple[float, float, float, float]] = None,
+    favorites_only: bool = False,
+    skip: int = 0,
+    limit: Optional[int] = None
+) -> list[MarkerPin]:
+    """
+    Get compact pin records (id, title, coordinates, favorite, label colors)
+
+    Uses two Core selects (markers + label colors) and never hydrates
+    ORM Marker instances.
+
+    Args:
+        db: Database session
+        user_id: Optional user ID to filter by
+        bbox: Optional (min_lat, min_lon, max_lat, max_lon) bounding box
+        favorites_only: Only return favorite markers
+        skip: Number of records to skip (pagination)
+        limit: Maximum number of records to return (None for no limit)
+
+    Returns:
+        List of MarkerPin records ordered by ID
+    """
+    rows = get_marker_rows(
+        db,
+        columns=PIN_COLUMNS,
+        user_id=user_id,
+        bbox=bbox,
+        favorites_only=favorites_only,
+        skip=skip,
+        limit=limit
+    )
+    if not rows:
+        return []
+
+    colors = get_label_colors_for_markers(db, [row[0] for row in rows])
+    return [
+        MarkerPin(marker_id, title, lat, lon, is_favorite, colors.get(marker_id, ()))
+        for marker_id, title, lat, lon, is_favorite in rows
+    ]
+
+
+def get_label_names_for_markers(
+    db: Session,
+    marker_ids: Sequence[int]
+) -> dict[int, list[str]]:
+    """
+    Get label names for a set of markers with Core selects
+
+    Args:
+        db: Database session
+        marker_ids: Marker IDs to look up
+
+    Returns:
+        Dictionary mapping marker ID to a list of label names
+    """
+    marker_labels = MarkerLabel.__table__
+    labels = Label.__table__
+
+    names: dict[int, list[str]] = {}
+    for start in range(0, len(marker_ids), IN_CLAUSE_CHUNK_SIZE):
+        chunk = marker_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+        stmt = (
+            select(marker_labels.c.marker_id, labels.c.name)
+            .join(labels, labels.c.idLabel == marker_labels.c.label_id)
+            .where(marker_labels.c.marker_id.in_(chunk))
+            .order_by(marker_labels.c.marker_id, labels.c.idLabel)
+        )
+        for marker_id, name in db.execute(stmt):
+            names.setdefault(marker_id, []).append(name)
+
+    return names
+
+
+def get_marker_label_pairs(
+    db: Session,
+    user_id: int,
+    marker_ids: Optional[Sequence[int]] = None
+) -> list[tuple[int, int]]:
+    """
+    Get the (marker ID, label ID) associations of a user's markers
+
+    Args:
+        db: Database session
+        user_id: User ID
+        marker_ids: Only these markers (default: all of the user's markers)
+
+    Returns:
+        List of (marker_id, label_id) tuples ordered by marker ID
+    """
+    marker_labels = MarkerLabel.__table__
+    table = Marker.__table__
+    stmt = (
+        select(marker_labels.c.marker_id, marker_labels.c.label_id)
+        .join(table, table.c.idMarker == marker_labels.c.marker_id)
+        .where(table.c.user_id == user_id)
+        .order_by(marker_labels.c.marker_id, marker_labels.c.label_id)
+    )
+    if marker_ids is None:
+        return db.execute(stmt).all()
+
+    pairs = []
+    for start in range(0, len(marker_ids), IN_CLAUSE_CHUNK_SIZE):
+        chunk = marker_ids[start:start + IN_CLAUSE_CHUNK_SIZE]
+        pairs += db.execute(stmt.where(marker_labels.c.marker_id.in_(chunk))).all()
+    return pairs
+
+
+def _rows_to_dicts(
+    db: Session,
+    rows: Sequence[tuple],
+    fields: Sequence[str],
+    column_fields: Sequence[str]
+) -> list[dict]:
+    """
+    Convert (idMarker, *column_fields) rows to Marker.to_dict-style dictionaries
+
+    Labels are fetched for the whole set of rows at once if requested.
+    """
+    label_names = None
+    if 'labels' in fields and rows:
+        label_names = get_label_names_for_markers(db, [row[0] for row in rows])
+
+    results = []
+    for row in rows:
+        values = dict(zip(column_fields, row[1:]))
+        for key in ('created_at', 'updated_at'):
+            if values.get(key) is not None:
+                values[key] = values[key].isoformat()
+        if label_names is not None:
+            values['labels'] = label_names.get(row[0], [])
+        results.append({field: values[field] for field in fields})
+
+    return results
+
+
+def get_marker_dicts(
+    db: Session,
+    fields: Sequence[str],
+    user_id: Optional[int] = None,
+    label_ids: Optional[Sequence[int]] = None,
+    search: Optional[str] = None,
+    is_favorite: Optional[bool] = None,
+    skip: int = 0,
+    limit: Optional[int] = 100,
+    marker_ids: Optional[Sequence[int]] = None
+) -> list[dict]:
+    """
+    Get markers as dictionaries restricted to a sparse fieldset
+
+    Only the columns backing ``fields`` are selected, so deferred/heavy
+    columns cost nothing unless a client asks for them. Keys and value
+    formats match Marker.to_dict().
+
+    Args:
+        db: Database session
+        fields: API field names (see models.marker.MARKER_RESPONSE_FIELDS)
+        user_id: Optional user ID to filter by
+        label_ids: Only markers having at least one of these labels
+        search: Search term for title/description
+        is_favorite: Filter by favorite status
+        skip: Number of records to skip
+        limit: Maximum number of records (None for no limit)
+        marker_ids: Only markers with these IDs
+
+    Returns:
+        List of dictionaries with exactly the requested keys
+
+    Raises:
+        ValueError: If a field name is unknown
+    """
+    unknown = [field for field in fields if field not in MARKER_FIELDS and field != 'labels']
+    if unknown:
+        raise ValueError(f"Unknown marker field: {unknown[0]}")
+
+    column_fields = [field for field in fields if field in MARKER_FIELDS]
+    table = Marker.__table__
+    # The ID is always selected to attach labels, even if not requested
+    selected = [table.c.idMarker] + [table.c[MARKER_FIELDS[field]] for field in column_fields]
+
+    stmt = (
+        select(*selected)
+        .where(*_marker_filters(
+            user_id=user_id,
+            marker_ids=marker_ids,
+            is_favorite=is_favorite,
+            label_ids=label_ids,
+            search=search
+        ))
+        .order_by(table.c.idMarker)
+        .offset(skip)
+        .limit(limit)
+    )
+    rows = db.execute(stmt).all()
+    return _rows_to_dicts(db, rows, fields, column_fields)
+
+
+def count_markers(
+    db: Session,
+    user_id: Optional[int] = None,
+    label_ids: Optional[Sequence[int]] = None,
+    search: Optional[str] = None,
+    is_favorite: Optional[bool] = None
+) -> int:
+    """
+    Count markers matching the list filters
+
+    Args:
+        db: Database session
+        user_id: Optional user ID to filter by
+        label_ids: Only markers having at least one of these labels
+        search: Search term for title/description
+        is_favorite: Filter by favorite status
+
+    Returns:
+        Number of matching markers
+    """
+    stmt = select(func.count()).select_from(Marker.__table__).where(*_marker_filters(
+        user_id=user_id,
+        is_favorite=is_favorite,
+        label_ids=label_ids,
+        search=search
+    ))
+    return db.execute(stmt).scalar_one()
+
+
+# Rows fetched per round of a streaming read (yield_per)
+STREAM_BATCH_SIZE = 1000
+
+
+def iter_marker_batches(
+    db: Session,
+    user_id: int,
+    fields: Sequence[str] = tuple(MARKER_FIELDS) + ('labels',),
+    label_ids: Optional[Sequence[int]] = None,
+    with_details: bool = True,
+    batch_size: int = STREAM_BATCH_SIZE
+) -> Iterator[list[dict]]:
+    """
+    Stream a user's markers in batches without loading them all
+
+    Uses a streaming Core select (``yield_per``), so only ``batch_size`` rows
+    are held in memory at a time regardless of the library size. Labels are
+    attached per batch.
+
+    Args:
+        db: Database session
+        user_id: User ID
+        fields: API field names to include (see Marker.to_dict)
+        label_ids: Only markers having at least one of these labels
+        with_details: Include the deferred columns (description, address,
+            metadata); when False they are dropped from ``fields``
+        batch_size: Number of rows per batch
+
+    Yields:
+        Lists of marker dictionaries (at most ``batch_size`` each), in ID order
+    """
+    if not with_details:
+        details = {'description', 'address', 'metadata'}
+        fields = [field for field in fields if field not in details]
+
+    column_fields = [field for field in fields if field in MARKER_FIELDS]
+    table = Marker.__table__
+    selected = [table.c.idMarker] + [table.c[MARKER_FIELDS[field]] for field in column_fields]
+    stmt = (
+        select(*selected)
+        .where(*_marker_filters(user_id=user_id, label_ids=label_ids))
+        .order_by(table.c.idMarker)
+        .execution_options(yield_per=batch_size)
+    )
+
+    for rows in db.execute(stmt).partitions():
+        yield _rows_to_dicts(db, rows, fields, column_fields)
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 from pymypersonalmap.models.user import User
+from pymypersonalmap.repository import change_repository, labels_repository, marker_repository
 
 
 def create_user(
@@ -84,11 +85,24 @@ def update_user(
 
 
 def delete_user(db: Session, user_id: int) -> bool:
-    """Delete a user"""
+    """
+    Delete a user and everything they own (no commit)
+
+    SQLite does not enforce the foreign keys here, so ON DELETE CASCADE
+    never fires: markers, label associations, attachment records, custom
+    labels and changes are removed with set-based DELETEs first, without
+    loading them. For large accounts use services/account_deletion_service.py,
+    which deletes them in batches before calling this.
+    """
     user = db.get(User, user_id)
     if not user:
         return False
 
+    marker_repository.delete_user_markers(db, user_id)
+    change_repository.delete_user_changes(db, user_id)
+    labels_repository.delete_user_labels(db, user_id)
+    # A loaded collection would make the ORM delete the markers a second time
+    db.expire(user, ["markers"])
     db.delete(user)
     db.flush()
     return True
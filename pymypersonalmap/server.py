@@ -0,0 +1,334 @@
+"""
+Production Server Launcher
+
+Pre-fork launcher for the FastAPI backend: the master process prepares
+the database, binds the listening socket once and forks WORKERS_COUNT
+uvicorn workers that all accept on it. The master restarts workers that
+die and handles signals:
+
+- SIGTERM / SIGINT: graceful shutdown (workers finish in-flight requests)
+- SIGHUP: rolling restart, one worker at a time; each replacement must be
+  accepting requests before the worker it replaces is stopped
+
+Every worker gets its own SQLite connections (the engine pool inherited
+from the master is discarded after fork, see database/session.py) and,
+with more than one worker, the shared marker index.
+
+On platforms without fork (Windows) uvicorn's own multi-process mode is
+used instead, without rolling restarts.
+
+Usage:
+    python -m pymypersonalmap.server                  # WORKERS_COUNT workers
+    python -m pymypersonalmap.server --workers 8 --port 9000
+    kill -HUP <master pid>                            # rolling restart
+"""
+
+import argparse
+import logging
+import os
+import select
+import signal
+import socket
+import threading
+import time
+
+import uvicorn
+
+from pymypersonalmap.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_APP = "pymypersonalmap.main:app"
+
+# Seconds a new worker has to start accepting requests
+WORKER_BOOT_TIMEOUT = 30
+
+# Seconds a stopping worker has to finish in-flight requests
+GRACEFUL_TIMEOUT = 30
+
+# Seconds between checks of the master loop
+POLL_INTERVAL = 0.5
+
+
+def reload_warning(reload: bool, environment: str = settings.ENVIRONMENT) -> str | None:
+    """
+    Warning for auto-reload enabled in production
+
+    Returns:
+        Warning message, or None if the configuration is fine
+    """
+    if reload and environment.lower() == "production":
+        return (
+            "Auto-reload is enabled with ENVIRONMENT=production: it watches the source "
+            "tree and runs a single process. Use it for development only."
+        )
+    return None
+
+
+def prepare_database() -> None:
+    """Create tables, indexes and system labels once, before forking workers"""
+    from pymypersonalmap.database.session import SessionLocal, ensure_indexes, init_db
+    from pymypersonalmap.services import label_service
+
+    init_db()
+    ensure_indexes()
+    db = SessionLocal()
+    try:
+        label_service.initialize_system_labels(db)
+    finally:
+        db.close()
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Bind the listening socket shared by all workers"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Worker:
+    """A forked worker process and the pipe it reports readiness on"""
+
+    def __init__(self, pid: int, ready_fd: int):
+        self.pid = pid
+        self.ready_fd = ready_fd
+        self.ready = False
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Wait until the worker accepts requests"""
+        if not self.ready:
+            readable, _, _ = select.select([self.ready_fd], [], [], timeout)
+            self.ready = bool(readable) and os.read(self.ready_fd, 1) == b"1"
+        return self.ready
+
+    def close(self) -> None:
+        os.close(self.ready_fd)
+
+
+class Arbiter:
+    """
+    Master process of the pre-fork server
+
+    Args:
+        app: ASGI application or "module:attribute" import string
+        host: Interface to listen on
+        port: Port to listen on
+        workers: Number of worker processes
+        log_level: Uvicorn log level
+
+    Example:
+        Arbiter("pymypersonalmap.main:app", "0.0.0.0", 8000, workers=4).run()
+    """
+
+    def __init__(
+        self,
+        app,
+        host: str = settings.SERVER_HOST,
+        port: int = settings.SERVER_PORT,
+        workers: int = settings.WORKERS_COUNT,
+        log_level: str = settings.LOG_LEVEL
+    ):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.worker_count = max(1, workers)
+        self.log_level = log_level.lower()
+        self.workers: dict[int, Worker] = {}
+        self.socket: socket.socket | None = None
+        self._stopping = False
+        self._restart_requested = False
+
+    def run(self) -> None:
+        """Serve until SIGTERM or SIGINT"""
+        self.socket = bind_socket(self.host, self.port)
+        logger.info(
+            f"Master {os.getpid()} listening on {self.host}:{self.port} "
+            f"with {self.worker_count} workers"
+        )
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_restart)
+        try:
+            for _ in range(self.worker_count):
+                self.spawn()
+            while not self._stopping:
+                self.reap()
+                if self._restart_requested:
+                    self._restart_requested = False
+                    self.rolling_restart()
+                elif not self._stopping:
+                    while len(self.workers) < self.worker_count:
+                        self.spawn()
+                time.sleep(POLL_INTERVAL)
+        finally:
+            self.stop_all()
+            self.socket.close()
+
+    def _on_stop(self, signum, frame) -> None:
+        self._stopping = True
+
+    def _on_restart(self, signum, frame) -> None:
+        self._restart_requested = True
+
+    def spawn(self) -> Worker:
+        """Fork a worker serving on the shared socket"""
+        ready_read, ready_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            code = 0
+            try:
+                self._serve(ready_write)
+            except BaseException:
+                logger.exception("Worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(ready_write)
+        worker = Worker(pid, ready_read)
+        self.workers[pid] = worker
+        return worker
+
+    def _serve(self, ready_fd: int) -> None:
+        """Worker process body"""
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_DFL)
+        config = uvicorn.Config(
+            self.app,
+            log_level=self.log_level,
+            timeout_graceful_shutdown=GRACEFUL_TIMEOUT
+        )
+        server = uvicorn.Server(config)
+
+        def report_ready() -> None:
+            while not server.started and not server.should_exit:
+                time.sleep(0.05)
+            os.write(ready_fd, b"1" if server.started else b"0")
+            os.close(ready_fd)
+
+        threading.Thread(target=report_ready, daemon=True).start()
+        server.run(sockets=[self.socket])
+
+    def reap(self) -> None:
+        """Collect exited workers (they are replaced by the master loop)"""
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.workers.pop(pid, None)
+            if worker is not None:
+                worker.close()
+                if not self._stopping:
+                    logger.warning(f"Worker {pid} exited with status {status}")
+
+    def stop(self, worker: Worker, timeout: float = GRACEFUL_TIMEOUT) -> None:
+        """Stop a worker gracefully, killing it after ``timeout`` seconds"""
+        try:
+            os.kill(worker.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        deadline = time.monotonic() + timeout
+        try:
+            while time.monotonic() < deadline:
+                pid, _ = os.waitpid(worker.pid, os.WNOHANG)
+                if pid:
+                    break
+                time.sleep(0.05)
+            else:
+                os.kill(worker.pid, signal.SIGKILL)
+                os.waitpid(worker.pid, 0)
+        except ChildProcessError:
+            # Already collected
+            pass
+        self.workers.pop(worker.pid, None)
+        worker.close()
+
+    def rolling_restart(self) -> None:
+        """Replace workers one at a time without refusing connections"""
+        logger.info("Rolling restart of the workers")
+        for old in list(self.workers.values()):
+            new = self.spawn()
+            if not new.wait_ready(WORKER_BOOT_TIMEOUT):
+                logger.error(f"Worker {new.pid} failed to start: keeping worker {old.pid}")
+                self.stop(new, timeout=0)
+                return
+            self.stop(old)
+
+    def stop_all(self) -> None:
+        """Stop every worker gracefully"""
+        workers = list(self.workers.values())
+        for worker in workers:
+            try:
+                os.kill(worker.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for worker in workers:
+            self.stop(worker)
+
+
+def run(
+    app=DEFAULT_APP,
+    host: str = settings.SERVER_HOST,
+    port: int = settings.SERVER_PORT,
+    workers: int = settings.WORKERS_COUNT,
+    reload: bool = False,
+    log_level: str = settings.LOG_LEVEL
+) -> None:
+    """
+    Run the backend in production or, with ``reload``, development mode
+
+    Args:
+        app: ASGI application or "module:attribute" import string
+        host: Interface to listen on (default SERVER_HOST)
+        port: Port to listen on (default SERVER_PORT)
+        workers: Worker processes (default WORKERS_COUNT)
+        reload: Restart on source changes (single process, development only)
+        log_level: Uvicorn log level (default LOG_LEVEL)
+    """
+    warning = reload_warning(reload)
+    if warning:
+        logger.warning(warning)
+        print(f"⚠ Warning: {warning}")
+
+    if reload:
+        uvicorn.run(app, host=host, port=port, reload=True, log_level=log_level.lower())
+        return
+
+    prepare_database()
+    if workers > 1:
+        # Workers map one copy of the marker arrays instead of building their own
+        # (the environment variable reaches workers started by spawn)
+        settings.SHARED_MARKER_INDEX = True
+        os.environ["SHARED_MARKER_INDEX"] = "true"
+    if not hasattr(os, "fork"):
+        uvicorn.run(app, host=host, port=port, workers=workers, log_level=log_level.lower())
+        return
+    Arbiter(app, host, port, workers, log_level).run()
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Run the My Personal Map backend")
+    parser.add_argument("--app", default=DEFAULT_APP, help="ASGI app import string")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.WORKERS_COUNT)
+    parser.add_argument(
+        "--reload", action="store_true", help="Restart on code changes (development)"
+    )
+    parser.add_argument("--log-level", default=settings.LOG_LEVEL)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper())
+    run(args.app, args.host, args.port, args.workers, args.reload, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
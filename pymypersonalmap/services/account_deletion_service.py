@@ -0,0 +1,307 @@
+"""
+AccountDeletionService - Deleting a user and everything they own
+
+Deleting a user through the ORM cascade would load every marker into the
+session and delete them one statement at a time. Here the markers (with
+their label associations and attachment records) and the change feed go
+with set-based DELETEs of USER_DELETION_BATCH_SIZE rows, each batch in its
+own short transaction: memory stays flat whatever the account size, and
+other writers get the SQLite write lock between batches.
+
+Large accounts are deleted by a background job
+(``get_deletion_jobs().start``) whose progress can be polled. The user is
+deactivated before the job starts, so its tokens stop working at once; an
+interrupted deletion can simply be started again. Jobs live in the process
+that started them.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from pymypersonalmap.config import settings
+from pymypersonalmap.repository import (
+    change_repository, labels_repository, marker_repository, user_repository
+)
+from pymypersonalmap.services import attachment_service, auth_service
+from pymypersonalmap.services.blob_store import BlobStore
+from pymypersonalmap.services.marker_index import get_marker_index
+from pymypersonalmap.services.snapshot_service import SnapshotStore
+from pymypersonalmap.services.user_service import UserNotFoundError
+
+logger = logging.getLogger(__name__)
+
+# Pause between batches, so writers waiting on the busy timeout get the lock
+BATCH_PAUSE = 0.01
+
+# Finished jobs kept for status queries
+MAX_FINISHED_JOBS = 100
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Called with the step ("markers", "changes" or "labels") and the rows just deleted
+ProgressCallback = Callable[[str, int], None]
+
+
+class DeletionJobNotFoundError(Exception):
+    """Raised when no deletion job has the requested ID"""
+    pass
+
+
+class DeletionInterruptedError(Exception):
+    """Raised when a deletion is stopped between two batches (server shutdown)"""
+    pass
+
+
+def delete_account(
+    db: Session,
+    user_id: int,
+    batch_size: int | None = None,
+    progress: ProgressCallback | None = None,
+    stop: threading.Event | None = None,
+    pause: float = 0.0,
+    blob_store: BlobStore | None = None,
+    snapshot_store: SnapshotStore | None = None
+) -> None:
+    """
+    Delete a user, their markers, attachments, custom labels and change feed
+
+    Commits after every batch. Deleting again a partly deleted account
+    finishes the job.
+
+    Args:
+        db: Database session
+        user_id: User ID to delete
+        batch_size: Rows per DELETE (default USER_DELETION_BATCH_SIZE)
+        progress: Called after every committed batch
+        stop: Checked between batches; once set the deletion stops
+        pause: Seconds to wait between batches
+        blob_store: Attachment blobs left unreferenced are deleted from it
+        snapshot_store: The user's marker snapshot files are deleted from it
+
+    Raises:
+        UserNotFoundError: If user not found
+        DeletionInterruptedError: If ``stop`` was set before the end
+    """
+    if user_repository.get_user_by_id(db, user_id) is None:
+        raise UserNotFoundError(f"User with ID {user_id} not found")
+    batch_size = batch_size or settings.USER_DELETION_BATCH_SIZE
+
+    steps = (
+        ("markers", marker_repository.delete_user_markers_batch),
+        ("changes", change_repository.delete_user_changes_batch),
+    )
+    for step, delete_batch in steps:
+        while True:
+            deleted = delete_batch(db, user_id, batch_size)
+            db.commit()
+            if progress is not None and deleted:
+                progress(step, deleted)
+            if deleted < batch_size:
+                break
+            if stop is not None and stop.is_set():
+                raise DeletionInterruptedError(f"Deletion of user {user_id} interrupted")
+            if pause:
+                time.sleep(pause)
+
+    labels = labels_repository.delete_user_labels(db, user_id)
+    # Only the user row is left to delete
+    user_repository.delete_user(db, user_id)
+    db.commit()
+    if progress is not None and labels:
+        progress("labels", labels)
+
+    auth_service.invalidate_user(user_id)
+    get_marker_index().discard(user_id)
+    if snapshot_store is not None:
+        snapshot_store.discard(user_id)
+    if blob_store is not None:
+        attachment_service.collect_garbage(db, blob_store)
+
+
+@dataclass
+class DeletionJob:
+    """Progress of a background account deletion"""
+
+    id: str
+    user_id: int
+    total_markers: int
+    state: str = PENDING
+    deleted: dict[str, int] = field(
+        default_factory=lambda: {"markers": 0, "changes": 0, "labels": 0}
+    )
+    error: str | None = None
+    started_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    _done: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def advance(self, step: str, rows: int) -> None:
+        self.deleted[step] += rows
+
+    def finish(self, error: str | None = None) -> None:
+        self.state = FAILED if error else DONE
+        self.error = error
+        self.finished_at = time.time()
+        self._done.set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Wait for the job to finish; False on timeout"""
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> dict:
+        deleted = dict(self.deleted)
+        if self.state == DONE or not self.total_markers:
+            fraction = 1.0 if self.state == DONE else 0.0
+        else:
+            fraction = min(deleted["markers"] / self.total_markers, 1.0)
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "state": self.state,
+            "total_markers": self.total_markers,
+            "deleted": deleted,
+            "progress": round(fraction, 4),
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class DeletionJobs:
+    """
+    Background account deletions, run one at a time by a single thread
+
+    SQLite has a single writer, so running deletions side by side would
+    only make them wait on each other.
+
+    Example:
+        job = get_deletion_jobs().start(user_id, SessionLocal)
+        job.to_dict()["progress"]
+    """
+
+    def __init__(self, batch_size: int | None = None, pause: float = BATCH_PAUSE):
+        self.batch_size = batch_size
+        self.pause = pause
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="account-deletion")
+        self._lock = threading.Lock()
+        self._jobs: OrderedDict[str, DeletionJob] = OrderedDict()
+        self._stop = threading.Event()
+
+    def start(
+        self,
+        user_id: int,
+        session_factory: sessionmaker,
+        blob_store: BlobStore | None = None,
+        snapshot_store: SnapshotStore | None = None
+    ) -> DeletionJob:
+        """
+        Deactivate a user and queue the deletion of their account
+
+        Returns the queued or running job if the user already has one.
+
+        Raises:
+            UserNotFoundError: If user not found
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.user_id == user_id and not job.finished:
+                    return job
+
+            with session_factory() as db:
+                if not user_repository.update_user(db, user_id, is_active=False):
+                    raise UserNotFoundError(f"User with ID {user_id} not found")
+                total = marker_repository.count_markers(db, user_id=user_id)
+                db.commit()
+            auth_service.invalidate_user(user_id)
+
+            job = DeletionJob(uuid.uuid4().hex, user_id, total)
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, session_factory, blob_store, snapshot_store)
+        return job
+
+    def get(self, job_id: str) -> DeletionJob:
+        """
+        Raises:
+            DeletionJobNotFoundError: If no job has this ID (or it was pruned)
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise DeletionJobNotFoundError(f"Deletion job {job_id} not found")
+        return job
+
+    def jobs(self) -> list[DeletionJob]:
+        """Jobs in the order they were started"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _run(
+        self,
+        job: DeletionJob,
+        session_factory: sessionmaker,
+        blob_store: BlobStore | None,
+        snapshot_store: SnapshotStore | None
+    ) -> None:
+        job.state = RUNNING
+        try:
+            with session_factory() as db:
+                delete_account(
+                    db, job.user_id, self.batch_size, job.advance, self._stop, self.pause,
+                    blob_store, snapshot_store
+                )
+        except Exception as e:
+            logger.exception(f"Deletion of user {job.user_id} failed")
+            job.finish(str(e) or type(e).__name__)
+        else:
+            job.finish()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self._jobs[job_id]
+
+    def shutdown(self) -> None:
+        """Stop the running deletion after its current batch and drop the queued ones"""
+        self._stop.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for job in self.jobs():
+            if not job.finished:
+                job.finish("Interrupted by shutdown; start the deletion again to finish it")
+
+
+_jobs: DeletionJobs | None = None
+_jobs_lock = threading.Lock()
+
+
+def get_deletion_jobs() -> DeletionJobs:
+    """Get the process-wide account deletion queue"""
+    global _jobs
+    if _jobs is None:
+        with _jobs_lock:
+            if _jobs is None:
+                _jobs = DeletionJobs()
+    return _jobs
+
+
+def shutdown_deletion_jobs() -> None:
+    """Stop the account deletion thread"""
+    global _jobs
+    if _jobs is not None:
+        _jobs.shutdown()
+        _jobs = None
@@ -0,0 +1,176 @@
+"""
+AttachmentService - Business logic for marker attachments
+
+Attachment records live in the database; their content is stored once
+per distinct SHA-256 in the BlobStore.
+"""
+
+import math
+import time
+from pathlib import Path
+from typing import BinaryIO
+
+from sqlalchemy.orm import Session
+from pymypersonalmap.config.settings import ATTACHMENTS_DIR, MAX_UPLOAD_SIZE_MB
+from pymypersonalmap.models.attachment import Attachment
+from pymypersonalmap.repository import attachment_repository, marker_repository
+from pymypersonalmap.services.blob_store import BlobStore
+from pymypersonalmap.services.marker_service import MarkerNotFoundError
+
+
+class AttachmentNotFoundError(Exception):
+    """Raised when an attachment is not found"""
+    pass
+
+
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+
+_blob_store: BlobStore | None = None
+
+
+def get_blob_store() -> BlobStore:
+    """
+    Get the application blob store (ATTACHMENTS_DIR or the user data directory)
+
+    Usage in FastAPI:
+        @app.get("/files")
+        def get_files(store: BlobStore = Depends(get_blob_store)):
+            ...
+    """
+    global _blob_store
+    if _blob_store is None:
+        if ATTACHMENTS_DIR:
+            root = Path(ATTACHMENTS_DIR)
+        else:
+            from pymypersonalmap.gui.config_manager import ConfigManager
+            root = ConfigManager().get_attachments_dir()
+        _blob_store = BlobStore(root)
+    return _blob_store
+
+
+def add_attachment(
+    db: Session,
+    store: BlobStore,
+    marker_id: int,
+    user_id: int,
+    stream: BinaryIO,
+    filename: str,
+    content_type: str | None = None
+) -> Attachment:
+    """
+    Attach a file to a marker
+
+    The content is streamed into the blob store; identical content already
+    stored is reused.
+
+    Args:
+        db: Database session
+        store: Blob store
+        marker_id: Marker ID
+        user_id: ID of the user attaching the file
+        stream: Binary file object with the content
+        filename: Original file name
+        content_type: MIME type
+
+    Returns:
+        Created Attachment
+
+    Raises:
+        MarkerNotFoundError: If the marker does not exist or is not owned by the user
+        BlobTooLargeError: If the file is larger than MAX_UPLOAD_SIZE_MB
+    """
+    marker = marker_repository.get_marker_by_id(db, marker_id)
+    if not marker or marker.user_id != user_id:
+        raise MarkerNotFoundError(f"Marker with ID {marker_id} not found")
+
+    sha256, size, created = store.put(stream, max_bytes=MAX_UPLOAD_SIZE_MB * 1024 * 1024)
+    # Just after this put's mtime: a concurrent upload of the same content refreshes it
+    stored_at = math.nextafter(store.path(sha256).stat().st_mtime, math.inf)
+    try:
+        return attachment_repository.create_attachment(
+            db,
+            marker_id=marker_id,
+            user_id=user_id,
+            sha256=sha256,
+            filename=(filename or "attachment")[:255],
+            content_type=(content_type or DEFAULT_CONTENT_TYPE)[:100],
+            size=size
+        )
+    except Exception:
+        db.rollback()
+        if created:
+            store.delete(sha256, older_than=stored_at)
+        raise
+
+
+def get_attachment(db: Session, attachment_id: int, user_id: int) -> Attachment:
+    """
+    Get an attachment owned by a user
+
+    Raises:
+        AttachmentNotFoundError: If not found or owned by another user
+    """
+    attachment = attachment_repository.get_attachment_by_id(db, attachment_id)
+    if not attachment or attachment.user_id != user_id:
+        raise AttachmentNotFoundError(f"Attachment with ID {attachment_id} not found")
+    return attachment
+
+
+def list_attachments(db: Session, marker_id: int, user_id: int) -> list[Attachment]:
+    """
+    Get the attachments of a marker owned by a user
+
+    Raises:
+        MarkerNotFoundError: If the marker does not exist or is not owned by the user
+    """
+    marker = marker_repository.get_marker_by_id(db, marker_id)
+    if not marker or marker.user_id != user_id:
+        raise MarkerNotFoundError(f"Marker with ID {marker_id} not found")
+    return attachment_repository.get_marker_attachments(db, marker_id)
+
+
+def delete_attachment(
+    db: Session, store: BlobStore, attachment_id: int, user_id: int
+) -> str | None:
+    """
+    Delete an attachment, and its blob if nothing else references it
+
+    Returns:
+        Key of the deleted blob, or None if other attachments still use it
+
+    Raises:
+        AttachmentNotFoundError: If not found or owned by another user
+    """
+    sha256 = attachment_repository.delete_owned_attachment(db, attachment_id, user_id)
+    if sha256 is None:
+        raise AttachmentNotFoundError(f"Attachment with ID {attachment_id} not found")
+    # Content stored again after this instant (a concurrent identical upload) is kept
+    checked_at = time.time()
+    if attachment_repository.count_blob_references(db, sha256) == 0:
+        if store.delete(sha256, older_than=checked_at):
+            return sha256
+    return None
+
+
+def collect_garbage(db: Session, store: BlobStore) -> int:
+    """
+    Delete blobs no attachment refers to (e.g. after markers were deleted)
+
+    Blobs stored after the collection started are kept, so uploads in
+    progress are safe. The references are read once the store has been
+    listed, which leaves one window: a blob stored before the collection
+    started whose attachment commits after that read is deleted. Uploads
+    commit right after storing their blob, so run the collection when
+    uploads are rare (shutdown, after an account deletion).
+
+    Returns:
+        Number of deleted blobs
+    """
+    started_at = time.time()
+    keys = list(store.iter_keys())
+    referenced = attachment_repository.get_referenced_blobs(db)
+    deleted = 0
+    for sha256 in keys:
+        if sha256 not in referenced and store.delete(sha256, older_than=started_at):
+            deleted += 1
+    return deleted
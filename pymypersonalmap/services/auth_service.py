@@ -0,0 +1,291 @@
+"""
+AuthService - JWT access and refresh tokens
+
+Login (``user_service.authenticate_user_async``) issues a short-lived access
+token and a long-lived refresh token, signed with SECRET_KEY
+(ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS).
+
+Authenticating a request must not cost a query, so two in-process caches
+sit in front of the database:
+
+- decoded access tokens, until they expire (no signature check per request)
+- a compact snapshot of each user (id, is_active, is_admin), kept for
+  AUTH_USER_CACHE_TTL seconds; issuing tokens fills it
+
+Deactivating or deleting a user drops its snapshot at once in this
+process; other server processes notice within AUTH_USER_CACHE_TTL.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import jwt
+from sqlalchemy.orm import Session
+
+from pymypersonalmap.config import settings
+from pymypersonalmap.models.user import User
+from pymypersonalmap.repository import user_repository
+from pymypersonalmap.services import user_service
+from pymypersonalmap.utils import memory
+from pymypersonalmap.utils.metrics import record_cache
+
+ACCESS_TOKEN = "access"
+REFRESH_TOKEN = "refresh"
+
+# Decoded access tokens kept (least recently used dropped first)
+MAX_CACHED_TOKENS = 10_000
+
+
+class AuthNotConfiguredError(Exception):
+    """Raised when tokens are needed but SECRET_KEY is not set"""
+    pass
+
+
+class InvalidTokenError(Exception):
+    """Raised when a token is malformed, expired, of the wrong type or for an inactive user"""
+    pass
+
+
+@dataclass(frozen=True)
+class ActiveUser:
+    """What authorization needs to know about the authenticated user"""
+
+    id: int
+    is_active: bool
+    is_admin: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "ActiveUser":
+        return cls(user.idUser, user.is_active, user.is_admin)
+
+
+@dataclass
+class TokenPair:
+    """Tokens returned by login and refresh"""
+
+    access_token: str
+    refresh_token: str
+    expires_in: int
+    token_type: str = "bearer"
+
+    def to_dict(self) -> dict:
+        return {
+            "access_token": self.access_token,
+            "refresh_token": self.refresh_token,
+            "token_type": self.token_type,
+            "expires_in": self.expires_in,
+        }
+
+
+class AuthCache:
+    """
+    Decoded access tokens and user snapshots
+
+    Args:
+        user_ttl: Seconds a user snapshot is trusted
+        max_tokens: Decoded tokens kept
+    """
+
+    def __init__(self, user_ttl: float, max_tokens: int = MAX_CACHED_TOKENS):
+        self.user_ttl = user_ttl
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        # Token -> (user ID, expiry as a Unix timestamp)
+        self._tokens: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        # User ID -> (snapshot, monotonic time it stops being trusted)
+        self._users: dict[int, tuple[ActiveUser, float]] = {}
+
+    def token_user_id(self, token: str) -> int | None:
+        """User ID of a cached, unexpired access token"""
+        with self._lock:
+            entry = self._tokens.get(token)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._tokens[token]
+                return None
+            self._tokens.move_to_end(token)
+            return entry[0]
+
+    def add_token(self, token: str, user_id: int, expires_at: float) -> None:
+        with self._lock:
+            self._tokens[token] = (user_id, expires_at)
+            self._tokens.move_to_end(token)
+            while len(self._tokens) > self.max_tokens:
+                self._tokens.popitem(last=False)
+
+    def user(self, user_id: int) -> ActiveUser | None:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            return entry[0]
+
+    def add_user(self, user: ActiveUser) -> None:
+        with self._lock:
+            self._users[user.id] = (user, time.monotonic() + self.user_ttl)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._tokens) + len(self._users),
+                "tokens": len(self._tokens),
+                "users": len(self._users),
+            }
+
+
+_cache = AuthCache(settings.AUTH_USER_CACHE_TTL)
+memory.register_cache("auth", _cache.stats)
+
+
+def _secret_key() -> str:
+    if not settings.SECRET_KEY:
+        raise AuthNotConfiguredError("SECRET_KEY is not set")
+    return settings.SECRET_KEY
+
+
+def _encode(user_id: int, token_type: str, lifetime: timedelta) -> tuple[str, datetime]:
+    now = datetime.now(timezone.utc)
+    expires_at = now + lifetime
+    claims = {
+        "sub": str(user_id),
+        "type": token_type,
+        "iat": now,
+        "exp": expires_at,
+        # Two tokens issued in the same second must differ
+        "jti": secrets.token_hex(8),
+    }
+    return jwt.encode(claims, _secret_key(), algorithm=settings.ALGORITHM), expires_at
+
+
+def _decode(token: str, token_type: str) -> tuple[int, float]:
+    """
+    Verify a token and return its user ID and expiry
+
+    Raises:
+        InvalidTokenError: If the token is invalid, expired or of another type
+    """
+    try:
+        claims = jwt.decode(
+            token, _secret_key(), algorithms=[settings.ALGORITHM],
+            options={"require": ["sub", "type", "exp"]}
+        )
+    except jwt.InvalidTokenError as e:
+        raise InvalidTokenError(str(e)) from None
+    if claims["type"] != token_type:
+        raise InvalidTokenError(f"Not an {token_type} token")
+    try:
+        return int(claims["sub"]), float(claims["exp"])
+    except (TypeError, ValueError):
+        raise InvalidTokenError("Invalid subject") from None
+
+
+def issue_tokens(user: User) -> TokenPair:
+    """
+    Issue an access and a refresh token for a user
+
+    The user snapshot is cached, so the requests made with the new access
+    token do not load the user again.
+
+    Raises:
+        AuthNotConfiguredError: If SECRET_KEY is not set
+    """
+    lifetime = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token, expires_at = _encode(user.idUser, ACCESS_TOKEN, lifetime)
+    refresh_token, _ = _encode(
+        user.idUser, REFRESH_TOKEN, timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    _cache.add_user(ActiveUser.from_user(user))
+    # The token carries whole seconds
+    _cache.add_token(access_token, user.idUser, int(expires_at.timestamp()))
+    return TokenPair(access_token, refresh_token, int(lifetime.total_seconds()))
+
+
+async def login(db: Session, email: str, password: str) -> TokenPair:
+    """
+    Check a user's credentials and issue tokens
+
+    The password check is awaited (``user_service.authenticate_user_async``).
+
+    Raises:
+        InvalidCredentialsError: If the credentials are invalid
+        PasswordHasherBusyError: If the password hashing queue is full
+        AuthNotConfiguredError: If SECRET_KEY is not set
+    """
+    return issue_tokens(await user_service.authenticate_user_async(db, email, password))
+
+
+def refresh(db: Session, refresh_token: str) -> TokenPair:
+    """
+    Issue new tokens in exchange for a valid refresh token
+
+    The user is reloaded, so a deactivated account cannot refresh.
+
+    Raises:
+        InvalidTokenError: If the token is invalid or the user inactive or deleted
+        AuthNotConfiguredError: If SECRET_KEY is not set
+    """
+    user_id, _ = _decode(refresh_token, REFRESH_TOKEN)
+    user = user_repository.get_user_by_id(db, user_id)
+    if user is None or not user.is_active:
+        raise InvalidTokenError("User not found or inactive")
+    return issue_tokens(user)
+
+
+def authenticate(db: Session, access_token: str) -> ActiveUser:
+    """
+    Resolve the user of an access token
+
+    Costs no query while the token and the user snapshot are cached.
+
+    Args:
+        db: Database session (used on cache misses only)
+        access_token: Bearer token of the request
+
+    Returns:
+        ActiveUser snapshot
+
+    Raises:
+        InvalidTokenError: If the token is invalid or the user inactive or deleted
+        AuthNotConfiguredError: If SECRET_KEY is not set
+    """
+    user_id = _cache.token_user_id(access_token)
+    record_cache("auth_token", user_id is not None)
+    if user_id is None:
+        user_id, expires_at = _decode(access_token, ACCESS_TOKEN)
+        _cache.add_token(access_token, user_id, expires_at)
+
+    active_user = _cache.user(user_id)
+    record_cache("auth_user", active_user is not None)
+    if active_user is None:
+        user = user_repository.get_user_by_id(db, user_id)
+        # Deleted users are cached as inactive, so their tokens cost no query either
+        active_user = ActiveUser.from_user(user) if user else ActiveUser(user_id, False, False)
+        _cache.add_user(active_user)
+
+    if not active_user.is_active:
+        raise InvalidTokenError("User not found or inactive")
+    return active_user
+
+
+def invalidate_user(user_id: int) -> None:
+    """Forget a user's cached snapshot (after deactivation, deletion or a role change)"""
+    _cache.invalidate_user(user_id)
+
+
+def clear_cache() -> None:
+    """Forget every cached token and user"""
+    _cache.clear()
@@ -0,0 +1,189 @@
+"""
+BlobStore - Content-addressed file storage
+
+Files are stored once under their SHA-256: ``<root>/ab/cd/abcd...``.
+Writes stream to a temporary file in chunks while hashing and are then
+renamed into place, so identical content costs no extra disk and a
+partially written file is never visible.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+
+class BlobTooLargeError(Exception):
+    """Raised when a blob exceeds the allowed size"""
+    pass
+
+
+# Bytes read/written per round
+BLOB_CHUNK_SIZE = 1024 * 1024
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+# Striped locks serializing put/delete of the same key
+_LOCK_STRIPES = 64
+
+
+class BlobStore:
+    """
+    Content-addressed blob store on the local filesystem
+
+    Example:
+        store = BlobStore(Path("/data/attachments"))
+        sha256, size, created = store.put(upload)
+        with store.open(sha256) as f:
+            ...
+    """
+
+    def __init__(self, root: Path | str):
+        self.root = Path(root)
+        self.tmp_dir = self.root / "tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self._locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+    def _lock(self, sha256: str) -> threading.Lock:
+        return self._locks[int(sha256[:4], 16) % _LOCK_STRIPES]
+
+    def path(self, sha256: str) -> Path:
+        """
+        Path of a blob
+
+        Raises:
+            ValueError: If the key is not a lowercase hex SHA-256
+        """
+        if not _SHA256.match(sha256):
+            raise ValueError(f"Invalid blob key: {sha256!r}")
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def exists(self, sha256: str) -> bool:
+        """Check if a blob is stored"""
+        return self.path(sha256).is_file()
+
+    def size(self, sha256: str) -> int:
+        """Size of a stored blob in bytes"""
+        return self.path(sha256).stat().st_size
+
+    def put(self, stream: BinaryIO, max_bytes: int | None = None) -> tuple[str, int, bool]:
+        """
+        Store the content of a binary stream
+
+        The stream is copied in BLOB_CHUNK_SIZE chunks, hashing as it goes;
+        at most one chunk is held in memory.
+
+        Args:
+            stream: Binary file object, read to the end
+            max_bytes: Maximum allowed size
+
+        Returns:
+            (sha256, size, created) where created is False if identical
+            content was already stored
+
+        Raises:
+            BlobTooLargeError: If the content is larger than max_bytes
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while chunk := stream.read(BLOB_CHUNK_SIZE):
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise BlobTooLargeError(f"File larger than {max_bytes} bytes")
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+
+            sha256 = digest.hexdigest()
+            target = self.path(sha256)
+            with self._lock(sha256):
+                try:
+                    # Refresh the mtime so a concurrent delete(older_than=...) keeps it
+                    os.utime(target)
+                    os.unlink(tmp_name)
+                    return sha256, size, False
+                except FileNotFoundError:
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    os.replace(tmp_name, target)
+                    return sha256, size, True
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+
+    def open(self, sha256: str) -> BinaryIO:
+        """
+        Open a blob for reading
+
+        Raises:
+            FileNotFoundError: If the blob is not stored
+        """
+        return open(self.path(sha256), "rb")
+
+    def iter_range(
+        self,
+        sha256: str,
+        start: int = 0,
+        end: int | None = None,
+        chunk_size: int = BLOB_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        """
+        Read bytes ``start``..``end`` (inclusive) of a blob in chunks
+
+        Args:
+            sha256: Blob key
+            start: First byte offset
+            end: Last byte offset (default: end of the blob)
+            chunk_size: Bytes per yielded chunk
+        """
+        with self.open(sha256) as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def delete(self, sha256: str, older_than: float | None = None) -> bool:
+        """
+        Delete a blob
+
+        Args:
+            sha256: Blob key
+            older_than: Only delete if the blob was last stored before this
+                timestamp. Callers that found the blob unreferenced pass the
+                time they started looking, so content re-uploaded meanwhile
+                (put refreshes the mtime) is kept.
+
+        Returns:
+            True if the blob was deleted
+        """
+        path = self.path(sha256)
+        with self._lock(sha256):
+            try:
+                if older_than is not None and path.stat().st_mtime >= older_than:
+                    return False
+                path.unlink()
+                return True
+            except FileNotFoundError:
+                return False
+
+    def iter_keys(self) -> Iterator[str]:
+        """Yield the keys of all stored blobs"""
+        for first in self.root.iterdir():
+            if first == self.tmp_dir or not first.is_dir():
+                continue
+            for second in first.iterdir():
+                for blob in second.iterdir():
+                    if _SHA256.match(blob.name):
+                        yield blob.name
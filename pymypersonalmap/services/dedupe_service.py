@@ -0,0 +1,320 @@
+"""
+DedupeService - Spatial duplicate detection for markers
+
+Markers are bucketed in a grid whose cells are as wide as the duplicate
+distance, so each marker is only compared with the markers in the
+neighbouring cells instead of with every other marker (UC-05).
+Two markers are duplicates when they are within ``distance_m`` of each
+other and their normalized titles are at least ``min_similarity`` alike.
+"""
+
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Iterable, Iterator, Sequence
+
+from sqlalchemy.orm import Session
+from pymypersonalmap.repository import marker_repository
+from pymypersonalmap.services.geo_utils import haversine_distance
+
+
+# Default maximum distance between duplicates
+DEFAULT_DISTANCE_M = 50.0
+
+# Default minimum title similarity (difflib ratio, 0..1)
+DEFAULT_MIN_SIMILARITY = 0.8
+
+METERS_PER_DEGREE_LAT = 111_320.0
+
+# Smallest cosine used for longitude cell widths (keeps cells finite near the poles)
+MIN_COS_LAT = 0.01
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_title(title: str) -> str:
+    """
+    Normalize a title for comparison
+
+    Lowercases, strips accents and punctuation and collapses whitespace.
+
+    Example:
+        >>> normalize_title("  Caffè  Florian! ")
+        'caffe florian'
+    """
+    decomposed = unicodedata.normalize("NFKD", title or "")
+    ascii_title = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_WORD.sub(" ", ascii_title.lower()).strip()
+
+
+def title_similarity(a: str, b: str, min_similarity: float = 0.0) -> float:
+    """
+    Similarity of two normalized titles (0..1)
+
+    Returns 0.0 early when the cheap upper bounds are below ``min_similarity``.
+    """
+    if a == b:
+        return 1.0
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    if matcher.real_quick_ratio() < min_similarity or matcher.quick_ratio() < min_similarity:
+        return 0.0
+    return matcher.ratio()
+
+
+class SpatialGrid:
+    """
+    Points bucketed in cells about ``cell_m`` wide
+
+    Rows have a fixed height in degrees of latitude; each row is split in
+    a whole number of columns about ``cell_m`` wide at its latitude, so
+    cells are roughly square on the ground everywhere and rows wrap around
+    at the antimeridian.
+    """
+
+    def __init__(self, cell_m: float):
+        self.cell_lat = cell_m / METERS_PER_DEGREE_LAT
+        self.cells: dict[tuple[int, int], list] = defaultdict(list)
+
+    def _columns(self, row: int) -> tuple[int, float]:
+        """Number of cells of a row and their width in degrees"""
+        center = math.radians((row + 0.5) * self.cell_lat)
+        width = self.cell_lat / max(math.cos(center), MIN_COS_LAT)
+        count = max(int(360.0 / width), 1)
+        return count, 360.0 / count
+
+    def key(self, latitude: float, longitude: float) -> tuple[int, int]:
+        """Cell of a point"""
+        row = math.floor(latitude / self.cell_lat)
+        count, width = self._columns(row)
+        return row, math.floor((longitude + 180.0) / width) % count
+
+    def add(self, latitude: float, longitude: float, item) -> None:
+        """Add a point carrying an arbitrary item"""
+        self.cells[self.key(latitude, longitude)].append((latitude, longitude, item))
+
+    def near(self, latitude: float, longitude: float) -> Iterator[tuple]:
+        """
+        Yield the (latitude, longitude, item) entries of the cells that can
+        hold points within ``cell_m`` of the given point
+        """
+        row = math.floor(latitude / self.cell_lat)
+        # Longitude span of the search circle, taken at its widest latitude
+        extreme = min(abs(latitude) + self.cell_lat, 90.0)
+        span = self.cell_lat / max(math.cos(math.radians(extreme)), MIN_COS_LAT)
+        for r in (row - 1, row, row + 1):
+            count, width = self._columns(r)
+            first = math.floor((longitude + 180.0 - span) / width)
+            last = math.floor((longitude + 180.0 + span) / width)
+            if last - first + 1 >= count:
+                columns = range(count)
+            else:
+                columns = {column % count for column in range(first, last + 1)}
+            for column in columns:
+                yield from self.cells.get((r, column), ())
+
+
+def _match(
+    latitude: float,
+    longitude: float,
+    normalized: str,
+    other_latitude: float,
+    other_longitude: float,
+    other_normalized: str,
+    distance_m: float,
+    min_similarity: float
+) -> tuple[float, float] | None:
+    """Return (distance, similarity) if two points are duplicates, else None"""
+    distance = haversine_distance(
+        latitude, longitude, other_latitude, other_longitude, unit='meters'
+    )
+    if distance > distance_m:
+        return None
+    similarity = title_similarity(normalized, other_normalized, min_similarity)
+    if similarity < min_similarity:
+        return None
+    return distance, similarity
+
+
+def find_duplicate_pairs(
+    markers: Iterable[tuple[int, str, float, float]],
+    distance_m: float = DEFAULT_DISTANCE_M,
+    min_similarity: float = DEFAULT_MIN_SIMILARITY
+) -> list[dict]:
+    """
+    Find pairs of duplicate markers
+
+    Args:
+        markers: (id, title, latitude, longitude) tuples
+        distance_m: Maximum distance between duplicates in meters
+        min_similarity: Minimum normalized title similarity
+
+    Returns:
+        List of {marker_id, duplicate_id, distance_m, similarity}, each
+        pair once with marker_id < duplicate_id
+    """
+    grid = SpatialGrid(distance_m)
+    pairs = []
+    for marker_id, title, latitude, longitude in markers:
+        normalized = normalize_title(title)
+        for other_lat, other_lon, (other_id, other_normalized) in grid.near(latitude, longitude):
+            match = _match(latitude, longitude, normalized, other_lat, other_lon,
+                           other_normalized, distance_m, min_similarity)
+            if match:
+                first, second = sorted((marker_id, other_id))
+                pairs.append({
+                    'marker_id': first,
+                    'duplicate_id': second,
+                    'distance_m': round(match[0], 1),
+                    'similarity': round(match[1], 3),
+                })
+        grid.add(latitude, longitude, (marker_id, normalized))
+
+    pairs.sort(key=lambda pair: (pair['marker_id'], pair['duplicate_id']))
+    return pairs
+
+
+def find_duplicates(
+    db: Session,
+    user_id: int,
+    distance_m: float = DEFAULT_DISTANCE_M,
+    min_similarity: float = DEFAULT_MIN_SIMILARITY
+) -> list[dict]:
+    """
+    Find merge candidates among a user's markers
+
+    Args:
+        db: Database session
+        user_id: User ID
+        distance_m: Maximum distance between duplicates in meters
+        min_similarity: Minimum normalized title similarity (0..1)
+
+    Returns:
+        List of {marker_id, duplicate_id, distance_m, similarity}
+
+    Raises:
+        ValueError: If a threshold is out of range
+    """
+    _check_thresholds(distance_m, min_similarity)
+    rows = marker_repository.get_marker_rows(
+        db, columns=("idMarker", "title", "latitude", "longitude"), user_id=user_id
+    )
+    return find_duplicate_pairs(rows, distance_m, min_similarity)
+
+
+def _check_thresholds(distance_m: float, min_similarity: float) -> None:
+    if not 0 < distance_m <= 10_000:
+        raise ValueError("distance_m must be between 0 and 10000")
+    if not 0 <= min_similarity <= 1:
+        raise ValueError("min_similarity must be between 0 and 1")
+
+
+# Incoming rows closer than this share one bounding box query
+QUERY_CELL_M = 2_000.0
+
+
+def _wrap_box(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> list[tuple]:
+    """Split a bounding box crossing the antimeridian in boxes within ±180°"""
+    if max_lon - min_lon >= 360.0:
+        return [(min_lat, -180.0, max_lat, 180.0)]
+    if min_lon < -180.0:
+        return [(min_lat, min_lon + 360.0, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lat, min_lon, max_lat, 180.0), (min_lat, -180.0, max_lat, max_lon - 360.0)]
+    return [(min_lat, min_lon, max_lat, max_lon)]
+
+
+class DuplicateDetector:
+    """
+    Check batches of incoming markers against a user's markers
+
+    The rows of a batch are grouped in cells of QUERY_CELL_M and only the
+    user's markers near each group (its bounding box plus ``distance_m``)
+    are loaded, so a batch spread over a continent does not load the
+    whole library. Rows earlier in the same batch are checked too; earlier
+    batches are found in the database, as they are committed before the
+    next batch is checked.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        user_id: int,
+        distance_m: float = DEFAULT_DISTANCE_M,
+        min_similarity: float = DEFAULT_MIN_SIMILARITY
+    ):
+        _check_thresholds(distance_m, min_similarity)
+        self.db = db
+        self.user_id = user_id
+        self.distance_m = distance_m
+        self.min_similarity = min_similarity
+
+    def query_boxes(self, rows: Sequence[dict]) -> list[tuple[float, float, float, float]]:
+        """Bounding boxes holding every existing marker that may duplicate a row"""
+        groups = SpatialGrid(max(QUERY_CELL_M, self.distance_m))
+        for row in rows:
+            groups.add(row['latitude'], row['longitude'], None)
+
+        margin = self.distance_m / METERS_PER_DEGREE_LAT
+        boxes = []
+        for points in groups.cells.values():
+            min_lat = max(min(point[0] for point in points) - margin, -90.0)
+            max_lat = min(max(point[0] for point in points) + margin, 90.0)
+            widest = math.radians(max(abs(min_lat), abs(max_lat)))
+            lon_margin = margin / max(math.cos(widest), MIN_COS_LAT)
+            boxes.extend(_wrap_box(
+                min_lat,
+                min(point[1] for point in points) - lon_margin,
+                max_lat,
+                max(point[1] for point in points) + lon_margin,
+            ))
+        return boxes
+
+    def check(self, rows: Sequence[dict]) -> list[dict | None]:
+        """
+        Find the closest duplicate of each row
+
+        Args:
+            rows: Dictionaries with title, latitude and longitude
+
+        Returns:
+            For each row, None or {duplicate_of, duplicate_title, distance_m,
+            similarity}; duplicate_of is None when the duplicate is an
+            earlier row of the same batch
+        """
+        if not rows:
+            return []
+
+        existing = marker_repository.get_marker_rows_in_boxes(
+            self.db,
+            self.query_boxes(rows),
+            columns=("idMarker", "title", "latitude", "longitude"),
+            user_id=self.user_id
+        )
+
+        grid = SpatialGrid(self.distance_m)
+        for marker_id, title, latitude, longitude in existing:
+            grid.add(latitude, longitude, (marker_id, title, normalize_title(title)))
+
+        results = []
+        for row in rows:
+            latitude, longitude = row['latitude'], row['longitude']
+            normalized = normalize_title(row['title'])
+            best = None
+            for other_lat, other_lon, (other_id, other_title, other_normalized) in grid.near(
+                latitude, longitude
+            ):
+                match = _match(latitude, longitude, normalized, other_lat, other_lon,
+                               other_normalized, self.distance_m, self.min_similarity)
+                if match and (best is None or match[0] < best['distance_m']):
+                    best = {
+                        'duplicate_of': other_id,
+                        'duplicate_title': other_title,
+                        'distance_m': round(match[0], 1),
+                        'similarity': round(match[1], 3),
+                    }
+            results.append(best)
+            grid.add(latitude, longitude, (None, row['title'], normalized))
+
+        return results
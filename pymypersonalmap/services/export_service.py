@@ -0,0 +1,268 @@
+"""
+ExportService - Streaming export of a user's markers
+
+Serializes markers to GeoJSON, NDJSON, CSV and GPX one batch at a time,
+so memory stays flat whatever the size of the library (UC-07).
+"""
+
+import csv
+import io
+import json
+from typing import Callable, Iterable, Iterator
+from xml.sax.saxutils import escape, quoteattr
+
+from sqlalchemy.orm import Session
+from pymypersonalmap.database.session import SessionLocal
+from pymypersonalmap.repository import marker_repository
+
+
+class UnsupportedExportFormatError(Exception):
+    """Raised when an export format is not supported"""
+    pass
+
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "geojson": ("application/geo+json", "geojson"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "gpx": ("application/gpx+xml", "gpx"),
+}
+
+CSV_COLUMNS = [
+    "id", "name", "latitude", "longitude", "description", "address",
+    "labels", "is_favorite", "created_at",
+]
+
+Batches = Iterable[list[dict]]
+
+
+def _properties(marker: dict) -> dict:
+    """GeoJSON/NDJSON properties of a marker (everything but the coordinates)"""
+    return {
+        "id": marker["id"],
+        "name": marker["title"],
+        "description": marker["description"],
+        "address": marker["address"],
+        "labels": marker["labels"],
+        "is_favorite": marker["is_favorite"],
+        "metadata": marker["metadata"],
+        "created_at": marker["created_at"],
+        "updated_at": marker["updated_at"],
+    }
+
+
+def _feature(marker: dict) -> dict:
+    return {
+        "type": "Feature",
+        "geometry": {
+            "type": "Point",
+            "coordinates": [marker["longitude"], marker["latitude"]],
+        },
+        "properties": _properties(marker),
+    }
+
+
+def geojson_chunks(batches: Batches) -> Iterator[str]:
+    """
+    Serialize marker batches as a GeoJSON FeatureCollection
+
+    Args:
+        batches: Iterable of marker dictionary lists
+
+    Yields:
+        Text chunks, one per batch plus header and footer
+    """
+    yield '{"type": "FeatureCollection", "features": ['
+    separator = ""
+    for batch in batches:
+        if not batch:
+            continue
+        yield separator + ", ".join(
+            json.dumps(_feature(marker), ensure_ascii=False) for marker in batch
+        )
+        separator = ", "
+    yield "]}\n"
+
+
+def ndjson_chunks(batches: Batches) -> Iterator[str]:
+    """
+    Serialize marker batches as newline-delimited GeoJSON features
+
+    Args:
+        batches: Iterable of marker dictionary lists
+
+    Yields:
+        Text chunks, one per batch
+    """
+    for batch in batches:
+        if batch:
+            yield "".join(
+                json.dumps(_feature(marker), ensure_ascii=False) + "\n" for marker in batch
+            )
+
+
+def csv_chunks(batches: Batches) -> Iterator[str]:
+    """
+    Serialize marker batches as CSV (labels comma-separated in one column)
+
+    Args:
+        batches: Iterable of marker dictionary lists
+
+    Yields:
+        Text chunks, header first and then one per batch
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    yield buffer.getvalue()
+
+    for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        for marker in batch:
+            writer.writerow([
+                marker["id"],
+                marker["title"],
+                marker["latitude"],
+                marker["longitude"],
+                marker["description"] or "",
+                marker["address"] or "",
+                ",".join(marker["labels"]),
+                "true" if marker["is_favorite"] else "false",
+                marker["created_at"] or "",
+            ])
+        yield buffer.getvalue()
+
+
+# Namespace of the waypoint extensions (label list)
+GPX_EXTENSIONS_NAMESPACE = "https://github.com/fedcal/MyPersonalMap/gpx/1"
+
+
+def _waypoint(marker: dict) -> str:
+    parts = [f'<wpt lat="{marker["latitude"]}" lon="{marker["longitude"]}">']
+    if marker["created_at"]:
+        parts.append(f'<time>{marker["created_at"]}Z</time>')
+    parts.append(f'<name>{escape(marker["title"])}</name>')
+    if marker["description"]:
+        parts.append(f'<desc>{escape(marker["description"])}</desc>')
+    if marker["labels"]:
+        # GPX allows one <type> per waypoint; the full list goes in the extensions
+        parts.append(f'<type>{escape(", ".join(marker["labels"]))}</type>')
+        parts.append("<extensions><mpm:labels>")
+        parts.extend(f"<mpm:label>{escape(label)}</mpm:label>" for label in marker["labels"])
+        parts.append("</mpm:labels></extensions>")
+    parts.append("</wpt>\n")
+    return "".join(parts)
+
+
+def gpx_chunks(batches: Batches, creator: str = "MyPersonalMap") -> Iterator[str]:
+    """
+    Serialize marker batches as GPX 1.1 waypoints
+
+    Args:
+        batches: Iterable of marker dictionary lists
+        creator: Value of the gpx creator attribute
+
+    Yields:
+        Text chunks, one per batch plus header and footer
+    """
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<gpx version="1.1" creator={quoteattr(creator)} '
+        f'xmlns="http://www.topografix.com/GPX/1/1" xmlns:mpm="{GPX_EXTENSIONS_NAMESPACE}">\n'
+    )
+    for batch in batches:
+        if batch:
+            yield "".join(_waypoint(marker) for marker in batch)
+    yield "</gpx>\n"
+
+
+SERIALIZERS: dict[str, Callable[[Batches], Iterator[str]]] = {
+    "geojson": geojson_chunks,
+    "ndjson": ndjson_chunks,
+    "csv": csv_chunks,
+    "gpx": gpx_chunks,
+}
+
+
+def get_format(export_format: str) -> tuple[str, str]:
+    """
+    Get media type and file extension of an export format
+
+    Raises:
+        UnsupportedExportFormatError: If the format is not supported
+    """
+    try:
+        return EXPORT_FORMATS[export_format.lower()]
+    except KeyError:
+        raise UnsupportedExportFormatError(
+            f"Unsupported export format '{export_format}'. "
+            f"Supported formats: {', '.join(EXPORT_FORMATS)}"
+        )
+
+
+def export_markers(
+    db: Session,
+    user_id: int,
+    export_format: str,
+    label_ids: list[int] | None = None,
+    batch_size: int = marker_repository.STREAM_BATCH_SIZE
+) -> Iterator[str]:
+    """
+    Export a user's markers in the given format using an existing session
+
+    Args:
+        db: Database session (must stay open while the iterator is consumed)
+        user_id: User ID
+        export_format: One of EXPORT_FORMATS
+        label_ids: Only markers having at least one of these labels
+        batch_size: Number of markers read and serialized per chunk
+
+    Returns:
+        Iterator of text chunks
+
+    Raises:
+        UnsupportedExportFormatError: If the format is not supported
+    """
+    get_format(export_format)
+    batches = marker_repository.iter_marker_batches(
+        db,
+        user_id=user_id,
+        label_ids=label_ids,
+        with_details=True,
+        batch_size=batch_size
+    )
+    return SERIALIZERS[export_format.lower()](batches)
+
+
+def stream_export(
+    user_id: int,
+    export_format: str,
+    label_ids: list[int] | None = None,
+    session_factory: Callable[[], Session] = SessionLocal
+) -> Iterator[str]:
+    """
+    Export generator owning its database session
+
+    The session lives exactly as long as the response is being streamed,
+    independently of request-scoped dependencies.
+
+    Args:
+        user_id: User ID
+        export_format: One of EXPORT_FORMATS
+        label_ids: Only markers having at least one of these labels
+        session_factory: Callable returning a new Session
+
+    Yields:
+        Text chunks
+
+    Raises:
+        UnsupportedExportFormatError: If the format is not supported
+    """
+    get_format(export_format)
+    db = session_factory()
+    try:
+        yield from export_markers(db, user_id, export_format, label_ids=label_ids)
+    finally:
+        db.close()
@@ -0,0 +1,889 @@
+"""
+ImportService - Streaming import of markers from GPX, KML, GeoJSON and CSV
+
+Uploads are parsed incrementally, validated in batches and inserted in
+chunks of ``chunk_size`` markers per transaction, so memory is bounded by
+the chunk size rather than by the file size (UC-05). Multi-file imports
+are parsed in a process pool whose workers stream validated rows, in
+batches, to a single writer.
+"""
+
+import codecs
+import csv
+import io
+import json
+import math
+import os
+import re
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Callable, Iterable, Iterator
+
+from sqlalchemy.orm import Session
+from pymypersonalmap.config.settings import ALLOWED_IMPORT_FORMATS, IMPORT_WORKERS
+from pymypersonalmap.repository import marker_repository, labels_repository
+from pymypersonalmap.services.dedupe_service import DuplicateDetector
+from pymypersonalmap.services.geo_utils import validate_coordinates, haversine_distance
+from pymypersonalmap.utils.parallel import bounded_imap_streamed, default_workers
+
+
+class UnsupportedImportFormatError(Exception):
+    """Raised when an import format is not supported or not enabled"""
+    pass
+
+
+# Markers inserted per transaction
+IMPORT_CHUNK_SIZE = 500
+
+# Row errors kept in the report (the total is always counted)
+MAX_REPORTED_ERRORS = 100
+
+# Bytes read per round by the incremental JSON reader
+JSON_READ_SIZE = 64 * 1024
+
+# Column length limits of the markers table
+MAX_TITLE_LENGTH = 200
+MAX_ADDRESS_LENGTH = 500
+
+CSV_ALIASES = {
+    "title": ("title", "name"),
+    "latitude": ("latitude", "lat"),
+    "longitude": ("longitude", "lon", "lng"),
+    "description": ("description", "desc"),
+    "address": ("address",),
+    "labels": ("labels",),
+    "is_favorite": ("is_favorite", "favorite"),
+}
+
+# One parsed record: (row number in the file, raw field values)
+Record = tuple[int, dict]
+
+# What to do with rows that duplicate an existing marker (see dedupe_service)
+DUPLICATES_SKIP = "skip"
+DUPLICATES_REPORT = "report"
+DUPLICATE_MODES = (DUPLICATES_SKIP, DUPLICATES_REPORT)
+
+# Errors meaning the file itself is malformed (as opposed to a bad row)
+PARSE_ERRORS = (ET.ParseError, ValueError, csv.Error, UnicodeDecodeError)
+
+# File extension -> import format
+FORMAT_EXTENSIONS = {
+    ".gpx": "gpx",
+    ".kml": "kml",
+    ".geojson": "geojson",
+    ".json": "geojson",
+    ".csv": "csv",
+}
+
+
+class ImportReport:
+    """Running totals and per-row errors of an import"""
+
+    def __init__(self, import_format: str):
+        self.format = import_format
+        self.processed = 0
+        self.imported = 0
+        self.failed = 0
+        self.bytes_read = 0
+        self.errors: list[dict] = []
+        self.aborted: str | None = None
+        self.files: list[dict] = []
+        self.skipped = 0
+        self.duplicates: list[dict] = []
+        self.duplicates_found = 0
+
+    def add_error(self, row: int | None, message: str, file: str | None = None) -> None:
+        """Count a rejected row, keeping at most MAX_REPORTED_ERRORS messages"""
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            error = {'row': row, 'error': message}
+            if file is not None:
+                error['file'] = file
+            self.errors.append(error)
+
+    def add_duplicate(self, row: dict, duplicate: dict, skipped: bool) -> None:
+        """Count a duplicate row, keeping at most MAX_REPORTED_ERRORS of them"""
+        self.duplicates_found += 1
+        if skipped:
+            self.skipped += 1
+        if len(self.duplicates) < MAX_REPORTED_ERRORS:
+            self.duplicates.append({
+                'title': row['title'],
+                'latitude': row['latitude'],
+                'longitude': row['longitude'],
+                **duplicate,
+            })
+
+    def to_dict(self) -> dict:
+        """Convert report to dictionary for API responses"""
+        return {
+            'format': self.format,
+            'processed': self.processed,
+            'imported': self.imported,
+            'failed': self.failed,
+            'bytes_read': self.bytes_read,
+            'errors': list(self.errors),
+            'errors_truncated': self.failed > len(self.errors),
+            'aborted': self.aborted,
+            'files': list(self.files),
+            'skipped': self.skipped,
+            'duplicates_found': self.duplicates_found,
+            'duplicates': list(self.duplicates),
+        }
+
+
+class CountingReader:
+    """Binary file wrapper counting the bytes consumed by a parser"""
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def __iter__(self) -> Iterator[bytes]:
+        for line in self._stream:
+            self.bytes_read += len(line)
+            yield line
+
+
+def get_allowed_formats() -> list[str]:
+    """Get the import formats enabled in settings (ALLOWED_IMPORT_FORMATS)"""
+    return [fmt.strip().lower() for fmt in ALLOWED_IMPORT_FORMATS.split(",") if fmt.strip()]
+
+
+def check_format(import_format: str) -> str:
+    """
+    Normalize an import format and check it is supported and enabled
+
+    Raises:
+        UnsupportedImportFormatError: If the format is not supported or enabled
+    """
+    import_format = import_format.lower()
+    if import_format not in PARSERS or import_format not in get_allowed_formats():
+        supported = [fmt for fmt in get_allowed_formats() if fmt in PARSERS]
+        raise UnsupportedImportFormatError(
+            f"Unsupported import format '{import_format}'. "
+            f"Supported formats: {', '.join(supported)}"
+        )
+    return import_format
+
+
+def format_from_filename(filename: str) -> str:
+    """
+    Get the import format of a file from its extension
+
+    Raises:
+        UnsupportedImportFormatError: If the extension is unknown or not enabled
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in FORMAT_EXTENSIONS:
+        raise UnsupportedImportFormatError(f"Cannot import '{filename}': unknown file extension")
+    return check_format(FORMAT_EXTENSIONS[extension])
+
+
+# ==================== PARSERS ====================
+
+def _local(tag: str) -> str:
+    """Tag name without its XML namespace"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child_text(elem: ET.Element, name: str) -> str | None:
+    """Stripped text of the first direct child with the given local name"""
+    for child in elem:
+        if _local(child.tag) == name:
+            text = (child.text or "").strip()
+            return text or None
+    return None
+
+
+def _iterparse(stream: BinaryIO, tags: frozenset) -> Iterator[tuple[str, ET.Element]]:
+    """
+    Yield complete elements with the given local names
+
+    Each yielded element is detached from its parent once the caller is
+    done with it, so the tree never grows beyond the open elements.
+    """
+    parents = []
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            parents.append(elem)
+            continue
+        parents.pop()
+        tag = _local(elem.tag)
+        if tag in tags:
+            yield tag, elem
+            if parents:
+                parents[-1].remove(elem)
+
+
+class _PathSummary:
+    """First point, point count and length of a GPX track or route"""
+
+    __slots__ = ("first", "last", "points", "length")
+
+    def __init__(self):
+        self.first = None
+        self.last = None
+        self.points = 0
+        self.length = 0.0
+
+    def add(self, latitude: float, longitude: float) -> None:
+        if self.last is not None:
+            self.length += haversine_distance(*self.last, latitude, longitude, unit='meters')
+        else:
+            self.first = (latitude, longitude)
+        self.last = (latitude, longitude)
+        self.points += 1
+
+
+GPX_TAGS = frozenset({"wpt", "trk", "rte", "trkpt", "rtept"})
+
+
+def parse_gpx(stream: BinaryIO) -> Iterator[Record]:
+    """
+    Parse GPX waypoints, tracks and routes
+
+    Each waypoint becomes a marker. Each track or route becomes one marker
+    at its first point, with point count and length in the metadata.
+
+    Args:
+        stream: Binary file object
+
+    Yields:
+        (row number, raw record) tuples
+    """
+    row = 0
+    path = _PathSummary()
+    for tag, elem in _iterparse(stream, GPX_TAGS):
+        if tag in ("trkpt", "rtept"):
+            try:
+                path.add(float(elem.get("lat")), float(elem.get("lon")))
+            except (TypeError, ValueError):
+                pass
+            continue
+
+        row += 1
+        if tag == "wpt":
+            metadata = {
+                key: value for key in ("time", "ele", "sym", "cmt")
+                if (value := _child_text(elem, key)) is not None
+            }
+            # Our exports list every label in the extensions; otherwise the
+            # <type> elements hold comma-separated label names
+            labels = [
+                (child.text or "").strip() for child in elem.iter() if _local(child.tag) == "label"
+            ] or ",".join(
+                (child.text or "").strip() for child in elem if _local(child.tag) == "type"
+            )
+            yield row, {
+                'title': _child_text(elem, "name"),
+                'description': _child_text(elem, "desc"),
+                'latitude': elem.get("lat"),
+                'longitude': elem.get("lon"),
+                'labels': labels,
+                'metadata': metadata or None,
+            }
+        else:
+            kind = "track" if tag == "trk" else "route"
+            first = path.first or (None, None)
+            yield row, {
+                'title': _child_text(elem, "name") or f"{kind.capitalize()} {row}",
+                'description': _child_text(elem, "desc"),
+                'latitude': first[0],
+                'longitude': first[1],
+                'metadata': {
+                    'source': f"gpx_{kind}",
+                    'points': path.points,
+                    'length_m': round(path.length, 1),
+                },
+            }
+            path = _PathSummary()
+
+
+def parse_kml(stream: BinaryIO) -> Iterator[Record]:
+    """
+    Parse KML Placemarks (the first coordinate of the geometry is used)
+
+    Args:
+        stream: Binary file object
+
+    Yields:
+        (row number, raw record) tuples
+    """
+    row = 0
+    for _, elem in _iterparse(stream, frozenset({"Placemark"})):
+        row += 1
+        latitude = longitude = None
+        for node in elem.iter():
+            if _local(node.tag) == "coordinates" and node.text and node.text.strip():
+                first = node.text.split()[0].split(",")
+                if len(first) >= 2:
+                    longitude, latitude = first[0], first[1]
+                break
+        yield row, {
+            'title': _child_text(elem, "name"),
+            'description': _child_text(elem, "description"),
+            'address': _child_text(elem, "address"),
+            'latitude': latitude,
+            'longitude': longitude,
+        }
+
+
+_FEATURES_KEY = re.compile(r'"features"\s*:\s*\[')
+
+
+def iter_geojson_features(stream: BinaryIO, read_size: int = JSON_READ_SIZE) -> Iterator[dict]:
+    """
+    Incrementally read the features of a GeoJSON FeatureCollection
+
+    Only the feature being decoded (plus one read buffer) is held in memory.
+    A document that is a single Feature is also accepted.
+
+    Args:
+        stream: Binary file object
+        read_size: Bytes read per round
+
+    Yields:
+        Decoded feature objects
+
+    Raises:
+        ValueError: If the document is not valid GeoJSON
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    eof = False
+
+    def read_more() -> None:
+        nonlocal buffer, eof
+        data = stream.read(read_size)
+        eof = not data
+        buffer += text_decoder.decode(data, final=eof)
+
+    # Locate the start of the features array
+    match = None
+    while not eof:
+        read_more()
+        match = _FEATURES_KEY.search(buffer)
+        if match:
+            break
+    if match is None:
+        document = json.loads(buffer)
+        if not isinstance(document, dict) or document.get("type") != "Feature":
+            raise ValueError("Not a GeoJSON Feature or FeatureCollection")
+        yield document
+        return
+
+    buffer = buffer[match.end():]
+    while True:
+        stripped = buffer.lstrip(" \t\r\n,")
+        if not stripped:
+            if eof:
+                raise ValueError("Unterminated features array")
+            buffer = ""
+            read_more()
+            continue
+        buffer = stripped
+        if buffer[0] == "]":
+            return
+        try:
+            feature, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise ValueError(f"Invalid feature: {e}")
+            read_more()
+            continue
+        yield feature
+        buffer = buffer[end:]
+
+
+def _first_position(coordinates) -> tuple:
+    """First [lon, lat] position of any GeoJSON geometry coordinates"""
+    while isinstance(coordinates, list) and coordinates and isinstance(coordinates[0], list):
+        coordinates = coordinates[0]
+    if isinstance(coordinates, list) and len(coordinates) >= 2:
+        return coordinates[0], coordinates[1]
+    return None, None
+
+
+GEOJSON_KNOWN_PROPERTIES = frozenset({
+    "id", "name", "title", "description", "address", "labels", "is_favorite",
+    "metadata", "created_at", "updated_at",
+})
+
+
+def parse_geojson(stream: BinaryIO) -> Iterator[Record]:
+    """
+    Parse GeoJSON features (the first position of the geometry is used)
+
+    Unknown properties are kept as metadata unless a ``metadata`` object
+    is present, so files produced by the exporter round-trip.
+
+    Args:
+        stream: Binary file object
+
+    Yields:
+        (row number, raw record) tuples
+    """
+    for row, feature in enumerate(iter_geojson_features(stream), start=1):
+        if not isinstance(feature, dict):
+            yield row, {}
+            continue
+        properties = feature.get("properties") or {}
+        geometry = feature.get("geometry") or {}
+        longitude, latitude = _first_position(geometry.get("coordinates"))
+
+        metadata = properties.get("metadata")
+        if not isinstance(metadata, dict):
+            metadata = {
+                key: value for key, value in properties.items()
+                if key not in GEOJSON_KNOWN_PROPERTIES
+            } or None
+
+        yield row, {
+            'title': properties.get("name") or properties.get("title"),
+            'description': properties.get("description"),
+            'address': properties.get("address"),
+            'latitude': latitude,
+            'longitude': longitude,
+            'is_favorite': properties.get("is_favorite"),
+            'labels': properties.get("labels"),
+            'metadata': metadata,
+        }
+
+
+def parse_csv(stream: BinaryIO) -> Iterator[Record]:
+    """
+    Parse CSV rows with a header (name/title, latitude/lat, longitude/lon/lng, ...)
+
+    Args:
+        stream: Binary file object
+
+    Yields:
+        (line number, raw record) tuples
+    """
+    reader = csv.reader(codecs.iterdecode(stream, "utf-8-sig"))
+    header = next(reader, None)
+    if header is None:
+        return
+
+    columns = {name.strip().lower(): index for index, name in enumerate(header)}
+    positions = {}
+    for field, aliases in CSV_ALIASES.items():
+        for alias in aliases:
+            if alias in columns:
+                positions[field] = columns[alias]
+                break
+    if "latitude" not in positions or "longitude" not in positions:
+        raise ValueError("CSV header must contain latitude and longitude columns")
+
+    for values in reader:
+        if not any(values):
+            continue
+        yield reader.line_num, {
+            field: values[index] if index < len(values) else None
+            for field, index in positions.items()
+        }
+
+
+PARSERS: dict[str, Callable[[BinaryIO], Iterator[Record]]] = {
+    "gpx": parse_gpx,
+    "kml": parse_kml,
+    "geojson": parse_geojson,
+    "csv": parse_csv,
+}
+
+
+# ==================== VALIDATION ====================
+
+def _to_bool(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "y")
+    return bool(value)
+
+
+def _text(record: dict, field: str, name: str) -> str | None:
+    """A text field as a string; numbers are converted, objects and lists rejected"""
+    value = record.get(field)
+    if value is None or value == "":
+        return None
+    if not isinstance(value, (str, int, float)):
+        raise ValueError(f"{name} must be text, not {type(value).__name__}")
+    return str(value)
+
+
+def _label_names(value) -> list[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    elif not isinstance(value, (list, tuple)):
+        raise ValueError(f"Labels must be text or a list, not {type(value).__name__}")
+    names = []
+    for name in value:
+        if not isinstance(name, (str, int, float)):
+            raise ValueError(f"Label names must be text, not {type(name).__name__}")
+        if str(name).strip():
+            names.append(str(name).strip())
+    return names
+
+
+def validate_record(record: dict, label_ids_by_name: dict[str, int]) -> dict:
+    """
+    Validate a raw record and convert it to a bulk_create_markers row
+
+    Label names unknown to the user are ignored.
+
+    Args:
+        record: Raw field values from a parser
+        label_ids_by_name: Labels visible to the user
+
+    Returns:
+        Row dictionary
+
+    Raises:
+        ValueError: If the record cannot be imported
+    """
+    title = (_text(record, 'title', "Name") or "").strip()
+    if not title:
+        raise ValueError("Missing name")
+    if len(title) > MAX_TITLE_LENGTH:
+        raise ValueError(f"Name longer than {MAX_TITLE_LENGTH} characters")
+
+    try:
+        latitude = float(record['latitude'])
+        longitude = float(record['longitude'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Missing or non-numeric coordinates")
+    if (
+        math.isnan(latitude)
+        or math.isnan(longitude)
+        or not validate_coordinates(latitude, longitude)
+    ):
+        raise ValueError(f"Coordinates out of range: {latitude}, {longitude}")
+
+    address = _text(record, 'address', "Address")
+    if address is not None and len(address) > MAX_ADDRESS_LENGTH:
+        raise ValueError(f"Address longer than {MAX_ADDRESS_LENGTH} characters")
+
+    return {
+        'title': title,
+        'latitude': latitude,
+        'longitude': longitude,
+        'description': _text(record, 'description', "Description"),
+        'address': address,
+        'metadata': record.get('metadata') or None,
+        'is_favorite': _to_bool(record.get('is_favorite')),
+        'label_ids': [
+            label_ids_by_name[name] for name in _label_names(record.get('labels'))
+            if name in label_ids_by_name
+        ],
+    }
+
+
+def validate_batch(
+    records: Iterable[Record],
+    label_ids_by_name: dict[str, int]
+) -> tuple[list[dict], list[tuple[int, str]]]:
+    """
+    Validate a batch of parsed records
+
+    Returns:
+        (valid rows, [(row number, error message), ...])
+    """
+    rows, errors = [], []
+    for row_number, record in records:
+        try:
+            rows.append(validate_record(record, label_ids_by_name))
+        except ValueError as e:
+            errors.append((row_number, str(e)))
+    return rows, errors
+
+
+# ==================== PIPELINE ====================
+
+def _duplicate_detector(
+    db: Session, user_id: int, on_duplicate: str | None
+) -> DuplicateDetector | None:
+    if on_duplicate is None:
+        return None
+    if on_duplicate not in DUPLICATE_MODES:
+        raise ValueError(f"on_duplicate must be one of: {', '.join(DUPLICATE_MODES)}")
+    return DuplicateDetector(db, user_id)
+
+
+def _drop_duplicates(
+    detector: DuplicateDetector | None,
+    rows: list[dict],
+    on_duplicate: str | None,
+    report: ImportReport
+) -> list[dict]:
+    """Report the duplicates among rows and return the rows to insert"""
+    if detector is None:
+        return rows
+    kept = []
+    for row, duplicate in zip(rows, detector.check(rows)):
+        skip = duplicate is not None and on_duplicate == DUPLICATES_SKIP
+        if duplicate is not None:
+            report.add_duplicate(row, duplicate, skipped=skip)
+        if not skip:
+            kept.append(row)
+    return kept
+
+
+def import_markers(
+    db: Session,
+    user_id: int,
+    import_format: str,
+    stream: BinaryIO,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    progress: Callable[[dict], None] | None = None,
+    on_duplicate: str | None = None
+) -> ImportReport:
+    """
+    Import markers from an uploaded file
+
+    Records are validated and inserted ``chunk_size`` at a time, one
+    transaction per chunk. Invalid rows are skipped and reported. If the
+    file turns out to be malformed part way through, the chunks already
+    committed are kept and the report is marked as aborted.
+
+    Args:
+        db: Database session
+        user_id: ID of the user importing the markers
+        import_format: One of get_allowed_formats()
+        stream: Binary file object
+        chunk_size: Markers inserted per transaction
+        progress: Called with the report dictionary after each chunk
+        on_duplicate: None to import everything, DUPLICATES_SKIP to leave out
+            rows duplicating an existing (or earlier imported) marker,
+            DUPLICATES_REPORT to import them but list them in the report
+
+    Returns:
+        ImportReport
+
+    Raises:
+        UnsupportedImportFormatError: If the format is not supported or enabled
+        ValueError: If on_duplicate is not a valid mode
+    """
+    import_format = check_format(import_format)
+    detector = _duplicate_detector(db, user_id, on_duplicate)
+    report = ImportReport(import_format)
+    reader = CountingReader(stream)
+    label_ids_by_name = labels_repository.get_label_ids_by_name(db, user_id)
+    records = PARSERS[import_format](reader)
+
+    def flush(chunk: list[Record]) -> None:
+        rows, errors = validate_batch(chunk, label_ids_by_name)
+        rows = _drop_duplicates(detector, rows, on_duplicate, report)
+        marker_repository.bulk_create_markers(db, user_id, rows)
+
+        report.processed += len(chunk)
+        report.imported += len(rows)
+        for row_number, message in errors:
+            report.add_error(row_number, message)
+        report.bytes_read = reader.bytes_read
+        if progress is not None:
+            progress(report.to_dict())
+
+    chunk = []
+    while True:
+        try:
+            record = next(records, None)
+        except PARSE_ERRORS as e:
+            # Keep what was parsed before the error
+            report.aborted = f"Malformed {import_format} file: {e}"
+            record = None
+
+        if record is not None:
+            chunk.append(record)
+            if len(chunk) < chunk_size:
+                continue
+        if chunk:
+            flush(chunk)
+            chunk = []
+        if record is None:
+            break
+
+    report.bytes_read = reader.bytes_read
+    return report
+
+
+# ==================== MULTI-FILE IMPORT ====================
+
+# Fields of the compact row tuples produced by parse_file
+ROW_FIELDS = (
+    'title', 'latitude', 'longitude', 'description', 'address',
+    'metadata', 'is_favorite', 'label_ids',
+)
+
+# One file to import: (display name, import format, bytes or filesystem path)
+ImportSource = tuple[str, str, bytes | str]
+
+
+class ParsedBatch:
+    """Rows and errors of part of a file, parsed and validated in a worker process"""
+
+    __slots__ = ("index", "name", "rows", "errors", "processed", "bytes_read", "aborted", "last")
+
+    def __init__(self, index: int, name: str):
+        self.index = index
+        self.name = name
+        self.rows: list[tuple] = []
+        self.errors: list[tuple[int, str]] = []
+        self.processed = 0
+        self.bytes_read = 0
+        self.aborted: str | None = None
+        # Set on the final batch of the file, which carries bytes_read and aborted
+        self.last = False
+
+
+def parse_file(
+    index: int,
+    name: str,
+    import_format: str,
+    source: bytes | str,
+    label_ids_by_name: dict[str, int],
+    batch_size: int = IMPORT_CHUNK_SIZE
+) -> Iterator[ParsedBatch]:
+    """
+    Parse and validate a file into batches of compact row tuples (see ROW_FIELDS)
+
+    Runs in a worker process: it touches no database and its arguments
+    and batches are plain picklable data. A batch is yielded as soon as it
+    holds ``batch_size`` valid rows, so a worker never holds more than one
+    batch of a file, whatever its size.
+
+    Args:
+        index: Position of the file in the import, copied to every batch
+        name: File name used in the report
+        import_format: Import format of the file
+        source: File content, or path of the file to read
+        label_ids_by_name: Labels visible to the importing user
+        batch_size: Valid rows per batch
+
+    Yields:
+        ParsedBatch, the last one with ``last`` set
+    """
+    batch = ParsedBatch(index, name)
+    if isinstance(source, str):
+        stream = open(source, "rb")
+    else:
+        stream = io.BytesIO(source)
+
+    with stream:
+        reader = CountingReader(stream)
+        try:
+            for row_number, record in PARSERS[import_format](reader):
+                batch.processed += 1
+                try:
+                    row = validate_record(record, label_ids_by_name)
+                except ValueError as e:
+                    batch.errors.append((row_number, str(e)))
+                    continue
+                batch.rows.append(tuple(row[field] for field in ROW_FIELDS))
+                if len(batch.rows) >= batch_size:
+                    yield batch
+                    batch = ParsedBatch(index, name)
+        except PARSE_ERRORS as e:
+            batch.aborted = f"Malformed {import_format} file: {e}"
+        batch.bytes_read = reader.bytes_read
+
+    batch.last = True
+    yield batch
+
+
+def import_files(
+    db: Session,
+    user_id: int,
+    sources: Iterable[ImportSource],
+    workers: int | None = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    progress: Callable[[dict], None] | None = None,
+    on_duplicate: str | None = None
+) -> ImportReport:
+    """
+    Import many files, parsing them in parallel
+
+    Worker processes parse and validate files into batches of
+    ``chunk_size`` compact row tuples and stream them back; this process is
+    the single writer and inserts them as they arrive, one transaction per
+    chunk. Memory is bounded by the batches in flight, not by file sizes.
+
+    Args:
+        db: Database session
+        user_id: ID of the user importing the markers
+        sources: (name, format, bytes or path) of each file; may be a lazy
+            iterable, it is consumed as workers become free
+        workers: Worker processes (default IMPORT_WORKERS, 0 = CPU count)
+        chunk_size: Markers inserted per transaction
+        progress: Called with the report dictionary after each file
+        on_duplicate: None to import everything, DUPLICATES_SKIP to leave out
+            rows duplicating an existing (or earlier imported) marker,
+            DUPLICATES_REPORT to import them but list them in the report
+
+    Returns:
+        ImportReport with one entry per file in ``files``
+
+    Raises:
+        UnsupportedImportFormatError: If a file format is not supported or enabled
+        ValueError: If on_duplicate is not a valid mode
+    """
+    detector = _duplicate_detector(db, user_id, on_duplicate)
+    if workers is None:
+        workers = default_workers(IMPORT_WORKERS)
+
+    sources = (
+        (name, check_format(import_format), source) for name, import_format, source in sources
+    )
+    report = ImportReport("multi")
+    label_ids_by_name = labels_repository.get_label_ids_by_name(db, user_id)
+    pending_rows: list[tuple] = []
+    # Report entries of the files still being parsed, by index
+    in_progress: dict[int, dict] = {}
+
+    def flush(rows: list[tuple]) -> None:
+        dicts = _drop_duplicates(
+            detector, [dict(zip(ROW_FIELDS, row)) for row in rows], on_duplicate, report
+        )
+        marker_repository.bulk_create_markers(db, user_id, dicts)
+        report.imported += len(dicts)
+
+    # At most 2 * workers files are in flight; pass paths to keep contents out of memory
+    arguments = (
+        (index, name, import_format, source, label_ids_by_name, chunk_size)
+        for index, (name, import_format, source) in enumerate(sources)
+    )
+    for batch in bounded_imap_streamed(parse_file, arguments, workers):
+        entry = in_progress.setdefault(batch.index, {
+            'name': batch.name, 'processed': 0, 'valid': 0, 'failed': 0, 'aborted': None,
+        })
+        entry['processed'] += batch.processed
+        entry['valid'] += len(batch.rows)
+        entry['failed'] += len(batch.errors)
+        report.processed += batch.processed
+        for row_number, message in batch.errors:
+            report.add_error(row_number, message, file=batch.name)
+
+        pending_rows.extend(batch.rows)
+        while len(pending_rows) >= chunk_size:
+            flush(pending_rows[:chunk_size])
+            del pending_rows[:chunk_size]
+
+        if batch.last:
+            entry['aborted'] = batch.aborted
+            report.bytes_read += batch.bytes_read
+            report.files.append(in_progress.pop(batch.index))
+            if progress is not None:
+                progress(report.to_dict())
+
+    if pending_rows:
+        flush(pending_rows)
+        if progress is not None:
+            progress(report.to_dict())
+
+    return report
@@ -0,0 +1,339 @@
+"""
+MarkerIndex - In-memory columnar read model for spatial queries
+
+Each user's markers are kept as NumPy arrays (IDs, coordinates, favorite
+flags, label bitmasks; see services/snapshot_service.py), built on first
+use. Bounding box, radius, nearest-neighbour, label and favorite filters
+are answered with vectorized masks instead of SQL round trips and ORM
+instances.
+
+The index listens to the change sequence (change_repository change
+listeners): a commit touching a user's markers or labels marks that
+user's arrays stale, and the next query patches in just the changed
+markers. Coordinates are held as microdegrees, so results can differ
+from the SQL path only for points within ~11 cm of a query boundary.
+
+With several server processes pass a SharedSnapshots (see
+services/shared_index.py): the arrays are then mapped read-only from the
+snapshot files one process builds, and commits in any process are seen
+by all of them.
+"""
+
+import threading
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from pymypersonalmap.repository import change_repository, labels_repository
+from pymypersonalmap.repository.marker_repository import MarkerPin
+from pymypersonalmap.config import settings
+from pymypersonalmap.services import snapshot_service
+from pymypersonalmap.services.geo_utils import EARTH_RADIUS_METERS
+from pymypersonalmap.services.shared_index import SharedSnapshots
+from pymypersonalmap.services.snapshot_service import COORDINATE_SCALE, MarkerSnapshot
+from pymypersonalmap.utils import memory
+from pymypersonalmap.utils.metrics import record_cache
+
+# Meters per degree of latitude, for the radius pre-filter
+METERS_PER_DEGREE = EARTH_RADIUS_METERS * np.pi / 180
+
+
+def haversine_meters(
+    latitude: float,
+    longitude: float,
+    latitudes: np.ndarray,
+    longitudes: np.ndarray
+) -> np.ndarray:
+    """Great-circle distances in meters from one point to arrays of points"""
+    lat1 = np.radians(latitude)
+    lat2 = np.radians(latitudes)
+    dlat = lat2 - lat1
+    dlon = np.radians(longitudes - longitude)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class UserMarkers:
+    """
+    Arrays of one user's markers plus the label colors needed for pins
+
+    Immutable once built: a refresh creates a new instance, so queries
+    run without locks. Only the snapshot's integer columns are kept (they
+    may be a shared mapping); float coordinates are computed per query.
+    """
+
+    def __init__(
+        self,
+        snapshot: MarkerSnapshot,
+        label_colors: dict[int, str],
+        generation: int = 0
+    ):
+        self.snapshot = snapshot
+        self.label_colors = label_colors
+        # Number of committed changes of the user the arrays include
+        self.generation = generation
+
+    def __len__(self) -> int:
+        return len(self.snapshot)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the arrays in bytes"""
+        return self.snapshot.nbytes
+
+    def in_bbox_mask(
+        self,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float
+    ) -> np.ndarray:
+        """Boolean row mask of a bounding box (bounds included)"""
+        latitudes = self.snapshot.latitudes_e6
+        longitudes = self.snapshot.longitudes_e6
+        mask = (latitudes >= min_lat * COORDINATE_SCALE) & (latitudes <= max_lat * COORDINATE_SCALE)
+        mask &= longitudes >= min_lon * COORDINATE_SCALE
+        mask &= longitudes <= max_lon * COORDINATE_SCALE
+        return mask
+
+    def latitude_band_mask(self, latitude: float, half_width_degrees: float) -> np.ndarray:
+        """Boolean row mask of the markers within some degrees of latitude"""
+        latitudes = self.snapshot.latitudes_e6
+        low = (latitude - half_width_degrees) * COORDINATE_SCALE
+        high = (latitude + half_width_degrees) * COORDINATE_SCALE
+        return (latitudes >= low) & (latitudes <= high)
+
+    def filter_mask(
+        self,
+        label_ids: list[int] | None = None,
+        favorites_only: bool = False
+    ) -> np.ndarray:
+        """Boolean row mask of the label and favorite filters"""
+        mask = np.ones(len(self), dtype=np.bool_)
+        if favorites_only:
+            mask &= self.snapshot.favorites
+        if label_ids:
+            mask &= self.snapshot.has_any_label(label_ids)
+        return mask
+
+    def distances(self, latitude: float, longitude: float, rows: np.ndarray) -> np.ndarray:
+        """Distances in meters from a point to the markers of some rows"""
+        latitudes = self.snapshot.latitudes_e6[rows] / COORDINATE_SCALE
+        longitudes = self.snapshot.longitudes_e6[rows] / COORDINATE_SCALE
+        return haversine_meters(latitude, longitude, latitudes, longitudes)
+
+    def pins(self, rows: np.ndarray, distances: np.ndarray | None = None) -> list[MarkerPin]:
+        """Build pins for some rows (in the given order)"""
+        snapshot = self.snapshot
+        pins = []
+        for position, row in enumerate(rows):
+            colors = tuple(
+                self.label_colors[label_id]
+                for label_id in sorted(snapshot.marker_label_ids(row))
+                if label_id in self.label_colors
+            )
+            pins.append(MarkerPin(
+                int(snapshot.ids[row]),
+                snapshot.title(row),
+                int(snapshot.latitudes_e6[row]) / COORDINATE_SCALE,
+                int(snapshot.longitudes_e6[row]) / COORDINATE_SCALE,
+                bool(snapshot.favorites[row]),
+                colors,
+                None if distances is None else float(distances[position])
+            ))
+        return pins
+
+
+class MarkerIndex:
+    """
+    Process-wide in-memory marker read model
+
+    Args:
+        shared: Snapshot files and generation counters shared with other
+            server processes (None = arrays private to this process)
+
+    Example:
+        index = get_marker_index()
+        pins = index.in_bbox(db, user_id, 45.0, 9.0, 45.6, 9.4, label_ids=[3])
+    """
+
+    def __init__(self, shared: SharedSnapshots | None = None):
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._users: dict[int, UserMarkers] = {}
+        # Committed changes per user, counted by the change listener
+        self._generations: dict[int, int] = {}
+        self._generations_lock = threading.Lock()
+        change_repository.add_change_listener(self._on_change)
+
+    def close(self) -> None:
+        """Stop listening to changes and drop all arrays"""
+        change_repository.remove_change_listener(self._on_change)
+        self.clear()
+        if self.shared is not None:
+            self.shared.close()
+
+    def clear(self) -> None:
+        """Drop all arrays (they are rebuilt on the next query)"""
+        with self._lock:
+            self._users.clear()
+
+    def discard(self, user_id: int) -> None:
+        """Drop a user's arrays"""
+        with self._lock:
+            self._users.pop(user_id, None)
+            self._generations.pop(user_id, None)
+
+    def _on_change(self, user_id: int, entity: str, entity_ids: list[int]) -> None:
+        # Runs in the committing thread
+        if self.shared is not None:
+            self.shared.bump(user_id)
+            return
+        with self._generations_lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def _generation(self, user_id: int) -> int:
+        if self.shared is not None:
+            return self.shared.generation(user_id)
+        return self._generations.get(user_id, 0)
+
+    def get(self, db: Session, user_id: int) -> UserMarkers:
+        """
+        Get a user's arrays, building or refreshing them if needed
+
+        Costs no SQL at all while nothing was committed for the user.
+        """
+        users = self._users.get(user_id)
+        if users is not None and users.generation == self._generation(user_id):
+            record_cache("marker_index", True)
+            return users
+        record_cache("marker_index", False)
+        with self._lock:
+            # Read before the database: a commit during the refresh triggers another one
+            generation = self._generation(user_id)
+            users = self._users.get(user_id)
+            if users is not None and users.generation == generation:
+                return users
+            if self.shared is not None:
+                snapshot = self.shared.load(db, user_id, generation)
+            elif users is None:
+                snapshot = snapshot_service.build_snapshot(db, user_id)
+            else:
+                snapshot = snapshot_service.refresh_snapshot(db, users.snapshot)
+            labels = labels_repository.get_labels_by_ids(db, snapshot.label_ids)
+            colors = {label.idLabel: label.color for label in labels}
+            users = UserMarkers(snapshot, colors, generation)
+            self._users[user_id] = users
+            return users
+
+    def in_bbox(
+        self,
+        db: Session,
+        user_id: int,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        label_ids: list[int] | None = None,
+        favorites_only: bool = False
+    ) -> list[MarkerPin]:
+        """
+        Pins of a user's markers inside a bounding box (bounds included)
+
+        Returns:
+            List of MarkerPin records ordered by ID
+        """
+        users = self.get(db, user_id)
+        mask = users.filter_mask(label_ids, favorites_only)
+        mask &= users.in_bbox_mask(min_lat, min_lon, max_lat, max_lon)
+        return users.pins(np.flatnonzero(mask))
+
+    def within_radius(
+        self,
+        db: Session,
+        user_id: int,
+        latitude: float,
+        longitude: float,
+        radius_meters: float,
+        label_ids: list[int] | None = None,
+        favorites_only: bool = False
+    ) -> list[MarkerPin]:
+        """
+        Pins of a user's markers within a radius from a point
+
+        Returns:
+            List of MarkerPin records sorted by distance (``distance`` set)
+        """
+        users = self.get(db, user_id)
+        mask = users.filter_mask(label_ids, favorites_only)
+        # Latitude band first: distances are computed for candidates only
+        mask &= users.latitude_band_mask(latitude, radius_meters / METERS_PER_DEGREE)
+        rows = np.flatnonzero(mask)
+        distances = users.distances(latitude, longitude, rows)
+        inside = distances <= radius_meters
+        rows, distances = rows[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return users.pins(rows[order], distances[order])
+
+    def nearest(
+        self,
+        db: Session,
+        user_id: int,
+        latitude: float,
+        longitude: float,
+        k: int = 10,
+        label_ids: list[int] | None = None,
+        favorites_only: bool = False
+    ) -> list[MarkerPin]:
+        """
+        Pins of the ``k`` markers of a user closest to a point
+
+        Returns:
+            List of at most ``k`` MarkerPin records sorted by distance
+        """
+        users = self.get(db, user_id)
+        rows = np.flatnonzero(users.filter_mask(label_ids, favorites_only))
+        distances = users.distances(latitude, longitude, rows)
+        if k < len(rows):
+            closest = np.argpartition(distances, k)[:k]
+            rows, distances = rows[closest], distances[closest]
+        order = np.argsort(distances, kind="stable")
+        return users.pins(rows[order], distances[order])
+
+    def stats(self) -> dict:
+        """Number of indexed users and markers, and the size of the arrays"""
+        users = list(self._users.values())
+        return {
+            "users": len(users),
+            "markers": sum(len(entry) for entry in users),
+            "bytes": sum(entry.nbytes for entry in users),
+        }
+
+
+_index: MarkerIndex | None = None
+
+
+def get_marker_index() -> MarkerIndex:
+    """
+    Get the process-wide marker index
+
+    Shares its arrays with the other server processes when
+    SHARED_MARKER_INDEX is enabled.
+    """
+    global _index
+    if _index is None:
+        shared = None
+        if settings.SHARED_MARKER_INDEX:
+            shared = SharedSnapshots(snapshot_service.get_snapshot_store())
+        _index = MarkerIndex(shared)
+    return _index
+
+
+def _index_stats() -> dict | None:
+    if _index is None:
+        return None
+    stats = _index.stats()
+    return {"entries": stats["users"], **stats}
+
+
+memory.register_cache("marker_index", _index_stats)
@@ -6,7 +6,8 @@ Handles coordinate validation, marker CRUD operations, and spatial queries.
 
 from sqlalchemy.orm import Session
 from pymypersonalmap.repository import marker_repository
-from pymypersonalmap.models.marker import Marker
+from pymypersonalmap.models.marker import Marker, MARKER_RESPONSE_FIELDS
+from pymypersonalmap.services.marker_index import get_marker_index
 
 
 class CoordinateValidationError(Exception):
@@ -89,13 +90,14 @@ def create_marker(
     )
 
 
-def get_marker(db: Session, marker_id: int) -> Marker:
+def get_marker(db: Session, marker_id: int, with_details: bool = False) -> Marker:
     """
     Get marker by ID
 
     Args:
         db: Database session
         marker_id: Marker ID
+        with_details: Load description, address and metadata in the same query
 
     Returns:
         Marker instance
@@ -103,7 +105,7 @@ def get_marker(db: Session, marker_id: int) -> Marker:
     Raises:
         MarkerNotFoundError: If marker not found
     """
-    marker = marker_repository.get_marker_by_id(db, marker_id)
+    marker = marker_repository.get_marker_by_id(db, marker_id, with_details=with_details)
     if not marker:
         raise MarkerNotFoundError(f"Marker with ID {marker_id} not found")
     return marker
@@ -113,15 +115,84 @@ def get_user_markers(
     db: Session,
     user_id: int,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    with_details: bool = False
 ) -> list[Marker]:
     """Get all markers for a user"""
     return marker_repository.get_all_markers(
         db=db,
         user_id=user_id,
         skip=skip,
+        limit=limit,
+        with_details=with_details
+    )
+
+
+def list_markers(
+    db: Session,
+    user_id: int,
+    fields: tuple[str, ...] = MARKER_RESPONSE_FIELDS,
+    label_ids: list[int] | None = None,
+    search: str | None = None,
+    is_favorite: bool | None = None,
+    skip: int = 0,
+    limit: int = 100
+) -> tuple[int, list[dict]]:
+    """
+    List a user's markers restricted to a sparse fieldset
+
+    Args:
+        db: Database session
+        user_id: User ID
+        fields: Marker fields to include in each result
+        label_ids: Only markers having at least one of these labels
+        search: Search term for title/description
+        is_favorite: Filter by favorite status
+        skip: Number of records to skip
+        limit: Maximum number of records
+
+    Returns:
+        Tuple (total matching markers, list of marker dictionaries)
+
+    Raises:
+        ValueError: If a field is unknown or pagination values are invalid
+    """
+    if skip < 0:
+        raise ValueError("Offset cannot be negative")
+    if not 1 <= limit <= 1000:
+        raise ValueError("Limit must be between 1 and 1000")
+
+    markers = marker_repository.get_marker_dicts(
+        db=db,
+        fields=fields,
+        user_id=user_id,
+        label_ids=label_ids,
+        search=search,
+        is_favorite=is_favorite,
+        skip=skip,
         limit=limit
     )
+    total = marker_repository.count_markers(
+        db=db,
+        user_id=user_id,
+        label_ids=label_ids,
+        search=search,
+        is_favorite=is_favorite
+    )
+    return total, markers
+
+
+def _raise_missing_or_forbidden(db: Session, marker_id: int, action: str) -> None:
+    """
+    Explain why an ownership-checked mutation affected zero rows
+
+    Raises:
+        MarkerNotFoundError: If the marker does not exist
+        PermissionError: If the marker exists but belongs to another user
+    """
+    if not marker_repository.marker_exists(db, marker_id):
+        raise MarkerNotFoundError(f"Marker with ID {marker_id} not found")
+    raise PermissionError(f"You don't have permission to {action} this marker")
 
 
 def update_marker(
@@ -133,10 +204,14 @@ def update_marker(
     latitude: float | None = None,
     longitude: float | None = None,
     metadata: dict | None = None
-) -> Marker:
+) -> dict:
     """
     Update marker with validation and ownership check
 
+    The ownership check and the update run as a single
+    UPDATE ... WHERE idMarker = ? AND user_id = ? RETURNING statement;
+    the marker is looked up again only when no row was affected.
+
     Args:
         db: Database session
         marker_id: Marker ID to update
@@ -148,21 +223,13 @@ def update_marker(
         metadata: New metadata (optional)
 
     Returns:
-        Updated Marker instance
+        Updated marker as a dictionary (Marker.to_dict keys without labels)
 
     Raises:
         MarkerNotFoundError: If marker not found
         PermissionError: If user doesn't own the marker
         CoordinateValidationError: If new coordinates are invalid
     """
-    # Check marker exists and user owns it
-    marker = marker_repository.get_marker_by_id(db, marker_id)
-    if not marker:
-        raise MarkerNotFoundError(f"Marker with ID {marker_id} not found")
-
-    if marker.user_id != user_id:
-        raise PermissionError("You don't have permission to update this marker")
-
     # Validate coordinates if provided
     if latitude is not None and longitude is not None:
         validate_coordinates(latitude, longitude)
@@ -175,10 +242,11 @@ def update_marker(
             raise ValueError("Title cannot exceed 200 characters")
         title = title.strip()
 
-    # Update marker
-    updated = marker_repository.update_marker(
+    # Update marker (ownership checked in the same statement)
+    updated = marker_repository.update_owned_marker(
         db=db,
         marker_id=marker_id,
+        user_id=user_id,
         title=title,
         description=description.strip() if description else None,
         latitude=latitude,
@@ -186,8 +254,8 @@ def update_marker(
         metadata=metadata
     )
 
-    if not updated:
-        raise MarkerNotFoundError(f"Marker with ID {marker_id} not found")
+    if updated is None:
+        _raise_missing_or_forbidden(db, marker_id, "update")
 
     return updated
 
@@ -196,6 +264,9 @@ def delete_marker(db: Session, marker_id: int, user_id: int) -> None:
     """
     Delete marker with ownership check
 
+    The ownership check and the deletion run as a single
+    DELETE ... WHERE idMarker = ? AND user_id = ? RETURNING statement.
+
     Args:
         db: Database session
         marker_id: Marker ID to delete
@@ -205,16 +276,8 @@ def delete_marker(db: Session, marker_id: int, user_id: int) -> None:
         MarkerNotFoundError: If marker not found
         PermissionError: If user doesn't own the marker
     """
-    # Check marker exists and user owns it
-    marker = marker_repository.get_marker_by_id(db, marker_id)
-    if not marker:
-        raise MarkerNotFoundError(f"Marker with ID {marker_id} not found")
-
-    if marker.user_id != user_id:
-        raise PermissionError("You don't have permission to delete this marker")
-
-    # Delete marker
-    marker_repository.delete_marker(db, marker_id)
+    if not marker_repository.delete_owned_marker(db, marker_id, user_id):
+        _raise_missing_or_forbidden(db, marker_id, "delete")
 
 
 def find_markers_nearby(
@@ -222,8 +285,9 @@ def find_markers_nearby(
     latitude: float,
     longitude: float,
     radius_meters: float,
-    user_id: int | None = None
-) -> list[Marker]:
+    user_id: int | None = None,
+    use_index: bool = False
+) -> list[Marker] | list[marker_repository.MarkerPin]:
     """
     Find markers within a radius from a point
 
@@ -233,9 +297,11 @@ def find_markers_nearby(
         longitude: Center point longitude
         radius_meters: Search radius in meters
         user_id: Optional user ID to filter results
+        use_index: Answer from the in-memory MarkerIndex (requires user_id)
+            and return MarkerPin records instead of Marker instances
 
     Returns:
-        List of markers within radius
+        List of markers within radius, sorted by distance
 
     Raises:
         CoordinateValidationError: If coordinates are invalid
@@ -249,6 +315,9 @@ def find_markers_nearby(
     if radius_meters > 100000:  # 100km limit
         raise ValueError("Radius cannot exceed 100,000 meters (100km)")
 
+    if use_index and user_id is not None:
+        return get_marker_index().within_radius(db, user_id, latitude, longitude, radius_meters)
+
     return marker_repository.get_markers_within_radius(
         db=db,
         latitude=latitude,
@@ -258,14 +327,52 @@ def find_markers_nearby(
     )
 
 
+def find_nearest_markers(
+    db: Session,
+    latitude: float,
+    longitude: float,
+    user_id: int,
+    k: int = 10,
+    label_ids: list[int] | None = None,
+    favorites_only: bool = False
+) -> list[marker_repository.MarkerPin]:
+    """
+    Find a user's markers closest to a point (from the in-memory MarkerIndex)
+
+    Args:
+        db: Database session
+        latitude: Point latitude
+        longitude: Point longitude
+        user_id: User ID
+        k: Number of markers to return (1 to 1000)
+        label_ids: Only markers having at least one of these labels
+        favorites_only: Only favorite markers
+
+    Returns:
+        List of MarkerPin records sorted by distance (``distance`` in meters)
+
+    Raises:
+        CoordinateValidationError: If coordinates are invalid
+        ValueError: If k is out of range
+    """
+    validate_coordinates(latitude, longitude)
+    if not 1 <= k <= 1000:
+        raise ValueError("k must be between 1 and 1000")
+
+    return get_marker_index().nearest(
+        db, user_id, latitude, longitude, k, label_ids=label_ids, favorites_only=favorites_only
+    )
+
+
 def find_markers_in_area(
     db: Session,
     min_lat: float,
     min_lon: float,
     max_lat: float,
     max_lon: float,
-    user_id: int | None = None
-) -> list[Marker]:
+    user_id: int | None = None,
+    use_index: bool = False
+) -> list[Marker] | list[marker_repository.MarkerPin]:
     """
     Find markers within a bounding box
 
@@ -276,6 +383,8 @@ def find_markers_in_area(
         max_lat: Maximum latitude
         max_lon: Maximum longitude
         user_id: Optional user ID to filter results
+        use_index: Answer from the in-memory MarkerIndex (requires user_id)
+            and return MarkerPin records instead of Marker instances
 
     Returns:
         List of markers within bounding box
@@ -291,6 +400,9 @@ def find_markers_in_area(
     if min_lon >= max_lon:
         raise ValueError("min_lon must be less than max_lon")
 
+    if use_index and user_id is not None:
+        return get_marker_index().in_bbox(db, user_id, min_lat, min_lon, max_lat, max_lon)
+
     return marker_repository.get_markers_in_bounding_box(
         db=db,
         min_lat=min_lat,
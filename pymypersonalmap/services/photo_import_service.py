@@ -0,0 +1,411 @@
+"""
+PhotoImportService - Markers from the GPS position of geotagged photos
+
+Walks a directory of JPEG/TIFF photos, reads only the EXIF header of each
+file in a process pool, clusters shots taken at nearly the same spot and
+creates one marker per cluster, labelled "Fotografia" (or "Drone" for
+drone cameras).
+"""
+
+import io
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from PIL import Image, ExifTags, UnidentifiedImageError
+from sqlalchemy.orm import Session
+
+from pymypersonalmap.config.settings import IMPORT_WORKERS
+from pymypersonalmap.repository import marker_repository, labels_repository
+from pymypersonalmap.services.dedupe_service import SpatialGrid
+from pymypersonalmap.services.geo_utils import validate_coordinates, haversine_distance
+from pymypersonalmap.services.import_service import (
+    ImportReport, IMPORT_CHUNK_SIZE, MAX_TITLE_LENGTH
+)
+from pymypersonalmap.utils.parallel import bounded_imap_unordered, default_workers
+
+
+class PhotoDirectoryError(Exception):
+    """Raised when the photo directory does not exist or is not readable"""
+    pass
+
+
+class PhotoDirectoryNotAllowedError(Exception):
+    """Raised when a directory is outside the configured photo import root"""
+    pass
+
+
+PHOTO_EXTENSIONS = frozenset({".jpg", ".jpeg", ".tif", ".tiff"})
+
+# Bytes read from the start of each file; JPEG EXIF (APP1) is at most 64 KB
+EXIF_HEADER_BYTES = 128 * 1024
+
+# Files read per worker task (amortizes the inter-process round trip)
+PHOTOS_PER_TASK = 64
+
+# Shots closer than this are merged into one marker
+DEFAULT_CLUSTER_DISTANCE_M = 25.0
+
+# File names listed in the metadata of a clustered marker
+MAX_CLUSTER_FILES = 20
+
+LABEL_PHOTO = "Fotografia"
+LABEL_DRONE = "Drone"
+
+# EXIF Make values of drone cameras
+DRONE_MAKES = ("dji", "parrot", "autel", "skydio", "yuneec", "hasselblad-dji")
+
+# One photo position: (path, latitude, longitude, altitude, taken_at, make, model)
+PhotoLocation = tuple[str, float, float, float | None, str | None, str | None, str | None]
+
+
+# ==================== EXIF ====================
+
+def _rational(value) -> float:
+    """EXIF rational (IFDRational or (numerator, denominator)) to float"""
+    if isinstance(value, tuple):
+        return value[0] / value[1]
+    return float(value)
+
+
+def gps_to_degrees(dms, ref: str | None) -> float:
+    """
+    Convert EXIF GPS degrees/minutes/seconds rationals to decimal degrees
+
+    Args:
+        dms: Three rationals (degrees, minutes, seconds)
+        ref: Hemisphere reference ('N', 'S', 'E' or 'W')
+
+    Returns:
+        Decimal degrees, negative for the southern and western hemispheres
+
+    Example:
+        >>> gps_to_degrees(((45, 1), (27, 1), (5112, 100)), 'N')
+        45.4642
+    """
+    degrees, minutes, seconds = (_rational(part) for part in dms)
+    value = degrees + minutes / 60.0 + seconds / 3600.0
+    if ref and ref.strip().upper() in ("S", "W"):
+        value = -value
+    return round(value, 7)
+
+
+def _open_header(path: str) -> Image.Image:
+    """Open an image from its first EXIF_HEADER_BYTES, or lazily from the file"""
+    with open(path, "rb") as f:
+        head = f.read(EXIF_HEADER_BYTES)
+    try:
+        image = Image.open(io.BytesIO(head))
+        image.getexif()
+        return image
+    except (OSError, SyntaxError, UnidentifiedImageError):
+        # Header larger than EXIF_HEADER_BYTES; Image.open still does not decode pixels
+        return Image.open(path)
+
+
+def read_photo_location(path: str) -> PhotoLocation | None:
+    """
+    Read the GPS position of a photo from its EXIF header
+
+    Only the header is read; the image data is never decoded.
+
+    Args:
+        path: Photo file path
+
+    Returns:
+        PhotoLocation, or None if the photo has no usable GPS position
+
+    Raises:
+        OSError: If the file cannot be read or is not an image
+    """
+    with _open_header(path) as image:
+        exif = image.getexif()
+    gps = exif.get_ifd(ExifTags.IFD.GPSInfo)
+    if ExifTags.GPS.GPSLatitude not in gps or ExifTags.GPS.GPSLongitude not in gps:
+        return None
+
+    try:
+        latitude = gps_to_degrees(
+            gps[ExifTags.GPS.GPSLatitude], gps.get(ExifTags.GPS.GPSLatitudeRef)
+        )
+        longitude = gps_to_degrees(
+            gps[ExifTags.GPS.GPSLongitude], gps.get(ExifTags.GPS.GPSLongitudeRef)
+        )
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    if not validate_coordinates(latitude, longitude) or (latitude == 0 and longitude == 0):
+        return None
+
+    altitude = None
+    if ExifTags.GPS.GPSAltitude in gps:
+        try:
+            altitude = round(_rational(gps[ExifTags.GPS.GPSAltitude]), 1)
+            if gps.get(ExifTags.GPS.GPSAltitudeRef) in (1, b"\x01"):
+                altitude = -altitude
+        except (TypeError, ValueError, ZeroDivisionError):
+            altitude = None
+
+    taken_at = exif.get_ifd(ExifTags.IFD.Exif).get(ExifTags.Base.DateTimeOriginal) \
+        or exif.get(ExifTags.Base.DateTime)
+    if taken_at:
+        try:
+            taken_at = datetime.strptime(
+                str(taken_at).strip("\x00 "), "%Y:%m:%d %H:%M:%S"
+            ).isoformat()
+        except ValueError:
+            taken_at = None
+
+    make = str(exif.get(ExifTags.Base.Make, "")).strip("\x00 ") or None
+    model = str(exif.get(ExifTags.Base.Model, "")).strip("\x00 ") or None
+    return path, latitude, longitude, altitude, taken_at, make, model
+
+
+def read_photo_locations(
+    paths: list[str],
+) -> tuple[list[PhotoLocation], list[tuple[str, str]], int]:
+    """
+    Worker task: read the GPS position of a batch of photos
+
+    Returns:
+        (locations, [(path, error), ...], number of photos without GPS)
+    """
+    locations, errors, without_gps = [], [], 0
+    for path in paths:
+        try:
+            location = read_photo_location(path)
+        except (OSError, SyntaxError, ValueError, UnidentifiedImageError) as e:
+            errors.append((path, str(e) or e.__class__.__name__))
+            continue
+        if location is None:
+            without_gps += 1
+        else:
+            locations.append(location)
+    return locations, errors, without_gps
+
+
+def iter_photo_paths(
+    directory: str | Path,
+    recursive: bool = True,
+    on_error: Callable[[str, OSError], None] | None = None
+) -> Iterator[str]:
+    """
+    Yield the paths of the photos in a directory, in directory order
+
+    Args:
+        directory: Directory to walk
+        recursive: Also walk subdirectories
+        on_error: Called with the path and error of each directory that
+            cannot be read; the walk continues with the others
+    """
+    stack = [str(directory)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in PHOTO_EXTENSIONS:
+                        yield entry.path
+        except OSError as e:
+            if on_error is None:
+                raise
+            on_error(current, e)
+
+
+def resolve_import_directory(directory: str, root: str | Path) -> Path:
+    """
+    Resolve a directory requested over the API inside the allowed root
+
+    Args:
+        directory: Requested directory, absolute or relative to ``root``
+        root: Directory the API may import from (empty = none)
+
+    Returns:
+        Resolved directory
+
+    Raises:
+        PhotoDirectoryNotAllowedError: If no root is configured or the
+            directory (after resolving symlinks and "..") is outside it
+    """
+    if not root:
+        raise PhotoDirectoryNotAllowedError(
+            "Photo import is disabled (PHOTO_IMPORT_ROOT is not set)"
+        )
+    root = Path(root).resolve()
+    resolved = (root / directory).resolve()
+    if not resolved.is_relative_to(root):
+        raise PhotoDirectoryNotAllowedError(f"Directory outside the photo import root: {directory}")
+    return resolved
+
+
+def _batches(paths: Iterable[str], size: int) -> Iterator[tuple[list[str]]]:
+    batch = []
+    for path in paths:
+        batch.append(path)
+        if len(batch) >= size:
+            yield (batch,)
+            batch = []
+    if batch:
+        yield (batch,)
+
+
+# ==================== CLUSTERING ====================
+
+class PhotoCluster:
+    """Photos taken at nearly the same position"""
+
+    __slots__ = ("latitude", "longitude", "files", "count", "altitude",
+                 "first_taken", "last_taken", "is_drone", "camera")
+
+    def __init__(self, location: PhotoLocation):
+        path, self.latitude, self.longitude, self.altitude, taken_at, make, model = location
+        self.files = [os.path.basename(path)]
+        self.count = 1
+        self.first_taken = self.last_taken = taken_at
+        self.is_drone = _is_drone(make)
+        self.camera = " ".join(part for part in (make, model) if part) or None
+
+    def add(self, location: PhotoLocation) -> None:
+        path, _, _, _, taken_at, make, _ = location
+        self.count += 1
+        if len(self.files) < MAX_CLUSTER_FILES:
+            self.files.append(os.path.basename(path))
+        if taken_at:
+            if self.first_taken is None or taken_at < self.first_taken:
+                self.first_taken = taken_at
+            if self.last_taken is None or taken_at > self.last_taken:
+                self.last_taken = taken_at
+        self.is_drone = self.is_drone or _is_drone(make)
+
+    def to_row(self, label_ids_by_name: dict[str, int]) -> dict:
+        """Convert cluster to a bulk_create_markers row"""
+        title = os.path.splitext(self.files[0])[0]
+        if self.count > 1:
+            title = f"{title} (+{self.count - 1})"
+        label = label_ids_by_name.get(LABEL_DRONE if self.is_drone else LABEL_PHOTO)
+        metadata = {
+            'source': "photos",
+            'photos': self.count,
+            'files': self.files,
+            'taken_from': self.first_taken,
+            'taken_to': self.last_taken,
+            'camera': self.camera,
+            'altitude_m': self.altitude,
+        }
+        return {
+            'title': title[:MAX_TITLE_LENGTH],
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'metadata': {key: value for key, value in metadata.items() if value is not None},
+            'label_ids': [label] if label is not None else [],
+        }
+
+
+def _is_drone(make: str | None) -> bool:
+    return bool(make) and make.lower().startswith(DRONE_MAKES)
+
+
+def cluster_locations(
+    locations: Iterable[PhotoLocation],
+    distance_m: float = DEFAULT_CLUSTER_DISTANCE_M
+) -> list[PhotoCluster]:
+    """
+    Greedily cluster photo positions
+
+    Each photo joins the nearest cluster whose first photo is within
+    ``distance_m``, or starts a new one. Clusters are looked up in a
+    SpatialGrid, so the cost is linear in the number of photos.
+
+    Args:
+        locations: Photo positions
+        distance_m: Maximum distance from the first photo of a cluster
+
+    Returns:
+        List of clusters
+    """
+    grid = SpatialGrid(distance_m)
+    clusters = []
+    for location in locations:
+        latitude, longitude = location[1], location[2]
+        nearest, nearest_distance = None, distance_m
+        for other_lat, other_lon, cluster in grid.near(latitude, longitude):
+            distance = haversine_distance(latitude, longitude, other_lat, other_lon, unit='meters')
+            if distance <= nearest_distance:
+                nearest, nearest_distance = cluster, distance
+        if nearest is None:
+            cluster = PhotoCluster(location)
+            clusters.append(cluster)
+            grid.add(latitude, longitude, cluster)
+        else:
+            nearest.add(location)
+    return clusters
+
+
+# ==================== IMPORT ====================
+
+def import_photo_directory(
+    db: Session,
+    user_id: int,
+    directory: str | Path,
+    recursive: bool = True,
+    workers: int | None = None,
+    cluster_distance_m: float = DEFAULT_CLUSTER_DISTANCE_M,
+    chunk_size: int = IMPORT_CHUNK_SIZE
+) -> ImportReport:
+    """
+    Create markers from the geotagged photos of a directory
+
+    EXIF headers are read by a process pool, PHOTOS_PER_TASK files per
+    task; this process clusters the positions and inserts one marker per
+    cluster in chunks of ``chunk_size``.
+
+    Args:
+        db: Database session
+        user_id: ID of the user importing the photos
+        directory: Directory containing the photos
+        recursive: Also import photos in subdirectories
+        workers: Worker processes (default IMPORT_WORKERS, 0 = CPU count)
+        cluster_distance_m: Photos closer than this become one marker
+        chunk_size: Markers inserted per transaction
+
+    Returns:
+        ImportReport; ``processed`` counts photos, ``imported`` markers,
+        ``skipped`` photos without GPS position
+
+    Raises:
+        PhotoDirectoryError: If the directory does not exist
+    """
+    if not os.path.isdir(directory):
+        raise PhotoDirectoryError(f"Not a directory: {directory}")
+    if workers is None:
+        workers = default_workers(IMPORT_WORKERS)
+
+    report = ImportReport("photos")
+    locations = []
+
+    def unreadable(path: str, error: OSError) -> None:
+        report.add_error(None, f"Cannot read directory: {error.strerror or error}",
+                         file=os.path.relpath(path, directory))
+
+    tasks = _batches(iter_photo_paths(directory, recursive, on_error=unreadable), PHOTOS_PER_TASK)
+    for found, errors, without_gps in bounded_imap_unordered(read_photo_locations, tasks, workers):
+        report.processed += len(found) + len(errors) + without_gps
+        report.skipped += without_gps
+        locations.extend(found)
+        for path, message in errors:
+            report.add_error(None, message, file=os.path.relpath(path, directory))
+
+    # Completion order depends on the workers; sort for stable clusters and titles
+    locations.sort()
+    clusters = cluster_locations(locations, cluster_distance_m)
+
+    label_ids_by_name = labels_repository.get_label_ids_by_name(db, user_id)
+    for start in range(0, len(clusters), chunk_size):
+        rows = [cluster.to_row(label_ids_by_name) for cluster in clusters[start:start + chunk_size]]
+        marker_repository.bulk_create_markers(db, user_id, rows)
+        report.imported += len(rows)
+
+    return report
@@ -0,0 +1,148 @@
+"""
+SharedSnapshots - Marker snapshots shared by the worker processes of a server
+
+With several server processes each one would otherwise build its own
+copy of the marker arrays. Here the snapshot files of the SnapshotStore
+are the shared segment: one process at a time (the builder, holding an
+exclusive file lock) writes a user's snapshot, and every worker maps it
+read-only, so the pages are held once in the OS page cache.
+
+Committed changes are signalled through ``generations.bin``, a file of
+uint64 counters mapped by all processes: the committing process bumps
+the user's counter, readers compare it with the generation of the arrays
+they have mapped (a memory read, no syscall) and remap when it moved.
+``<user_id>/current`` records which snapshot file was published for
+which generation, so only the first reader after a commit rebuilds.
+
+Users share counter slots modulo ``GENERATION_SLOTS``; a collision only
+costs a no-op refresh.
+"""
+
+import json
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from pymypersonalmap.services.snapshot_service import (
+    MarkerSnapshot, SnapshotFormatError, SnapshotStore, read_snapshot
+)
+
+# Counter slots in generations.bin (8 bytes each)
+GENERATION_SLOTS = 65536
+
+GENERATIONS_FILE = "generations.bin"
+LOCK_FILE = "builder.lock"
+COUNTERS_LOCK_FILE = "generations.lock"
+POINTER_FILE = "current"
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Exclusive lock between processes (and threads, each call opens its own file)"""
+    with open(path, "a+b") as file:
+        if os.name == "nt":
+            import msvcrt
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+class SharedSnapshots:
+    """
+    Snapshot files plus cross-process generation counters
+
+    Example:
+        shared = SharedSnapshots(get_snapshot_store())
+        generation = shared.generation(user_id)
+        snapshot = shared.load(db, user_id, generation)
+    """
+
+    def __init__(self, store: SnapshotStore, slots: int = GENERATION_SLOTS):
+        self.store = store
+        self.slots = slots
+        self.root = store.root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock_path = self.root / LOCK_FILE
+        # Separate lock, so commits never wait for a rebuild
+        self._counters_lock_path = self.root / COUNTERS_LOCK_FILE
+
+        size = slots * 8
+        with _file_lock(self._counters_lock_path):
+            with open(self.root / GENERATIONS_FILE, "a+b") as file:
+                if os.fstat(file.fileno()).st_size < size:
+                    file.truncate(size)
+                self._mmap = mmap.mmap(file.fileno(), size)
+        self._counters = np.frombuffer(self._mmap, dtype=np.uint64)
+
+    def close(self) -> None:
+        """Unmap the counters"""
+        self._counters = None
+        self._mmap.close()
+
+    def generation(self, user_id: int) -> int:
+        """Committed generation of a user's markers, as seen by all processes"""
+        return int(self._counters[user_id % self.slots])
+
+    def bump(self, user_id: int) -> None:
+        """Signal every process that a user's markers changed"""
+        with _file_lock(self._counters_lock_path):
+            self._counters[user_id % self.slots] += 1
+
+    def load(self, db: Session, user_id: int, generation: int) -> MarkerSnapshot:
+        """
+        Map a user's snapshot that includes at least ``generation``
+
+        The snapshot published by another process is reused when it is
+        recent enough; otherwise this process refreshes it from the change
+        sequence, writes it and publishes it.
+        """
+        with _file_lock(self._lock_path):
+            published = self._read_pointer(user_id)
+            if published is not None and published["generation"] >= generation:
+                try:
+                    return read_snapshot(self.store.path(user_id, published["seq"]))
+                except (OSError, SnapshotFormatError):
+                    pass
+            # Read the counter again: commits up to now are in the database
+            generation = max(generation, self.generation(user_id))
+            snapshot = self.store.get(db, user_id)
+            self._write_pointer(user_id, {"generation": generation, "seq": snapshot.seq})
+            return snapshot
+
+    def _pointer_path(self, user_id: int) -> Path:
+        return self.root / str(user_id) / POINTER_FILE
+
+    def _read_pointer(self, user_id: int) -> dict | None:
+        try:
+            return json.loads(self._pointer_path(user_id).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_pointer(self, user_id: int, pointer: dict) -> None:
+        path = self._pointer_path(user_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        descriptor, temp = tempfile.mkstemp(dir=path.parent, prefix=".current-")
+        try:
+            with os.fdopen(descriptor, "w") as file:
+                json.dump(pointer, file)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
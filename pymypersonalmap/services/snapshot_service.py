@@ -0,0 +1,557 @@
+"""
+SnapshotService - Columnar binary snapshots of a user's markers
+
+A snapshot holds everything needed to draw or count a whole library
+without touching the database: IDs, int32 microdegree coordinates,
+favorite flags, label bitmasks and a UTF-8 string table of titles.
+
+File layout (little-endian)::
+
+    b"MPMSNAP1" | uint32 header length | JSON header | arrays
+
+Every array starts on a 64-byte boundary; the header records its dtype,
+shape and offset, so the file is opened with ``mmap`` and the arrays are
+NumPy views of the mapping (nothing is parsed or copied). Snapshots are
+written as ``<cache_dir>/snapshots/<user_id>/markers-<seq>.snap`` and
+brought up to date by applying the change sequence since ``seq``.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from pymypersonalmap.models.marker_change import ENTITY_MARKER
+from pymypersonalmap.repository import change_repository, marker_repository
+from pymypersonalmap.utils import memory
+from pymypersonalmap.utils.metrics import record_cache
+
+
+class SnapshotFormatError(Exception):
+    """Raised when a snapshot file is truncated, corrupt or of another version"""
+    pass
+
+
+MAGIC = b"MPMSNAP1"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# Coordinates are stored as integer microdegrees (about 11 cm at the equator)
+COORDINATE_SCALE = 1_000_000
+
+# Columns read from the markers table, in snapshot order
+SNAPSHOT_COLUMNS = ("idMarker", "title", "latitude", "longitude", "is_favorite")
+
+# Change rows read per page while refreshing
+CHANGES_PAGE_SIZE = 1000
+
+# Rebuild from scratch instead of patching when more markers than this
+# fraction of the snapshot changed
+REBUILD_FRACTION = 0.25
+
+_PREFIX = struct.Struct("<8sI")
+
+
+class MarkerSnapshot:
+    """
+    Read-only columnar view of a user's markers at a change sequence number
+
+    Rows are ordered by marker ID. Arrays may be views of a memory-mapped
+    file, so they must not be modified.
+
+    Example:
+        snapshot = store.get(db, user_id)
+        inside = (snapshot.latitudes >= 45) & (snapshot.latitudes <= 46)
+        ids = snapshot.ids[inside]
+    """
+
+    def __init__(
+        self,
+        user_id: int,
+        seq: int,
+        label_ids: list[int],
+        ids: np.ndarray,
+        latitudes_e6: np.ndarray,
+        longitudes_e6: np.ndarray,
+        favorites: np.ndarray,
+        label_masks: np.ndarray,
+        title_offsets: np.ndarray,
+        title_data: np.ndarray
+    ):
+        self.user_id = user_id
+        self.seq = seq
+        # Bit i of a label mask stands for label_ids[i]
+        self.label_ids = list(label_ids)
+        self.ids = ids
+        self.latitudes_e6 = latitudes_e6
+        self.longitudes_e6 = longitudes_e6
+        self.favorites = favorites
+        self.label_masks = label_masks
+        self.title_offsets = title_offsets
+        self.title_data = title_data
+        self._bits = {label_id: bit for bit, label_id in enumerate(self.label_ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __repr__(self) -> str:
+        return f"<MarkerSnapshot(user_id={self.user_id}, seq={self.seq}, markers={len(self)})>"
+
+    @property
+    def latitudes(self) -> np.ndarray:
+        """Latitudes in decimal degrees (float64)"""
+        return self.latitudes_e6 / COORDINATE_SCALE
+
+    @property
+    def longitudes(self) -> np.ndarray:
+        """Longitudes in decimal degrees (float64)"""
+        return self.longitudes_e6 / COORDINATE_SCALE
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the arrays in bytes"""
+        return sum(array.nbytes for array in self._arrays().values())
+
+    def title(self, row: int) -> str:
+        """Title of the marker at a row"""
+        start, end = self.title_offsets[row], self.title_offsets[row + 1]
+        return self.title_data[start:end].tobytes().decode("utf-8")
+
+    def titles(self, rows: np.ndarray | None = None) -> list[str]:
+        """Titles of the given rows (default: all rows)"""
+        if rows is None:
+            rows = range(len(self))
+        return [self.title(row) for row in rows]
+
+    def row_of(self, marker_id: int) -> int | None:
+        """Row of a marker, or None if it is not in the snapshot"""
+        row = int(np.searchsorted(self.ids, marker_id))
+        if row < len(self.ids) and self.ids[row] == marker_id:
+            return row
+        return None
+
+    def marker_label_ids(self, row: int) -> list[int]:
+        """Label IDs of the marker at a row"""
+        return [
+            label_id for bit, label_id in enumerate(self.label_ids)
+            if int(self.label_masks[row, bit // 64]) >> (bit % 64) & 1
+        ]
+
+    def has_any_label(self, label_ids: list[int]) -> np.ndarray:
+        """Boolean row mask of markers carrying at least one of the labels"""
+        wanted = np.zeros(self.label_masks.shape[1], dtype=np.uint64)
+        for label_id in label_ids:
+            bit = self._bits.get(label_id)
+            if bit is not None:
+                wanted[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        return (self.label_masks & wanted).any(axis=1)
+
+    def label_counts(self) -> dict[int, int]:
+        """Number of markers per label ID (labels on no marker are omitted)"""
+        counts = {}
+        for bit, label_id in enumerate(self.label_ids):
+            column = self.label_masks[:, bit // 64] >> np.uint64(bit % 64)
+            count = int(np.count_nonzero(column & np.uint64(1)))
+            if count:
+                counts[label_id] = count
+        return counts
+
+    def _arrays(self) -> dict[str, np.ndarray]:
+        return {
+            "ids": self.ids,
+            "latitudes_e6": self.latitudes_e6,
+            "longitudes_e6": self.longitudes_e6,
+            "favorites": self.favorites,
+            "label_masks": self.label_masks,
+            "title_offsets": self.title_offsets,
+            "title_data": self.title_data,
+        }
+
+
+# ==================== BUILDING ====================
+
+def _mask_words(label_count: int) -> int:
+    return max(1, -(-label_count // 64))
+
+
+def _from_rows(
+    user_id: int,
+    seq: int,
+    rows: list[tuple],
+    pairs: list[tuple[int, int]],
+    label_ids: list[int] | None = None
+) -> MarkerSnapshot:
+    """
+    Build a snapshot from marker rows and (marker_id, label_id) pairs
+
+    Args:
+        rows: (idMarker, title, latitude, longitude, is_favorite) ordered by ID
+        pairs: Label associations of those markers
+        label_ids: Existing bit assignment to extend (keeps masks comparable)
+    """
+    count = len(rows)
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+    latitudes = np.fromiter((row[2] for row in rows), dtype=np.float64, count=count)
+    longitudes = np.fromiter((row[3] for row in rows), dtype=np.float64, count=count)
+    favorites = np.fromiter((bool(row[4]) for row in rows), dtype=np.bool_, count=count)
+
+    encoded = [row[1].encode("utf-8") for row in rows]
+    lengths = np.fromiter((len(title) for title in encoded), dtype=np.uint32, count=count)
+    title_offsets = np.zeros(count + 1, dtype=np.uint32)
+    np.cumsum(lengths, out=title_offsets[1:])
+    title_data = np.frombuffer(b"".join(encoded), dtype=np.uint8).copy()
+
+    label_ids = list(label_ids or [])
+    known = set(label_ids)
+    label_ids += sorted({label_id for _, label_id in pairs if label_id not in known})
+    bits = {label_id: bit for bit, label_id in enumerate(label_ids)}
+    label_masks = np.zeros((count, _mask_words(len(label_ids))), dtype=np.uint64)
+    if pairs:
+        pair_rows = np.searchsorted(ids, [marker_id for marker_id, _ in pairs])
+        pair_bits = np.array([bits[label_id] for _, label_id in pairs], dtype=np.uint64)
+        np.bitwise_or.at(
+            label_masks,
+            (pair_rows, (pair_bits // 64).astype(np.intp)),
+            np.left_shift(np.uint64(1), pair_bits % np.uint64(64))
+        )
+
+    return MarkerSnapshot(
+        user_id=user_id,
+        seq=seq,
+        label_ids=label_ids,
+        ids=ids,
+        latitudes_e6=np.round(latitudes * COORDINATE_SCALE).astype(np.int32),
+        longitudes_e6=np.round(longitudes * COORDINATE_SCALE).astype(np.int32),
+        favorites=favorites,
+        label_masks=label_masks,
+        title_offsets=title_offsets,
+        title_data=title_data
+    )
+
+
+def build_snapshot(db: Session, user_id: int) -> MarkerSnapshot:
+    """
+    Build a snapshot of all of a user's markers from the database
+
+    The sequence number is read first: a change committed while the rows
+    are read is applied again by the next refresh, which is harmless.
+    """
+    seq = change_repository.get_latest_seq(db, user_id)
+    rows = marker_repository.get_marker_rows(db, columns=SNAPSHOT_COLUMNS, user_id=user_id)
+    pairs = marker_repository.get_marker_label_pairs(db, user_id)
+    return _from_rows(user_id, seq, rows, pairs)
+
+
+def _gather_titles(
+    offsets: np.ndarray,
+    data: np.ndarray,
+    rows: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Select the titles of some rows from a string table, without decoding them"""
+    starts = offsets[:-1][rows].astype(np.int64)
+    lengths = (offsets[1:][rows] - offsets[:-1][rows]).astype(np.int64)
+    new_offsets = np.zeros(len(rows) + 1, dtype=np.uint32)
+    np.cumsum(lengths, out=new_offsets[1:])
+    # Byte i of the result comes from starts[row] + (i - new_offsets[row])
+    shift = np.repeat(starts - new_offsets[:-1], lengths)
+    positions = np.arange(int(new_offsets[-1]), dtype=np.int64) + shift
+    return new_offsets, data[positions]
+
+
+def _merge(kept: MarkerSnapshot, rows: np.ndarray, fresh: MarkerSnapshot) -> MarkerSnapshot:
+    """Combine some rows of a snapshot with a freshly read one, ordered by ID"""
+    ids = np.concatenate([kept.ids[rows], fresh.ids])
+    order = np.argsort(ids, kind="stable")
+    words = fresh.label_masks.shape[1]
+    kept_masks = np.zeros((len(rows), words), dtype=np.uint64)
+    kept_masks[:, :kept.label_masks.shape[1]] = kept.label_masks[rows]
+
+    offsets, data = _gather_titles(kept.title_offsets, kept.title_data, rows)
+    title_offsets = np.concatenate([offsets[:-1], fresh.title_offsets + offsets[-1]])
+    title_data = np.concatenate([data, fresh.title_data])
+    title_offsets, title_data = _gather_titles(title_offsets, title_data, order)
+
+    return MarkerSnapshot(
+        user_id=fresh.user_id,
+        seq=fresh.seq,
+        label_ids=fresh.label_ids,
+        ids=ids[order],
+        latitudes_e6=np.concatenate([kept.latitudes_e6[rows], fresh.latitudes_e6])[order],
+        longitudes_e6=np.concatenate([kept.longitudes_e6[rows], fresh.longitudes_e6])[order],
+        favorites=np.concatenate([kept.favorites[rows], fresh.favorites])[order],
+        label_masks=np.concatenate([kept_masks, fresh.label_masks])[order],
+        title_offsets=title_offsets,
+        title_data=title_data
+    )
+
+
+def refresh_snapshot(db: Session, snapshot: MarkerSnapshot) -> MarkerSnapshot:
+    """
+    Bring a snapshot up to date with the change sequence
+
+    Only the markers changed since ``snapshot.seq`` are read again; the
+    rest of the arrays are reused. Falls back to a full rebuild when a
+    large part of the library changed.
+
+    Returns:
+        The same snapshot if nothing changed, otherwise a new one
+    """
+    user_id = snapshot.user_id
+    latest = change_repository.get_latest_seq(db, user_id)
+    if latest <= snapshot.seq:
+        return snapshot
+
+    changed: set[int] = set()
+    since = snapshot.seq
+    limit = max(int(len(snapshot) * REBUILD_FRACTION), CHANGES_PAGE_SIZE)
+    while since < latest:
+        page = change_repository.get_changes_since(db, user_id, since, CHANGES_PAGE_SIZE)
+        if not page:
+            break
+        changed.update(entity_id for _, entity, entity_id, _ in page if entity == ENTITY_MARKER)
+        since = page[-1][0]
+        if len(changed) > limit:
+            return build_snapshot(db, user_id)
+
+    marker_ids = sorted(changed)
+    rows = marker_repository.get_marker_rows(
+        db, columns=SNAPSHOT_COLUMNS, user_id=user_id, marker_ids=marker_ids
+    )
+    pairs = marker_repository.get_marker_label_pairs(db, user_id, marker_ids)
+    fresh = _from_rows(user_id, since, rows, pairs, label_ids=snapshot.label_ids)
+    keep = np.flatnonzero(~np.isin(snapshot.ids, marker_ids))
+    return _merge(snapshot, keep, fresh)
+
+
+# ==================== FILES ====================
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_snapshot(snapshot: MarkerSnapshot, path: Path | str) -> None:
+    """
+    Write a snapshot file atomically (temporary file + rename)
+
+    Args:
+        snapshot: Snapshot to write
+        path: Destination file
+    """
+    path = Path(path)
+    arrays = {name: np.ascontiguousarray(array) for name, array in snapshot._arrays().items()}
+
+    def header_bytes(start: int) -> tuple[bytes, dict]:
+        layout, offset = {}, start
+        for name, array in arrays.items():
+            offset = _align(offset)
+            layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += array.nbytes
+        header = {
+            "version": FORMAT_VERSION,
+            "user_id": snapshot.user_id,
+            "seq": snapshot.seq,
+            "count": len(snapshot),
+            "label_ids": snapshot.label_ids,
+            "arrays": layout,
+        }
+        return json.dumps(header, separators=(",", ":")).encode(), layout
+
+    # Offsets depend on the header length and vice versa: reserve room once
+    encoded, _ = header_bytes(0)
+    start = _align(_PREFIX.size + len(encoded) + 64)
+    encoded, layout = header_bytes(start)
+    encoded = encoded.ljust(start - _PREFIX.size)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(_PREFIX.pack(MAGIC, len(encoded)))
+            tmp.write(encoded)
+            for name, array in arrays.items():
+                tmp.write(b"\0" * (layout[name]["offset"] - tmp.tell()))
+                tmp.write(array.tobytes())
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+def read_snapshot(path: Path | str) -> MarkerSnapshot:
+    """
+    Open a snapshot file as memory-mapped arrays
+
+    Args:
+        path: Snapshot file
+
+    Returns:
+        MarkerSnapshot whose arrays are read-only views of the file
+
+    Raises:
+        SnapshotFormatError: If the file is not a valid snapshot
+    """
+    with open(path, "rb") as f:
+        try:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise SnapshotFormatError(f"{path} is empty") from None
+    try:
+        magic, header_length = _PREFIX.unpack_from(mapping, 0)
+        if magic != MAGIC:
+            raise SnapshotFormatError(f"{path} is not a marker snapshot")
+        header = json.loads(mapping[_PREFIX.size:_PREFIX.size + header_length])
+        if header.get("version") != FORMAT_VERSION:
+            raise SnapshotFormatError(f"{path} has unsupported version {header.get('version')}")
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            shape = tuple(spec["shape"])
+            arrays[name] = np.frombuffer(
+                mapping, dtype=dtype, count=int(np.prod(shape)), offset=spec["offset"]
+            ).reshape(shape)
+        return MarkerSnapshot(
+            user_id=header["user_id"],
+            seq=header["seq"],
+            label_ids=header["label_ids"],
+            **arrays
+        )
+    except (struct.error, ValueError, KeyError, TypeError) as e:
+        raise SnapshotFormatError(f"{path} is corrupt: {e}") from None
+
+
+class SnapshotStore:
+    """
+    Per-user snapshot files, kept open and refreshed from the change sequence
+
+    Each refresh writes a new ``markers-<seq>.snap`` next to the previous
+    one instead of overwriting it, so readers that still map the old file
+    (another process, or Windows, which cannot replace a mapped file)
+    are unaffected; older files are removed once nothing holds them.
+
+    Example:
+        store = SnapshotStore(cache_dir)
+        snapshot = store.get(db, user_id)
+    """
+
+    def __init__(self, cache_dir: Path | str):
+        self.root = Path(cache_dir) / "snapshots"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._snapshots: dict[int, MarkerSnapshot] = {}
+
+    def path(self, user_id: int, seq: int) -> Path:
+        """Path of a user's snapshot at a sequence number"""
+        return self.root / str(user_id) / f"markers-{seq:012d}.snap"
+
+    def latest_path(self, user_id: int) -> Path | None:
+        """Path of a user's most recent snapshot file, if any"""
+        files = sorted((self.root / str(user_id)).glob("markers-*.snap"))
+        return files[-1] if files else None
+
+    def get(self, db: Session, user_id: int) -> MarkerSnapshot:
+        """
+        Get a user's up-to-date snapshot
+
+        Costs one indexed query when nothing changed; otherwise only the
+        changed markers are read and a new file is written.
+
+        Args:
+            db: Database session
+            user_id: User ID
+
+        Returns:
+            MarkerSnapshot at the user's latest change sequence number
+        """
+        with self._lock:
+            current = self._snapshots.get(user_id) or self._open(user_id)
+            if current is None:
+                snapshot = self._save(build_snapshot(db, user_id))
+            else:
+                snapshot = refresh_snapshot(db, current)
+                if snapshot is not current:
+                    snapshot = self._save(snapshot)
+            record_cache("snapshot", snapshot is current)
+            self._snapshots[user_id] = snapshot
+            return snapshot
+
+    def open(self, db: Session, user_id: int) -> tuple[MarkerSnapshot, BinaryIO]:
+        """
+        Get a user's up-to-date snapshot and open its file for reading
+
+        The file is opened while no refresh can remove it, so it stays
+        readable until closed.
+        """
+        with self._lock:
+            snapshot = self.get(db, user_id)
+            return snapshot, open(self.path(user_id, snapshot.seq), "rb")
+
+    def stats(self) -> dict:
+        """Number of open snapshots and markers, and the size of their mapped arrays"""
+        with self._lock:
+            snapshots = list(self._snapshots.values())
+        return {
+            "entries": len(snapshots),
+            "markers": sum(len(snapshot) for snapshot in snapshots),
+            "bytes": sum(snapshot.nbytes for snapshot in snapshots),
+        }
+
+    def discard(self, user_id: int) -> None:
+        """Forget a user's snapshot and delete its files"""
+        with self._lock:
+            self._snapshots.pop(user_id, None)
+            self._remove_older(user_id, keep=None)
+
+    def _open(self, user_id: int) -> MarkerSnapshot | None:
+        path = self.latest_path(user_id)
+        if path is None:
+            return None
+        try:
+            return read_snapshot(path)
+        except (OSError, SnapshotFormatError):
+            return None
+
+    def _save(self, snapshot: MarkerSnapshot) -> MarkerSnapshot:
+        """Write a snapshot and reopen it mapped, so its arrays live in the page cache"""
+        path = self.path(snapshot.user_id, snapshot.seq)
+        write_snapshot(snapshot, path)
+        self._remove_older(snapshot.user_id, keep=path)
+        return read_snapshot(path)
+
+    def _remove_older(self, user_id: int, keep: Path | None) -> None:
+        for path in (self.root / str(user_id)).glob("markers-*.snap"):
+            if path != keep:
+                try:
+                    path.unlink()
+                except OSError:
+                    # Still mapped on Windows: removed by a later refresh
+                    pass
+
+
+_store: SnapshotStore | None = None
+
+
+def get_snapshot_store() -> SnapshotStore:
+    """
+    Get the application snapshot store (in the user cache directory)
+
+    Usage in FastAPI:
+        @app.get("/all")
+        def get_all(snapshots: SnapshotStore = Depends(get_snapshot_store)):
+            ...
+    """
+    global _store
+    if _store is None:
+        from pymypersonalmap.gui.config_manager import ConfigManager
+        _store = SnapshotStore(ConfigManager().get_cache_dir())
+    return _store
+
+
+memory.register_cache("snapshot_store", lambda: _store.stats() if _store else None)
@@ -0,0 +1,100 @@
+"""
+SyncService - Business logic for incremental (delta) sync
+
+Turns the change sequence into compact deltas: clients send the last
+sequence number they have seen and receive only the markers and labels
+created, updated or deleted since then.
+"""
+
+from sqlalchemy.orm import Session
+from pymypersonalmap.repository import change_repository, labels_repository, marker_repository
+from pymypersonalmap.models.marker import MARKER_RESPONSE_FIELDS
+from pymypersonalmap.models.marker_change import ENTITY_MARKER, ENTITY_LABEL, OP_DELETE
+
+
+# Maximum number of change rows returned per call
+MAX_CHANGES_PER_PAGE = 1000
+
+
+def get_latest_seq(db: Session, user_id: int) -> int:
+    """Get the sequence number of a user's most recent change"""
+    return change_repository.get_latest_seq(db, user_id)
+
+
+def get_changes(
+    db: Session,
+    user_id: int,
+    since: int = 0,
+    limit: int = MAX_CHANGES_PER_PAGE
+) -> dict:
+    """
+    Get the deltas of a user's markers and labels since a sequence number
+
+    Multiple changes of the same entity collapse to its current state:
+    entities that still exist are returned in ``upserted``, entities whose
+    last change is a delete are returned as tombstones in ``deleted``.
+
+    Args:
+        db: Database session
+        user_id: User ID
+        since: Last sequence number the client has seen (0 for everything)
+        limit: Maximum number of change rows to consume
+
+    Returns:
+        Dictionary with ``since``, ``last_seq`` (pass it as the next ``since``),
+        ``has_more`` and per-entity ``upserted``/``deleted`` lists
+
+    Raises:
+        ValueError: If since or limit are invalid
+    """
+    if since < 0:
+        raise ValueError("since cannot be negative")
+    if not 1 <= limit <= MAX_CHANGES_PER_PAGE:
+        raise ValueError(f"Limit must be between 1 and {MAX_CHANGES_PER_PAGE}")
+
+    changes = change_repository.get_changes_since(db, user_id, since=since, limit=limit)
+
+    # Last operation per entity wins
+    last_op: dict[tuple[str, int], str] = {}
+    for _, entity, entity_id, operation in changes:
+        last_op[(entity, entity_id)] = operation
+
+    changed = {ENTITY_MARKER: [], ENTITY_LABEL: []}
+    deleted = {ENTITY_MARKER: [], ENTITY_LABEL: []}
+    for (entity, entity_id), operation in last_op.items():
+        if entity in changed:
+            (deleted if operation == OP_DELETE else changed)[entity].append(entity_id)
+
+    markers = []
+    marker_ids = sorted(changed[ENTITY_MARKER])
+    for start in range(0, len(marker_ids), marker_repository.IN_CLAUSE_CHUNK_SIZE):
+        markers += marker_repository.get_marker_dicts(
+            db=db,
+            fields=MARKER_RESPONSE_FIELDS,
+            user_id=user_id,
+            marker_ids=marker_ids[start:start + marker_repository.IN_CLAUSE_CHUNK_SIZE],
+            limit=None
+        )
+    # Changed in this page but deleted by a later change: report as tombstone
+    found = {marker['id'] for marker in markers}
+    deleted[ENTITY_MARKER] += [marker_id for marker_id in marker_ids if marker_id not in found]
+
+    labels = labels_repository.get_labels_by_ids(db, sorted(changed[ENTITY_LABEL]))
+    found = {label.idLabel for label in labels}
+    deleted[ENTITY_LABEL] += [
+        label_id for label_id in changed[ENTITY_LABEL] if label_id not in found
+    ]
+
+    return {
+        "since": since,
+        "last_seq": changes[-1][0] if changes else since,
+        "has_more": len(changes) == limit,
+        "markers": {
+            "upserted": markers,
+            "deleted": sorted(deleted[ENTITY_MARKER]),
+        },
+        "labels": {
+            "upserted": [label.to_dict() for label in labels],
+            "deleted": sorted(deleted[ENTITY_LABEL]),
+        },
+    }
@@ -0,0 +1,238 @@
+"""
+ThumbnailService - Cached thumbnails of attached photos
+
+Thumbnails are rendered in a process pool, never on the request thread:
+the JPEG decoder is asked for a downscaled image (``Image.draft``), which
+is then reduced to each size in turn, largest first. All sizes of a photo
+are produced in one pass and cached as
+``<cache_dir>/thumbnails/ab/<sha256>_<size>.jpg``; concurrent requests for
+the same photo wait on a single rendering.
+"""
+
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from pymypersonalmap.config.settings import THUMBNAIL_WORKERS
+from pymypersonalmap.utils import memory
+from pymypersonalmap.utils.metrics import record_cache
+from pymypersonalmap.utils.parallel import pool_context
+
+
+class ThumbnailError(Exception):
+    """Raised when a thumbnail cannot be rendered (e.g. not an image)"""
+    pass
+
+
+class ThumbnailTimeoutError(ThumbnailError):
+    """Raised when a rendering takes longer than RENDER_TIMEOUT"""
+    pass
+
+
+# Longest side in pixels: list view, marker popup, preview
+THUMBNAIL_SIZES = (128, 320, 800)
+
+THUMBNAIL_QUALITY = 85
+
+# Seconds a request waits for a rendering before giving up
+RENDER_TIMEOUT = 30
+
+
+def render_thumbnails(source: str, targets: list[tuple[int, str]]) -> list[int]:
+    """
+    Render thumbnails of an image file (runs in a worker process)
+
+    Args:
+        source: Path of the image
+        targets: (size, destination path) pairs
+
+    Returns:
+        Rendered sizes
+
+    Raises:
+        ThumbnailError: If the file is not a readable image
+    """
+    targets = sorted(targets, reverse=True)
+    try:
+        with Image.open(source) as image:
+            largest = targets[0][0]
+            # Let the JPEG decoder scale by 1/2..1/8 instead of decoding full size
+            image.draft("RGB", (largest, largest))
+            image = ImageOps.exif_transpose(image)
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+
+            for size, destination in targets:
+                # Each size is reduced from the previous, larger one
+                image.thumbnail((size, size), reducing_gap=2.0)
+                _save_atomically(image, Path(destination))
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise ThumbnailError(f"Cannot render thumbnail: {e}") from None
+    return [size for size, _ in targets]
+
+
+def _save_atomically(image: Image.Image, destination: Path) -> None:
+    """Write a JPEG to a temporary file and rename it into place"""
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=destination.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            image.save(tmp, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+        os.replace(tmp_name, destination)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+class ThumbnailGenerator:
+    """
+    Lazily rendered, disk-cached thumbnails with request coalescing
+
+    Example:
+        generator = ThumbnailGenerator(cache_dir)
+        path = generator.get(sha256, store.path(sha256), 320)
+    """
+
+    def __init__(self, cache_dir: Path | str, workers: int = THUMBNAIL_WORKERS):
+        self.root = Path(cache_dir) / "thumbnails"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.workers = max(workers, 1)
+        self._pool: ProcessPoolExecutor | None = None
+        # Reentrant: add_done_callback runs the callback at once, in the
+        # calling thread, if the rendering has already finished. Otherwise it
+        # runs in the pool's management thread, so the lock must never be
+        # held while waiting on the pool.
+        self._lock = threading.RLock()
+        self._inflight: dict[str, Future] = {}
+
+    def path(self, sha256: str, size: int) -> Path:
+        """Cache path of a thumbnail"""
+        return self.root / sha256[:2] / f"{sha256}_{size}.jpg"
+
+    def submit(self, sha256: str, source: Path | str) -> Future | None:
+        """
+        Render all sizes of a photo in the background
+
+        Returns:
+            The pending rendering (shared with concurrent callers), or None
+            if every size is already cached
+        """
+        targets = [
+            (size, str(self.path(sha256, size)))
+            for size in THUMBNAIL_SIZES
+            if not self.path(sha256, size).exists()
+        ]
+        if not targets:
+            return None
+
+        with self._lock:
+            future = self._inflight.get(sha256)
+            if future is None:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=pool_context()
+                    )
+                try:
+                    future = self._pool.submit(render_thumbnails, str(source), targets)
+                except BrokenProcessPool:
+                    # A worker died (e.g. killed for memory): start a new pool
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=pool_context()
+                    )
+                    future = self._pool.submit(render_thumbnails, str(source), targets)
+                self._inflight[sha256] = future
+                future.add_done_callback(lambda _: self._forget(sha256))
+        return future
+
+    def get(self, sha256: str, source: Path | str, size: int) -> Path:
+        """
+        Get the path of a thumbnail, rendering it on the first request
+
+        Args:
+            sha256: Content hash of the photo
+            source: Path of the photo
+            size: One of THUMBNAIL_SIZES
+
+        Returns:
+            Path of the cached JPEG
+
+        Raises:
+            ValueError: If the size is not supported
+            ThumbnailTimeoutError: If the rendering takes longer than RENDER_TIMEOUT
+            ThumbnailError: If the photo cannot be rendered
+        """
+        if size not in THUMBNAIL_SIZES:
+            raise ValueError(f"Unsupported thumbnail size {size}; use one of {THUMBNAIL_SIZES}")
+        path = self.path(sha256, size)
+        cached = path.exists()
+        record_cache("thumbnail", cached)
+        if cached:
+            return path
+
+        future = self.submit(sha256, source)
+        if future is not None:
+            try:
+                future.result(timeout=RENDER_TIMEOUT)
+            except FutureTimeoutError:
+                raise ThumbnailTimeoutError(
+                    f"Thumbnail not rendered within {RENDER_TIMEOUT} s"
+                ) from None
+            except BrokenProcessPool as e:
+                raise ThumbnailError(f"Thumbnail worker failed: {e}") from None
+        return path
+
+    def discard(self, sha256: str) -> None:
+        """Delete the cached thumbnails of a photo"""
+        for size in THUMBNAIL_SIZES:
+            self.path(sha256, size).unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        # Outside the lock: shutting down waits for done-callbacks that take it
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Number of renderings in progress"""
+        with self._lock:
+            return {"entries": len(self._inflight)}
+
+    def _forget(self, sha256: str) -> None:
+        with self._lock:
+            self._inflight.pop(sha256, None)
+
+
+_generator: ThumbnailGenerator | None = None
+
+
+def get_thumbnail_generator() -> ThumbnailGenerator:
+    """
+    Get the application thumbnail generator (cache in the user cache directory)
+
+    Usage in FastAPI:
+        @app.get("/thumb")
+        def thumb(thumbnails: ThumbnailGenerator = Depends(get_thumbnail_generator)):
+            ...
+    """
+    global _generator
+    if _generator is None:
+        from pymypersonalmap.gui.config_manager import ConfigManager
+        _generator = ThumbnailGenerator(ConfigManager().get_cache_dir())
+    return _generator
+
+
+def shutdown_thumbnail_generator() -> None:
+    """Stop the application thumbnail generator's worker processes"""
+    if _generator is not None:
+        _generator.shutdown()
+
+
+memory.register_cache("thumbnail_inflight", lambda: _generator.stats() if _generator else None)
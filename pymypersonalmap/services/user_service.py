@@ -2,12 +2,25 @@
 UserService - Business logic for user operations
 
 Handles user registration, authentication, password hashing, and user management.
+
+Password hashing and verification (bcrypt, 100-300 ms of CPU each) run
+in a bounded thread pool: at most PASSWORD_HASH_WORKERS at once, so a burst
+of logins cannot take every core from the other requests. The login
+endpoint is async and uses ``authenticate_user_async``: while bcrypt runs it
+waits on the event loop instead of holding a request thread as well.
 """
 
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
 from sqlalchemy.orm import Session
 from passlib.context import CryptContext
+from pymypersonalmap.config.settings import PASSWORD_HASH_MAX_QUEUE, PASSWORD_HASH_WORKERS
 from pymypersonalmap.repository import user_repository
 from pymypersonalmap.models.user import User
+from pymypersonalmap.utils import metrics
 
 
 # Password hashing context
@@ -29,31 +42,162 @@ class InvalidCredentialsError(Exception):
     pass
 
 
+class PasswordHasherBusyError(Exception):
+    """Raised when too many password hashes are already waiting for a thread"""
+    pass
+
+
+class PasswordHasher:
+    """
+    Bounded thread pool for password hashing and verification
+
+    bcrypt releases the GIL, so the threads use several cores while the
+    event loop and the other request threads keep running. Calls beyond
+    ``max_queue`` waiting ones are refused instead of piling up.
+
+    Args:
+        workers: Hashes computed at once
+        max_queue: Hashes allowed to wait for a thread (0 = unbounded)
+
+    Example:
+        hasher = PasswordHasher(workers=2)
+        valid = await hasher.verify_async("secret password", hashed)
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_queue: int = PASSWORD_HASH_MAX_QUEUE
+    ):
+        self.workers = max(workers, 1)
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._queued = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a thread"""
+        return self._queued
+
+    def submit(self, function: Callable, *args) -> Future:
+        """
+        Run ``function(*args)`` in the pool
+
+        Raises:
+            PasswordHasherBusyError: If ``max_queue`` calls are already waiting
+        """
+        with self._lock:
+            if self.max_queue and self._queued >= self.max_queue:
+                metrics.PASSWORD_HASH_REJECTED.inc()
+                raise PasswordHasherBusyError("Too many password checks in progress, retry later")
+            self._queued += 1
+            metrics.PASSWORD_HASH_QUEUE.inc()
+        try:
+            return self._executor.submit(self._run, function, args)
+        except RuntimeError:
+            # Shut down
+            self._dequeue()
+            raise
+
+    def _dequeue(self) -> None:
+        with self._lock:
+            self._queued -= 1
+            metrics.PASSWORD_HASH_QUEUE.dec()
+
+    def _run(self, function: Callable, args: tuple):
+        self._dequeue()
+        metrics.PASSWORD_HASH_IN_PROGRESS.inc()
+        try:
+            return function(*args)
+        finally:
+            metrics.PASSWORD_HASH_IN_PROGRESS.dec()
+
+    def hash(self, password: str) -> str:
+        return self.submit(pwd_context.hash, password).result()
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self.submit(pwd_context.verify, plain_password, hashed_password).result()
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(
+            self.submit(pwd_context.verify, plain_password, hashed_password)
+        )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_hasher: PasswordHasher | None = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Get the process-wide password hashing pool"""
+    global _hasher
+    if _hasher is None:
+        # Two pools would double the cap
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = PasswordHasher()
+    return _hasher
+
+
+def shutdown_password_hasher() -> None:
+    """Stop the password hashing threads"""
+    global _hasher
+    if _hasher is not None:
+        _hasher.shutdown()
+        _hasher = None
+
+
 def hash_password(password: str) -> str:
     """
     Hash a password using bcrypt
 
+    Runs in the password hashing pool; the calling thread waits.
+
     Args:
         password: Plain text password
 
     Returns:
         Hashed password
+
+    Raises:
+        PasswordHasherBusyError: If the hashing queue is full
     """
-    return pwd_context.hash(password)
+    return get_password_hasher().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a password against a hash
 
+    Runs in the password hashing pool; the calling thread waits.
+
     Args:
         plain_password: Plain text password to verify
         hashed_password: Hashed password to compare against
 
     Returns:
         True if password matches, False otherwise
+
+    Raises:
+        PasswordHasherBusyError: If the hashing queue is full
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_hasher().verify(plain_password, hashed_password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password without blocking the event loop (see ``verify_password``)"""
+    return await get_password_hasher().verify_async(plain_password, hashed_password)
+
+
+def _forget_cached_user(user_id: int) -> None:
+    """Make authentication reload a user whose status changed"""
+    # auth_service imports this module
+    from pymypersonalmap.services import auth_service
+    auth_service.invalidate_user(user_id)
 
 
 def create_user(
@@ -145,7 +289,41 @@ def authenticate_user(
 
     Raises:
         InvalidCredentialsError: If credentials are invalid
+        PasswordHasherBusyError: If the hashing queue is full
     """
+    user = _get_login_user(db, email)
+
+    if not verify_password(password, user.hashed_password):
+        raise InvalidCredentialsError("Invalid email or password")
+
+    return user
+
+
+async def authenticate_user_async(
+    db: Session,
+    email: str,
+    password: str
+) -> User:
+    """
+    Authenticate a user without blocking the event loop (see ``authenticate_user``)
+
+    The user is looked up in a worker thread, then the password check is
+    awaited in the hashing pool: no thread waits on bcrypt.
+
+    Raises:
+        InvalidCredentialsError: If credentials are invalid
+        PasswordHasherBusyError: If the hashing queue is full
+    """
+    user = await asyncio.to_thread(_get_login_user, db, email)
+
+    if not await verify_password_async(password, user.hashed_password):
+        raise InvalidCredentialsError("Invalid email or password")
+
+    return user
+
+
+def _get_login_user(db: Session, email: str) -> User:
+    """The active user with this email, or InvalidCredentialsError"""
     user = user_repository.get_user_by_email(db, email.strip().lower())
 
     if not user:
@@ -154,9 +332,6 @@ def authenticate_user(
     if not user.is_active:
         raise InvalidCredentialsError("User account is inactive")
 
-    if not verify_password(password, user.hashed_password):
-        raise InvalidCredentialsError("Invalid email or password")
-
     return user
 
 
@@ -378,6 +553,7 @@ def deactivate_user(db: Session, user_id: int) -> User:
         raise UserNotFoundError(f"User with ID {user_id} not found")
 
     db.commit()
+    _forget_cached_user(user_id)
     return updated
 
 
@@ -405,6 +581,7 @@ def activate_user(db: Session, user_id: int) -> User:
         raise UserNotFoundError(f"User with ID {user_id} not found")
 
     db.commit()
+    _forget_cached_user(user_id)
     return updated
 
 
@@ -412,7 +589,10 @@ def delete_user(db: Session, user_id: int) -> None:
     """
     Permanently delete a user
 
-    Warning: This will also delete all associated markers due to CASCADE.
+    Warning: This also deletes all their markers, attachments, custom labels
+    and changes, with batched set-based DELETEs committed one by one (see
+    services/account_deletion_service.py). Large accounts are better deleted
+    in the background with ``get_deletion_jobs().start``.
 
     Args:
         db: Database session
@@ -421,8 +601,5 @@ def delete_user(db: Session, user_id: int) -> None:
     Raises:
         UserNotFoundError: If user not found
     """
-    success = user_repository.delete_user(db, user_id)
-    if not success:
-        raise UserNotFoundError(f"User with ID {user_id} not found")
-
-    db.commit()
+    from pymypersonalmap.services import account_deletion_service
+    account_deletion_service.delete_account(db, user_id)
@@ -7,7 +7,9 @@ Shared fixtures for testing across the application.
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from pymypersonalmap.database.session import Base
+from sqlalchemy.pool import StaticPool
+from pymypersonalmap.database import query_monitor
+from pymypersonalmap.database.session import Base, instrument_engine
 from pymypersonalmap.models.user import User
 from pymypersonalmap.models.labels import Label
 from pymypersonalmap.models.marker import Marker
@@ -21,8 +23,17 @@ def test_db():
     This fixture creates a fresh database for each test function,
     ensuring test isolation.
     """
-    # Create in-memory SQLite database
-    engine = create_engine("sqlite:///:memory:", echo=False)
+    # Create in-memory SQLite database (one shared connection, usable from
+    # the threads FastAPI runs sync endpoints in)
+    engine = create_engine(
+        "sqlite:///:memory:",
+        echo=False,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+
+    # Count statements like the application engine (query budgets, metrics)
+    instrument_engine(engine)
 
     # Create all tables
     Base.metadata.create_all(bind=engine)
@@ -40,6 +51,74 @@ def test_db():
     Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(scope="function")
+def blob_store(tmp_path):
+    """Attachment blob store in a temporary directory"""
+    from pymypersonalmap.services.blob_store import BlobStore
+    return BlobStore(tmp_path / "attachments")
+
+
+@pytest.fixture(scope="function")
+def thumbnail_generator(tmp_path):
+    """Thumbnail generator caching in a temporary directory"""
+    from pymypersonalmap.services.thumbnail_service import ThumbnailGenerator
+    generator = ThumbnailGenerator(tmp_path / "cache", workers=1)
+    yield generator
+    generator.shutdown()
+
+
+@pytest.fixture(scope="function")
+def snapshot_store(tmp_path):
+    """Marker snapshot store in a temporary directory"""
+    from pymypersonalmap.services.snapshot_service import SnapshotStore
+    return SnapshotStore(tmp_path / "cache")
+
+
+@pytest.fixture(scope="function")
+def client(test_db, blob_store, thumbnail_generator, snapshot_store):
+    """
+    FastAPI TestClient bound to the test database
+
+    Each request gets its own session on the same in-memory database;
+    attachments, thumbnails and snapshots go to temporary directories.
+
+    Requests act as the user in their ``user_id`` query parameter instead
+    of carrying a token; authentication itself is tested in test_api_auth.py.
+    """
+    from fastapi import Query
+    from fastapi.testclient import TestClient
+    from pymypersonalmap.main import app
+    from pymypersonalmap.api.dependencies import get_current_user_id
+    from pymypersonalmap.database.session import get_db, get_session_factory
+    from pymypersonalmap.services import auth_service
+    from pymypersonalmap.services.attachment_service import get_blob_store
+    from pymypersonalmap.services.thumbnail_service import get_thumbnail_generator
+    from pymypersonalmap.services.snapshot_service import get_snapshot_store
+
+    TestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_db.get_bind())
+
+    def override_get_db():
+        db = TestSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def user_id_from_query(user_id: int = Query(..., ge=1)) -> int:
+        return user_id
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user_id] = user_id_from_query
+    app.dependency_overrides[get_session_factory] = lambda: TestSessionLocal
+    app.dependency_overrides[get_blob_store] = lambda: blob_store
+    app.dependency_overrides[get_thumbnail_generator] = lambda: thumbnail_generator
+    app.dependency_overrides[get_snapshot_store] = lambda: snapshot_store
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    # User IDs restart in every test database
+    auth_service.clear_cache()
+
+
 @pytest.fixture(scope="function")
 def sample_user(test_db):
     """Create a sample user for testing"""
@@ -88,3 +167,9 @@ def sample_marker(test_db, sample_user):
     test_db.commit()
     test_db.refresh(marker)
     return marker
+
+
+@pytest.fixture(autouse=True)
+def strict_query_budgets(monkeypatch):
+    """Requests over their statement budget fail the test instead of logging"""
+    monkeypatch.setattr(query_monitor, "strict", True)
@@ -0,0 +1,102 @@
+"""
+Test Admin API
+
+Tests for the memory diagnostics endpoints (/api/v1/admin/memory) and
+account deletion (/api/v1/admin/users).
+"""
+
+import tracemalloc
+
+import pytest
+
+from pymypersonalmap.config import settings
+from pymypersonalmap.services.account_deletion_service import (
+    get_deletion_jobs, shutdown_deletion_jobs
+)
+
+TOKEN = {"X-Admin-Token": "s3cret"}
+
+# Allocations made between two snapshots, kept alive until the diff
+_retained = []
+
+
+@pytest.fixture
+def admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    yield
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _retained.clear()
+    shutdown_deletion_jobs()
+
+
+def test_admin_endpoints_are_disabled_without_token(client):
+    """Test the endpoints do not exist while ADMIN_TOKEN is unset"""
+    assert client.get("/api/v1/admin/memory", headers=TOKEN).status_code == 404
+
+
+def test_admin_endpoints_require_the_token(client, admin_token):
+    """Test a missing or wrong token is refused"""
+    assert client.get("/api/v1/admin/memory").status_code == 403
+    response = client.get("/api/v1/admin/memory", headers={"X-Admin-Token": "guess"})
+    assert response.status_code == 403
+
+
+def test_cache_report(client, admin_token, sample_user):
+    """Test the report lists the caches and indexes with their entries"""
+    client.get("/api/v1/markers", params={"user_id": sample_user.idUser})
+
+    report = client.get("/api/v1/admin/memory", headers=TOKEN).json()
+
+    assert report["resident_bytes"] > 0
+    caches = report["caches"]
+    assert {"marker_index", "snapshot_store", "thumbnail_inflight"} <= set(caches)
+    assert caches["orm_identity_maps"]["sessions"] >= 1
+    assert caches["sql_compiled_cache"]["capacity"] > 0
+
+
+def test_snapshot_diff_groups_growth_by_line(client, admin_token):
+    """Test allocations made between two snapshots are reported at their line"""
+    assert client.post("/api/v1/admin/memory/snapshots", headers=TOKEN).status_code == 409
+
+    status = client.post("/api/v1/admin/memory/tracing/start", headers=TOKEN).json()
+    assert status["tracing"] is True
+    first = client.post("/api/v1/admin/memory/snapshots", headers=TOKEN).json()["id"]
+    _retained.extend(bytearray(1024) for _ in range(2000))
+    second = client.post("/api/v1/admin/memory/snapshots", headers=TOKEN).json()["id"]
+
+    diff = client.get(
+        f"/api/v1/admin/memory/snapshots/{first}/diff/{second}", headers=TOKEN
+    ).json()
+
+    top = diff["lines"][0]
+    assert top["file"] == __file__
+    assert top["size_diff"] > 2000 * 1024
+    assert top["count_diff"] >= 2000
+    response = client.get(f"/api/v1/admin/memory/snapshots/{first}/diff/999", headers=TOKEN)
+    assert response.status_code == 404
+
+    status = client.post("/api/v1/admin/memory/tracing/stop", headers=TOKEN).json()
+    assert status == {
+        "tracing": False, "frames": 0, "traced_bytes": 0, "peak_traced_bytes": 0,
+        "snapshots": [],
+    }
+
+
+def test_delete_user_in_background(client, admin_token, test_db, sample_marker):
+    """Test the deletion is queued, then polled until done"""
+    user_id = sample_marker.user_id
+    assert client.delete("/api/v1/admin/users/999", headers=TOKEN).status_code == 404
+
+    response = client.delete(f"/api/v1/admin/users/{user_id}", headers=TOKEN)
+
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    assert get_deletion_jobs().get(job_id).wait(10)
+    job = client.get(f"/api/v1/admin/users/deletions/{job_id}", headers=TOKEN).json()
+    assert job["state"] == "done"
+    assert job["deleted"]["markers"] == 1
+    listed = client.get("/api/v1/admin/users/deletions", headers=TOKEN).json()["jobs"]
+    assert job_id in [listed_job["id"] for listed_job in listed]
+    assert client.get("/api/v1/admin/users/deletions/nope", headers=TOKEN).status_code == 404
+    assert client.get("/api/v1/markers", params={"user_id": user_id}).json()["total"] == 0
@@ -0,0 +1,166 @@
+"""
+Test Attachments API
+
+Tests for upload, download with range requests, thumbnails and deletion
+of attachments.
+"""
+
+import io
+
+import pytest
+from PIL import Image
+
+
+DATA = bytes(range(256)) * 40
+
+
+@pytest.fixture(scope="function")
+def attachment(client, sample_user, sample_marker):
+    """Upload an attachment through the API"""
+    response = client.post(
+        f"/api/v1/markers/{sample_marker.idMarker}/attachments",
+        params={"user_id": sample_user.idUser},
+        files={"file": ("photo è.jpg", DATA, "image/jpeg")},
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def _get(client, sample_user, attachment, **headers):
+    return client.get(
+        f"/api/v1/attachments/{attachment['id']}",
+        params={"user_id": sample_user.idUser},
+        headers=headers,
+    )
+
+
+def test_upload_and_list(client, sample_user, sample_marker, attachment):
+    """Test the uploaded file is recorded and listed on its marker"""
+    assert attachment["size"] == len(DATA)
+    assert attachment["content_type"] == "image/jpeg"
+
+    response = client.get(
+        f"/api/v1/markers/{sample_marker.idMarker}/attachments",
+        params={"user_id": sample_user.idUser},
+    )
+
+    assert response.status_code == 200
+    assert [a["id"] for a in response.json()] == [attachment["id"]]
+
+
+def test_upload_to_missing_marker(client, sample_user):
+    """Test uploading to a missing marker returns 404"""
+    response = client.post(
+        "/api/v1/markers/999/attachments",
+        params={"user_id": sample_user.idUser},
+        files={"file": ("a.jpg", b"x", "image/jpeg")},
+    )
+    assert response.status_code == 404
+
+
+def test_download_html_as_file(client, sample_user, sample_marker):
+    """Test types that could run script are served as downloads"""
+    uploaded = client.post(
+        f"/api/v1/markers/{sample_marker.idMarker}/attachments",
+        params={"user_id": sample_user.idUser},
+        files={"file": ("page.html", b"<script>alert(1)</script>", "text/html")},
+    ).json()
+
+    response = _get(client, sample_user, uploaded)
+
+    assert response.headers["content-disposition"].startswith("attachment;")
+    assert response.headers["x-content-type-options"] == "nosniff"
+
+
+def test_download(client, sample_user, attachment):
+    """Test the full content is served with validators"""
+    response = _get(client, sample_user, attachment)
+
+    assert response.status_code == 200
+    assert response.content == DATA
+    assert response.headers["etag"] == f'"{attachment["sha256"]}"'
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["content-disposition"].startswith("inline;")
+    assert "photo%20%C3%A8.jpg" in response.headers["content-disposition"]
+    assert response.headers["x-content-type-options"] == "nosniff"
+
+    cached = _get(client, sample_user, attachment, **{"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=0-99", 0, 99),
+    ("bytes=10000-", 10000, len(DATA) - 1),
+    ("bytes=-100", len(DATA) - 100, len(DATA) - 1),
+    ("bytes=5000-999999", 5000, len(DATA) - 1),
+])
+def test_range_request(client, sample_user, attachment, header, start, end):
+    """Test single byte ranges are served as 206 Partial Content"""
+    response = _get(client, sample_user, attachment, Range=header)
+
+    assert response.status_code == 206
+    assert response.content == DATA[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(DATA)}"
+
+
+def test_unsatisfiable_range(client, sample_user, attachment):
+    """Test a range past the end returns 416"""
+    response = _get(client, sample_user, attachment, Range=f"bytes={len(DATA)}-")
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(DATA)}"
+
+
+def test_if_range_mismatch_returns_full_content(client, sample_user, attachment):
+    """Test a stale If-Range validator yields the whole file"""
+    response = _get(client, sample_user, attachment, Range="bytes=0-9", **{"If-Range": '"stale"'})
+
+    assert response.status_code == 200
+    assert response.content == DATA
+
+
+def test_delete(client, sample_user, attachment, blob_store):
+    """Test deleting the only reference removes the content"""
+    response = client.delete(
+        f"/api/v1/attachments/{attachment['id']}", params={"user_id": sample_user.idUser}
+    )
+
+    assert response.status_code == 204
+    assert not blob_store.exists(attachment["sha256"])
+    assert _get(client, sample_user, attachment).status_code == 404
+
+
+def test_thumbnail(client, sample_user, sample_marker):
+    """Test photo thumbnails are rendered, cached and revalidated"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (1600, 1200), "green").save(buffer, "JPEG")
+    attachment = client.post(
+        f"/api/v1/markers/{sample_marker.idMarker}/attachments",
+        params={"user_id": sample_user.idUser},
+        files={"file": ("big.jpg", buffer.getvalue(), "image/jpeg")},
+    ).json()
+    url = f"/api/v1/attachments/{attachment['id']}/thumbnail"
+
+    response = client.get(url, params={"user_id": sample_user.idUser, "size": 128})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert "immutable" in response.headers["cache-control"]
+    with Image.open(io.BytesIO(response.content)) as image:
+        assert image.size == (128, 96)
+
+    cached = client.get(
+        url, params={"user_id": sample_user.idUser, "size": 128},
+        headers={"If-None-Match": response.headers["etag"]},
+    )
+    assert cached.status_code == 304
+    assert client.get(url, params={"user_id": sample_user.idUser, "size": 50}).status_code == 400
+
+
+def test_thumbnail_of_non_image(client, sample_user, attachment):
+    """Test thumbnails of files that are not images return 415"""
+    response = client.get(
+        f"/api/v1/attachments/{attachment['id']}/thumbnail", params={"user_id": sample_user.idUser}
+    )
+    assert response.status_code == 415
@@ -0,0 +1,96 @@
+"""
+Test Auth API
+
+Tests for JWT login, refresh and the bearer token dependency.
+"""
+
+import pytest
+from sqlalchemy import event
+
+from pymypersonalmap.api.dependencies import get_current_user_id
+from pymypersonalmap.config import settings
+from pymypersonalmap.main import app
+from pymypersonalmap.services import user_service
+
+PASSWORD = "correct horse battery"
+
+
+@pytest.fixture
+def auth_client(client, monkeypatch):
+    """Client going through the real token authentication"""
+    monkeypatch.setattr(settings, "SECRET_KEY", "test-secret-key")
+    app.dependency_overrides.pop(get_current_user_id)
+    return client
+
+
+@pytest.fixture
+def account(test_db):
+    return user_service.create_user(test_db, "ada@example.com", "ada", PASSWORD)
+
+
+def _login(client, email="ada@example.com", password=PASSWORD):
+    return client.post("/api/v1/auth/token", data={"username": email, "password": password})
+
+
+def _bearer(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def test_authenticated_requests_cost_no_query(auth_client, test_db, account):
+    """Test the token and user snapshot are cached from login on"""
+    tokens = _login(auth_client).json()
+    user_id = account.idUser
+    statements = []
+    event.listen(test_db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    response = auth_client.get("/api/v1/auth/me", headers=_bearer(tokens))
+
+    assert response.json() == {"id": user_id, "is_active": True, "is_admin": False}
+    assert statements == []
+    markers = auth_client.get("/api/v1/markers", headers=_bearer(tokens))
+    assert markers.status_code == 200
+
+
+def test_requests_without_valid_token_are_refused(auth_client, account):
+    """Test missing, forged and refresh tokens are not accepted, nor a user_id parameter"""
+    refresh_token = _login(auth_client).json()["refresh_token"]
+
+    response = auth_client.get("/api/v1/markers", params={"user_id": account.idUser})
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+    forged = {"Authorization": "Bearer not.a.token"}
+    assert auth_client.get("/api/v1/markers", headers=forged).status_code == 401
+    as_access = {"Authorization": f"Bearer {refresh_token}"}
+    assert auth_client.get("/api/v1/markers", headers=as_access).status_code == 401
+    assert _login(auth_client, password="wrong password").status_code == 401
+
+
+def test_refresh_issues_new_tokens(auth_client, account):
+    """Test a refresh token buys a new pair, and an access token does not"""
+    tokens = _login(auth_client).json()
+
+    refreshed = auth_client.post(
+        "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    ).json()
+
+    assert refreshed["access_token"] != tokens["access_token"]
+    assert auth_client.get("/api/v1/auth/me", headers=_bearer(refreshed)).status_code == 200
+    response = auth_client.post(
+        "/api/v1/auth/refresh", json={"refresh_token": tokens["access_token"]}
+    )
+    assert response.status_code == 401
+
+
+def test_deactivation_revokes_access_at_once(auth_client, test_db, account):
+    """Test deactivating a user drops the cached snapshot, so its tokens stop working"""
+    tokens = _login(auth_client).json()
+    assert auth_client.get("/api/v1/auth/me", headers=_bearer(tokens)).status_code == 200
+
+    user_service.deactivate_user(test_db, account.idUser)
+
+    assert auth_client.get("/api/v1/auth/me", headers=_bearer(tokens)).status_code == 401
+    response = auth_client.post(
+        "/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+    )
+    assert response.status_code == 401
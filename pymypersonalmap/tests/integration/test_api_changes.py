@@ -0,0 +1,179 @@
+"""
+Test Change Feed API
+
+Tests for delta sync (GET /api/v1/changes) and ETags on list endpoints.
+"""
+
+from pymypersonalmap.models.marker import Marker
+from pymypersonalmap.models.marker_change import ENTITY_MARKER, OP_UPDATE
+from pymypersonalmap.models.user import User
+from pymypersonalmap.repository import marker_repository, labels_repository, change_repository
+
+
+class TestChangeFeed:
+    """Tests for GET /api/v1/changes"""
+
+    def test_full_sync_and_deltas(self, client, test_db, sample_user):
+        """Test a client only receives what changed since its last sequence"""
+        user_id = sample_user.idUser
+        first = marker_repository.create_marker(test_db, "First", 45.0, 9.0, user_id)
+        second = marker_repository.create_marker(test_db, "Second", 46.0, 10.0, user_id)
+        first_id, second_id = first.idMarker, second.idMarker
+
+        full = client.get("/api/v1/changes", params={"user_id": user_id}).json()
+        assert [m["title"] for m in full["markers"]["upserted"]] == ["First", "Second"]
+        assert full["has_more"] is False
+
+        marker_repository.update_owned_marker(test_db, first_id, user_id, title="Renamed")
+        marker_repository.delete_owned_marker(test_db, second_id, user_id)
+
+        delta = client.get("/api/v1/changes", params={
+            "user_id": user_id, "since": full["last_seq"]
+        }).json()
+        assert [m["title"] for m in delta["markers"]["upserted"]] == ["Renamed"]
+        assert delta["markers"]["deleted"] == [second_id]
+        assert delta["last_seq"] > full["last_seq"]
+
+        empty = client.get("/api/v1/changes", params={
+            "user_id": user_id, "since": delta["last_seq"]
+        }).json()
+        assert empty["markers"] == {"upserted": [], "deleted": []}
+        assert empty["last_seq"] == delta["last_seq"]
+
+    def test_seeded_feed_returns_existing_data(self, client, test_db, sample_user, sample_marker):
+        """Test markers and labels predating the change table are in a full sync once seeded"""
+        user_id = sample_user.idUser
+        custom_id = labels_repository.create_label(test_db, "Mine", created_by=user_id).idLabel
+        test_db.commit()
+        before = client.get("/api/v1/changes", params={"user_id": user_id}).json()
+        assert before["markers"]["upserted"] == []
+
+        assert change_repository.seed_changes(test_db) == 2
+        test_db.commit()
+
+        full = client.get("/api/v1/changes", params={"user_id": user_id}).json()
+        assert [m["id"] for m in full["markers"]["upserted"]] == [sample_marker.idMarker]
+        assert [label["id"] for label in full["labels"]["upserted"]] == [custom_id]
+
+    def test_create_then_delete_is_tombstone(self, client, test_db, sample_user):
+        """Test an entity created and deleted in the same page is a tombstone"""
+        user_id = sample_user.idUser
+        marker_id = marker_repository.create_marker(test_db, "Temp", 45.0, 9.0, user_id).idMarker
+        marker_repository.delete_owned_marker(test_db, marker_id, user_id)
+
+        body = client.get("/api/v1/changes", params={"user_id": user_id}).json()
+        assert body["markers"] == {"upserted": [], "deleted": [marker_id]}
+
+    def test_label_changes(self, client, test_db, sample_user):
+        """Test custom label create/delete and association changes are in the feed"""
+        user_id = sample_user.idUser
+        marker_id = marker_repository.create_marker(test_db, "Spot", 45.0, 9.0, user_id).idMarker
+        label = labels_repository.create_label(test_db, "Mine", created_by=user_id)
+        test_db.commit()
+        label_id = label.idLabel
+        since = client.get("/api/v1/changes", params={"user_id": user_id}).json()["last_seq"]
+
+        marker_repository.add_label_to_marker(test_db, marker_id, label_id)
+        delta = client.get("/api/v1/changes", params={"user_id": user_id, "since": since}).json()
+        assert delta["markers"]["upserted"][0]["labels"] == ["Mine"]
+
+        labels_repository.delete_label(test_db, label_id)
+        test_db.commit()
+        delta = client.get("/api/v1/changes", params={
+            "user_id": user_id, "since": delta["last_seq"]
+        }).json()
+        assert delta["labels"]["deleted"] == [label_id]
+        assert delta["markers"]["upserted"][0]["labels"] == []
+
+    def test_label_delete_records_marker_changes_per_owner(self, test_db, sample_user):
+        """Test deleting a label records its markers' changes without loading them"""
+        other = User(username="other", email="other@example.com", hashed_password="-")
+        test_db.add(other)
+        test_db.commit()
+        label_id = labels_repository.create_label(
+            test_db, "Shared", created_by=sample_user.idUser
+        ).idLabel
+        owned = {}
+        for user_id, count in ((sample_user.idUser, 3), (other.idUser, 2)):
+            owned[user_id] = marker_repository.bulk_create_markers(test_db, user_id, [
+                {"title": f"M{i}", "latitude": 45.0, "longitude": 9.0, "label_ids": [label_id]}
+                for i in range(count)
+            ])
+        seqs = {user_id: change_repository.get_latest_seq(test_db, user_id) for user_id in owned}
+        test_db.expunge_all()
+
+        assert labels_repository.delete_label(test_db, label_id)
+        test_db.commit()
+
+        assert not any(isinstance(obj, Marker) for obj in test_db.identity_map.values())
+        for user_id, marker_ids in owned.items():
+            changes = change_repository.get_changes_since(test_db, user_id, seqs[user_id])
+            updated = [entity_id for _, entity, entity_id, operation in changes
+                       if entity == ENTITY_MARKER and operation == OP_UPDATE]
+            assert sorted(updated) == sorted(marker_ids)
+        assert labels_repository.count_markers_with_label(test_db, label_id) == 0
+
+    def test_paging(self, client, test_db, sample_user):
+        """Test has_more and last_seq allow paging through the feed"""
+        user_id = sample_user.idUser
+        for i in range(3):
+            marker_repository.create_marker(test_db, f"M{i}", 45.0, 9.0, user_id)
+
+        page = client.get("/api/v1/changes", params={"user_id": user_id, "limit": 2}).json()
+        assert page["has_more"] is True
+        assert len(page["markers"]["upserted"]) == 2
+
+        rest = client.get("/api/v1/changes", params={
+            "user_id": user_id, "limit": 2, "since": page["last_seq"]
+        }).json()
+        assert rest["has_more"] is False
+        assert [m["title"] for m in rest["markers"]["upserted"]] == ["M2"]
+
+    def test_other_users_changes_are_hidden(self, client, test_db, sample_user):
+        """Test the feed is scoped to the user"""
+        marker_repository.create_marker(test_db, "Mine", 45.0, 9.0, sample_user.idUser)
+
+        body = client.get("/api/v1/changes", params={"user_id": sample_user.idUser + 1}).json()
+        assert body["markers"]["upserted"] == []
+        assert body["last_seq"] == 0
+
+
+class TestETags:
+    """Tests for conditional GET on list endpoints"""
+
+    def test_markers_not_modified(self, client, test_db, sample_user):
+        """Test If-None-Match returns 304 until the data changes"""
+        user_id = sample_user.idUser
+        marker = marker_repository.create_marker(test_db, "Spot", 45.0, 9.0, user_id)
+        marker_id = marker.idMarker
+        params = {"user_id": user_id}
+
+        first = client.get("/api/v1/markers", params=params)
+        etag = first.headers["ETag"]
+        assert first.status_code == 200
+
+        cached = client.get("/api/v1/markers", params=params, headers={"If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+        marker_repository.update_owned_marker(test_db, marker_id, user_id, title="Changed")
+        fresh = client.get("/api/v1/markers", params=params, headers={"If-None-Match": etag})
+        assert fresh.status_code == 200
+        assert fresh.headers["ETag"] != etag
+
+    def test_etag_depends_on_query(self, client, sample_user):
+        """Test different query strings get different ETags"""
+        base = {"user_id": sample_user.idUser}
+        all_fields = client.get("/api/v1/markers", params=base).headers["ETag"]
+        sparse = client.get("/api/v1/markers", params={**base, "fields": "id"}).headers["ETag"]
+        assert all_fields != sparse
+
+    def test_labels_not_modified(self, client, sample_user, sample_labels):
+        """Test labels list supports If-None-Match"""
+        params = {"user_id": sample_user.idUser}
+        first = client.get("/api/v1/labels", params=params)
+        assert {label["name"] for label in first.json()["labels"]} >= {"Urbex", "Restaurant"}
+
+        cached = client.get("/api/v1/labels", params=params,
+                            headers={"If-None-Match": first.headers["ETag"]})
+        assert cached.status_code == 304
@@ -0,0 +1,156 @@
+"""
+Test Export API
+
+Tests for the streaming export endpoint and serializers.
+"""
+
+import csv
+import io
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+from pymypersonalmap.models.marker import Marker
+from pymypersonalmap.repository import marker_repository
+from pymypersonalmap.services import export_service, import_service
+
+
+@pytest.fixture(scope="function")
+def export_markers(test_db, sample_user, sample_labels):
+    """Create markers with details and labels"""
+    markers = [
+        Marker(title="Duomo & Piazza", description="Gothic <cathedral>", address="Milano",
+               latitude=45.4642, longitude=9.1900, is_favorite=True, user_id=sample_user.idUser),
+        Marker(title="Navigli", latitude=45.4520, longitude=9.1750, user_id=sample_user.idUser),
+        Marker(title="Colosseo", latitude=41.8902, longitude=12.4922, user_id=sample_user.idUser),
+    ]
+    markers[0].labels = [sample_labels[0], sample_labels[2]]
+    test_db.add_all(markers)
+    test_db.commit()
+    return markers
+
+
+class TestIterMarkerBatches:
+    """Tests for marker_repository.iter_marker_batches"""
+
+    def test_batches(self, test_db, sample_user, export_markers):
+        """Test markers are streamed in batches of the requested size"""
+        batches = list(marker_repository.iter_marker_batches(
+            test_db, sample_user.idUser, batch_size=2
+        ))
+
+        assert [len(batch) for batch in batches] == [2, 1]
+        assert batches[0][0]["labels"] == ["Urbex", "Photo Spot"]
+        assert batches[0][0]["description"] == "Gothic <cathedral>"
+
+    def test_without_details(self, test_db, sample_user, export_markers):
+        """Test deferred columns are dropped when details are not requested"""
+        batch = next(marker_repository.iter_marker_batches(
+            test_db, sample_user.idUser, with_details=False
+        ))
+        assert "description" not in batch[0]
+        assert "metadata" not in batch[0]
+
+
+class TestExportEndpoint:
+    """Tests for GET /api/v1/export/{format}"""
+
+    def test_geojson(self, client, sample_user, export_markers):
+        """Test GeoJSON FeatureCollection export"""
+        response = client.get("/api/v1/export/geojson", params={"user_id": sample_user.idUser})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/geo+json")
+        assert "markers_export.geojson" in response.headers["content-disposition"]
+        body = response.json()
+        assert body["type"] == "FeatureCollection"
+        assert len(body["features"]) == 3
+        feature = body["features"][0]
+        assert feature["geometry"]["coordinates"] == [9.19, 45.4642]
+        assert feature["properties"]["name"] == "Duomo & Piazza"
+        assert feature["properties"]["labels"] == ["Urbex", "Photo Spot"]
+
+    def test_geojson_empty(self, client, sample_user):
+        """Test an empty library still produces valid GeoJSON"""
+        response = client.get("/api/v1/export/geojson", params={"user_id": sample_user.idUser})
+        assert response.json() == {"type": "FeatureCollection", "features": []}
+
+    def test_ndjson(self, client, sample_user, export_markers):
+        """Test one feature per line"""
+        response = client.get("/api/v1/export/ndjson", params={"user_id": sample_user.idUser})
+
+        lines = response.text.splitlines()
+        assert len(lines) == 3
+        assert json.loads(lines[2])["properties"]["name"] == "Colosseo"
+
+    def test_csv(self, client, sample_user, export_markers):
+        """Test CSV export with header"""
+        response = client.get("/api/v1/export/csv", params={"user_id": sample_user.idUser})
+
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 3
+        assert rows[0]["name"] == "Duomo & Piazza"
+        assert rows[0]["labels"] == "Urbex,Photo Spot"
+        assert rows[0]["is_favorite"] == "true"
+        assert rows[1]["description"] == ""
+
+    def test_gpx(self, client, sample_user, export_markers):
+        """Test GPX export is well-formed and escaped"""
+        response = client.get("/api/v1/export/gpx", params={"user_id": sample_user.idUser})
+
+        root = ET.fromstring(response.content)
+        ns = {"gpx": "http://www.topografix.com/GPX/1/1"}
+        waypoints = root.findall("gpx:wpt", ns)
+        assert len(waypoints) == 3
+        assert waypoints[0].get("lat") == "45.4642"
+        assert waypoints[0].find("gpx:name", ns).text == "Duomo & Piazza"
+        assert waypoints[0].find("gpx:desc", ns).text == "Gothic <cathedral>"
+
+    def test_gpx_labels(self, client, sample_user, export_markers):
+        """Test one <type> per waypoint, the full label list in the extensions, and re-import"""
+        response = client.get("/api/v1/export/gpx", params={"user_id": sample_user.idUser})
+
+        ns = {
+            "gpx": "http://www.topografix.com/GPX/1/1",
+            "mpm": export_service.GPX_EXTENSIONS_NAMESPACE,
+        }
+        waypoint = ET.fromstring(response.content).find("gpx:wpt", ns)
+        assert [t.text for t in waypoint.findall("gpx:type", ns)] == ["Urbex, Photo Spot"]
+        labels = waypoint.findall("gpx:extensions/mpm:labels/mpm:label", ns)
+        assert [label.text for label in labels] == ["Urbex", "Photo Spot"]
+
+        records = list(import_service.parse_gpx(io.BytesIO(response.content)))
+        assert records[0][1]['labels'] == ["Urbex", "Photo Spot"]
+
+    def test_label_filter(self, client, sample_user, sample_labels, export_markers):
+        """Test exporting only markers with a label"""
+        response = client.get("/api/v1/export/ndjson", params={
+            "user_id": sample_user.idUser,
+            "label_ids": str(sample_labels[0].idLabel),
+        })
+        assert len(response.text.splitlines()) == 1
+
+    def test_other_users_markers_excluded(self, client, sample_user, export_markers):
+        """Test only the requesting user's markers are exported"""
+        response = client.get("/api/v1/export/ndjson", params={"user_id": sample_user.idUser + 1})
+        assert response.text == ""
+
+    def test_unsupported_format(self, client, sample_user):
+        """Test unknown formats are rejected"""
+        response = client.get("/api/v1/export/kml", params={"user_id": sample_user.idUser})
+        assert response.status_code == 400
+
+
+def test_serializers_stream_per_batch():
+    """Test serializers emit a chunk per batch instead of buffering everything"""
+    marker = {
+        "id": 1, "title": "A", "latitude": 1.0, "longitude": 2.0, "description": None,
+        "address": None, "metadata": None, "labels": [], "is_favorite": False,
+        "created_at": None, "updated_at": None,
+    }
+    batches = [[marker], [dict(marker, id=2)]]
+
+    assert len(list(export_service.geojson_chunks(batches))) == 4
+    assert len(list(export_service.ndjson_chunks(batches))) == 2
+    assert len(list(export_service.csv_chunks(batches))) == 3
+    assert len(list(export_service.gpx_chunks(batches))) == 4
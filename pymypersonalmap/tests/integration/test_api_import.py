@@ -0,0 +1,110 @@
+"""
+Test Import API
+
+Tests for the file upload import endpoint.
+"""
+
+from pymypersonalmap.api.routes import imports
+from pymypersonalmap.services import import_service
+
+
+def test_import_csv(client, sample_user):
+    """Test a CSV upload is imported and reported"""
+    data = b"name,latitude,longitude\nDuomo,45.4642,9.19\nBroken,abc,9.19\n"
+
+    response = client.post(
+        "/api/v1/import/csv",
+        params={"user_id": sample_user.idUser},
+        files={"file": ("markers.csv", data, "text/csv")},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["imported"] == 1
+    assert body["failed"] == 1
+    assert body["errors"][0]["row"] == 3
+
+    markers = client.get("/api/v1/markers", params={"user_id": sample_user.idUser}).json()
+    assert markers["markers"][0]["title"] == "Duomo"
+
+
+def test_export_import_round_trip(client, sample_user, sample_marker):
+    """Test a GeoJSON export can be imported back"""
+    exported = client.get("/api/v1/export/geojson", params={"user_id": sample_user.idUser}).content
+
+    response = client.post(
+        "/api/v1/import/geojson",
+        params={"user_id": sample_user.idUser},
+        files={"file": ("markers.geojson", exported, "application/geo+json")},
+    )
+
+    assert response.json()["imported"] == 1
+    titles = [m["title"] for m in client.get(
+        "/api/v1/markers", params={"user_id": sample_user.idUser}
+    ).json()["markers"]]
+    assert titles == [sample_marker.title, sample_marker.title]
+
+
+def test_unsupported_format(client, sample_user):
+    """Test unknown formats are rejected"""
+    response = client.post(
+        "/api/v1/import/shp",
+        params={"user_id": sample_user.idUser},
+        files={"file": ("a.shp", b"x")},
+    )
+    assert response.status_code == 400
+
+
+def test_upload_too_large(client, sample_user, monkeypatch):
+    """Test uploads over MAX_UPLOAD_SIZE_MB are refused"""
+    monkeypatch.setattr(imports, "MAX_UPLOAD_SIZE_MB", 0)
+
+    response = client.post(
+        "/api/v1/import/csv",
+        params={"user_id": sample_user.idUser},
+        files={"file": ("a.csv", b"name,latitude,longitude\n")},
+    )
+    assert response.status_code == 413
+
+
+def test_import_many(client, sample_user, monkeypatch):
+    """Test several files are imported in one request"""
+    monkeypatch.setattr(import_service, "IMPORT_WORKERS", 1)
+    gpx = (b'<gpx xmlns="http://www.topografix.com/GPX/1/1">'
+           b'<wpt lat="45.46" lon="9.19"><name>Duomo</name></wpt></gpx>')
+
+    response = client.post(
+        "/api/v1/import",
+        params={"user_id": sample_user.idUser},
+        files=[
+            ("files", ("a.csv", b"name,latitude,longitude\nNavigli,45.45,9.17\n", "text/csv")),
+            ("files", ("b.gpx", gpx, "application/gpx+xml")),
+        ],
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["imported"] == 2
+    assert [f["name"] for f in body["files"]] == ["a.csv", "b.gpx"]
+
+
+def test_import_photos_requires_configured_root(client, sample_user, tmp_path, monkeypatch):
+    """Test the photo importer only reads inside PHOTO_IMPORT_ROOT"""
+    body = {"directory": str(tmp_path)}
+    response = client.post(
+        "/api/v1/import/photos", params={"user_id": sample_user.idUser}, json=body
+    )
+    assert response.status_code == 403
+
+    monkeypatch.setattr(imports, "PHOTO_IMPORT_ROOT", str(tmp_path / "photos"))
+    response = client.post(
+        "/api/v1/import/photos", params={"user_id": sample_user.idUser}, json=body
+    )
+    assert response.status_code == 403
+
+    (tmp_path / "photos").mkdir()
+    response = client.post(
+        "/api/v1/import/photos", params={"user_id": sample_user.idUser}, json={"directory": "."}
+    )
+    assert response.status_code == 200
+    assert response.json()["processed"] == 0
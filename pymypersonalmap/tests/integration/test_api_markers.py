@@ -0,0 +1,170 @@
+"""
+Test Markers API
+
+Tests for the marker endpoints of main.py against an in-memory database.
+"""
+
+from sqlalchemy import event
+from pymypersonalmap.models.marker import Marker
+
+
+def _add_markers(test_db, user, labels):
+    markers = [
+        Marker(title="Duomo", description="Gothic cathedral", latitude=45.4642,
+               longitude=9.1900, marker_metadata={"rating": 5}, is_favorite=True,
+               user_id=user.idUser),
+        Marker(title="Navigli", latitude=45.4520, longitude=9.1750, user_id=user.idUser),
+    ]
+    markers[0].labels = [labels[0]]
+    test_db.add_all(markers)
+    test_db.commit()
+    return markers
+
+
+class TestListMarkers:
+    """Tests for GET /api/v1/markers"""
+
+    def test_list_all_fields(self, client, test_db, sample_user, sample_labels):
+        """Test default response contains every marker field"""
+        _add_markers(test_db, sample_user, sample_labels)
+
+        response = client.get("/api/v1/markers", params={"user_id": sample_user.idUser})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total"] == 2
+        duomo = body["markers"][0]
+        assert duomo["description"] == "Gothic cathedral"
+        assert duomo["metadata"] == {"rating": 5}
+        assert duomo["labels"] == ["Urbex"]
+
+    def test_sparse_fieldset(self, client, test_db, sample_user, sample_labels):
+        """Test only the requested fields are returned"""
+        markers = _add_markers(test_db, sample_user, sample_labels)
+
+        response = client.get("/api/v1/markers", params={
+            "user_id": sample_user.idUser,
+            "fields": "id,title,latitude,longitude",
+        })
+
+        assert response.status_code == 200
+        assert response.json()["markers"] == [
+            {"id": markers[0].idMarker, "title": "Duomo", "latitude": 45.4642, "longitude": 9.19},
+            {"id": markers[1].idMarker, "title": "Navigli", "latitude": 45.452, "longitude": 9.175},
+        ]
+
+    def test_sparse_fieldset_skips_heavy_columns(self, client, test_db, sample_user, sample_labels):
+        """Test heavy columns are not selected when not requested"""
+        _add_markers(test_db, sample_user, sample_labels)
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        engine = test_db.get_bind()
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            client.get(
+                "/api/v1/markers", params={"user_id": sample_user.idUser, "fields": "id,title"}
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        select_markers = [s for s in statements if "FROM markers" in s and "count" not in s]
+        assert select_markers
+        assert all("marker_metadata" not in s and "markers.description" not in s
+                   for s in select_markers)
+
+    def test_unknown_field(self, client, sample_user):
+        """Test unknown fields are rejected"""
+        response = client.get(
+            "/api/v1/markers", params={"user_id": sample_user.idUser, "fields": "id,secret"}
+        )
+        assert response.status_code == 400
+
+    def test_filters(self, client, test_db, sample_user, sample_labels):
+        """Test favorite, label and search filters"""
+        _add_markers(test_db, sample_user, sample_labels)
+        params = {"user_id": sample_user.idUser, "fields": "title"}
+
+        favorites = client.get("/api/v1/markers", params={**params, "is_favorite": True}).json()
+        assert favorites["markers"] == [{"title": "Duomo"}]
+
+        labelled = client.get("/api/v1/markers", params={
+            **params, "label_ids": str(sample_labels[0].idLabel)
+        }).json()
+        assert labelled["markers"] == [{"title": "Duomo"}]
+
+        found = client.get("/api/v1/markers", params={**params, "search": "gothic"}).json()
+        assert found["total"] == 1
+
+
+class TestGetMarker:
+    """Tests for GET /api/v1/markers/{marker_id}"""
+
+    def test_get_marker_with_details(self, client, test_db, sample_user, sample_labels):
+        """Test single marker response includes details"""
+        markers = _add_markers(test_db, sample_user, sample_labels)
+
+        response = client.get(
+            f"/api/v1/markers/{markers[0].idMarker}", params={"user_id": sample_user.idUser}
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["name"] == "Duomo"
+        assert body["description"] == "Gothic cathedral"
+        assert body["labels"] == ["Urbex"]
+
+    def test_get_marker_not_found(self, client, sample_user):
+        """Test missing marker returns 404"""
+        response = client.get("/api/v1/markers/999", params={"user_id": sample_user.idUser})
+        assert response.status_code == 404
+
+
+class TestDuplicates:
+    """Tests for GET /api/v1/markers/duplicates"""
+
+    def test_duplicates(self, client, test_db, sample_user, sample_marker):
+        """Test duplicate pairs are returned and not shadowed by /markers/{id}"""
+        copy = Marker(title="Duomo di Milano", latitude=45.46425, longitude=9.19005,
+                      user_id=sample_user.idUser)
+        test_db.add(copy)
+        test_db.commit()
+
+        response = client.get("/api/v1/markers/duplicates", params={"user_id": sample_user.idUser})
+
+        assert response.status_code == 200
+        pair = response.json()["duplicates"][0]
+        assert (pair["marker_id"], pair["duplicate_id"]) == (sample_marker.idMarker, copy.idMarker)
+
+    def test_invalid_threshold(self, client, sample_user):
+        """Test out-of-range thresholds are rejected"""
+        response = client.get("/api/v1/markers/duplicates", params={
+            "user_id": sample_user.idUser, "min_similarity": 5
+        })
+        assert response.status_code == 400
+
+
+class TestSnapshot:
+    """Tests for GET /api/v1/markers/snapshot"""
+
+    def test_download_snapshot(self, client, test_db, sample_user, sample_marker, tmp_path):
+        """Test the snapshot downloads as a readable file and honours If-None-Match"""
+        from pymypersonalmap.services import snapshot_service
+
+        params = {"user_id": sample_user.idUser}
+        response = client.get("/api/v1/markers/snapshot", params=params)
+
+        assert response.status_code == 200
+        path = tmp_path / "download.snap"
+        path.write_bytes(response.content)
+        snapshot = snapshot_service.read_snapshot(path)
+        assert list(snapshot.ids) == [sample_marker.idMarker]
+        assert snapshot.titles() == ["Duomo di Milano"]
+
+        etag = response.headers["ETag"]
+        response = client.get(
+            "/api/v1/markers/snapshot", params=params, headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
@@ -0,0 +1,319 @@
+"""
+Test Query Plans
+
+Captures EXPLAIN QUERY PLAN for the statements issued by every repository
+function and fails if any of them falls back to a full table scan.
+"""
+
+import re
+import pytest
+from sqlalchemy import event, inspect
+from pymypersonalmap.models.marker import Marker
+from pymypersonalmap.repository import (
+    marker_repository, labels_repository, user_repository, change_repository, attachment_repository
+)
+
+
+FULL_SCAN = re.compile(r"^SCAN (\S+)")
+
+
+class QueryPlanRecorder:
+    """Record the statements executed on an engine and explain them"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            return
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._capture)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._capture)
+
+    def plans(self) -> list[tuple[str, list[str]]]:
+        """Return (statement, plan detail lines) for each captured statement"""
+        raw = self.engine.raw_connection()
+        try:
+            return [
+                (statement, self._explain(raw, statement, params))
+                for statement, params in self.statements
+            ]
+        finally:
+            raw.close()
+
+    @staticmethod
+    def _explain(raw, statement: str, params) -> list[str]:
+        return [row[3] for row in raw.execute(f"EXPLAIN QUERY PLAN {statement}", params)]
+
+    def full_scans(self, allowed: frozenset = frozenset()) -> list[tuple[str, str]]:
+        """Return (statement, plan line) for every full scan of a non-allowed table"""
+        scans = []
+        for statement, details in self.plans():
+            for detail in details:
+                match = FULL_SCAN.match(detail)
+                if match and match.group(1) not in allowed:
+                    scans.append((statement, detail))
+        return scans
+
+
+@pytest.fixture(scope="function")
+def plan_data(test_db, sample_user, sample_labels):
+    """Populate the database with a few markers, labels and a second user"""
+    other = user_repository.create_user(test_db, "other@example.com", "other", "hashed")
+    custom = labels_repository.create_label(test_db, "Mine", created_by=sample_user.idUser)
+    markers = [
+        Marker(title=f"Marker {i}", description="desc", latitude=45.0 + i * 0.01,
+               longitude=9.0 + i * 0.01, is_favorite=(i % 3 == 0),
+               user_id=sample_user.idUser if i % 4 else other.idUser)
+        for i in range(40)
+    ]
+    for i, marker in enumerate(markers):
+        marker.labels = [sample_labels[i % len(sample_labels)]]
+    test_db.add_all(markers)
+    test_db.commit()
+    attachment = attachment_repository.create_attachment(
+        test_db, markers[1].idMarker, sample_user.idUser, "a" * 64, "photo.jpg", "image/jpeg", 10
+    )
+    return {
+        "user_id": sample_user.idUser,
+        "other_id": other.idUser,
+        "marker_id": markers[1].idMarker,
+        "other_marker_id": markers[0].idMarker,
+        "label_id": sample_labels[0].idLabel,
+        "custom_label_id": custom.idLabel,
+        "marker_ids": [m.idMarker for m in markers],
+        "attachment_id": attachment.idAttachment,
+    }
+
+
+# (name, call, tables allowed to be fully scanned)
+REPOSITORY_CALLS = [
+    # marker_repository
+    ("create_marker",
+     lambda db, d: marker_repository.create_marker(db, "New", 45.1, 9.1, d["user_id"]), set()),
+    ("bulk_create_markers",
+     lambda db, d: marker_repository.bulk_create_markers(
+         db, d["user_id"],
+         [{"title": "Bulk", "latitude": 45.1, "longitude": 9.1, "label_ids": [d["label_id"]]}]),
+     set()),
+    ("get_marker_by_id",
+     lambda db, d: marker_repository.get_marker_by_id(db, d["marker_id"]), set()),
+    ("get_marker_by_id_details",
+     lambda db, d: marker_repository.get_marker_by_id(db, d["marker_id"], with_details=True),
+     set()),
+    ("get_all_markers",
+     lambda db, d: marker_repository.get_all_markers(db, user_id=d["user_id"]), set()),
+    ("get_all_markers_with_labels",
+     lambda db, d: marker_repository.get_all_markers(
+         db, user_id=d["user_id"], with_details=True, with_labels=True
+     ), set()),
+    ("update_marker",
+     lambda db, d: marker_repository.update_marker(db, d["marker_id"], title="Renamed"), set()),
+    ("delete_marker", lambda db, d: marker_repository.delete_marker(db, d["marker_id"]), set()),
+    ("marker_exists", lambda db, d: marker_repository.marker_exists(db, d["marker_id"]), set()),
+    ("update_owned_marker",
+     lambda db, d: marker_repository.update_owned_marker(
+         db, d["marker_id"], d["user_id"], title="Renamed"),
+     set()),
+    ("delete_owned_marker",
+     lambda db, d: marker_repository.delete_owned_marker(db, d["marker_id"], d["user_id"]), set()),
+    ("delete_user_markers_batch",
+     lambda db, d: marker_repository.delete_user_markers_batch(db, d["user_id"], 10), set()),
+    ("delete_user_markers",
+     lambda db, d: marker_repository.delete_user_markers(db, d["user_id"]), set()),
+    ("get_markers_within_radius",
+     lambda db, d: marker_repository.get_markers_within_radius(
+         db, 45.1, 9.1, 5000, user_id=d["user_id"]),
+     set()),
+    ("get_markers_in_bounding_box",
+     lambda db, d: marker_repository.get_markers_in_bounding_box(
+         db, 45.0, 9.0, 45.2, 9.2, user_id=d["user_id"]),
+     set()),
+    ("get_markers_in_bounding_box_all_users",
+     lambda db, d: marker_repository.get_markers_in_bounding_box(db, 45.0, 9.0, 45.2, 9.2), set()),
+    ("get_favorite_markers",
+     lambda db, d: marker_repository.get_favorite_markers(db, d["user_id"]), set()),
+    ("add_label_to_marker",
+     lambda db, d: marker_repository.add_label_to_marker(db, d["marker_id"], d["custom_label_id"]),
+     set()),
+    ("remove_label_from_marker",
+     lambda db, d: marker_repository.remove_label_from_marker(db, d["marker_id"], d["label_id"]),
+     set()),
+    ("search_markers",
+     lambda db, d: marker_repository.search_markers(db, "Marker 1", user_id=d["user_id"]), set()),
+    ("get_marker_rows",
+     lambda db, d: marker_repository.get_marker_rows(
+         db, user_id=d["user_id"], bbox=(45.0, 9.0, 45.2, 9.2)),
+     set()),
+    ("get_marker_rows_favorites",
+     lambda db, d: marker_repository.get_marker_rows(db, user_id=d["user_id"], favorites_only=True),
+     set()),
+    ("get_marker_rows_in_boxes",
+     lambda db, d: marker_repository.get_marker_rows_in_boxes(
+         db, [(45.0, 9.0, 45.1, 9.1), (45.2, 9.2, 45.3, 9.3)], user_id=d["user_id"]),
+     set()),
+    ("get_marker_rows_by_ids",
+     lambda db, d: marker_repository.get_marker_rows(
+         db, user_id=d["user_id"], marker_ids=d["marker_ids"][:5]),
+     set()),
+    ("get_marker_label_pairs",
+     lambda db, d: marker_repository.get_marker_label_pairs(db, d["user_id"]), set()),
+    ("get_marker_label_pairs_by_ids",
+     lambda db, d: marker_repository.get_marker_label_pairs(
+         db, d["user_id"], d["marker_ids"][:5]),
+     set()),
+    ("get_label_colors_for_markers",
+     lambda db, d: marker_repository.get_label_colors_for_markers(db, d["marker_ids"]), set()),
+    ("get_label_names_for_markers",
+     lambda db, d: marker_repository.get_label_names_for_markers(db, d["marker_ids"]), set()),
+    ("get_marker_pins",
+     lambda db, d: marker_repository.get_marker_pins(db, user_id=d["user_id"]), set()),
+    ("get_marker_dicts",
+     lambda db, d: marker_repository.get_marker_dicts(
+         db, ["id", "title", "labels"], user_id=d["user_id"], label_ids=[d["label_id"]],
+         search="Marker", is_favorite=True),
+     set()),
+    ("count_markers",
+     lambda db, d: marker_repository.count_markers(
+         db, user_id=d["user_id"], label_ids=[d["label_id"]]),
+     set()),
+    ("iter_marker_batches",
+     lambda db, d: list(marker_repository.iter_marker_batches(
+         db, d["user_id"], label_ids=[d["label_id"]])),
+     set()),
+    # labels_repository
+    ("create_label",
+     lambda db, d: labels_repository.create_label(db, "Another", created_by=d["user_id"]), set()),
+    ("get_label_by_id", lambda db, d: labels_repository.get_label_by_id(db, d["label_id"]), set()),
+    ("get_labels_by_ids",
+     lambda db, d: labels_repository.get_labels_by_ids(db, [d["label_id"]]), set()),
+    ("get_label_by_name", lambda db, d: labels_repository.get_label_by_name(db, "Urbex"), set()),
+    ("get_label_ids_by_name",
+     lambda db, d: labels_repository.get_label_ids_by_name(db, d["user_id"]), set()),
+    ("get_all_labels", lambda db, d: labels_repository.get_all_labels(db), {"labels"}),
+    ("get_all_labels_system",
+     lambda db, d: labels_repository.get_all_labels(db, system_only=True), set()),
+    ("get_all_labels_user",
+     lambda db, d: labels_repository.get_all_labels(db, user_id=d["user_id"]), set()),
+    ("get_system_labels", lambda db, d: labels_repository.get_system_labels(db), set()),
+    ("get_user_labels", lambda db, d: labels_repository.get_user_labels(db, d["user_id"]), set()),
+    ("update_label",
+     lambda db, d: labels_repository.update_label(db, d["custom_label_id"], color="#000000"),
+     set()),
+    ("delete_label", lambda db, d: labels_repository.delete_label(db, d["custom_label_id"]), set()),
+    ("delete_user_labels",
+     lambda db, d: labels_repository.delete_user_labels(db, d["user_id"]), set()),
+    ("label_exists_by_name",
+     lambda db, d: labels_repository.label_exists_by_name(db, "Urbex"), set()),
+    ("count_markers_with_label",
+     lambda db, d: labels_repository.count_markers_with_label(db, d["label_id"]), set()),
+    # attachment_repository
+    ("create_attachment",
+     lambda db, d: attachment_repository.create_attachment(
+         db, d["marker_id"], d["user_id"], "b" * 64, "b.jpg", "image/jpeg", 5),
+     set()),
+    ("get_attachment_by_id",
+     lambda db, d: attachment_repository.get_attachment_by_id(db, d["attachment_id"]), set()),
+    ("get_marker_attachments",
+     lambda db, d: attachment_repository.get_marker_attachments(db, d["marker_id"]), set()),
+    ("delete_owned_attachment",
+     lambda db, d: attachment_repository.delete_owned_attachment(
+         db, d["attachment_id"], d["user_id"]),
+     set()),
+    ("delete_marker_attachments",
+     lambda db, d: attachment_repository.delete_marker_attachments(db, d["marker_id"]), set()),
+    ("delete_attachments_of_markers",
+     lambda db, d: attachment_repository.delete_attachments_of_markers(db, d["marker_ids"]),
+     set()),
+    ("count_blob_references",
+     lambda db, d: attachment_repository.count_blob_references(db, "a" * 64), set()),
+    # Scans the sha256 index only
+    ("get_referenced_blobs",
+     lambda db, d: attachment_repository.get_referenced_blobs(db), {"attachments"}),
+    # change_repository
+    ("get_changes_since",
+     lambda db, d: change_repository.get_changes_since(db, d["user_id"], since=1), set()),
+    ("get_latest_seq", lambda db, d: change_repository.get_latest_seq(db, d["user_id"]), set()),
+    ("delete_user_changes_batch",
+     lambda db, d: change_repository.delete_user_changes_batch(db, d["user_id"], 10), set()),
+    ("delete_user_changes",
+     lambda db, d: change_repository.delete_user_changes(db, d["user_id"]), set()),
+    # user_repository
+    ("create_user",
+     lambda db, d: user_repository.create_user(db, "new@example.com", "new", "hashed"), set()),
+    ("get_user_by_id", lambda db, d: user_repository.get_user_by_id(db, d["user_id"]), set()),
+    ("get_user_by_email",
+     lambda db, d: user_repository.get_user_by_email(db, "test@example.com"), set()),
+    ("get_user_by_username",
+     lambda db, d: user_repository.get_user_by_username(db, "testuser"), set()),
+    ("get_all_users", lambda db, d: user_repository.get_all_users(db), {"users"}),
+    ("update_user",
+     lambda db, d: user_repository.update_user(db, d["user_id"], full_name="Test"), set()),
+    ("delete_user", lambda db, d: user_repository.delete_user(db, d["other_id"]), set()),
+    ("user_exists_by_email",
+     lambda db, d: user_repository.user_exists_by_email(db, "test@example.com"), set()),
+    ("user_exists_by_username",
+     lambda db, d: user_repository.user_exists_by_username(db, "testuser"), set()),
+]
+
+
+@pytest.mark.parametrize(
+    "name, call, allowed",
+    REPOSITORY_CALLS,
+    ids=[name for name, _, _ in REPOSITORY_CALLS]
+)
+def test_repository_function_avoids_full_scans(test_db, plan_data, name, call, allowed):
+    """Test every statement issued by a repository function uses an index"""
+    # Start from an empty identity map so lookups really hit the database
+    test_db.expire_all()
+
+    with QueryPlanRecorder(test_db.get_bind()) as recorder:
+        call(test_db, plan_data)
+        test_db.flush()
+
+    assert recorder.full_scans(frozenset(allowed)) == []
+
+
+def test_favorites_use_partial_index(test_db, plan_data):
+    """Test favorite lookups use the partial index once statistics exist"""
+    test_db.connection().exec_driver_sql("ANALYZE")
+
+    with QueryPlanRecorder(test_db.get_bind()) as recorder:
+        marker_repository.get_marker_rows(
+            test_db, user_id=plan_data["user_id"], favorites_only=True
+        )
+
+    details = [line for _, lines in recorder.plans() for line in lines]
+    assert any("idx_marker_user_favorite" in line for line in details)
+
+
+def test_recorder_detects_full_scan(test_db, plan_data):
+    """Test the recorder itself flags an unindexed filter"""
+    with QueryPlanRecorder(test_db.get_bind()) as recorder:
+        test_db.query(Marker).filter(Marker.title == "Marker 3").all()
+
+    assert recorder.full_scans() != []
+
+
+def test_ensure_indexes_drops_superseded(test_db, monkeypatch):
+    """Test upgrading a database replaces the old single-column marker indexes"""
+    from pymypersonalmap.database import session
+
+    engine = test_db.get_bind()
+    test_db.connection().exec_driver_sql("CREATE INDEX idx_marker_user ON markers (user_id)")
+    test_db.connection().exec_driver_sql("DROP INDEX idx_marker_user_id")
+    test_db.commit()
+    monkeypatch.setattr(session, "engine", engine)
+
+    session.ensure_indexes()
+
+    names = {index["name"] for index in inspect(engine).get_indexes("markers")}
+    assert "idx_marker_user_id" in names
+    assert names.isdisjoint(session.SUPERSEDED_INDEXES)
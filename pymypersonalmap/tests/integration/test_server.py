@@ -0,0 +1,100 @@
+"""
+Integration tests for the pre-fork production launcher
+"""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+from pymypersonalmap.server import reload_warning
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="pre-fork needs os.fork")
+
+
+async def worker_pid_app(scope, receive, send):
+    """ASGI app answering with the PID of the worker serving the request"""
+    if scope["type"] != "http":
+        return
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": json.dumps(os.getpid()).encode()})
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get_pid(port: int) -> int:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=5) as response:
+        return json.loads(response.read())
+
+
+def _wait_for(condition, timeout: float = 20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            result = condition()
+            if result:
+                return result
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise AssertionError("condition not met in time")
+
+
+@pytest.fixture
+def master():
+    """A master process with two workers, on a free local port"""
+    port = _free_port()
+    code = (
+        "from pymypersonalmap.server import Arbiter; "
+        "Arbiter('pymypersonalmap.tests.integration.test_server:worker_pid_app', "
+        f"'127.0.0.1', {port}, 2, 'warning').run()"
+    )
+    process = subprocess.Popen([sys.executable, "-c", code])
+    yield process, port
+    if process.poll() is None:
+        process.kill()
+        process.wait()
+
+
+def _worker_pids(master_pid: int) -> set[int]:
+    children = subprocess.run(
+        ["pgrep", "-P", str(master_pid)], capture_output=True, text=True
+    ).stdout.split()
+    return {int(pid) for pid in children}
+
+
+def test_workers_serve_and_restart(master):
+    """Test requests reach the forked workers across a rolling restart"""
+    process, port = master
+    pid = _wait_for(lambda: _get_pid(port))
+    workers = _wait_for(lambda: len(_worker_pids(process.pid)) == 2 and _worker_pids(process.pid))
+    assert pid in workers
+
+    process.send_signal(signal.SIGHUP)
+    replaced = _wait_for(lambda: (
+        len(_worker_pids(process.pid)) == 2
+        and not _worker_pids(process.pid) & workers
+        and _worker_pids(process.pid)
+    ))
+    assert _get_pid(port) in replaced
+
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(30) == 0
+    assert not _worker_pids(process.pid)
+
+
+def test_reload_warning():
+    """Test auto-reload is only flagged in production"""
+    assert reload_warning(True, "production")
+    assert reload_warning(False, "production") is None
+    assert reload_warning(True, "development") is None
@@ -0,0 +1,109 @@
+"""
+Unit tests for account_deletion_service
+"""
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from pymypersonalmap.models.attachment import Attachment
+from pymypersonalmap.models.labels import Label
+from pymypersonalmap.models.marker import Marker
+from pymypersonalmap.models.marker_change import MarkerChange
+from pymypersonalmap.models.marker_label import MarkerLabel
+from pymypersonalmap.models.user import User
+from pymypersonalmap.repository import attachment_repository, labels_repository
+from pymypersonalmap.repository import marker_repository, user_repository
+from pymypersonalmap.services import account_deletion_service
+from pymypersonalmap.services.account_deletion_service import DeletionJobs
+from pymypersonalmap.services.user_service import UserNotFoundError
+
+
+@pytest.fixture
+def accounts(test_db, sample_user, sample_labels):
+    """The sample user with 5 labelled markers and an attachment, and another user"""
+    custom = labels_repository.create_label(test_db, "Mine", created_by=sample_user.idUser)
+    label_ids = [sample_labels[0].idLabel, custom.idLabel]
+    marker_ids = marker_repository.bulk_create_markers(test_db, sample_user.idUser, [
+        {"title": f"Marker {i}", "latitude": 45.0, "longitude": 9.0, "label_ids": label_ids}
+        for i in range(5)
+    ])
+    attachment_repository.create_attachment(
+        test_db, marker_ids[0], sample_user.idUser, "a" * 64, "a.jpg", "image/jpeg", 5
+    )
+    other = User(username="other", email="other@example.com", hashed_password="-")
+    test_db.add(other)
+    test_db.commit()
+    marker_repository.bulk_create_markers(test_db, other.idUser, [
+        {"title": "Kept", "latitude": 45.0, "longitude": 9.0, "label_ids": label_ids[:1]}
+    ])
+    return sample_user.idUser, other.idUser
+
+
+def _count(db, column, value) -> int:
+    return db.execute(select(func.count()).where(column == value)).scalar_one()
+
+
+def test_delete_account_in_batches(test_db, accounts):
+    """Test everything the user owns goes in batches, without loading the markers"""
+    user_id, other_id = accounts
+    test_db.expunge_all()
+    calls = []
+
+    account_deletion_service.delete_account(
+        test_db, user_id, batch_size=2, progress=lambda step, rows: calls.append((step, rows))
+    )
+
+    assert calls == [
+        ("markers", 2), ("markers", 2), ("markers", 1),
+        ("changes", 2), ("changes", 2), ("changes", 2), ("changes", 1),
+        ("labels", 1),
+    ]
+    assert not any(isinstance(obj, Marker) for obj in test_db.identity_map.values())
+    assert test_db.get(User, user_id) is None
+    assert _count(test_db, Marker.user_id, user_id) == 0
+    assert _count(test_db, MarkerChange.user_id, user_id) == 0
+    assert _count(test_db, Attachment.user_id, user_id) == 0
+    assert _count(test_db, Label.created_by, user_id) == 0
+    assert test_db.scalar(select(func.count()).select_from(MarkerLabel)) == 1
+    assert _count(test_db, Marker.user_id, other_id) == 1
+
+
+def test_deletion_job_reports_progress(test_db, accounts):
+    """Test a background deletion deactivates the user first and reports its progress"""
+    user_id, _ = accounts
+    jobs = DeletionJobs(batch_size=2, pause=0)
+    session_factory = sessionmaker(bind=test_db.get_bind())
+    try:
+        with pytest.raises(UserNotFoundError):
+            jobs.start(999, session_factory)
+
+        job = jobs.start(user_id, session_factory)
+        assert job.wait(10)
+    finally:
+        jobs.shutdown()
+
+    report = jobs.get(job.id).to_dict()
+    assert report["state"] == "done"
+    assert report["total_markers"] == 5
+    assert report["deleted"] == {"markers": 5, "changes": 7, "labels": 1}
+    assert report["progress"] == 1.0
+    test_db.expire_all()
+    assert test_db.get(User, user_id) is None
+
+
+def test_repository_delete_leaves_no_orphans(test_db, accounts):
+    """Test deleting the user row directly also deletes what it owns (no FK cascade here)"""
+    user_id, other_id = accounts
+    user = test_db.get(User, user_id)
+    assert len(user.markers) == 5
+
+    assert user_repository.delete_user(test_db, user_id)
+    test_db.commit()
+
+    assert _count(test_db, Marker.user_id, user_id) == 0
+    assert _count(test_db, MarkerChange.user_id, user_id) == 0
+    assert _count(test_db, Attachment.user_id, user_id) == 0
+    assert _count(test_db, Label.created_by, user_id) == 0
+    assert test_db.scalar(select(func.count()).select_from(MarkerLabel)) == 1
+    assert _count(test_db, Marker.user_id, other_id) == 1
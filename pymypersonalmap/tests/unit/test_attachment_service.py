@@ -0,0 +1,145 @@
+"""
+Tests for Attachment Service
+
+Tests for the content-addressed blob store and attachment bookkeeping.
+"""
+
+import hashlib
+import io
+import time
+import pytest
+from pymypersonalmap.repository import marker_repository
+from pymypersonalmap.services import attachment_service
+from pymypersonalmap.services.attachment_service import AttachmentNotFoundError
+from pymypersonalmap.services.blob_store import BlobTooLargeError
+from pymypersonalmap.services.marker_service import MarkerNotFoundError
+
+
+class TestBlobStore:
+    """Tests for BlobStore"""
+
+    def test_put_is_content_addressed(self, blob_store):
+        """Test content is stored under its SHA-256 and stored once"""
+        data = b"x" * 3_000_000
+
+        first = blob_store.put(io.BytesIO(data))
+        second = blob_store.put(io.BytesIO(data))
+
+        sha256 = hashlib.sha256(data).hexdigest()
+        assert first == (sha256, len(data), True)
+        assert second == (sha256, len(data), False)
+        assert blob_store.path(sha256).relative_to(blob_store.root).parts == (
+            sha256[:2], sha256[2:4], sha256
+        )
+        assert list(blob_store.iter_keys()) == [sha256]
+        assert not any(blob_store.tmp_dir.iterdir())
+
+    def test_put_too_large(self, blob_store):
+        """Test oversized content is refused and nothing is left behind"""
+        with pytest.raises(BlobTooLargeError):
+            blob_store.put(io.BytesIO(b"x" * 100), max_bytes=10)
+        assert list(blob_store.iter_keys()) == []
+        assert not any(blob_store.tmp_dir.iterdir())
+
+    def test_iter_range(self, blob_store):
+        """Test ranges are read inclusively in chunks"""
+        sha256, _, _ = blob_store.put(io.BytesIO(b"0123456789"))
+
+        assert list(blob_store.iter_range(sha256, 2, 6, chunk_size=2)) == [b"23", b"45", b"6"]
+        assert b"".join(blob_store.iter_range(sha256)) == b"0123456789"
+
+    def test_delete_keeps_reuploaded_blob(self, blob_store):
+        """Test content stored again after the reference check survives the release"""
+        sha256, _, _ = blob_store.put(io.BytesIO(b"photo"))
+        checked_at = time.time()
+        time.sleep(0.05)
+
+        assert blob_store.put(io.BytesIO(b"photo"))[2] is False
+        assert blob_store.delete(sha256, older_than=checked_at) is False
+        assert blob_store.exists(sha256)
+        assert blob_store.delete(sha256, older_than=time.time() + 1) is True
+
+    def test_invalid_key(self, blob_store):
+        """Test keys that are not hashes cannot escape the store"""
+        with pytest.raises(ValueError):
+            blob_store.path("../../etc/passwd")
+
+
+def test_attachments_share_blobs(test_db, blob_store, sample_user, sample_marker):
+    """Test identical uploads share a blob that outlives the first deletion"""
+    first = attachment_service.add_attachment(
+        test_db, blob_store, sample_marker.idMarker, sample_user.idUser,
+        io.BytesIO(b"photo"), "a.jpg", "image/jpeg"
+    )
+    second = attachment_service.add_attachment(
+        test_db, blob_store, sample_marker.idMarker, sample_user.idUser,
+        io.BytesIO(b"photo"), "b.jpg", None
+    )
+
+    sha256 = first.sha256
+    assert second.sha256 == sha256
+    assert second.content_type == "application/octet-stream"
+    assert [a.filename for a in attachment_service.list_attachments(
+        test_db, sample_marker.idMarker, sample_user.idUser)] == ["a.jpg", "b.jpg"]
+
+    first_id, second_id = first.idAttachment, second.idAttachment
+    attachment_service.delete_attachment(test_db, blob_store, first_id, sample_user.idUser)
+    assert blob_store.exists(sha256)
+    attachment_service.delete_attachment(test_db, blob_store, second_id, sample_user.idUser)
+    assert not blob_store.exists(sha256)
+
+
+def test_failed_attachment_keeps_reused_blob(
+    test_db, blob_store, sample_user, sample_marker, monkeypatch
+):
+    """Test a failed upload removes its new blob unless the same content was stored again"""
+    def fail(*args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    def reupload_then_fail(*args, **kwargs):
+        time.sleep(0.01)
+        blob_store.put(io.BytesIO(b"shared"))
+        fail()
+
+    for content, create in ((b"lonely", fail), (b"shared", reupload_then_fail)):
+        monkeypatch.setattr(attachment_service.attachment_repository, "create_attachment", create)
+        with pytest.raises(RuntimeError):
+            attachment_service.add_attachment(
+                test_db, blob_store, sample_marker.idMarker, sample_user.idUser,
+                io.BytesIO(content), "a.jpg"
+            )
+
+    assert not blob_store.exists(hashlib.sha256(b"lonely").hexdigest())
+    assert blob_store.exists(hashlib.sha256(b"shared").hexdigest())
+
+
+def test_attachment_ownership(test_db, blob_store, sample_user, sample_marker):
+    """Test other users can neither attach to nor read a marker's files"""
+    with pytest.raises(MarkerNotFoundError):
+        attachment_service.add_attachment(
+            test_db, blob_store, sample_marker.idMarker, sample_user.idUser + 1,
+            io.BytesIO(b"x"), "x.jpg"
+        )
+    attachment = attachment_service.add_attachment(
+        test_db, blob_store, sample_marker.idMarker, sample_user.idUser, io.BytesIO(b"x"), "x.jpg"
+    )
+    with pytest.raises(AttachmentNotFoundError):
+        attachment_service.get_attachment(test_db, attachment.idAttachment, sample_user.idUser + 1)
+    with pytest.raises(AttachmentNotFoundError):
+        attachment_service.delete_attachment(
+            test_db, blob_store, attachment.idAttachment, sample_user.idUser + 1
+        )
+
+
+def test_marker_deletion_releases_blobs(test_db, blob_store, sample_user, sample_marker):
+    """Test deleting a marker drops its attachments and GC reclaims the content"""
+    sha256 = attachment_service.add_attachment(
+        test_db, blob_store, sample_marker.idMarker, sample_user.idUser,
+        io.BytesIO(b"photo"), "a.jpg"
+    ).sha256
+    blob_store.put(io.BytesIO(b"orphan"))
+
+    marker_repository.delete_owned_marker(test_db, sample_marker.idMarker, sample_user.idUser)
+
+    assert attachment_service.collect_garbage(test_db, blob_store) == 2
+    assert not blob_store.exists(sha256)
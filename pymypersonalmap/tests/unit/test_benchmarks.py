@@ -0,0 +1,86 @@
+"""
+Unit tests for the benchmark dataset generator, result comparison and load report
+"""
+
+from sqlalchemy import event
+
+from benchmarks.loadtest import RouteStats, parse_mix
+from benchmarks.results import build_results, compare, summarize
+from benchmarks.scenarios import prepare_serialize_orm
+from benchmarks.synthetic import CITIES, generate_markers, load_dataset
+
+
+def test_generator_is_deterministic():
+    """Test the same seed produces the same rows and another seed different ones"""
+    first = list(generate_markers(200, seed=7, label_ids=[1, 2, 3]))
+
+    assert first == list(generate_markers(200, seed=7, label_ids=[1, 2, 3]))
+    assert first != list(generate_markers(200, seed=8, label_ids=[1, 2, 3]))
+
+
+def test_markers_are_clustered_around_cities():
+    """Test most markers fall near a city and labels follow their popularity"""
+    rows = list(generate_markers(2000, seed=1, label_ids=[10, 20, 30, 40]))
+
+    near_city = sum(
+        1 for row in rows
+        if any(abs(row["latitude"] - lat) < 1 and abs(row["longitude"] - lon) < 1.5
+               for _, lat, lon, _, _ in CITIES)
+    )
+    assert near_city > 0.85 * len(rows)
+
+    assigned = [label_id for row in rows for label_id in row["label_ids"]]
+    assert assigned.count(10) > assigned.count(40)
+    assert all(len(set(row["label_ids"])) == len(row["label_ids"]) for row in rows)
+
+
+def test_serialize_orm_loads_markers_eagerly():
+    """Test the ORM serialization scenario times two queries, not one per marker"""
+    dataset = load_dataset(200)
+    statements = []
+    event.listen(dataset.engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    with dataset.session() as db:
+        run = prepare_serialize_orm(dataset, db)
+        statements.clear()
+        run()
+
+    assert len(statements) == 2
+    dataset.engine.dispose()
+
+
+def test_compare_flags_median_regressions():
+    """Test only scenarios slower than the threshold are reported"""
+    baseline = build_results(1000, 42, {
+        "radius": summarize([0.010] * 5),
+        "search": summarize([0.010] * 5),
+        "removed": summarize([0.010] * 5),
+    })
+    current = build_results(1000, 42, {
+        "radius": summarize([0.011] * 5),
+        "search": summarize([0.013] * 5),
+        "added": summarize([0.100] * 5),
+    })
+
+    regressions = compare(baseline, current, threshold=0.2)
+
+    assert [regression.name for regression in regressions] == ["search"]
+    assert round(regressions[0].ratio, 2) == 1.3
+
+
+def test_load_report_percentiles_and_errors():
+    """Test the load report counts errors and uses nearest-rank percentiles"""
+    stats = RouteStats()
+    for index in range(1, 101):
+        stats.record(index / 1000, 200 if index <= 98 else 500)
+    stats.record(0.5, None)
+
+    summary = stats.summary(elapsed=10.0)
+
+    assert summary["requests"] == 101
+    assert summary["throughput_rps"] == 10.1
+    assert summary["error_rate"] == round(3 / 101, 4)
+    assert summary["statuses"] == {"0": 1, "200": 98, "500": 2}
+    assert summary["p50_ms"] == 51.0
+    assert summary["p99_ms"] == 100.0
+    assert parse_mix(["viewport=3", "create"]) == {"viewport": 3.0, "create": 1.0}
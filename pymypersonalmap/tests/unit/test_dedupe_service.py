@@ -0,0 +1,181 @@
+"""
+Tests for Dedupe Service
+
+Tests for the spatial grid, title normalization and duplicate detection.
+"""
+
+import io
+import random
+
+import pytest
+from pymypersonalmap.models.marker import Marker
+from pymypersonalmap.services import dedupe_service, import_service
+from pymypersonalmap.services.dedupe_service import SpatialGrid, DuplicateDetector
+from pymypersonalmap.services.geo_utils import haversine_distance
+
+
+class TestTitles:
+    """Tests for title normalization and similarity"""
+
+    def test_normalize_title(self):
+        """Test accents, case and punctuation are ignored"""
+        assert dedupe_service.normalize_title("  Caffè  Florian! ") == "caffe florian"
+
+    def test_similarity(self):
+        """Test similar and different titles"""
+        assert dedupe_service.title_similarity("duomo di milano", "duomo di milano") == 1.0
+        assert dedupe_service.title_similarity("duomo di milano", "duomo milano") > 0.8
+        assert dedupe_service.title_similarity("duomo", "navigli", 0.8) == 0.0
+
+
+class TestSpatialGrid:
+    """Tests for SpatialGrid neighbour lookups"""
+
+    @pytest.mark.parametrize("latitude", [0.0, 45.0, -60.0, 85.0])
+    def test_near_finds_every_point_within_cell_size(self, latitude):
+        """Test no point within the cell size is missed, at any latitude"""
+        rng = random.Random(42)
+        grid = SpatialGrid(100.0)
+        points = [
+            (latitude + rng.uniform(-0.01, 0.01), 9.0 + rng.uniform(-0.05, 0.05))
+            for _ in range(500)
+        ]
+        for index, (lat, lon) in enumerate(points):
+            grid.add(lat, lon, index)
+
+        for lat, lon in points[:50]:
+            expected = {
+                index for index, (other_lat, other_lon) in enumerate(points)
+                if haversine_distance(lat, lon, other_lat, other_lon, unit='meters') <= 100.0
+            }
+            found = {item for _, _, item in grid.near(lat, lon)}
+            assert expected <= found
+
+    def test_near_wraps_at_antimeridian(self):
+        """Test points on both sides of ±180° are neighbours"""
+        grid = SpatialGrid(100.0)
+        grid.add(-16.5, 179.99995, "east")
+
+        assert [item for _, _, item in grid.near(-16.5, -179.99995)] == ["east"]
+
+
+class TestFindDuplicates:
+    """Tests for duplicate detection"""
+
+    def test_find_duplicate_pairs(self):
+        """Test only close markers with similar titles are paired"""
+        markers = [
+            (1, "Duomo di Milano", 45.4642, 9.1900),
+            (2, "Duomo di Milano!", 45.4643, 9.1901),
+            (3, "Galleria", 45.4643, 9.1901),
+            (4, "Duomo di Milano", 45.5, 9.3),
+        ]
+
+        pairs = dedupe_service.find_duplicate_pairs(markers, distance_m=50)
+
+        assert [(p['marker_id'], p['duplicate_id']) for p in pairs] == [(1, 2)]
+        assert pairs[0]['distance_m'] < 50
+
+    def test_find_duplicates_for_user(self, test_db, sample_user, sample_marker):
+        """Test the user's markers are searched"""
+        test_db.add(Marker(title="Duomo di Milano", latitude=45.46425, longitude=9.19005,
+                           user_id=sample_user.idUser))
+        test_db.commit()
+
+        pairs = dedupe_service.find_duplicates(test_db, sample_user.idUser)
+        assert len(pairs) == 1
+        assert dedupe_service.find_duplicates(test_db, sample_user.idUser + 1) == []
+
+    def test_invalid_thresholds(self, test_db, sample_user):
+        """Test thresholds are validated"""
+        with pytest.raises(ValueError):
+            dedupe_service.find_duplicates(test_db, sample_user.idUser, distance_m=0)
+        with pytest.raises(ValueError):
+            dedupe_service.find_duplicates(test_db, sample_user.idUser, min_similarity=2)
+
+    def test_detector_checks_existing_and_batch(self, test_db, sample_user, sample_marker):
+        """Test incoming rows are matched against stored markers and each other"""
+        detector = DuplicateDetector(test_db, sample_user.idUser)
+        rows = [
+            {'title': "Duomo di Milano", 'latitude': 45.46421, 'longitude': 9.19001},
+            {'title': "Navigli", 'latitude': 45.4520, 'longitude': 9.1750},
+            {'title': "Navigli", 'latitude': 45.45201, 'longitude': 9.17501},
+        ]
+
+        results = detector.check(rows)
+
+        assert results[0]['duplicate_of'] == sample_marker.idMarker
+        assert results[1] is None
+        assert results[2]['duplicate_of'] is None
+        assert results[2]['duplicate_title'] == "Navigli"
+
+    def test_detector_queries_only_near_rows(
+        self, test_db, sample_user, sample_marker, monkeypatch
+    ):
+        """Test a batch spread across the world loads small boxes, not the whole span"""
+        detector = DuplicateDetector(test_db, sample_user.idUser)
+        rows = [
+            {'title': "Duomo di Milano", 'latitude': 45.46421, 'longitude': 9.19001},
+            {'title': "Sydney Opera", 'latitude': -33.8568, 'longitude': 151.2153},
+            {'title': "Fiji", 'latitude': -16.5, 'longitude': 179.99995},
+        ]
+
+        boxes = detector.query_boxes(rows)
+
+        assert len(boxes) == 4  # The Fiji box is split at the antimeridian
+        assert all(max_lat - min_lat < 0.01 for min_lat, _, max_lat, _ in boxes)
+        assert detector.check(rows)[0]['duplicate_of'] == sample_marker.idMarker
+
+    def test_detector_across_antimeridian(self, test_db, sample_user):
+        """Test an existing marker just across ±180° is found"""
+        test_db.add(
+            Marker(
+                title="Taveuni", latitude=-16.5, longitude=-179.99995, user_id=sample_user.idUser
+            )
+        )
+        test_db.commit()
+        detector = DuplicateDetector(test_db, sample_user.idUser)
+
+        results = detector.check([{'title': "Taveuni", 'latitude': -16.5, 'longitude': 179.99995}])
+
+        assert results[0]['duplicate_title'] == "Taveuni"
+
+
+class TestImportDuplicates:
+    """Tests for duplicate handling during import"""
+
+    CSV = b"name,latitude,longitude\nDuomo di Milano,45.46421,9.19001\nNavigli,45.452,9.175\n"
+
+    def test_skip(self, test_db, sample_user, sample_marker):
+        """Test duplicates are left out and reported"""
+        report = import_service.import_markers(
+            test_db, sample_user.idUser, "csv", io.BytesIO(self.CSV), on_duplicate="skip"
+        )
+
+        assert report.imported == 1
+        assert report.skipped == 1
+        assert report.duplicates[0]['duplicate_of'] == sample_marker.idMarker
+
+    def test_reimport_is_idempotent(self, test_db, sample_user):
+        """Test importing the same file twice does not create copies"""
+        for _ in range(2):
+            report = import_service.import_markers(
+                test_db, sample_user.idUser, "csv", io.BytesIO(self.CSV), on_duplicate="skip"
+            )
+        assert report.imported == 0
+        assert report.skipped == 2
+
+    def test_report(self, test_db, sample_user, sample_marker):
+        """Test duplicates are imported but listed"""
+        report = import_service.import_markers(
+            test_db, sample_user.idUser, "csv", io.BytesIO(self.CSV), on_duplicate="report"
+        )
+        assert report.imported == 2
+        assert report.duplicates_found == 1
+
+    def test_invalid_mode(self, test_db, sample_user):
+        """Test unknown modes are rejected"""
+        with pytest.raises(ValueError):
+            import_service.import_markers(
+                test_db, sample_user.idUser, "csv", io.BytesIO(self.CSV), on_duplicate="merge"
+            )
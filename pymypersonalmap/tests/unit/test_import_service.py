@@ -0,0 +1,271 @@
+"""
+Tests for Import Service
+
+Tests for the incremental parsers, validation and chunked import pipeline.
+"""
+
+import io
+import json
+
+import pytest
+from sqlalchemy import event
+from pymypersonalmap.repository import marker_repository
+from pymypersonalmap.services import import_service
+from pymypersonalmap.services.import_service import UnsupportedImportFormatError
+
+
+GPX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="test" xmlns="http://www.topografix.com/GPX/1/1">
+  <wpt lat="45.4642" lon="9.1900"><name>Duomo</name><desc>Cathedral</desc><type>Urbex</type></wpt>
+  <wpt lat="95.0" lon="9.0"><name>Broken</name></wpt>
+  <trk><name>Morning run</name><trkseg>
+    <trkpt lat="45.0" lon="9.0"/><trkpt lat="45.001" lon="9.0"/><trkpt lat="45.002" lon="9.0"/>
+  </trkseg></trk>
+</gpx>"""
+
+KML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2"><Document><Folder>
+  <Placemark><name>Colosseo</name>
+    <Point><coordinates>12.4922,41.8902,0</coordinates></Point>
+  </Placemark>
+  <Placemark><name>No geometry</name></Placemark>
+</Folder></Document></kml>"""
+
+
+def _records(parser, data: bytes) -> list:
+    return list(parser(io.BytesIO(data)))
+
+
+class TestParsers:
+    """Tests for the format parsers"""
+
+    def test_gpx_waypoints_and_tracks(self):
+        """Test waypoints become markers and tracks are summarized"""
+        records = _records(import_service.parse_gpx, GPX)
+
+        assert [row for row, _ in records] == [1, 2, 3]
+        duomo = records[0][1]
+        assert duomo['title'] == "Duomo"
+        assert duomo['latitude'] == "45.4642"
+        assert duomo['labels'] == "Urbex"
+        track = records[2][1]
+        assert track['title'] == "Morning run"
+        assert (track['latitude'], track['longitude']) == (45.0, 9.0)
+        assert track['metadata']['points'] == 3
+        assert track['metadata']['length_m'] == pytest.approx(222.4, abs=0.5)
+
+    def test_kml_placemarks(self):
+        """Test placemarks nested in folders"""
+        records = _records(import_service.parse_kml, KML)
+
+        assert records[0][1]['title'] == "Colosseo"
+        assert (records[0][1]['latitude'], records[0][1]['longitude']) == ("41.8902", "12.4922")
+        assert records[1][1]['latitude'] is None
+
+    def test_geojson_small_reads(self):
+        """Test features split across many reads are decoded"""
+        document = {
+            "type": "FeatureCollection",
+            "features": [
+                {"type": "Feature", "geometry": {"type": "Point", "coordinates": [9.19, 45.46 + i]},
+                 "properties": {"name": f"Point {i}", "labels": ["Urbex"], "rating": i}}
+                for i in range(5)
+            ],
+        }
+        data = json.dumps(document).encode()
+
+        features = list(import_service.iter_geojson_features(io.BytesIO(data), read_size=7))
+        assert len(features) == 5
+
+        records = _records(import_service.parse_geojson, data)
+        assert records[4][1]['title'] == "Point 4"
+        assert records[4][1]['metadata'] == {"rating": 4}
+
+    def test_geojson_single_feature(self):
+        """Test a document that is a single Feature"""
+        data = json.dumps({"type": "Feature", "geometry": {"type": "Point", "coordinates": [1, 2]},
+                           "properties": {"name": "A"}}).encode()
+        assert _records(import_service.parse_geojson, data)[0][1]['latitude'] == 2
+
+    def test_geojson_truncated(self):
+        """Test a truncated document is reported as invalid"""
+        with pytest.raises(ValueError):
+            _records(import_service.parse_geojson, b'{"features": [{"type": "Feature"')
+
+    def test_csv_aliases(self):
+        """Test CSV header aliases and line numbers"""
+        data = (
+            "name,lat,lng,labels\n"
+            "Duomo,45.46,9.19,\"Urbex,Photo Spot\"\n"
+            "\n"
+            "Navigli,45.45,9.17,\n"
+        ).encode()
+
+        records = _records(import_service.parse_csv, data)
+        assert records[0] == (2, {'title': "Duomo", 'latitude': "45.46", 'longitude': "9.19",
+                                  'labels': "Urbex,Photo Spot"})
+        assert records[1][0] == 4
+
+    def test_csv_without_coordinates(self):
+        """Test a header without coordinate columns is rejected"""
+        with pytest.raises(ValueError):
+            _records(import_service.parse_csv, b"name,city\nA,Milano\n")
+
+
+class TestValidation:
+    """Tests for validate_record"""
+
+    def test_valid_record(self):
+        """Test conversion and label resolution"""
+        row = import_service.validate_record(
+            {'title': " Duomo ", 'latitude': "45.46", 'longitude': "9.19",
+             'labels': "Urbex,Unknown", 'is_favorite': "yes"},
+            {"Urbex": 7}
+        )
+        assert row['title'] == "Duomo"
+        assert row['latitude'] == 45.46
+        assert row['label_ids'] == [7]
+        assert row['is_favorite'] is True
+
+    @pytest.mark.parametrize("record", [
+        {'latitude': 1, 'longitude': 1},
+        {'title': "A", 'latitude': "x", 'longitude': 1},
+        {'title': "A", 'latitude': 91, 'longitude': 1},
+        {'title': "A", 'latitude': "nan", 'longitude': 1},
+        {'title': "A" * 201, 'latitude': 1, 'longitude': 1},
+        {'title': {'en': "A"}, 'latitude': 1, 'longitude': 1},
+        {'title': "A", 'latitude': 1, 'longitude': 1, 'description': {'en': "x"}},
+        {'title': "A", 'latitude': 1, 'longitude': 1, 'address': ["Via Roma"]},
+        {'title': "A", 'latitude': 1, 'longitude': 1, 'labels': {'name': "Urbex"}},
+        {'title': "A", 'latitude': 1, 'longitude': 1, 'labels': [{'name': "Urbex"}]},
+    ])
+    def test_invalid_records(self, record):
+        """Test invalid records are rejected"""
+        with pytest.raises(ValueError):
+            import_service.validate_record(record, {})
+
+
+class TestImportMarkers:
+    """Tests for the chunked import pipeline"""
+
+    def test_import_gpx(self, test_db, sample_user, sample_labels):
+        """Test valid rows are imported and invalid ones reported"""
+        report = import_service.import_markers(test_db, sample_user.idUser, "gpx", io.BytesIO(GPX))
+
+        assert report.processed == 3
+        assert report.imported == 2
+        assert report.errors == [{'row': 2, 'error': "Coordinates out of range: 95.0, 9.0"}]
+        assert report.bytes_read == len(GPX)
+        markers = marker_repository.get_marker_dicts(
+            test_db, ["title", "labels"], user_id=sample_user.idUser
+        )
+        assert markers[0] == {'title': "Duomo", 'labels': ["Urbex"]}
+
+    def test_one_transaction_per_chunk(self, test_db, sample_user):
+        """Test rows are committed per chunk, not per row"""
+        lines = ["name,latitude,longitude"] + [f"P{i},45.{i},9.1" for i in range(10)]
+        data = "\n".join(lines).encode()
+        commits, progress = [], []
+        event.listen(test_db, "after_commit", lambda session: commits.append(1))
+
+        report = import_service.import_markers(
+            test_db, sample_user.idUser, "csv", io.BytesIO(data),
+            chunk_size=4, progress=progress.append
+        )
+
+        assert report.imported == 10
+        assert len(commits) == 3
+        assert [p['processed'] for p in progress] == [4, 8, 10]
+
+    def test_malformed_file_keeps_parsed_rows(self, test_db, sample_user):
+        """Test rows parsed before a syntax error are still imported"""
+        data = GPX.replace(b"</gpx>", b"<wpt lat=")
+
+        report = import_service.import_markers(test_db, sample_user.idUser, "gpx", io.BytesIO(data))
+
+        assert report.imported == 2
+        assert report.aborted.startswith("Malformed gpx file")
+
+    def test_non_text_fields_are_row_errors(self, test_db, sample_user):
+        """Test a feature with an object description is reported without losing its chunk"""
+        data = json.dumps({"type": "FeatureCollection", "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [9.19, 45.46]},
+             "properties": {"name": "Duomo", "description": {"en": "x"}}},
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [9.18, 45.47]},
+             "properties": {"name": "Brera", "description": 42}},
+        ]}).encode()
+
+        report = import_service.import_markers(
+            test_db, sample_user.idUser, "geojson", io.BytesIO(data)
+        )
+
+        assert report.imported == 1
+        assert report.errors == [{'row': 1, 'error': "Description must be text, not dict"}]
+        markers = marker_repository.get_marker_dicts(
+            test_db, ["title", "description"], user_id=sample_user.idUser
+        )
+        assert markers == [{'title': "Brera", 'description': "42"}]
+
+    def test_unsupported_format(self, test_db, sample_user):
+        """Test unknown formats are rejected"""
+        with pytest.raises(UnsupportedImportFormatError):
+            import_service.import_markers(test_db, sample_user.idUser, "shp", io.BytesIO(b""))
+
+
+class TestImportFiles:
+    """Tests for the parallel multi-file import"""
+
+    def _sources(self, count: int) -> list:
+        return [
+            (
+                f"walk_{i}.csv",
+                "csv",
+                f"name,latitude,longitude\nA{i},45.{i},9.1\nB{i},45.{i},9.2\n".encode(),
+            )
+            for i in range(count)
+        ]
+
+    def test_parse_file(self, tmp_path):
+        """Test a worker yields compact rows and errors in fixed-size batches"""
+        path = tmp_path / "points.gpx"
+        path.write_bytes(GPX)
+
+        batches = list(import_service.parse_file(
+            7, "points.gpx", "gpx", str(path), {"Urbex": 3}, batch_size=1
+        ))
+
+        assert [len(batch.rows) for batch in batches] == [1, 1, 0]
+        assert [batch.last for batch in batches] == [False, False, True]
+        assert all(batch.index == 7 for batch in batches)
+        assert sum(batch.processed for batch in batches) == 3
+        assert batches[0].rows[0][:3] == ("Duomo", 45.4642, 9.19)
+        assert batches[0].rows[0][-1] == [3]
+        assert [e for batch in batches for e in batch.errors] == [
+            (2, "Coordinates out of range: 95.0, 9.0")
+        ]
+        assert batches[-1].bytes_read == len(GPX)
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_import_files(self, test_db, sample_user, workers):
+        """Test all files are imported by the single writer in chunks"""
+        commits = []
+        event.listen(test_db, "after_commit", lambda session: commits.append(1))
+        sources = self._sources(5) + [("broken.gpx", "gpx", b"<gpx><wpt")]
+
+        report = import_service.import_files(
+            test_db, sample_user.idUser, sources, workers=workers, chunk_size=4
+        )
+
+        assert report.imported == 10
+        assert len(commits) == 3
+        assert sorted(f['name'] for f in report.files) == sorted(name for name, _, _ in sources)
+        broken = next(f for f in report.files if f['name'] == "broken.gpx")
+        assert broken['aborted'].startswith("Malformed gpx file")
+        assert marker_repository.count_markers(test_db, user_id=sample_user.idUser) == 10
+
+    def test_format_from_filename(self):
+        """Test formats are detected from extensions"""
+        assert import_service.format_from_filename("Track.GPX") == "gpx"
+        assert import_service.format_from_filename("points.json") == "geojson"
+        with pytest.raises(UnsupportedImportFormatError):
+            import_service.format_from_filename("archive.zip")
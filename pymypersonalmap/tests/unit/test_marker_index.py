@@ -0,0 +1,176 @@
+"""
+Unit tests for the in-memory marker index and its shared snapshots
+"""
+
+import multiprocessing
+
+import pytest
+from sqlalchemy import event
+
+from pymypersonalmap.models.marker_change import ENTITY_MARKER, OP_DELETE
+from pymypersonalmap.repository import change_repository, marker_repository
+from pymypersonalmap.services import marker_index, marker_service
+from pymypersonalmap.services.marker_index import MarkerIndex
+from pymypersonalmap.services.shared_index import SharedSnapshots
+from pymypersonalmap.services.snapshot_service import SnapshotStore
+
+
+@pytest.fixture
+def index(monkeypatch):
+    """A fresh index, also used by marker_service"""
+    index = MarkerIndex()
+    monkeypatch.setattr(marker_index, "_index", index)
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def milan(test_db, sample_user, sample_labels):
+    """Markers around Milan, one in Rome"""
+    urbex, restaurant, _ = sample_labels
+    return marker_repository.bulk_create_markers(test_db, sample_user.idUser, [
+        {"title": "Duomo", "latitude": 45.4642, "longitude": 9.1900,
+         "label_ids": [urbex.idLabel]},
+        {"title": "Castello", "latitude": 45.4705, "longitude": 9.1794, "is_favorite": True},
+        {"title": "Navigli", "latitude": 45.4500, "longitude": 9.1700,
+         "label_ids": [restaurant.idLabel]},
+        {"title": "Colosseo", "latitude": 41.8902, "longitude": 12.4922},
+    ])
+
+
+def _count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_bbox_matches_sql(test_db, sample_user, milan, index):
+    """Test bounding box results equal the SQL path, as pins with label colors"""
+    pins = index.in_bbox(test_db, sample_user.idUser, 45.44, 9.16, 45.48, 9.20)
+    expected = marker_repository.get_markers_in_bounding_box(
+        test_db, 45.44, 9.16, 45.48, 9.20, user_id=sample_user.idUser
+    )
+
+    assert [pin.id for pin in pins] == sorted(marker.idMarker for marker in expected)
+    assert pins[0].title == "Duomo"
+    assert pins[0].label_colors == ("#FF5733",)
+    assert pins[0].latitude == pytest.approx(45.4642)
+
+
+def test_radius_matches_sql(test_db, sample_user, milan, index):
+    """Test radius results and their order equal the SQL path"""
+    pins = index.within_radius(test_db, sample_user.idUser, 45.4642, 9.1900, 2000)
+    expected = marker_repository.get_markers_within_radius(
+        test_db, 45.4642, 9.1900, 2000, user_id=sample_user.idUser
+    )
+
+    assert [pin.id for pin in pins] == [marker.idMarker for marker in expected]
+    assert [pin.distance for pin in pins] == pytest.approx(
+        [marker.distance for marker in expected], abs=0.5
+    )
+
+
+def test_nearest_and_filters(test_db, sample_user, sample_labels, milan, index):
+    """Test k-NN with label and favorite filters"""
+    user_id = sample_user.idUser
+
+    nearest = index.nearest(test_db, user_id, 41.9, 12.5, k=2)
+    assert [pin.title for pin in nearest] == ["Colosseo", "Navigli"]
+
+    labelled = index.nearest(
+        test_db, user_id, 41.9, 12.5, k=5, label_ids=[sample_labels[0].idLabel]
+    )
+    assert [pin.title for pin in labelled] == ["Duomo"]
+
+    favorites = index.in_bbox(test_db, user_id, -90, -180, 90, 180, favorites_only=True)
+    assert [pin.title for pin in favorites] == ["Castello"]
+
+
+def test_commits_refresh_the_index(test_db, sample_user, milan, index):
+    """Test writes show up after commit, and queries cost no SQL otherwise"""
+    user_id = sample_user.idUser
+    index.in_bbox(test_db, user_id, 45, 9, 46, 10)
+
+    statements = _count_statements(test_db.get_bind())
+    index.in_bbox(test_db, user_id, 45, 9, 46, 10)
+    assert statements == []
+
+    created = marker_repository.create_marker(test_db, "Brera", 45.4720, 9.1880, user_id)
+    marker_repository.delete_owned_marker(test_db, milan[1], user_id)
+    test_db.commit()
+
+    titles = [pin.title for pin in index.in_bbox(test_db, user_id, 45, 9, 46, 10)]
+    assert titles == ["Duomo", "Navigli", "Brera"]
+    assert index.get(test_db, user_id).snapshot.ids[-1] == created.idMarker
+
+
+def test_rolled_back_writes_do_not_invalidate(test_db, sample_user, milan, index):
+    """Test the listener only fires for committed transactions"""
+    user_id = sample_user.idUser
+    before = index.get(test_db, user_id)
+
+    change_repository.record_change(test_db, user_id, ENTITY_MARKER, milan[0], OP_DELETE)
+    test_db.rollback()
+
+    assert index.get(test_db, user_id) is before
+
+
+def test_service_option(test_db, sample_user, milan, index):
+    """Test marker_service answers from the index when asked to"""
+    pins = marker_service.find_markers_in_area(
+        test_db, 45.44, 9.16, 45.48, 9.20, user_id=sample_user.idUser, use_index=True
+    )
+    nearby = marker_service.find_markers_nearby(
+        test_db, 45.4642, 9.19, 1000, user_id=sample_user.idUser, use_index=True
+    )
+
+    assert {pin.title for pin in pins} == {"Duomo", "Castello", "Navigli"}
+    assert nearby[0].title == "Duomo" and nearby[0].distance == pytest.approx(0, abs=0.1)
+    assert index.stats()["markers"] == 4
+
+
+def _bump_in_child(store_dir, user_id):
+    SharedSnapshots(SnapshotStore(store_dir)).bump(user_id)
+
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two indexes sharing snapshot files, as in two server processes"""
+    indexes = [MarkerIndex(SharedSnapshots(SnapshotStore(tmp_path))) for _ in range(2)]
+    # Only the first one commits: the second must learn changes from the counters
+    change_repository.remove_change_listener(indexes[1]._on_change)
+    yield indexes
+    for index in indexes:
+        index.close()
+
+
+def test_shared_snapshots(test_db, sample_user, milan, workers):
+    """Test one process builds the snapshot and the others map it"""
+    builder, reader = workers
+    user_id = sample_user.idUser
+
+    built = builder.get(test_db, user_id)
+    mapped = reader.get(test_db, user_id)
+    assert mapped.snapshot.seq == built.snapshot.seq
+    assert not reader.shared.store._snapshots
+    assert not mapped.snapshot.ids.flags.writeable
+
+    marker_repository.create_marker(test_db, "Brera", 45.4720, 9.1880, user_id)
+    assert reader.shared.generation(user_id) == 1
+
+    titles = [pin.title for pin in reader.in_bbox(test_db, user_id, 45, 9, 46, 10)]
+    assert titles == ["Duomo", "Castello", "Navigli", "Brera"]
+    assert builder.get(test_db, user_id).snapshot.seq == reader.get(test_db, user_id).snapshot.seq
+
+
+def test_generations_cross_processes(workers, tmp_path):
+    """Test a counter bumped by another process is seen without remapping"""
+    process = multiprocessing.get_context("spawn").Process(
+        target=_bump_in_child, args=(tmp_path, 7)
+    )
+    process.start()
+    process.join(30)
+
+    assert process.exitcode == 0
+    assert workers[0].shared.generation(7) == 1
+    assert workers[0].shared.generation(8) == 0
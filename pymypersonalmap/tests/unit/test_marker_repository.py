@@ -0,0 +1,181 @@
+"""
+Tests for Marker Repository
+
+Tests for the Core-level read and write paths of marker_repository.py.
+"""
+
+import pytest
+from sqlalchemy import event
+from pymypersonalmap.models.marker import Marker
+from pymypersonalmap.repository import marker_repository
+from pymypersonalmap.repository.marker_repository import MarkerPin
+from pymypersonalmap.services import marker_service
+from pymypersonalmap.services.marker_service import MarkerNotFoundError
+
+
+@pytest.fixture(scope="function")
+def tagged_markers(test_db, sample_user, sample_labels):
+    """Create a few markers, some of them labelled and favorite"""
+    markers = [
+        Marker(title="Duomo", latitude=45.4642, longitude=9.1900,
+               is_favorite=True, user_id=sample_user.idUser),
+        Marker(title="Navigli", latitude=45.4520, longitude=9.1750,
+               user_id=sample_user.idUser),
+        Marker(title="Colosseo", latitude=41.8902, longitude=12.4922,
+               user_id=sample_user.idUser),
+    ]
+    markers[0].labels = [sample_labels[0], sample_labels[2]]
+    markers[2].labels = [sample_labels[1]]
+    test_db.add_all(markers)
+    test_db.commit()
+    return markers
+
+
+class TestMarkerRows:
+    """Tests for get_marker_rows"""
+
+    def test_default_pin_columns(self, test_db, sample_user, tagged_markers):
+        """Test rows contain the pin columns in order"""
+        rows = marker_repository.get_marker_rows(test_db, user_id=sample_user.idUser)
+
+        assert len(rows) == 3
+        assert tuple(rows[0]) == (tagged_markers[0].idMarker, "Duomo", 45.4642, 9.1900, True)
+
+    def test_custom_columns(self, test_db, sample_user, tagged_markers):
+        """Test callers can pick the columns they need"""
+        rows = marker_repository.get_marker_rows(
+            test_db, columns=("idMarker", "title"), user_id=sample_user.idUser
+        )
+
+        assert [tuple(row) for row in rows] == [
+            (m.idMarker, m.title) for m in tagged_markers
+        ]
+
+    def test_unknown_column(self, test_db):
+        """Test unknown columns are rejected"""
+        with pytest.raises(ValueError):
+            marker_repository.get_marker_rows(test_db, columns=("idMarker", "nope"))
+
+    def test_bbox_and_favorites(self, test_db, sample_user, tagged_markers):
+        """Test bounding box and favorite filters"""
+        milan = (45.0, 9.0, 46.0, 10.0)
+        rows = marker_repository.get_marker_rows(
+            test_db, columns=("title",), user_id=sample_user.idUser, bbox=milan
+        )
+        assert sorted(row[0] for row in rows) == ["Duomo", "Navigli"]
+
+        rows = marker_repository.get_marker_rows(
+            test_db, columns=("title",), user_id=sample_user.idUser, favorites_only=True
+        )
+        assert [row[0] for row in rows] == ["Duomo"]
+
+    def test_does_not_hydrate_orm_instances(self, test_db, sample_user, tagged_markers):
+        """Test the fast path leaves the identity map untouched"""
+        user_id = sample_user.idUser
+        test_db.expunge_all()
+        marker_repository.get_marker_rows(test_db, user_id=user_id)
+        assert len(test_db.identity_map) == 0
+
+
+class TestMarkerPins:
+    """Tests for get_marker_pins"""
+
+    def test_pins_with_label_colors(self, test_db, sample_user, sample_labels, tagged_markers):
+        """Test pins carry label colors"""
+        pins = marker_repository.get_marker_pins(test_db, user_id=sample_user.idUser)
+
+        assert all(isinstance(pin, MarkerPin) for pin in pins)
+        assert pins[0].label_colors == (sample_labels[0].color, sample_labels[2].color)
+        assert pins[1].label_colors == ()
+        assert pins[2].label_colors == (sample_labels[1].color,)
+
+    def test_pin_to_dict(self, test_db, sample_user, tagged_markers):
+        """Test pin serialization"""
+        pin = marker_repository.get_marker_pins(test_db, user_id=sample_user.idUser)[1]
+
+        assert pin.to_dict() == {
+            'id': tagged_markers[1].idMarker,
+            'title': "Navigli",
+            'latitude': 45.4520,
+            'longitude': 9.1750,
+            'is_favorite': False,
+            'label_colors': [],
+        }
+
+    def test_pins_have_no_instance_dict(self, test_db, sample_user, tagged_markers):
+        """Test pins are compact __slots__ records"""
+        pin = marker_repository.get_marker_pins(test_db, user_id=sample_user.idUser)[0]
+        assert not hasattr(pin, "__dict__")
+
+    def test_no_markers(self, test_db, sample_user):
+        """Test empty result"""
+        assert marker_repository.get_marker_pins(test_db, user_id=sample_user.idUser) == []
+
+
+class TestOwnedMutations:
+    """Tests for the single-statement ownership-checked mutations"""
+
+    def test_update_owned_marker(self, test_db, sample_user, sample_marker):
+        """Test update returns the new values in one statement"""
+        marker_id, user_id = sample_marker.idMarker, sample_user.idUser
+        statements = []
+        engine = test_db.get_bind()
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            updated = marker_repository.update_owned_marker(
+                test_db, marker_id, user_id, title="Duomo", is_favorite=True
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        # One statement on markers; the other one appends to the change feed
+        marker_statements = [s for s in statements if "markers" in s]
+        assert len(marker_statements) == 1
+        assert marker_statements[0].startswith("UPDATE markers")
+        assert "RETURNING" in marker_statements[0]
+        assert updated['id'] == marker_id
+        assert updated['title'] == "Duomo"
+        assert updated['is_favorite'] is True
+        assert updated['description'] == "Gothic cathedral in Milan"
+
+    def test_update_other_users_marker(self, test_db, sample_user, sample_marker):
+        """Test update affects nothing when the user does not own the marker"""
+        updated = marker_repository.update_owned_marker(
+            test_db, sample_marker.idMarker, sample_user.idUser + 1, title="Hacked"
+        )
+
+        assert updated is None
+        test_db.expire_all()
+        assert (
+            marker_repository.get_marker_by_id(test_db, sample_marker.idMarker).title
+            == "Duomo di Milano"
+        )
+
+    def test_delete_owned_marker(self, test_db, sample_user, sample_labels, tagged_markers):
+        """Test delete removes the marker and its label associations"""
+        marker_id = tagged_markers[0].idMarker
+
+        assert (
+            marker_repository.delete_owned_marker(test_db, marker_id, sample_user.idUser + 1)
+            is False
+        )
+        assert marker_repository.delete_owned_marker(test_db, marker_id, sample_user.idUser) is True
+        assert marker_repository.marker_exists(test_db, marker_id) is False
+        assert marker_repository.get_label_colors_for_markers(test_db, [marker_id]) == {}
+
+    def test_service_distinguishes_missing_and_forbidden(self, test_db, sample_user, sample_marker):
+        """Test the service tells not-found apart from forbidden"""
+        other_user = sample_user.idUser + 1
+
+        with pytest.raises(MarkerNotFoundError):
+            marker_service.update_marker(test_db, 999, sample_user.idUser, title="X")
+        with pytest.raises(PermissionError):
+            marker_service.update_marker(test_db, sample_marker.idMarker, other_user, title="X")
+        with pytest.raises(MarkerNotFoundError):
+            marker_service.delete_marker(test_db, 999, sample_user.idUser)
+        with pytest.raises(PermissionError):
+            marker_service.delete_marker(test_db, sample_marker.idMarker, other_user)
@@ -0,0 +1,65 @@
+"""
+Unit tests for the in-process metrics
+"""
+
+import pytest
+
+from pymypersonalmap.database.session import instrument_engine
+from pymypersonalmap.repository import marker_repository
+from pymypersonalmap.utils import metrics
+from pymypersonalmap.utils.metrics import Histogram
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    metrics.REGISTRY.clear()
+    yield
+    metrics.REGISTRY.clear()
+
+
+def test_histogram_buckets():
+    """Test observations land in cumulative buckets with count and sum"""
+    histogram = Histogram("job_seconds", "Job duration", ("job",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "resize")
+
+    assert histogram.render() == [
+        'job_seconds_bucket{job="resize",le="0.1"} 2',
+        'job_seconds_bucket{job="resize",le="1.0"} 3',
+        'job_seconds_bucket{job="resize",le="+Inf"} 4',
+        'job_seconds_count{job="resize"} 4',
+        'job_seconds_sum{job="resize"} 3.65',
+    ]
+
+
+def test_statements_by_repository_function(test_db, sample_user):
+    """Test SQL statements are counted per repository function"""
+    instrument_engine(test_db.get_bind())
+
+    marker_repository.get_marker_rows(test_db, user_id=sample_user.idUser)
+
+    assert metrics.DB_STATEMENTS.value("marker_repository.get_marker_rows") >= 1
+    assert metrics.DB_LATENCY.count("marker_repository.get_marker_rows") >= 1
+
+
+def test_metrics_endpoint(client, sample_user):
+    """Test requests are recorded by route template and exposed"""
+    client.get("/api/v1/markers/999999", params={"user_id": sample_user.idUser})
+    client.get("/no/such/route")
+    client.get("/api/v1/labels", params={"user_id": sample_user.idUser},
+               headers={"If-None-Match": '"stale"'})
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert (
+        'http_requests_total{method="GET",route="/api/v1/markers/{marker_id}",status="404"} 1'
+        in body
+    )
+    assert 'http_requests_total{method="GET",route="<unmatched>",status="404"} 1' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/labels"} 1' in body
+    assert 'cache_hit_ratio{cache="http_etag"} 0.0' in body
+    assert "http_requests_in_flight 1" in body
+    assert metrics.HTTP_IN_FLIGHT.value() == 0
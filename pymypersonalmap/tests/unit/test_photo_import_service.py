@@ -0,0 +1,162 @@
+"""
+Tests for Photo Import Service
+
+Tests for EXIF GPS extraction, clustering and directory import.
+"""
+
+import pytest
+from PIL import Image, ExifTags
+from PIL.TiffImagePlugin import IFDRational
+from pymypersonalmap.repository import marker_repository
+from pymypersonalmap.services import photo_import_service
+from pymypersonalmap.services.label_service import initialize_system_labels
+from pymypersonalmap.services.photo_import_service import (
+    PhotoDirectoryError, PhotoDirectoryNotAllowedError
+)
+
+
+def _save_photo(path, latitude=None, longitude=None, make="Canon", taken_at="2024:05:01 10:00:00"):
+    """Save a small JPEG with optional EXIF GPS tags"""
+    image = Image.new("RGB", (32, 24), "red")
+    exif = image.getexif()
+    exif[ExifTags.Base.Make] = make
+    exif[ExifTags.IFD.Exif] = {ExifTags.Base.DateTimeOriginal: taken_at}
+    if latitude is not None:
+        def dms(value):
+            value = abs(value)
+            degrees, minutes = int(value), int(value * 60) % 60
+            seconds = round((value - degrees - minutes / 60) * 3600, 2)
+            return (
+                IFDRational(degrees),
+                IFDRational(minutes),
+                IFDRational(int(seconds * 100), 100),
+            )
+
+        exif[ExifTags.IFD.GPSInfo] = {
+            ExifTags.GPS.GPSLatitudeRef: "N" if latitude >= 0 else "S",
+            ExifTags.GPS.GPSLatitude: dms(latitude),
+            ExifTags.GPS.GPSLongitudeRef: "E" if longitude >= 0 else "W",
+            ExifTags.GPS.GPSLongitude: dms(longitude),
+            ExifTags.GPS.GPSAltitude: IFDRational(1225, 10),
+        }
+    image.save(path, exif=exif)
+    return str(path)
+
+
+def test_gps_to_degrees():
+    """Test rationals are converted with the hemisphere sign"""
+    assert photo_import_service.gps_to_degrees(((45, 1), (27, 1), (5112, 100)), "N") == 45.4642
+    assert photo_import_service.gps_to_degrees((33.0, 52.0, 0.0), "S") == pytest.approx(
+        -33.8667, abs=1e-4
+    )
+
+
+def test_read_photo_location(tmp_path):
+    """Test GPS position, altitude, time and camera are read from EXIF"""
+    path = _save_photo(tmp_path / "duomo.jpg", 45.4642, -9.19, make="DJI")
+
+    location = photo_import_service.read_photo_location(path)
+
+    assert location[0] == path
+    assert location[1] == pytest.approx(45.4642, abs=1e-4)
+    assert location[2] == pytest.approx(-9.19, abs=1e-4)
+    assert location[3:6] == (122.5, "2024-05-01T10:00:00", "DJI")
+
+
+def test_read_photo_without_gps(tmp_path):
+    """Test photos without GPS tags are recognized"""
+    assert photo_import_service.read_photo_location(_save_photo(tmp_path / "a.jpg")) is None
+
+
+def test_cluster_locations():
+    """Test near-identical positions share a cluster"""
+    locations = [
+        ("/p/a.jpg", 45.46420, 9.19000, None, "2024-05-01T10:00:00", "Canon", None),
+        ("/p/b.jpg", 45.46425, 9.19005, None, "2024-05-01T09:00:00", "DJI", None),
+        ("/p/c.jpg", 45.47000, 9.19000, None, None, "Canon", None),
+    ]
+
+    clusters = photo_import_service.cluster_locations(locations, distance_m=25)
+
+    assert [cluster.count for cluster in clusters] == [2, 1]
+    assert clusters[0].first_taken == "2024-05-01T09:00:00"
+    assert clusters[0].is_drone is True
+    row = clusters[0].to_row({"Fotografia": 1, "Drone": 2})
+    assert row['title'] == "a (+1)"
+    assert row['label_ids'] == [2]
+    assert row['metadata']['files'] == ["a.jpg", "b.jpg"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_import_photo_directory(test_db, sample_user, tmp_path, workers):
+    """Test a directory tree becomes clustered, labelled markers"""
+    initialize_system_labels(test_db)
+    (tmp_path / "trip").mkdir()
+    _save_photo(tmp_path / "IMG_1.jpg", 45.4642, 9.19)
+    _save_photo(tmp_path / "IMG_2.jpg", 45.46421, 9.19001)
+    _save_photo(tmp_path / "trip" / "DJI_1.JPG", 41.8902, 12.4922, make="DJI")
+    _save_photo(tmp_path / "no_gps.jpg")
+    (tmp_path / "broken.jpg").write_bytes(b"not a jpeg")
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    report = photo_import_service.import_photo_directory(
+        test_db, sample_user.idUser, tmp_path, workers=workers
+    )
+
+    assert report.processed == 5
+    assert report.imported == 2
+    assert report.skipped == 1
+    assert report.failed == 1
+    markers = marker_repository.get_marker_dicts(
+        test_db, ["title", "labels", "metadata"], user_id=sample_user.idUser
+    )
+    assert sorted((m['title'], tuple(m['labels'])) for m in markers) == [
+        ("DJI_1", ("Drone",)), ("IMG_1 (+1)", ("Fotografia",))
+    ]
+
+
+def test_import_missing_directory(test_db, sample_user, tmp_path):
+    """Test a missing directory is rejected"""
+    with pytest.raises(PhotoDirectoryError):
+        photo_import_service.import_photo_directory(
+            test_db, sample_user.idUser, tmp_path / "missing"
+        )
+
+
+def test_unreadable_subdirectory_is_reported(test_db, sample_user, tmp_path, monkeypatch):
+    """Test a directory that cannot be read is reported and the others imported"""
+    initialize_system_labels(test_db)
+    (tmp_path / "private").mkdir()
+    _save_photo(tmp_path / "IMG_1.jpg", 45.4642, 9.19)
+    real_scandir = photo_import_service.os.scandir
+
+    def scandir(path):
+        if path.endswith("private"):
+            raise PermissionError(13, "Permission denied", path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(photo_import_service.os, "scandir", scandir)
+
+    report = photo_import_service.import_photo_directory(
+        test_db, sample_user.idUser, tmp_path, workers=1
+    )
+
+    assert report.imported == 1
+    assert report.failed == 1
+    assert report.to_dict()['errors'][0]['file'] == "private"
+
+
+def test_resolve_import_directory(tmp_path):
+    """Test API directories must stay inside the configured root"""
+    (tmp_path / "trip").mkdir()
+
+    assert (
+        photo_import_service.resolve_import_directory("trip", tmp_path)
+        == (tmp_path / "trip").resolve()
+    )
+    with pytest.raises(PhotoDirectoryNotAllowedError):
+        photo_import_service.resolve_import_directory("../..", tmp_path)
+    with pytest.raises(PhotoDirectoryNotAllowedError):
+        photo_import_service.resolve_import_directory("/etc", tmp_path)
+    with pytest.raises(PhotoDirectoryNotAllowedError):
+        photo_import_service.resolve_import_directory(str(tmp_path), "")
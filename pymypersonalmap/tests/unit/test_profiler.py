@@ -0,0 +1,68 @@
+"""
+Unit tests for the on-demand request profiler
+"""
+
+import pstats
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from pymypersonalmap.utils.profiler import ProfilerMiddleware, SamplingProfiler
+
+
+def busy_work(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(100))
+
+
+def _client(output_dir) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(ProfilerMiddleware, token="s3cret", output_dir=output_dir)
+
+    @app.get("/slow")
+    def slow():
+        busy_work(0.1)
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_profiles_requests_with_token(tmp_path):
+    """Test a request with the token is profiled into pstats and collapsed stacks"""
+    response = _client(tmp_path).get("/slow", headers={"X-Profile": "s3cret"})
+
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    collapsed = (tmp_path / f"{profile_id}.collapsed").read_text()
+    assert "slow (test_profiler.py" in collapsed
+    assert ";busy_work (test_profiler.py" in collapsed
+
+    stats = pstats.Stats(str(tmp_path / f"{profile_id}.pstats"))
+    functions = {name for _, _, name in stats.stats}
+    assert "busy_work" in functions
+
+
+def test_other_requests_are_not_profiled(tmp_path):
+    """Test requests without the right token are served untouched"""
+    client = _client(tmp_path)
+
+    assert "X-Profile-Id" not in client.get("/slow").headers
+    assert "X-Profile-Id" not in client.get("/slow", headers={"X-Profile": "guess"}).headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sampler_statistics():
+    """Test own and cumulative times follow the sampled stacks"""
+    profiler = SamplingProfiler(interval=0.01)
+    outer, inner = ("a.py", 1, "outer"), ("a.py", 5, "inner")
+    profiler.stacks[(outer, inner)] = 3
+    profiler.stacks[(outer,)] = 1
+
+    stats = profiler.stats()
+
+    assert stats[outer][:4] == (4, 4, 0.01, 0.04)
+    assert stats[inner][:4] == (3, 3, 0.03, 0.03)
+    assert stats[inner][4] == {outer: (3, 3, 0.03, 0.03)}
+    assert profiler.collapsed() == ["outer (a.py:1);inner (a.py:5) 3", "outer (a.py:1) 1"]
@@ -0,0 +1,55 @@
+"""
+Unit tests for per-request SQL accounting, slow query log and budgets
+"""
+
+import pytest
+
+from pymypersonalmap.database import query_monitor
+from pymypersonalmap.database.query_monitor import QueryBudgetExceeded
+from pymypersonalmap.repository import labels_repository, marker_repository
+
+
+def test_statement_shape():
+    """Test IN-lists and whitespace do not change a statement's shape"""
+    assert query_monitor.statement_shape(
+        "SELECT *\n  FROM markers WHERE id IN (?, ?, ?)"
+    ) == query_monitor.statement_shape("SELECT * FROM markers WHERE id IN (?)")
+
+
+def test_budget_and_n_plus_one(test_db, sample_labels):
+    """Test repeated statements are flagged and budgets enforced"""
+    with query_monitor.query_budget(20) as queries:
+        for _ in range(12):
+            labels_repository.get_label_by_name(test_db, "Urbex")
+
+    assert queries.count == 12
+    assert list(queries.repeated().values()) == [12]
+
+    with pytest.raises(QueryBudgetExceeded, match="2 statements issued, budget is 1"):
+        with query_monitor.query_budget(1):
+            labels_repository.get_label_by_name(test_db, "Urbex")
+            labels_repository.get_label_by_name(test_db, "Restaurant")
+
+
+def test_slow_statements_are_logged_with_plan(test_db, sample_user, monkeypatch, tmp_path):
+    """Test slow statements are written with parameters and query plan"""
+    monkeypatch.setattr(query_monitor, "slow_query_seconds", 0)
+    monkeypatch.setattr(query_monitor, "_slow_log", None)
+    path = query_monitor.configure_slow_log(tmp_path)
+
+    marker_repository.get_marker_rows(test_db, user_id=sample_user.idUser)
+
+    log = path.read_text()
+    assert "FROM markers" in log
+    assert f"parameters: ({sample_user.idUser}," in log
+    assert "idx_marker_user_created" in log or "SEARCH markers" in log
+
+
+def test_endpoint_budget_fails_requests(client, sample_user, monkeypatch):
+    """Test a request over its endpoint budget fails in strict mode"""
+    params = {"user_id": sample_user.idUser}
+    assert client.get("/api/v1/labels", params=params).status_code == 200
+
+    monkeypatch.setitem(query_monitor.budgets, "GET /api/v1/labels", 0)
+    with pytest.raises(QueryBudgetExceeded, match="GET /api/v1/labels issued"):
+        client.get("/api/v1/labels", params=params)
@@ -0,0 +1,115 @@
+"""
+Unit tests for the columnar marker snapshots
+"""
+
+import numpy as np
+import pytest
+
+from pymypersonalmap.repository import marker_repository
+from pymypersonalmap.services import snapshot_service
+from pymypersonalmap.services.snapshot_service import SnapshotFormatError, SnapshotStore
+
+
+@pytest.fixture
+def library(test_db, sample_user, sample_labels):
+    """A few markers with labels, created through the repository (change feed)"""
+    urbex, restaurant, _ = sample_labels
+    return marker_repository.bulk_create_markers(test_db, sample_user.idUser, [
+        {"title": "Duomo", "latitude": 45.4642, "longitude": 9.19, "label_ids": [urbex.idLabel]},
+        {"title": "Navigli", "latitude": 45.45, "longitude": 9.17, "is_favorite": True},
+        {"title": "Trattoria Città", "latitude": -33.8688, "longitude": -151.2093,
+         "label_ids": [urbex.idLabel, restaurant.idLabel]},
+    ])
+
+
+def test_build_snapshot(test_db, sample_user, sample_labels, library):
+    """Test the columns, titles and label bitmasks of a fresh snapshot"""
+    urbex, restaurant, photo = sample_labels
+
+    snapshot = snapshot_service.build_snapshot(test_db, sample_user.idUser)
+
+    assert list(snapshot.ids) == library
+    assert snapshot.latitudes_e6.dtype == np.int32
+    assert list(snapshot.latitudes_e6) == [45464200, 45450000, -33868800]
+    assert snapshot.longitudes[2] == pytest.approx(-151.2093)
+    assert list(snapshot.favorites) == [False, True, False]
+    assert snapshot.titles() == ["Duomo", "Navigli", "Trattoria Città"]
+    assert snapshot.marker_label_ids(2) == [urbex.idLabel, restaurant.idLabel]
+    assert list(snapshot.has_any_label([restaurant.idLabel, photo.idLabel])) == [False, False, True]
+    assert snapshot.label_counts() == {urbex.idLabel: 2, restaurant.idLabel: 1}
+
+
+def test_file_round_trip(test_db, sample_user, library, tmp_path):
+    """Test a written snapshot maps back to identical arrays"""
+    snapshot = snapshot_service.build_snapshot(test_db, sample_user.idUser)
+    path = tmp_path / "markers.snap"
+
+    snapshot_service.write_snapshot(snapshot, path)
+    loaded = snapshot_service.read_snapshot(path)
+
+    assert loaded.seq == snapshot.seq
+    assert loaded.label_ids == snapshot.label_ids
+    for name, array in snapshot._arrays().items():
+        assert np.array_equal(getattr(loaded, name), array), name
+        assert getattr(loaded, name).ctypes.data % snapshot_service.ALIGNMENT == 0
+    assert not loaded.ids.flags.writeable
+
+
+def test_empty_library(test_db, sample_user, tmp_path):
+    """Test a user without markers gets a valid, empty snapshot"""
+    path = tmp_path / "empty.snap"
+    snapshot_service.write_snapshot(snapshot_service.build_snapshot(test_db, 1), path)
+
+    loaded = snapshot_service.read_snapshot(path)
+
+    assert len(loaded) == 0
+    assert loaded.label_counts() == {}
+
+
+def test_corrupt_file(tmp_path):
+    """Test files that are not snapshots are rejected"""
+    path = tmp_path / "bad.snap"
+    path.write_bytes(b"not a snapshot at all")
+
+    with pytest.raises(SnapshotFormatError):
+        snapshot_service.read_snapshot(path)
+
+
+def test_refresh_applies_changes(test_db, sample_user, sample_labels, library):
+    """Test a refresh patches created, updated, relabelled and deleted markers"""
+    user_id = sample_user.idUser
+    snapshot = snapshot_service.build_snapshot(test_db, user_id)
+    assert snapshot_service.refresh_snapshot(test_db, snapshot) is snapshot
+
+    marker_repository.update_owned_marker(test_db, library[0], user_id, title="Duomo di Milano")
+    marker_repository.delete_owned_marker(test_db, library[1], user_id)
+    marker_repository.add_label_to_marker(test_db, library[2], sample_labels[2].idLabel)
+    created = marker_repository.create_marker(test_db, "Brera", 45.472, 9.188, user_id)
+    test_db.commit()
+
+    refreshed = snapshot_service.refresh_snapshot(test_db, snapshot)
+    rebuilt = snapshot_service.build_snapshot(test_db, user_id)
+
+    assert refreshed.seq == rebuilt.seq > snapshot.seq
+    assert list(refreshed.ids) == [library[0], library[2], created.idMarker]
+    assert refreshed.titles() == ["Duomo di Milano", "Trattoria Città", "Brera"]
+    assert refreshed.label_counts() == rebuilt.label_counts()
+    assert np.array_equal(refreshed.latitudes_e6, rebuilt.latitudes_e6)
+
+
+def test_store_reuses_and_rewrites_files(test_db, sample_user, library, tmp_path):
+    """Test the store writes a file per sequence number and drops stale ones"""
+    store = SnapshotStore(tmp_path)
+    user_id = sample_user.idUser
+
+    first = store.get(test_db, user_id)
+    assert store.get(test_db, user_id) is first
+    assert store.latest_path(user_id) == store.path(user_id, first.seq)
+
+    marker_repository.create_marker(test_db, "Brera", 45.472, 9.188, user_id)
+    second = SnapshotStore(tmp_path).get(test_db, user_id)
+
+    assert len(second) == len(first) + 1
+    assert list((tmp_path / "snapshots" / str(user_id)).iterdir()) == [
+        store.path(user_id, second.seq)
+    ]
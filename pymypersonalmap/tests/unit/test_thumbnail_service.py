@@ -0,0 +1,84 @@
+"""
+Tests for Thumbnail Service
+
+Tests for thumbnail rendering, caching and request coalescing.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PIL import Image
+from pymypersonalmap.services import thumbnail_service
+from pymypersonalmap.services.thumbnail_service import ThumbnailError, THUMBNAIL_SIZES
+
+SHA256 = "ab" * 32
+
+
+@pytest.fixture
+def photo(tmp_path):
+    """A 2000x1500 JPEG"""
+    path = tmp_path / "photo.jpg"
+    Image.new("RGB", (2000, 1500), "blue").save(path, quality=90)
+    return path
+
+
+def test_render_thumbnails(photo, tmp_path):
+    """Test every size is rendered, keeping the aspect ratio"""
+    targets = [(size, str(tmp_path / f"{size}.jpg")) for size in THUMBNAIL_SIZES]
+
+    rendered = thumbnail_service.render_thumbnails(str(photo), targets)
+
+    assert rendered == sorted(THUMBNAIL_SIZES, reverse=True)
+
+    for size, path in targets:
+        with Image.open(path) as image:
+            assert image.format == "JPEG"
+            assert image.size == (size, size * 3 // 4)
+
+
+def test_render_not_an_image(tmp_path):
+    """Test files that are not images raise ThumbnailError"""
+    source = tmp_path / "notes.txt"
+    source.write_text("hello")
+
+    with pytest.raises(ThumbnailError):
+        thumbnail_service.render_thumbnails(str(source), [(128, str(tmp_path / "out.jpg"))])
+
+
+def test_get_renders_once(thumbnail_generator, photo, monkeypatch):
+    """Test concurrent first requests share one rendering and later ones hit the cache"""
+    submitted = []
+    original_submit = thumbnail_generator.submit
+
+    def counting_submit(sha256, source):
+        future = original_submit(sha256, source)
+        submitted.append(future)
+        return future
+
+    monkeypatch.setattr(thumbnail_generator, "submit", counting_submit)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        sizes = [128, 320, 800, 128]
+        paths = list(pool.map(lambda size: thumbnail_generator.get(SHA256, photo, size), sizes))
+
+    assert all(path.exists() for path in paths)
+    assert len({id(future) for future in submitted if future is not None}) == 1
+    assert thumbnail_generator.submit(SHA256, photo) is None
+
+
+def test_get_unsupported_size(thumbnail_generator, photo):
+    """Test sizes outside THUMBNAIL_SIZES are refused"""
+    with pytest.raises(ValueError):
+        thumbnail_generator.get(SHA256, photo, 100)
+
+
+def test_shutdown_with_rendering_in_flight(thumbnail_generator, photo):
+    """Test shutdown does not deadlock with the completion callback"""
+    thumbnail_generator.submit(SHA256, photo)
+
+    stopper = threading.Thread(target=thumbnail_generator.shutdown)
+    stopper.start()
+    stopper.join(timeout=30)
+
+    assert not stopper.is_alive()
@@ -0,0 +1,64 @@
+"""
+Unit tests for user_service password hashing
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from pymypersonalmap.services import user_service
+from pymypersonalmap.services.user_service import PasswordHasher, PasswordHasherBusyError
+from pymypersonalmap.utils import metrics
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hash_and_verify_in_pool(hasher):
+    """Test hashes made in the pool verify, both from threads and coroutines"""
+    hashed = hasher.hash("correct horse")
+
+    assert hashed != "correct horse"
+    assert hasher.verify("correct horse", hashed) is True
+    assert asyncio.run(hasher.verify_async("wrong horse", hashed)) is False
+
+
+def test_queue_is_bounded_and_measured(hasher):
+    """Test calls beyond the queue limit are refused and the depth is exported"""
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    running = hasher.submit(blocker)
+    started.wait(5)
+    waiting = hasher.submit(lambda: "done")
+
+    assert hasher.queue_depth == 1
+    assert "password_hash_queue_depth 1" in metrics.REGISTRY.render()
+    rejected = metrics.PASSWORD_HASH_REJECTED.value()
+    with pytest.raises(PasswordHasherBusyError):
+        hasher.submit(lambda: "refused")
+    assert metrics.PASSWORD_HASH_REJECTED.value() == rejected + 1
+
+    release.set()
+    running.result(5)
+    assert waiting.result(5) == "done"
+    assert hasher.queue_depth == 0
+
+
+def test_service_functions_use_shared_pool(monkeypatch, hasher):
+    """Test the module-level functions go through the process-wide pool"""
+    monkeypatch.setattr(user_service, "_hasher", hasher)
+
+    hashed = user_service.hash_password("s3cret password")
+
+    assert asyncio.run(user_service.verify_password_async("s3cret password", hashed)) is True
+    assert user_service.get_password_hasher() is hasher
@@ -0,0 +1,201 @@
+"""
+Memory Diagnostics
+
+Tools to find out why the resident memory of a server process grows:
+
+- tracemalloc tracing with numbered snapshots, and the difference between
+  two snapshots grouped by file and line (where the memory was allocated)
+- the size and number of entries of every in-process cache and index,
+  reported by the modules owning them through ``register_cache``
+
+Tracing slows allocations down and costs memory itself, so it is off
+until started. Everything is per process: with several server workers,
+each one traces and reports its own memory.
+"""
+
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Callable
+
+# Snapshots kept in memory (the oldest is dropped first)
+MAX_SNAPSHOTS = 10
+
+# Allocations of these files are the tracing machinery, not the application
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<unknown>")
+
+
+class TracingNotStartedError(Exception):
+    """Raised when a snapshot is requested while tracemalloc is not tracing"""
+    pass
+
+
+class SnapshotNotFoundError(Exception):
+    """Raised when a snapshot ID is unknown (never taken, or already dropped)"""
+    pass
+
+
+_lock = threading.Lock()
+_snapshots: dict[int, tuple[float, tracemalloc.Snapshot]] = {}
+_next_snapshot_id = 1
+
+# Cache name -> callable returning its statistics (None when not created yet)
+_caches: dict[str, Callable[[], dict | None]] = {}
+
+
+def start_tracing(frames: int = 1) -> dict:
+    """
+    Start tracing allocations
+
+    Args:
+        frames: Frames stored per allocation (1 is enough to group by line)
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    return tracing_status()
+
+
+def stop_tracing() -> dict:
+    """Stop tracing and drop the snapshots (they cannot be compared to new ones)"""
+    with _lock:
+        _snapshots.clear()
+    tracemalloc.stop()
+    return tracing_status()
+
+
+def tracing_status() -> dict:
+    """Whether tracing is on, traced memory and the snapshots available"""
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    with _lock:
+        snapshots = [
+            {"id": snapshot_id, "taken_at": taken_at}
+            for snapshot_id, (taken_at, _) in _snapshots.items()
+        ]
+    return {
+        "tracing": tracing,
+        "frames": tracemalloc.get_traceback_limit() if tracing else 0,
+        "traced_bytes": current,
+        "peak_traced_bytes": peak,
+        "snapshots": snapshots,
+    }
+
+
+def take_snapshot() -> dict:
+    """
+    Take a snapshot of the traced allocations
+
+    Returns:
+        Dictionary with the snapshot ID and the traced memory
+
+    Raises:
+        TracingNotStartedError: If tracing is off
+    """
+    global _next_snapshot_id
+    if not tracemalloc.is_tracing():
+        raise TracingNotStartedError("Start tracing before taking snapshots")
+    # Unreachable cycles would show up as leaks
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES]
+    )
+    with _lock:
+        snapshot_id = _next_snapshot_id
+        _next_snapshot_id += 1
+        _snapshots[snapshot_id] = (time.time(), snapshot)
+        while len(_snapshots) > MAX_SNAPSHOTS:
+            del _snapshots[min(_snapshots)]
+    return {
+        "id": snapshot_id,
+        "traced_bytes": sum(trace.size for trace in snapshot.traces),
+    }
+
+
+def _get_snapshot(snapshot_id: int) -> tuple[float, tracemalloc.Snapshot]:
+    with _lock:
+        try:
+            return _snapshots[snapshot_id]
+        except KeyError:
+            raise SnapshotNotFoundError(f"Snapshot {snapshot_id} not found") from None
+
+
+def compare_snapshots(first_id: int, second_id: int, limit: int = 25) -> dict:
+    """
+    Allocation differences between two snapshots, grouped by file and line
+
+    Args:
+        first_id: Older snapshot
+        second_id: Newer snapshot
+        limit: Lines reported, largest growth first
+
+    Raises:
+        SnapshotNotFoundError: If a snapshot ID is unknown
+    """
+    first_taken, first = _get_snapshot(first_id)
+    second_taken, second = _get_snapshot(second_id)
+    differences = second.compare_to(first, "lineno")
+    return {
+        "first": first_id,
+        "second": second_id,
+        "seconds": round(second_taken - first_taken, 3),
+        "size_diff": sum(stat.size_diff for stat in differences),
+        "count_diff": sum(stat.count_diff for stat in differences),
+        "lines": [
+            {
+                "file": stat.traceback[0].filename,
+                "line": stat.traceback[0].lineno,
+                "size": stat.size,
+                "size_diff": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff,
+            }
+            for stat in differences[:limit]
+        ],
+    }
+
+
+def register_cache(name: str, stats: Callable[[], dict | None]) -> None:
+    """
+    Report a cache or index in ``cache_report``
+
+    Args:
+        name: Name of the cache in the report
+        stats: Returns the statistics of the cache, at least ``entries``
+            and, when known, ``bytes``; None if the cache was not created
+    """
+    _caches[name] = stats
+
+
+def resident_bytes() -> int | None:
+    """Resident set size of this process, if the platform reports it"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak, not current: the best macOS offers without extra dependencies
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def cache_report() -> dict:
+    """Size and number of entries of every registered cache and index"""
+    caches = {}
+    for name, stats in sorted(_caches.items()):
+        try:
+            caches[name] = stats()
+        except Exception as e:
+            caches[name] = {"error": str(e)}
+    return {
+        "pid": os.getpid(),
+        "resident_bytes": resident_bytes(),
+        "gc_objects": len(gc.get_objects()),
+        "caches": caches,
+    }
@@ -0,0 +1,337 @@
+"""
+Metrics
+
+In-process counters, gauges and histograms rendered in the Prometheus
+text format by ``GET /metrics``. Histograms have fixed, preallocated
+buckets: an observation is a bisect plus two additions under a lock, so
+instrumentation stays cheap on hot paths (every request, every SQL
+statement).
+
+Values are per process; with several server workers each one reports its
+own (scrape them individually or aggregate by instance).
+
+Application metrics:
+
+- http_requests_total / http_request_duration_seconds by method, route
+  template and status, http_requests_in_flight (MetricsMiddleware)
+- db_statements_total / db_statement_duration_seconds by repository
+  function, db_pool_checkout_wait_seconds (database/session.py)
+- cache_requests_total by cache and result, plus the derived
+  cache_hit_ratio
+- password_hash_queue_depth, password_hash_in_progress and
+  password_hash_rejected_total (services/user_service.py)
+"""
+
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+# Seconds; suited to both SQL statements and whole requests
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Modules whose functions statements are attributed to
+REPOSITORY_PACKAGE = "pymypersonalmap.repository."
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class: a named metric family with label names"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        """Add ``amount`` to the counter of a label combination"""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def values(self) -> dict[tuple, float]:
+        """Snapshot of the values by label combination"""
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(self.values().items())
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Counter):
+    """Value that goes up and down"""
+
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observations in fixed buckets
+
+    Example:
+        LATENCY = Histogram("job_seconds", "Job duration", ("job",))
+        LATENCY.observe(0.042, "resize")
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label combination: [count per bucket..., count above the last, sum]
+        self._series: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        """Record one observation"""
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return int(sum(series[:-1])) if series else 0
+
+    def sum(self, *labels) -> float:
+        series = self._series.get(labels)
+        return series[-1] if series else 0.0
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = []
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+            lines.append(f"{self.name}_sum{label_text} {_format_value(series[-1])}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+    """Set of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        # Functions returning derived metrics (rendered lines) at scrape time
+        self._collectors: list[Callable[[], list[str]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], list[str]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        """Reset every metric (for tests)"""
+        for metric in self._metrics:
+            metric.clear()
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by method, route and status",
+    ("method", "route", "status")
+))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route",
+    ("method", "route")
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests being served"
+))
+DB_STATEMENTS = REGISTRY.register(Counter(
+    "db_statements_total", "SQL statements by repository function", ("function",)
+))
+DB_LATENCY = REGISTRY.register(Histogram(
+    "db_statement_duration_seconds", "SQL statement duration by repository function",
+    ("function",)
+))
+DB_POOL_WAIT = REGISTRY.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection"
+))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit or miss)",
+    ("cache", "result")
+))
+PASSWORD_HASH_QUEUE = REGISTRY.register(Gauge(
+    "password_hash_queue_depth", "Password hashes and verifications waiting for a thread"
+))
+PASSWORD_HASH_IN_PROGRESS = REGISTRY.register(Gauge(
+    "password_hash_in_progress", "Password hashes and verifications running"
+))
+PASSWORD_HASH_REJECTED = REGISTRY.register(Counter(
+    "password_hash_rejected_total", "Password hashes refused because the queue was full"
+))
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a lookup of an in-process or HTTP cache"""
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def _cache_hit_ratios() -> list[str]:
+    totals: dict[str, list[float]] = {}
+    for (cache, result), value in CACHE_REQUESTS.values().items():
+        hits_and_total = totals.setdefault(cache, [0, 0])
+        hits_and_total[1] += value
+        if result == "hit":
+            hits_and_total[0] += value
+    lines = [
+        "# HELP cache_hit_ratio Fraction of cache lookups that were hits",
+        "# TYPE cache_hit_ratio gauge",
+    ]
+    for cache, (hits, total) in sorted(totals.items()):
+        labels = _format_labels(("cache",), (cache,))
+        lines.append(f"cache_hit_ratio{labels} {_format_value(hits / total)}")
+    return lines
+
+
+REGISTRY.add_collector(_cache_hit_ratios)
+
+
+def repository_function() -> str:
+    """
+    Name of the innermost repository function on the call stack
+
+    Returns:
+        "<module>.<function>", e.g. "marker_repository.get_marker_rows",
+        or "other" for statements issued outside the repository layer
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith(REPOSITORY_PACKAGE):
+            return f"{module[len(REPOSITORY_PACKAGE):]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "other"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, latency and concurrency
+
+    Requests are labelled with the route template (``/api/v1/markers/{marker_id}``),
+    not the raw path, so the number of series stays bounded.
+
+    Usage:
+        app.add_middleware(MetricsMiddleware)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "<unmatched>"
+            HTTP_REQUESTS.inc(scope["method"], template, str(status))
+            HTTP_LATENCY.observe(elapsed, scope["method"], template)
@@ -0,0 +1,174 @@
+"""
+Parallel Utilities
+
+Process pool helpers for CPU-bound work (parsing, image decoding).
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Iterable, Iterator, TypeVar
+
+
+T = TypeVar("T")
+
+
+def default_workers(configured: int = 0) -> int:
+    """Number of worker processes for a setting where 0 means one per CPU core"""
+    return configured or os.cpu_count() or 1
+
+
+def pool_context() -> multiprocessing.context.BaseContext:
+    """
+    Start method for worker pools
+
+    The server process is multi-threaded and holds database connections
+    and locks, which ``fork`` would copy into the workers in whatever
+    state they happen to be. Workers are started from a clean forkserver
+    process instead (spawn where forkserver is unavailable, e.g. Windows).
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def bounded_imap_unordered(
+    func: Callable[..., T],
+    arguments: Iterable[tuple],
+    workers: int,
+    window: int | None = None
+) -> Iterator[T]:
+    """
+    Run ``func(*args)`` for each argument tuple in a process pool
+
+    Results are yielded as they complete. At most ``window`` tasks
+    (default ``2 * workers``) are submitted at a time, so ``arguments`` may
+    be a lazy iterable of any length without its items piling up in memory.
+    With one worker everything runs in the calling process.
+
+    Args:
+        func: Picklable top-level function
+        arguments: Argument tuples
+        workers: Number of worker processes
+        window: Maximum number of tasks in flight
+
+    Yields:
+        Function results, in completion order
+    """
+    arguments = iter(arguments)
+    if workers <= 1:
+        for args in arguments:
+            yield func(*args)
+        return
+
+    window = window or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context()) as pool:
+        pending = {pool.submit(func, *args) for _, args in zip(range(window), arguments)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                args = next(arguments, None)
+                if args is not None:
+                    pending.add(pool.submit(func, *args))
+
+
+def _stream_items(
+    items: queue.Queue,
+    stop: threading.Event,
+    task_id: int,
+    func: Callable[..., Iterator],
+    args: tuple
+) -> None:
+    """Worker side of bounded_imap_streamed: forward what ``func`` yields, then an end mark"""
+    try:
+        for item in func(*args):
+            if stop.is_set():
+                break
+            items.put((task_id, True, item))
+    finally:
+        items.put((task_id, False, None))
+
+
+def bounded_imap_streamed(
+    func: Callable[..., Iterator[T]],
+    arguments: Iterable[tuple],
+    workers: int,
+    window: int | None = None,
+    max_queued: int | None = None
+) -> Iterator[T]:
+    """
+    Run the generator ``func(*args)`` for each argument tuple in a process pool
+
+    Like bounded_imap_unordered, but each task streams its items back as it
+    produces them instead of returning one result at the end: the items of
+    all running tasks are yielded interleaved, in the order they arrive. At
+    most ``max_queued`` items (default ``window``) wait for the caller; a
+    worker producing faster than that blocks, so memory does not grow with
+    the size of a task. With one worker everything runs in the calling
+    process.
+
+    Args:
+        func: Picklable top-level generator function
+        arguments: Argument tuples
+        workers: Number of worker processes
+        window: Maximum number of tasks in flight (default ``2 * workers``)
+        max_queued: Maximum number of items waiting for the caller
+
+    Yields:
+        Items of the tasks, each task's in order
+
+    Raises:
+        Whatever a task raised, once its earlier items have been yielded
+    """
+    arguments = iter(arguments)
+    if workers <= 1:
+        for args in arguments:
+            yield from func(*args)
+        return
+
+    window = window or 2 * workers
+    context = pool_context()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool, \
+            context.Manager() as manager:
+        items = manager.Queue(max_queued or window)
+        stop = manager.Event()
+        running = {}
+
+        def submit(task_id: int) -> None:
+            args = next(arguments, None)
+            if args is not None:
+                running[task_id] = pool.submit(_stream_items, items, stop, task_id, func, args)
+
+        for task_id in range(window):
+            submit(task_id)
+        next_id = window
+        try:
+            while running:
+                try:
+                    task_id, more, item = items.get(timeout=1)
+                except queue.Empty:
+                    # A worker that died never sends its end mark
+                    for future in running.values():
+                        if future.done():
+                            future.result()
+                    continue
+                if more:
+                    yield item
+                    continue
+                running.pop(task_id).result()
+                submit(next_id)
+                next_id += 1
+        finally:
+            # Stopped early (the caller closed the generator or a task failed):
+            # let the running tasks end, unblocking those waiting on a full queue
+            stop.set()
+            for future in running.values():
+                future.cancel()
+            while not all(future.done() for future in running.values()):
+                try:
+                    items.get(timeout=0.1)
+                except queue.Empty:
+                    pass
@@ -0,0 +1,214 @@
+"""
+Request Profiler
+
+Opt-in profiling of single requests, to investigate slow requests where
+they happen. A request carrying ``X-Profile: <PROFILE_TOKEN>`` is sampled
+while it runs and the result is written to ``<logs dir>/profiles``:
+
+- ``<id>.pstats``: pstats-compatible statistics
+  (``python -m pstats <id>.pstats``, snakeviz, ...)
+- ``<id>.collapsed``: collapsed stacks for flamegraph.pl or speedscope
+
+The profile id is returned in the ``X-Profile-Id`` response header.
+
+The profiler samples stacks rather than tracing calls: synchronous
+endpoints run in worker threads that cProfile cannot follow, and sampling
+keeps the profiled request close to its normal speed. Every busy thread
+is sampled, so requests served concurrently appear in the profile too.
+
+The middleware is only installed when PROFILE_TOKEN is set, so it costs
+nothing otherwise.
+"""
+
+import hmac
+import marshal
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# Seconds between samples
+DEFAULT_INTERVAL = 0.001
+
+# Threads whose innermost frame is in these modules are idle (waiting)
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "thread.py")
+
+FrameKey = tuple[str, int, str]
+
+
+def _frame_key(code) -> FrameKey:
+    return code.co_filename, code.co_firstlineno, code.co_name
+
+
+class SamplingProfiler:
+    """
+    Periodic sampler of the stacks of all busy threads
+
+    Example:
+        profiler = SamplingProfiler()
+        profiler.start()
+        handle_request()
+        profiler.stop()
+        profiler.write_pstats(path)
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        # Stacks, outermost frame first, and how many times each was seen
+        self.stacks: Counter[tuple[FrameKey, ...]] = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started = 0.0
+
+    def start(self) -> None:
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(exclude=own)
+
+    def sample(self, exclude: int | None = None) -> None:
+        """Record the current stack of every busy thread"""
+        self.samples += 1
+        for ident, frame in sys._current_frames().items():
+            if ident == exclude or frame.f_code.co_filename.endswith(_IDLE_FILES):
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_key(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+
+    def collapsed(self) -> list[str]:
+        """Stacks in the collapsed format ("outer;inner;leaf count")"""
+        lines = []
+        for stack, count in self.stacks.most_common():
+            names = [
+                f"{name} ({Path(filename).name}:{line})".replace(";", ":")
+                for filename, line, name in stack
+            ]
+            lines.append(f"{';'.join(names)} {count}")
+        return lines
+
+    def stats(self) -> dict:
+        """
+        Samples converted to the dictionary pstats loads
+
+        Call counts are sample counts; own time is the time a function was
+        the innermost frame, cumulative time the time it was on the stack.
+        """
+        interval = self.interval
+        stats: dict[FrameKey, list] = {}
+        for stack, count in self.stacks.items():
+            seconds = count * interval
+            seen = set()
+            for depth, key in enumerate(stack):
+                entry = stats.setdefault(key, [0, 0, 0.0, 0.0, {}])
+                if key not in seen:
+                    seen.add(key)
+                    entry[0] += count
+                    entry[1] += count
+                    entry[3] += seconds
+                leaf = depth == len(stack) - 1
+                if leaf:
+                    entry[2] += seconds
+                if depth:
+                    caller = entry[4].setdefault(stack[depth - 1], [0, 0, 0.0, 0.0])
+                    caller[0] += count
+                    caller[1] += count
+                    caller[2] += seconds if leaf else 0.0
+                    caller[3] += seconds
+        return {
+            key: (cc, nc, tt, ct, {caller: tuple(values) for caller, values in callers.items()})
+            for key, (cc, nc, tt, ct, callers) in stats.items()
+        }
+
+    def write_pstats(self, path: Path | str) -> None:
+        with open(path, "wb") as file:
+            marshal.dump(self.stats(), file)
+
+    def write_collapsed(self, path: Path | str) -> None:
+        Path(path).write_text("\n".join(self.collapsed()) + "\n", encoding="utf-8")
+
+
+def profiles_dir() -> Path:
+    """Directory the profiles are written to"""
+    from pymypersonalmap.gui.config_manager import ConfigManager
+    directory = ConfigManager().get_logs_dir() / "profiles"
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware profiling the requests that carry the profiling token
+
+    Args:
+        app: ASGI application
+        token: Secret expected in the X-Profile header
+        output_dir: Directory of the profiles (default: logs/profiles)
+        interval: Seconds between samples
+
+    Usage:
+        if PROFILE_TOKEN:
+            app.add_middleware(ProfilerMiddleware, token=PROFILE_TOKEN)
+    """
+
+    def __init__(
+        self,
+        app,
+        token: str,
+        output_dir: Path | str | None = None,
+        interval: float = DEFAULT_INTERVAL
+    ):
+        self.app = app
+        self.token = token.encode()
+        self.output_dir = Path(output_dir) if output_dir is not None else None
+        self.interval = interval
+
+    def _requested(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return hmac.compare_digest(value, self.token)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(4)}"
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER, profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = SamplingProfiler(self.interval)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            directory = self.output_dir or profiles_dir()
+            directory.mkdir(parents=True, exist_ok=True)
+            profiler.write_pstats(directory / f"{profile_id}.pstats")
+            profiler.write_collapsed(directory / f"{profile_id}.collapsed")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Memory Diagnostics Client
+
+Command line client of the backend admin memory endpoints: cache and
+index sizes, tracemalloc tracing and snapshot differences grouped by file
+and line. The backend must run with ADMIN_TOKEN set.
+
+Usage:
+    python scripts/memory_diagnostics.py caches              # Cache and index sizes
+    python scripts/memory_diagnostics.py start --frames 1    # Start tracing
+    python scripts/memory_diagnostics.py snapshot            # Take a snapshot, print its ID
+    python scripts/memory_diagnostics.py diff 1 2            # Growth between snapshots 1 and 2
+    python scripts/memory_diagnostics.py watch 300           # Snapshot, wait 5 min, snapshot, diff
+    python scripts/memory_diagnostics.py stop                # Stop tracing
+
+Options:
+    --url URL        Backend URL (default: http://127.0.0.1:8000)
+    --token TOKEN    Admin token (default: $ADMIN_TOKEN)
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ADMIN_PATH = "/api/v1/admin/memory"
+
+
+class AdminClient:
+    """Minimal client of the admin endpoints"""
+
+    def __init__(self, url: str, token: str):
+        self.url = url.rstrip("/")
+        self.token = token
+
+    def request(self, method: str, path: str) -> dict:
+        request = urllib.request.Request(
+            f"{self.url}{ADMIN_PATH}{path}",
+            method=method,
+            headers={"X-Admin-Token": self.token, "Accept": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=120) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                detail = json.loads(e.read()).get("detail", e.reason)
+            except ValueError:
+                detail = e.reason
+            raise SystemExit(f"Error {e.code}: {detail}")
+        except urllib.error.URLError as e:
+            raise SystemExit(f"Cannot reach {self.url}: {e.reason}")
+
+
+def format_bytes(value) -> str:
+    if value is None:
+        return "-"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(value) < 1024 or unit == "GiB":
+            return f"{value:.1f} {unit}" if unit != "B" else f"{value} B"
+        value /= 1024
+
+
+def print_caches(report: dict) -> None:
+    print(f"Process {report['pid']}: resident {format_bytes(report['resident_bytes'])}, "
+          f"{report['gc_objects']} objects tracked by the garbage collector")
+    print(f"{'cache':<24} {'entries':>10} {'bytes':>12}  details")
+    for name, stats in report["caches"].items():
+        if stats is None:
+            print(f"{name:<24} {'(not created)':>10}")
+            continue
+        details = ", ".join(
+            f"{key}={value}" for key, value in stats.items() if key not in ("entries", "bytes")
+        )
+        print(f"{name:<24} {stats.get('entries', '-'):>10} "
+              f"{format_bytes(stats.get('bytes')):>12}  {details}")
+
+
+def print_status(status: dict) -> None:
+    if not status["tracing"]:
+        print("Tracing is off")
+        return
+    print(f"Tracing with {status['frames']} frame(s): "
+          f"{format_bytes(status['traced_bytes'])} traced, "
+          f"peak {format_bytes(status['peak_traced_bytes'])}")
+    for snapshot in status["snapshots"]:
+        taken_at = time.strftime("%H:%M:%S", time.localtime(snapshot["taken_at"]))
+        print(f"  snapshot {snapshot['id']} taken at {taken_at}")
+
+
+def print_diff(diff: dict) -> None:
+    print(f"Snapshot {diff['first']} -> {diff['second']} ({diff['seconds']:.0f}s): "
+          f"{format_bytes(diff['size_diff'])} in {diff['count_diff']:+d} blocks")
+    print(f"{'growth':>12} {'blocks':>9} {'total':>12}  location")
+    for line in diff["lines"]:
+        print(f"{format_bytes(line['size_diff']):>12} {line['count_diff']:>+9d} "
+              f"{format_bytes(line['size']):>12}  {line['file']}:{line['line']}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Memory diagnostics of a running backend")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Backend URL")
+    parser.add_argument("--token", default=os.getenv("ADMIN_TOKEN", ""),
+                        help="Admin token (default: $ADMIN_TOKEN)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("caches", help="Size and entries of the caches and indexes")
+    commands.add_parser("status", help="Tracing status and available snapshots")
+    start = commands.add_parser("start", help="Start tracing allocations")
+    start.add_argument("--frames", type=int, default=1, help="Frames stored per allocation")
+    commands.add_parser("stop", help="Stop tracing and drop the snapshots")
+    commands.add_parser("snapshot", help="Take a snapshot")
+    diff = commands.add_parser("diff", help="Allocation growth between two snapshots")
+    diff.add_argument("first", type=int)
+    diff.add_argument("second", type=int)
+    diff.add_argument("--limit", type=int, default=25, help="Lines reported")
+    watch = commands.add_parser("watch", help="Snapshot, wait, snapshot and diff")
+    watch.add_argument("seconds", type=float)
+    watch.add_argument("--limit", type=int, default=25, help="Lines reported")
+    args = parser.parse_args(argv)
+
+    if not args.token:
+        parser.error("the admin token is required (--token or ADMIN_TOKEN)")
+    client = AdminClient(args.url, args.token)
+
+    if args.command == "caches":
+        print_caches(client.request("GET", ""))
+    elif args.command == "status":
+        print_status(client.request("GET", "/tracing"))
+    elif args.command == "start":
+        print_status(client.request("POST", f"/tracing/start?frames={args.frames}"))
+    elif args.command == "stop":
+        print_status(client.request("POST", "/tracing/stop"))
+    elif args.command == "snapshot":
+        snapshot = client.request("POST", "/snapshots")
+        print(f"Snapshot {snapshot['id']}: {format_bytes(snapshot['traced_bytes'])} traced")
+    elif args.command == "diff":
+        print_diff(client.request(
+            "GET", f"/snapshots/{args.first}/diff/{args.second}?limit={args.limit}"
+        ))
+    elif args.command == "watch":
+        client.request("POST", "/tracing/start")
+        first = client.request("POST", "/snapshots")
+        print(f"Snapshot {first['id']} taken, waiting {args.seconds:g}s...")
+        time.sleep(args.seconds)
+        second = client.request("POST", "/snapshots")
+        print_diff(client.request(
+            "GET", f"/snapshots/{first['id']}/diff/{second['id']}?limit={args.limit}"
+        ))
+        print()
+        print_caches(client.request("GET", ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())